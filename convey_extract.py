@@ -2,39 +2,20 @@ import io, re
 from typing import Dict, Any, List
 from PyPDF2 import PdfReader
 
-# OCR fallback
-try:
-    import pytesseract
-    from pdf2image import convert_from_bytes
-    _OCR_OK = True
-except Exception:
-    _OCR_OK = False
+from page_ocr import OCR_AVAILABLE as _OCR_OK
+from text_store import text_store
+from text_scanner import MultiPatternScanner, ScanRule
 
 def pdf_to_text(file_bytes: bytes) -> str:
-    """Extract text via PyPDF2; if very short and OCR available, use OCR fallback."""
-    # Try native
+    """Text from the shared text store; extracted (OCR'ing only pages without a text layer) on first sight."""
     try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        buf = []
-        for i, page in enumerate(reader.pages):
-            buf.append(page.extract_text() or "")
-        text = "\n\n".join(buf).strip()
-        if len(text) >= 400 or not _OCR_OK:
-            return text
+        return text_store.get_or_extract(file_bytes, ocr=_OCR_OK).text
     except Exception:
-        # fall through to OCR if available
         pass
 
-    if not _OCR_OK:
-        return ""
-
-    # OCR fallback
     try:
-        images = convert_from_bytes(file_bytes, dpi=300)  # needs poppler installed
-        parts = []
-        for idx, img in enumerate(images):
-            parts.append(pytesseract.image_to_string(img))
-        return "\n\n".join(parts).strip()
+        reader = PdfReader(io.BytesIO(file_bytes))
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages).strip()
     except Exception:
         return ""
 
@@ -53,6 +34,19 @@ def extract_with_ocr_fallback(file_bytes: bytes) -> Dict[str, Any]:
     raw = pdf_to_text(file_bytes)
     return conv_extract_from_text(raw)
 
+# Keyword and heading patterns of conv_extract_from_text, found in one pass
+_SCANNER = MultiPatternScanner([
+    ScanRule("flood_zone", ("flood",), r"\bflood\s*zone\s*([23])\b"),
+    ScanRule("surface_water", ("surface",), r"surface\s*water"),
+    ScanRule("tpo", ("tpo", "tree preservation"), r"\bTPO\b|\bTree Preservation\b"),
+    ScanRule("s106", ("section", "s106"), r"\bSection\s*106\b|\bS106\b"),
+    ScanRule("cil", ("community infrastructure levy", "cil"), r"\bCommunity Infrastructure Levy\b|\bCIL\b"),
+    ScanRule("conservation", ("conservation area",), r"\bConservation Area\b"),
+    ScanRule("council", ("local", "council", "authority"),
+             r"(?:Local\s+Authority|Council|Authority)\s*:\s*([^\n]+)", re.I | re.M),
+    ScanRule("address", ("address", "site"), r"(?:Address|Site\s*Address)\s*:\s*([^\n]+)", re.I | re.M),
+])
+
 def conv_extract_from_text(text: str) -> Dict[str, Any]:
     if not isinstance(text, str):
         text = ""
@@ -60,22 +54,27 @@ def conv_extract_from_text(text: str) -> Dict[str, Any]:
     # Planning refs like 12/3746, 12/3746N, SP/03/12
     refs = list(set(_find_all(r"\b[A-Z]{0,3}\/?\d{2,4}\/?\d{1,4}[A-Z]?\b", text)))
 
+    scan = _SCANNER.scan(text)
+
     # Basic flood mentions
     flood_norm = ""
-    if re.search(r"\bflood\s*zone\s*3\b", text, re.I): flood_norm = "Flood Zone 3"
-    elif re.search(r"\bflood\s*zone\s*2\b", text, re.I): flood_norm = "Flood Zone 2"
-    elif re.search(r"surface\s*water", text, re.I): flood_norm = "Surface water (screen)"
+    zones = {hit.group(1) for hit in scan.all("flood_zone")}
+    if "3" in zones: flood_norm = "Flood Zone 3"
+    elif "2" in zones: flood_norm = "Flood Zone 2"
+    elif "surface_water" in scan: flood_norm = "Surface water (screen)"
 
     # TPO + S106 + Conservation
-    tpo_present = bool(re.search(r"\bTPO\b|\bTree Preservation\b", text, re.I))
-    s106_present = bool(re.search(r"\bSection\s*106\b|\bS106\b", text, re.I))
-    cil_present = bool(re.search(r"\bCommunity Infrastructure Levy\b|\bCIL\b", text, re.I))
-    consv_present = bool(re.search(r"\bConservation Area\b", text, re.I))
+    tpo_present = "tpo" in scan
+    s106_present = "s106" in scan
+    cil_present = "cil" in scan
+    consv_present = "conservation" in scan
 
     # Council (best effort)
-    council_guess = _grab(r"(?:Local\s+Authority|Council|Authority)\s*:\s*([^\n]+)", text)
+    council = scan.first("council")
+    council_guess = council.group(1).strip() if council else ""
     # Address (very rough, gets anything that looks like an address heading)
-    address_guess = _grab(r"(?:Address|Site\s*Address)\s*:\s*([^\n]+)", text)
+    address = scan.first("address")
+    address_guess = address.group(1).strip() if address else ""
     if not address_guess:
         # fallback: first long line that looks like an address
         m = re.search(r"([A-Za-z0-9 ,.-]{15,}?)\s+(?:Tel|Telephone|Email)\b", text, re.I)
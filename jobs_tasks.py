@@ -1,23 +1,19 @@
-import os, tempfile, subprocess
+import os
 from parsers.pdf_text import extract_pdf_text
+from text_store import text_store
 from db import SessionLocal
 from models import Matters, File as FileModel, Finding, Risk as RiskModel
 from risk_engine import run as run_rules
 from datetime import datetime, timezone
 
 def ocr_text_task(path: str) -> dict:
-    text = extract_pdf_text(path) or ""
-    if len((text or "").strip()) >= 100:
-        return {"applied": False, "text": text}
-    if os.getenv("OCR_ENABLED","true").lower() != "true":
-        return {"applied": False, "text": text}
+    ocr = os.getenv("OCR_ENABLED","true").lower() == "true"
     try:
-        out = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf").name
-        subprocess.run(["ocrmypdf","--quiet","--force-ocr", path, out], check=True)
-        text2 = extract_pdf_text(out) or text
-        return {"applied": True, "text": text2}
+        # Stored text by content hash; otherwise native text per page, OCR only where a page has none
+        doc = text_store.get_or_extract(path, ocr=ocr)
     except Exception:
-        return {"applied": False, "text": text}
+        return {"applied": False, "text": extract_pdf_text(path) or ""}
+    return {"applied": doc.ocr_applied, "text": doc.text, "cached": doc.cached}
 
 def process_scan_task(matter_id: int, doc_id: int) -> dict:
     """Full pipeline in background: OCR-if-needed → rules → persist."""
@@ -26,15 +22,12 @@ def process_scan_task(matter_id: int, doc_id: int) -> dict:
         m = db.get(Matter, matter_id)
         d = db.get(FileModel, doc_id)
         if not m or not d: return {"ok": False, "error": "not found"}
-        text = extract_pdf_text(d.path or "") or ""
-        applied = False
-        if len((text or "").strip()) < 100 and os.getenv("OCR_ENABLED","true").lower() == "true":
-            res = ocr_text_task(d.path or "")
-            applied = bool(res.get("applied"))
-            text = res.get("text") or text
-            if applied and not d.ocr_applied:
-                d.ocr_applied = True
-                db.commit()
+        res = ocr_text_task(d.path or "")
+        text = res.get("text") or ""
+        applied = bool(res.get("applied"))
+        if applied and not d.ocr_applied:
+            d.ocr_applied = True
+            db.commit()
         result = run_rules(text)
         # persist
         for f in result.get("findings", []):
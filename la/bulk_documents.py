@@ -0,0 +1,202 @@
+"""
+Bulk Document Processing
+Backfill of LLC1/CON29 replies for many matters from one folder
+
+The folder is listed once and files named {ref}_LLC1.pdf / {ref}_CON29.pdf
+are matched to matters by ref with one query per QUERY_CHUNK refs. Each matter's documents are
+hashed, copied into the data directory and parsed in a process pool (text
+comes from the shared text store, so documents seen before aren't parsed
+again). Results come back as plain rows and are written a batch of matters
+at a time: orders, documents and risks with bulk inserts, findings with
+upsert_findings.
+"""
+import logging
+import os
+import re
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from text_store import content_sha256, text_store
+from .finding_store import con29_findings, llc1_findings, upsert_findings
+from .models import LADocument, LAMatter, LAOrder, LARisk
+from .parsers import parse_con29, parse_llc1
+from .risk import risk_engine
+
+logger = logging.getLogger(__name__)
+
+# Same directory la.services stores uploaded documents in
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../data"))
+
+DOCUMENT_NAME = re.compile(r"^(?P<ref>.+)_(?P<kind>LLC1|CON29)\.pdf$", re.I)
+
+# Matters written per commit
+BATCH_MATTERS = 200
+
+# Bound on IN-list size for ref lookups
+QUERY_CHUNK = 500
+
+RISK_MESSAGES = {
+    "UnadoptedRoad": "Abutting highway is not adopted",
+    "ConservationArea": "Property is in a conservation area",
+    "ListedBuilding": "Property is a listed building",
+    "EnforcementNotice": "Enforcement notices are recorded",
+    "ContaminatedLand": "Contaminated land designation is recorded",
+    "Section106": "Section 106 agreement is recorded",
+    "CILOutstanding": "Community Infrastructure Levy is outstanding",
+    "FloodZone3": "Property is in flood zone 3",
+    "RadonAffected": "Property is in a radon affected area",
+    "MissingBuildingRegs": "No building regulations completion certificate",
+}
+
+# Document each risk code is derived from; a batch only replaces risks its documents can re-derive
+LLC1_RISKS = ("ConservationArea", "ListedBuilding")
+CON29_RISKS = tuple(code for code in RISK_MESSAGES if code not in LLC1_RISKS)
+
+# (matter id, order id, [(kind, source path)], destination directory)
+MatterTask = Tuple[str, str, List[Tuple[str, str]], str]
+
+
+def scan_document_folder(folder: str) -> Dict[str, Dict[str, str]]:
+    """{ref: {kind: path}} for every {ref}_LLC1.pdf / {ref}_CON29.pdf in the folder"""
+
+    documents: Dict[str, Dict[str, str]] = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            m = DOCUMENT_NAME.match(entry.name)
+            if m and entry.is_file():
+                documents.setdefault(m.group("ref"), {})[m.group("kind").upper()] = entry.path
+    return documents
+
+
+def match_matters(
+    db: Session,
+    documents: Dict[str, Dict[str, str]],
+    matter_ids: Optional[Iterable[str]] = None
+) -> List[Tuple[str, str]]:
+    """(matter id, ref) for matters with documents in the folder, optionally limited to matter_ids"""
+
+    wanted = set(matter_ids) if matter_ids is not None else None
+    refs = sorted(documents)
+    matched = []
+    for i in range(0, len(refs), QUERY_CHUNK):
+        rows = db.query(LAMatter.id, LAMatter.ref).filter(LAMatter.ref.in_(refs[i:i + QUERY_CHUNK]))
+        matched.extend((matter_id, ref) for matter_id, ref in rows if wanted is None or matter_id in wanted)
+    return matched
+
+
+def parse_matter_documents(task: MatterTask) -> Dict[str, Any]:
+    """
+    Copy, extract and parse one matter's documents (runs in a worker process)
+
+    Returns the order, document, finding and risk rows to write, or an
+    error for the matter.
+    """
+
+    matter_id, order_id, docs, dest_dir = task
+    result: Dict[str, Any] = {"matter_id": matter_id, "order_id": order_id, "kinds": [k for k, _ in docs],
+                              "documents": [], "findings": [], "risks": [], "error": None}
+    try:
+        llc1 = con29 = None
+        for kind, path in docs:
+            sha = content_sha256(path)
+            dest = os.path.join(dest_dir, f"{order_id}_{kind}_{sha[:10]}.bin")
+            shutil.copyfile(path, dest)
+            result["documents"].append({"id": str(uuid.uuid4()), "order_id": order_id, "kind": kind,
+                                        "file_path": dest, "content_type": "application/octet-stream"})
+
+            text = text_store.get_or_extract(path, sha256=sha).text
+            if kind == "LLC1":
+                llc1 = parse_llc1(text)
+                result["findings"].extend(llc1_findings(matter_id, llc1))
+            else:
+                con29 = parse_con29(text)
+                result["findings"].extend(con29_findings(matter_id, con29))
+
+        result["risks"] = [
+            {"id": str(uuid.uuid4()), "matter_id": matter_id, "code": r["code"], "severity": r["level"],
+             "message": RISK_MESSAGES.get(r["code"], r["code"])}
+            for r in risk_engine(llc1, con29)
+        ]
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def process_document_folder(
+    db: Session,
+    folder: str,
+    matter_ids: Optional[Iterable[str]] = None,
+    workers: Optional[int] = None,
+    batch_size: int = BATCH_MATTERS,
+    dest_dir: str = DATA_DIR
+) -> Dict[str, Any]:
+    """
+    Parse and store the documents in a folder for every matching matter
+
+    Args:
+        db: Session used for all writes (from the calling process)
+        folder: Folder of {ref}_LLC1.pdf / {ref}_CON29.pdf files
+        matter_ids: Only process these matters (default: every matched ref)
+        workers: Parsing processes (default: CPU count; 0 parses in this process)
+        batch_size: Matters written per commit
+        dest_dir: Where document copies are stored
+    """
+
+    documents = scan_document_folder(folder)
+    matched = match_matters(db, documents, matter_ids)
+    os.makedirs(dest_dir, exist_ok=True)
+    tasks: List[MatterTask] = [
+        (matter_id, str(uuid.uuid4()), sorted(documents[ref].items()), dest_dir) for matter_id, ref in matched
+    ]
+
+    results = {"processed": 0, "errors": [], "matched": len(tasks),
+               "unmatched_refs": len(documents) - len({ref for _, ref in matched})}
+    if not tasks:
+        return results
+
+    pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count()) if workers != 0 else None
+    try:
+        parsed = pool.map(parse_matter_documents, tasks, chunksize=8) if pool else map(parse_matter_documents, tasks)
+        batch: List[Dict[str, Any]] = []
+        for result in parsed:
+            if result["error"]:
+                results["errors"].append(f"Matter {result['matter_id']}: {result['error']}")
+                continue
+            batch.append(result)
+            if len(batch) >= batch_size:
+                results["processed"] += _write_batch(db, batch)
+                batch = []
+        if batch:
+            results["processed"] += _write_batch(db, batch)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    logger.info("Bulk document processing of %s: %d matters, %d errors",
+                folder, results["processed"], len(results["errors"]))
+    return results
+
+
+def _write_batch(db: Session, batch: List[Dict[str, Any]]) -> int:
+    try:
+        db.bulk_insert_mappings(LAOrder, [
+            {"id": r["order_id"], "matter_id": r["matter_id"], "council_code": "MANUAL",
+             "types": ",".join(r["kinds"]), "status": "READY"}
+            for r in batch
+        ])
+        db.bulk_insert_mappings(LADocument, [d for r in batch for d in r["documents"]])
+        upsert_findings(db, [f for r in batch for f in r["findings"]])
+        for kinds in {tuple(r["kinds"]) for r in batch}:
+            codes = (LLC1_RISKS if "LLC1" in kinds else ()) + (CON29_RISKS if "CON29" in kinds else ())
+            ids = [r["matter_id"] for r in batch if tuple(r["kinds"]) == kinds]
+            db.query(LARisk).filter(LARisk.matter_id.in_(ids), LARisk.code.in_(codes)).delete(synchronize_session=False)
+        db.bulk_insert_mappings(LARisk, [risk for r in batch for risk in r["risks"]])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(batch)
@@ -0,0 +1,427 @@
+"""
+Bulk Matter Import
+Streaming, resumable CSV import of LA matters
+
+The uploaded CSV is spooled to disk and read once, row by row, to record
+chunk boundaries (the byte range of every CHUNK_ROWS rows). Each chunk is
+then a job on the RQ queue served by worker.py. A chunk task reads only its
+own byte range, opens its own session, skips refs that already exist and
+bulk-inserts the rest, marking its checkpoint done in the same transaction.
+An import interrupted by a crash is resumed by re-enqueueing the chunks that
+are not done; rows already imported are never inserted twice.
+
+Without RQ or a reachable Redis, chunks run on a local thread pool instead.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from db import SessionLocal
+from .models import LABulkImportChunk, LABulkImportJob, LAMatter
+
+try:
+    from redis import Redis
+    from rq import Queue
+    RQ_AVAILABLE = True
+except ImportError:
+    RQ_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+BULK_IMPORT_DIR = os.getenv("BULK_IMPORT_DIR", "data/bulk_imports")
+CHUNK_ROWS = int(os.getenv("BULK_IMPORT_CHUNK_ROWS", "500"))
+LOCAL_WORKERS = int(os.getenv("BULK_IMPORT_LOCAL_WORKERS", "4"))
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+RQ_QUEUE = os.getenv("RQ_QUEUE", "default")
+CHUNK_TIMEOUT_SECONDS = 600
+
+# Row errors kept per chunk
+MAX_CHUNK_ERRORS = 50
+
+PRIORITIES = ("standard", "priority", "urgent")
+
+# (start offset, end offset, first row number, row count)
+Chunk = Tuple[int, int, int, int]
+
+_local_pool: Optional[ThreadPoolExecutor] = None
+
+
+class _OffsetLines:
+    """Decoded lines of a binary file, tracking the byte offset consumed so far"""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.offset = f.tell()
+
+    def __iter__(self) -> "_OffsetLines":
+        return self
+
+    def __next__(self) -> str:
+        line = self.f.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode("utf-8", "replace")
+
+
+def plan_chunks(path: str, chunk_rows: int = CHUNK_ROWS) -> Tuple[List[str], List[Chunk]]:
+    """
+    Header and chunk boundaries of a CSV file, read in one streaming pass
+
+    csv.reader pulls exactly the lines of each record (quoted fields may span
+    lines), so the offset after a record is where the next one starts.
+    """
+
+    with open(path, "rb") as f:
+        if f.read(3) != b"\xef\xbb\xbf":
+            f.seek(0)
+        lines = _OffsetLines(f)
+        reader = csv.reader(lines)
+        header = [name.strip() for name in next(reader, [])]
+        if not any(header):
+            raise ValueError("CSV file has no header row")
+
+        chunks: List[Chunk] = []
+        start, first_row, rows = lines.offset, 1, 0
+        for row in reader:
+            if not row:
+                continue
+            rows += 1
+            if rows == chunk_rows:
+                chunks.append((start, lines.offset, first_row, rows))
+                start, first_row, rows = lines.offset, first_row + rows, 0
+        if rows:
+            chunks.append((start, lines.offset, first_row, rows))
+
+    return header, chunks
+
+
+def read_chunk(path: str, header: List[str], start: int, end: int) -> Iterator[Dict[str, str]]:
+    """Rows in one chunk's byte range"""
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start).decode("utf-8", "replace")
+    return csv.DictReader(io.StringIO(data, newline=""), fieldnames=header)
+
+
+def _flag(value: Optional[str], default: bool) -> str:
+    if value is None or not value.strip():
+        return "true" if default else "false"
+    return "true" if value.strip().lower() in ("true", "yes", "y", "1") else "false"
+
+
+def matter_mapping(row: Dict[str, str], row_number: int, job_id: str) -> Dict[str, Any]:
+    """
+    LAMatter column values for one CSV row
+
+    Expected columns: ref, applicant_name, applicant_email, property_address,
+    llc1_requested, con29_requested (optional: applicant_phone, uprn,
+    con29o_requested, priority). Rows without a ref get one derived from the
+    job and row number, so a re-run produces the same ref.
+
+    Raises:
+        ValueError: If the row has no property address
+    """
+
+    def value(name: str) -> str:
+        return (row.get(name) or "").strip()
+
+    address = value("property_address") or value("address")
+    if not address:
+        raise ValueError("property_address is required")
+
+    priority = value("priority").lower() or "standard"
+    return {
+        "id": str(uuid.uuid4()),
+        "ref": value("ref") or f"BULK-{job_id[:8].upper()}-{row_number}",
+        "address": address,
+        "uprn": value("uprn") or None,
+        "applicant_name": value("applicant_name") or None,
+        "applicant_email": value("applicant_email") or None,
+        "applicant_phone": value("applicant_phone") or None,
+        "llc1_requested": _flag(row.get("llc1_requested"), True),
+        "con29_requested": _flag(row.get("con29_requested"), True),
+        "con29o_requested": _flag(row.get("con29o_requested"), False),
+        "priority": priority if priority in PRIORITIES else "standard",
+        "status": "created",
+        "payment_status": "pending",
+        "sla_status": "on_time",
+    }
+
+
+def _apply_fees_and_sla(mappings: List[Dict[str, Any]]) -> None:
+    """Fee and SLA due date per row, computed once per distinct product/priority mix"""
+
+    from payments import payment_engine
+    from sla import sla_manager
+
+    def key(m: Dict[str, Any]) -> Tuple[str, str, str, str]:
+        return m["llc1_requested"], m["con29_requested"], m["con29o_requested"], m["priority"]
+
+    async def compute(k: Tuple[str, str, str, str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        matter_data = {
+            "llc1_requested": k[0],
+            "con29_requested": k[1],
+            "con29o_requested": k[2],
+            "priority": k[3],
+        }
+        return await payment_engine.calculate_fees(matter_data), await sla_manager.calculate_sla_dates(matter_data)
+
+    async def compute_all(keys: List[Tuple[str, str, str, str]]) -> List[Any]:
+        return await asyncio.gather(*(compute(k) for k in keys))
+
+    keys = sorted({key(m) for m in mappings})
+    if not keys:
+        return
+    results = dict(zip(keys, asyncio.run(compute_all(keys))))
+    for m in mappings:
+        fees, sla_dates = results[key(m)]
+        m["fee_calculated"] = fees.get("total")
+        if "due_date" in sla_dates:
+            m["sla_due_date"] = sla_dates["due_date"]
+
+
+def import_chunk(job_id: str, chunk_index: int) -> Dict[str, Any]:
+    """
+    Import one chunk of a bulk import (RQ job)
+
+    Runs in its own session. Rows are checked against existing refs and
+    bulk-inserted; the chunk checkpoint is marked done in the same commit,
+    so a chunk is either fully imported and recorded or not at all.
+    """
+
+    db = SessionLocal()
+    try:
+        job = db.get(LABulkImportJob, job_id)
+        chunk = db.query(LABulkImportChunk).filter_by(job_id=job_id, chunk_index=chunk_index).first()
+        if job is None or chunk is None:
+            return {"ok": False, "error": "not found"}
+        if chunk.status == "done":
+            return {"ok": True, "already_done": True}
+
+        try:
+            created, skipped, errors = _import_rows(db, job, chunk)
+            chunk.status = "done"
+            chunk.created_count = created
+            chunk.skipped_count = skipped
+            chunk.error_count = len(errors)
+            chunk.errors = json.dumps(errors[:MAX_CHUNK_ERRORS])
+            chunk.last_error = None
+            chunk.attempts += 1
+            chunk.completed_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            _mark_failed(db, chunk, e)
+            raise
+
+        return {"ok": True, "created": created, "skipped": skipped, "errors": len(errors)}
+    finally:
+        db.close()
+
+
+def _import_rows(db: Session, job: LABulkImportJob, chunk: LABulkImportChunk) -> Tuple[int, int, List[str]]:
+    header = json.loads(job.header)
+    mappings: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    rows = read_chunk(job.file_path, header, chunk.start_offset, chunk.end_offset)
+    for row_number, row in enumerate(rows, start=chunk.first_row):
+        try:
+            mappings.append(matter_mapping(row, row_number, job.id))
+        except ValueError as e:
+            errors.append(f"Row {row_number}: {e}")
+
+    # Refs already present (earlier attempts, other chunks, existing matters) are skipped
+    refs = {m["ref"] for m in mappings}
+    existing = {ref for (ref,) in db.query(LAMatter.ref).filter(LAMatter.ref.in_(refs))} if refs else set()
+    fresh: Dict[str, Dict[str, Any]] = {}
+    for m in mappings:
+        if m["ref"] not in existing:
+            fresh.setdefault(m["ref"], m)
+
+    new_rows = list(fresh.values())
+    _apply_fees_and_sla(new_rows)
+    db.bulk_insert_mappings(LAMatter, new_rows)
+    return len(new_rows), len(mappings) - len(new_rows), errors
+
+
+def _mark_failed(db: Session, chunk: LABulkImportChunk, error: Exception) -> None:
+    try:
+        db.refresh(chunk)
+        # A concurrent run of the same chunk may have finished it
+        if chunk.status != "done":
+            chunk.status = "failed"
+            chunk.last_error = str(error)[:500]
+            chunk.attempts += 1
+            db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Could not record failure of bulk import chunk %s", chunk.id)
+
+
+def start_import(db: Session, path: str, filename: Optional[str] = None, chunk_rows: int = CHUNK_ROWS) -> LABulkImportJob:
+    """
+    Plan a spooled CSV into chunks, record them and enqueue every chunk
+
+    Raises:
+        ValueError: If the file has no header row
+    """
+
+    header, chunks = plan_chunks(path, chunk_rows)
+    job = LABulkImportJob(
+        id=str(uuid.uuid4()),
+        filename=filename,
+        file_path=path,
+        header=json.dumps(header),
+        total_rows=sum(c[3] for c in chunks),
+        chunk_rows=chunk_rows,
+    )
+    db.add(job)
+    db.flush()
+    db.bulk_insert_mappings(LABulkImportChunk, [
+        {
+            "id": str(uuid.uuid4()),
+            "job_id": job.id,
+            "chunk_index": index,
+            "start_offset": start,
+            "end_offset": end,
+            "first_row": first_row,
+            "row_count": rows,
+            "status": "pending",
+            "created_count": 0,
+            "skipped_count": 0,
+            "error_count": 0,
+            "attempts": 0,
+        }
+        for index, (start, end, first_row, rows) in enumerate(chunks)
+    ])
+    db.commit()
+
+    job.backend = enqueue_chunks(job.id, range(len(chunks)))
+    db.commit()
+    logger.info("Bulk import %s: %d rows in %d chunks via %s", job.id, job.total_rows, len(chunks), job.backend)
+    return job
+
+
+def resume_import(db: Session, job_id: str) -> Optional[Dict[str, Any]]:
+    """Re-enqueue the chunks of an import that are not done; None if there is no such import"""
+
+    job = db.get(LABulkImportJob, job_id)
+    if job is None:
+        return None
+    indexes = [
+        index for (index,) in db.query(LABulkImportChunk.chunk_index)
+        .filter(LABulkImportChunk.job_id == job_id, LABulkImportChunk.status != "done")
+        .order_by(LABulkImportChunk.chunk_index)
+    ]
+    if indexes:
+        job.backend = enqueue_chunks(job_id, indexes)
+        db.commit()
+    return {"job_id": job_id, "resumed_chunks": len(indexes), "backend": job.backend}
+
+
+def enqueue_chunks(job_id: str, indexes: Iterable[int]) -> str:
+    """Enqueue chunk tasks on RQ, or run them on the local pool; returns the backend used"""
+
+    indexes = list(indexes)
+    if RQ_AVAILABLE:
+        try:
+            conn = Redis.from_url(REDIS_URL)
+            conn.ping()
+            queue = Queue(RQ_QUEUE, connection=conn)
+            for index in indexes:
+                queue.enqueue(import_chunk, job_id, index, job_timeout=CHUNK_TIMEOUT_SECONDS,
+                              description=f"bulk import {job_id} chunk {index}")
+            return "rq"
+        except Exception as e:
+            logger.warning("RQ unavailable for bulk import %s, running locally: %s", job_id, e)
+
+    global _local_pool
+    if _local_pool is None:
+        _local_pool = ThreadPoolExecutor(max_workers=LOCAL_WORKERS, thread_name_prefix="bulk-import")
+    for index in indexes:
+        _local_pool.submit(_run_local, job_id, index)
+    return "local"
+
+
+def _run_local(job_id: str, chunk_index: int) -> None:
+    try:
+        import_chunk(job_id, chunk_index)
+    except Exception:
+        logger.exception("Bulk import %s chunk %d failed", job_id, chunk_index)
+
+
+def import_status(db: Session, job_id: str) -> Optional[Dict[str, Any]]:
+    """Progress of an import from its chunk checkpoints; None if there is no such import"""
+
+    job = db.get(LABulkImportJob, job_id)
+    if job is None:
+        return None
+
+    chunks = {"pending": 0, "done": 0, "failed": 0}
+    processed_rows = created = skipped = rejected = 0
+    totals = (
+        db.query(
+            LABulkImportChunk.status,
+            func.count(LABulkImportChunk.id),
+            func.sum(LABulkImportChunk.row_count),
+            func.sum(LABulkImportChunk.created_count),
+            func.sum(LABulkImportChunk.skipped_count),
+            func.sum(LABulkImportChunk.error_count),
+        )
+        .filter(LABulkImportChunk.job_id == job_id)
+        .group_by(LABulkImportChunk.status)
+    )
+    for status, count, rows, created_rows, skipped_rows, error_rows in totals:
+        chunks[status] = count
+        if status == "done":
+            processed_rows, created, skipped, rejected = rows or 0, created_rows or 0, skipped_rows or 0, error_rows or 0
+
+    failures = (
+        db.query(LABulkImportChunk.chunk_index, LABulkImportChunk.last_error, LABulkImportChunk.errors)
+        .filter(LABulkImportChunk.job_id == job_id,
+                (LABulkImportChunk.status == "failed") | (LABulkImportChunk.error_count > 0))
+        .order_by(LABulkImportChunk.chunk_index)
+        .limit(20)
+    )
+    errors: List[str] = []
+    for index, last_error, row_errors in failures:
+        if last_error:
+            errors.append(f"Chunk {index}: {last_error}")
+        errors.extend(json.loads(row_errors or "[]"))
+
+    total_chunks = sum(chunks.values())
+    if chunks["done"] == total_chunks:
+        status = "completed"
+    elif chunks["pending"] == 0:
+        status = "failed"
+    else:
+        status = "running"
+
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "status": status,
+        "backend": job.backend,
+        "total_rows": job.total_rows,
+        "processed_rows": processed_rows,
+        "progress_percent": round(processed_rows / job.total_rows * 100, 1) if job.total_rows else 100.0,
+        "matters_created": created,
+        "rows_skipped": skipped,
+        "rows_rejected": rejected,
+        "chunks": {"total": total_chunks, **chunks},
+        "errors": errors[:MAX_CHUNK_ERRORS],
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+    }
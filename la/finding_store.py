@@ -0,0 +1,94 @@
+"""
+Finding Rows
+Normalised findings for parsed LLC1/CON29 replies, and batched writes of them
+
+Findings are built as plain column mappings so they can be produced in
+worker processes and written many matters at a time. A matter has at most
+one finding per key: upsert_findings replaces existing (matter, key) rows
+with one DELETE and one bulk INSERT per batch.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from .models import LAFinding
+from .schemas import LLC1, Con29
+
+# Rows per DELETE/INSERT pair
+UPSERT_BATCH_SIZE = 500
+
+FindingRow = Dict[str, Any]
+
+
+def finding_row(matter_id: str, key: str, value: Any, ev_file: str, ev_page: Optional[int], conf: int = 90) -> FindingRow:
+    return {
+        "matter_id": matter_id,
+        "key": key,
+        "value": json.dumps(value),
+        "evidence_file": ev_file,
+        "evidence_page": ev_page,
+        "confidence": conf,
+    }
+
+
+def llc1_findings(matter_id: str, model: LLC1) -> List[FindingRow]:
+    def present(charge_type: str) -> bool:
+        return any(c.charge_type == charge_type and c.present for c in model.charges)
+
+    return [
+        finding_row(matter_id, "llc1.conservation_area.present", present("ConservationArea"), "LLC1", 1),
+        finding_row(matter_id, "llc1.listed_building.present", present("ListedBuilding"), "LLC1", 1),
+        finding_row(matter_id, "llc1.tpo.present", present("TPO"), "LLC1", 1),
+        finding_row(matter_id, "llc1.article4.present", present("Article4Direction"), "LLC1", 1),
+    ]
+
+
+def con29_findings(matter_id: str, model: Con29) -> List[FindingRow]:
+    rows = []
+
+    def add(key: str, value: Any) -> None:
+        rows.append(finding_row(matter_id, key, value, "CON29", 1))
+
+    if model.roads_footways is not None:
+        add("con29.roads_footways.abutting_highway_adopted", model.roads_footways.abutting_highway_adopted)
+        if model.roads_footways.authority:
+            add("con29.roads_footways.highways_authority", model.roads_footways.authority)
+    if model.enforcement_notices_present is not None:
+        add("con29.enforcement_notices_present", bool(model.enforcement_notices_present))
+    if model.contaminated_land_designation is not None:
+        add("con29.contaminated_land_designation", bool(model.contaminated_land_designation))
+    if model.s106_present is not None:
+        add("con29.s106_present", bool(model.s106_present))
+    if model.cil_outstanding is not None:
+        add("con29.cil_outstanding", bool(model.cil_outstanding))
+    if model.flood_zone is not None:
+        add("con29.flood_zone", str(model.flood_zone))
+    if model.radon_affected is not None:
+        add("con29.radon_affected", bool(model.radon_affected))
+    if model.building_regs_completion_present is not None:
+        add("con29.building_regs_completion_present", bool(model.building_regs_completion_present))
+    return rows
+
+
+def upsert_findings(db: Session, rows: List[FindingRow], batch_size: int = UPSERT_BATCH_SIZE) -> int:
+    """
+    Replace the findings for each (matter, key) in rows
+
+    The last row for a (matter, key) wins. Nothing is committed; returns
+    the number of findings written.
+    """
+
+    latest: Dict[Tuple[str, str], FindingRow] = {}
+    for row in rows:
+        latest[(row["matter_id"], row["key"])] = row
+
+    items = list(latest.items())
+    for i in range(0, len(items), batch_size):
+        batch = items[i:i + batch_size]
+        db.query(LAFinding).filter(
+            tuple_(LAFinding.matter_id, LAFinding.key).in_([pair for pair, _ in batch])
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(LAFinding, [row for _, row in batch])
+    return len(items)
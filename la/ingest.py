@@ -0,0 +1,387 @@
+"""
+LA Matter Ingest Pipeline
+Spools uploads to disk and extracts PDF text page by page in a bounded process pool
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from text_store import DocumentTextStore, StoredText
+
+logger = logging.getLogger(__name__)
+
+INGEST_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/uploads/la_ingest"))
+
+# Uploads are copied to disk in chunks of this size
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+# Pages waiting for a worker; producers block once it is full
+PAGE_QUEUE_SIZE = 64
+
+MAX_EXTRACT_WORKERS = int(os.getenv("LA_INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Finished jobs are forgotten after this long
+JOB_RETENTION_SECONDS = 3600
+
+# Parsed readers kept per worker process, so per-page tasks don't re-parse the file
+READER_CACHE_SIZE = 4
+
+_readers: Dict[str, Any] = {}
+
+
+def _get_reader(path: str):
+    reader = _readers.get(path)
+    if reader is None:
+        from PyPDF2 import PdfReader
+
+        if len(_readers) >= READER_CACHE_SIZE:
+            _readers.pop(next(iter(_readers)))
+        reader = _readers[path] = PdfReader(path)
+    return reader
+
+
+def count_pdf_pages(path: str) -> int:
+    """Number of pages in a PDF (runs in a worker process)"""
+    return len(_get_reader(path).pages)
+
+
+def extract_pdf_page(path: str, page_number: int) -> str:
+    """Text of one PDF page (runs in a worker process)"""
+    return _get_reader(path).pages[page_number].extract_text() or ""
+
+
+async def spool_upload(upload: Any, directory: str, chunk_size: int = SPOOL_CHUNK_BYTES) -> Tuple[str, int, str]:
+    """
+    Copy an UploadFile to disk in chunks
+
+    Returns:
+        (stored path, size in bytes, SHA-256 of the content)
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.basename(getattr(upload, "filename", None) or "upload.pdf")
+    path = os.path.join(directory, f"{uuid.uuid4().hex[:8]}_{filename}")
+
+    size = 0
+    digest = hashlib.sha256()
+    with open(path, "wb") as out:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            await asyncio.to_thread(out.write, chunk)
+            digest.update(chunk)
+            size += len(chunk)
+
+    return path, size, digest.hexdigest()
+
+
+class PageExtractionPipeline:
+    """
+    Bounded per-page text extraction
+
+    Files are split into one task per page. Tasks go through a bounded
+    asyncio queue to a fixed set of consumers, each running one page at a
+    time in the executor (a process pool by default), so extraction never
+    runs on the event loop and producers wait while the queue is full. Every
+    file shares the same queue and workers, so a large bundle is interleaved
+    with other uploads instead of holding the worker until it finishes.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MAX_EXTRACT_WORKERS,
+        queue_size: int = PAGE_QUEUE_SIZE,
+        executor: Optional[Executor] = None,
+        count_pages: Callable[[str], int] = count_pdf_pages,
+        extract_page: Callable[[str, int], str] = extract_pdf_page
+    ):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.count_pages = count_pages
+        self.extract_page = extract_page
+
+        self._executor = executor
+        self._owns_executor = executor is None
+
+        # Queue and consumers are bound to the loop they were created on
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+        self.stats = {
+            'files': 0,
+            'pages_extracted': 0,
+            'page_errors': 0
+        }
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.max_workers)]
+        self._loop = loop
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            path, page_number, future = await self._queue.get()
+            try:
+                if not future.done():
+                    text = await loop.run_in_executor(self._executor, self.extract_page, path, page_number)
+                    if not future.done():
+                        future.set_result(text)
+                    self.stats['pages_extracted'] += 1
+            except Exception as e:
+                self.stats['page_errors'] += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def extract_file(
+        self,
+        path: str,
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[List[str], List[int]]:
+        """
+        Extract every page of a file
+
+        Args:
+            path: File on disk
+            on_progress: Called with (pages done, total pages) as pages finish
+
+        Returns:
+            (page texts in page order, numbers of pages that failed);
+            failed pages contribute empty text
+
+        Raises:
+            Whatever count_pages raises for an unreadable file
+        """
+
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        self.stats['files'] += 1
+
+        total = await loop.run_in_executor(self._executor, self.count_pages, path)
+        done = 0
+        if on_progress:
+            on_progress(done, total)
+
+        def page_finished(_future: asyncio.Future) -> None:
+            nonlocal done
+            done += 1
+            if on_progress:
+                on_progress(done, total)
+
+        futures: List[asyncio.Future] = []
+        try:
+            for page_number in range(total):
+                future = loop.create_future()
+                future.add_done_callback(page_finished)
+                futures.append(future)
+                await self._queue.put((path, page_number, future))
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+
+        results = await asyncio.gather(*futures, return_exceptions=True)
+
+        texts: List[str] = []
+        failed: List[int] = []
+        for page_number, result in enumerate(results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Page {page_number + 1} of {path} failed: {result}")
+                failed.append(page_number)
+                texts.append("")
+            else:
+                texts.append(result)
+        return texts, failed
+
+    async def close(self) -> None:
+        """Stop the consumers and the pool this pipeline created"""
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._loop = None
+
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+@dataclass
+class IngestFile:
+    """Progress of one uploaded file"""
+    filename: str
+    stored_path: str
+    size_bytes: int
+    file_id: Optional[str] = None
+    sha256: Optional[str] = None
+    status: str = "queued"  # queued|processing|completed|failed
+    cached: bool = False
+    pages_total: Optional[int] = None
+    pages_done: int = 0
+    failed_pages: List[int] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class IngestJob:
+    """Background extraction of every file in one upload"""
+    job_id: str
+    matter_id: str
+    files: List[IngestFile]
+    status: str = "queued"  # queued|processing|completed|failed
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        pages_total = sum(f.pages_total or 0 for f in self.files)
+        pages_done = sum(f.pages_done for f in self.files)
+        return {
+            "job_id": self.job_id,
+            "matter_id": self.matter_id,
+            "status": self.status,
+            "progress": round(pages_done / pages_total, 3) if pages_total else 0.0,
+            "pages_total": pages_total,
+            "pages_done": pages_done,
+            "files": [
+                {
+                    "file_id": f.file_id,
+                    "filename": f.filename,
+                    "size_bytes": f.size_bytes,
+                    "status": f.status,
+                    "cached": f.cached,
+                    "pages_total": f.pages_total,
+                    "pages_done": f.pages_done,
+                    "failed_pages": [page + 1 for page in f.failed_pages],
+                    "error": f.error
+                }
+                for f in self.files
+            ],
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class IngestJobRegistry:
+    """
+    Ingest jobs of this worker process
+
+    Jobs run on the worker that accepted the upload; per-file results are
+    also persisted (LAFile.processing_status), which is what other workers
+    see.
+    """
+
+    def __init__(self, retention_seconds: float = JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, IngestJob] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def create(self, matter_id: str, files: List[IngestFile], job_id: Optional[str] = None) -> IngestJob:
+        self._prune()
+        job = IngestJob(job_id=job_id or str(uuid.uuid4()), matter_id=matter_id, files=files)
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def start(
+        self,
+        job: IngestJob,
+        pipeline: PageExtractionPipeline,
+        persist: Callable[[IngestJob, IngestFile, str], None],
+        store: Optional[DocumentTextStore] = None
+    ) -> asyncio.Task:
+        """Run a job in the background; persist(job, file, text) runs in a thread per file"""
+
+        task = asyncio.get_running_loop().create_task(run_ingest_job(job, pipeline, persist, store))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j for j, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+async def run_ingest_job(
+    job: IngestJob,
+    pipeline: PageExtractionPipeline,
+    persist: Callable[[IngestJob, IngestFile, str], None],
+    store: Optional[DocumentTextStore] = None
+) -> IngestJob:
+    """
+    Extract every file of a job concurrently and persist each as it finishes
+
+    Files already in the text store (by content hash) are not extracted
+    again; newly extracted files are added to it.
+    """
+
+    job.status = "processing"
+    await asyncio.gather(*(_run_file(job, upload, pipeline, persist, store) for upload in job.files))
+
+    job.status = "failed" if all(f.status == "failed" for f in job.files) else "completed"
+    job.finished_at = time.time()
+    return job
+
+
+async def _run_file(
+    job: IngestJob,
+    upload: IngestFile,
+    pipeline: PageExtractionPipeline,
+    persist: Callable[[IngestJob, IngestFile, str], None],
+    store: Optional[DocumentTextStore] = None
+) -> None:
+    upload.status = "processing"
+
+    def on_progress(done: int, total: int) -> None:
+        upload.pages_done, upload.pages_total = done, total
+
+    try:
+        stored = None
+        if store is not None and upload.sha256:
+            stored = await asyncio.to_thread(store.get, upload.sha256)
+        if stored is not None:
+            texts = stored.pages
+            upload.cached = True
+            on_progress(len(texts), len(texts))
+        else:
+            texts, upload.failed_pages = await pipeline.extract_file(upload.stored_path, on_progress)
+            if store is not None and upload.sha256 and not upload.failed_pages:
+                await asyncio.to_thread(store.put, StoredText(sha256=upload.sha256, pages=texts))
+        text = "\n".join(texts)
+        upload.status = "completed"
+    except Exception as e:
+        logger.error(f"PDF extraction failed for {upload.filename}: {e}")
+        text = f"PDF extraction failed: {e}"
+        upload.status = "failed"
+        upload.error = str(e)
+
+    try:
+        await asyncio.to_thread(persist, job, upload, text)
+    except Exception as e:
+        logger.error(f"Failed to store extracted text for {upload.filename}: {e}")
+        upload.status = "failed"
+        upload.error = f"Failed to store extracted text: {e}"
+
+
+# Process-wide instances used by the matters router
+ingest_pipeline = PageExtractionPipeline()
+ingest_jobs = IngestJobRegistry()
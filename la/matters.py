@@ -1,13 +1,16 @@
 
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Request
 from fastapi.responses import JSONResponse
-from PyPDF2 import PdfReader
-import io
+from datetime import datetime, timezone
+import asyncio
+import os
 import uuid
 import logging
-from la.models import LAMatter, LAFinding
+from la.models import LAMatter, LAFinding, LAFile
+from la.ingest import INGEST_DIR, IngestFile, IngestJob, ingest_jobs, ingest_pipeline, spool_upload
 from sqlalchemy.orm import Session
-from db import get_db
+from db import get_db, SessionLocal
+from text_store import text_store
 
 router = APIRouter(prefix="/la/matters")
 
@@ -26,6 +29,7 @@ async def ingest(
 	uprn: str = Form(None),
 	db: Session = Depends(get_db),
 ):
+	"""Spool the upload(s) and start background text extraction; poll progress_url for status"""
 	logger = logging.getLogger("la.matters.ingest")
 	logger.info(f"Received ingest request: titleNo={titleNo}, addr={addr}, uprn={uprn}, file={file}, files={files}")
 	upload_files = []
@@ -39,15 +43,14 @@ async def ingest(
 	if not upload_files:
 		logger.error(f"No file(s) uploaded. file={file}, files={files}")
 		raise HTTPException(status_code=400, detail="No file(s) uploaded. Please provide a PDF file.")
-	upload = upload_files[0]
-	try:
-		contents = await upload.read()
-		pdf_reader = PdfReader(io.BytesIO(contents))
-		text = "\n".join(page.extract_text() or "" for page in pdf_reader.pages)
-	except Exception as e:
-		logger.error(f"PDF extraction failed: {e}")
-		text = f"PDF extraction failed: {e}"
 	matter_id = str(uuid.uuid4())
+	try:
+		spooled = await asyncio.gather(*(
+			spool_upload(upload, os.path.join(INGEST_DIR, matter_id)) for upload in upload_files
+		))
+	except OSError as e:
+		logger.error(f"Failed to store upload: {e}")
+		raise HTTPException(status_code=500, detail=f"Failed to store upload: {e}")
 	ref_value = titleNo or f"AUTO-{matter_id[:8]}"
 	matter = LAMatter(
 		id=matter_id,
@@ -55,31 +58,93 @@ async def ingest(
 		address=addr or "",
 		uprn=uprn or "",
 	)
+	ingest_files = []
 	try:
 		db.add(matter)
 		db.commit()
 		db.refresh(matter)
-		finding = LAFinding(
-			matter_id=matter.id,
-			key="pdf_text",
-			value=text[:10000],
-		)
-		db.add(finding)
+		for upload, (stored_path, size, sha256) in zip(upload_files, spooled):
+			la_file = LAFile(
+				id=str(uuid.uuid4()),
+				matter_id=matter.id,
+				filename=upload.filename or os.path.basename(stored_path),
+				stored_path=stored_path,
+				content_type=upload.content_type,
+				file_size=size,
+				processing_status="pending",
+			)
+			db.add(la_file)
+			ingest_files.append(IngestFile(
+				filename=la_file.filename, stored_path=stored_path, size_bytes=size, file_id=la_file.id,
+				sha256=sha256
+			))
 		db.commit()
 	except Exception as e:
-		logger.error(f"Failed to create LAMatter or LAFinding: {e}")
-		raise HTTPException(status_code=500, detail=f"Failed to create matter or finding: {e}")
+		logger.error(f"Failed to create LAMatter or LAFile: {e}")
+		raise HTTPException(status_code=500, detail=f"Failed to create matter or files: {e}")
+	job = ingest_jobs.create(matter.id, ingest_files)
+	ingest_jobs.start(job, ingest_pipeline, _store_extracted_text, text_store)
 	summary = {
 		"id": matter.id,
 		"ref": matter.ref,
 		"address": matter.address,
 		"uprn": matter.uprn,
 		"created_at": matter.created_at.isoformat() if matter.created_at else None,
-		"extracted_text": text[:500],
+		"job_id": job.job_id,
+		"status": job.status,
+		"files": len(ingest_files),
+		"progress_url": f"/la/matters/ingest/{job.job_id}/status",
 	}
 	logger.info(f"Ingest summary: {summary}")
 	return summary
 
+def _store_extracted_text(job: IngestJob, upload: IngestFile, text: str):
+	"""
+	Record one file's text as findings (runs in a worker thread)
+
+	pdf_text holds a preview; the full per-page text is in the text store
+	under the pdf_text_sha256 finding.
+	"""
+	db = SessionLocal()
+	try:
+		db.add(LAFinding(
+			matter_id=job.matter_id,
+			key="pdf_text",
+			value=text[:10000],
+			evidence_file=upload.filename,
+		))
+		if upload.sha256 and upload.status == "completed":
+			db.add(LAFinding(
+				matter_id=job.matter_id,
+				key="pdf_text_sha256",
+				value=upload.sha256,
+				evidence_file=upload.filename,
+			))
+		la_file = db.get(LAFile, upload.file_id) if upload.file_id else None
+		if la_file is not None:
+			la_file.processing_status = upload.status
+			la_file.processed_at = datetime.now(timezone.utc)
+		db.commit()
+	finally:
+		db.close()
+
+@router.get("/ingest/{job_id}/status")
+async def ingest_status(job_id: str):
+	"""Progress of a background ingest job"""
+	job = ingest_jobs.get(job_id)
+	if not job:
+		raise HTTPException(status_code=404, detail="Ingest job not found")
+	return job.to_dict()
+
+@router.get("/text-store/stats")
+async def text_store_stats():
+	"""Hit rate of the extracted-text store in this worker"""
+	return text_store.get_stats()
+
+@router.on_event("shutdown")
+async def _close_ingest_pipeline():
+	await ingest_pipeline.close()
+
 # List all LA Matters
 @router.post("/create")
 async def create_matter(
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Float
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Float, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db import Base  # reuse your existing Base from db.py
@@ -9,6 +9,8 @@ def _id():
 
 class LAMatter(Base):
     __tablename__ = "la_matters"
+    # SLA dashboards and the SLA recompute filter on status and due date
+    __table_args__ = (Index("ix_la_matters_status_sla_due", "status", "sla_due_date"),)
     id = Column(String, primary_key=True, default=_id)
     ref = Column(String, nullable=False, unique=True)
     address = Column(String, nullable=True)
@@ -252,3 +254,39 @@ class LAUser(Base):
     can_review = Column(String, nullable=False, default="false")
     workload_capacity = Column(Integer, default=20)  # max concurrent matters
     created_at = Column(DateTime, server_default=func.now())
+
+class LABulkImportJob(Base):
+    """CSV matter import, split into chunks processed by workers"""
+    __tablename__ = "la_bulk_import_jobs"
+    id = Column(String, primary_key=True, default=_id)
+    filename = Column(String, nullable=True)
+    file_path = Column(String, nullable=False)
+    header = Column(Text, nullable=False)  # JSON array of CSV column names
+    total_rows = Column(Integer, nullable=False, default=0)
+    chunk_rows = Column(Integer, nullable=False)
+    backend = Column(String, nullable=True)  # rq|local
+    created_at = Column(DateTime, server_default=func.now())
+
+    chunks = relationship("LABulkImportChunk", back_populates="job", cascade="all, delete-orphan")
+
+class LABulkImportChunk(Base):
+    """Checkpoint for one chunk of a bulk import; done chunks are never re-imported"""
+    __tablename__ = "la_bulk_import_chunks"
+    __table_args__ = (UniqueConstraint("job_id", "chunk_index", name="uq_bulk_import_chunk"),)
+    id = Column(String, primary_key=True, default=_id)
+    job_id = Column(String, ForeignKey("la_bulk_import_jobs.id"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    start_offset = Column(Integer, nullable=False)  # byte range of the chunk's rows in the CSV
+    end_offset = Column(Integer, nullable=False)
+    first_row = Column(Integer, nullable=False)     # 1-based data row number
+    row_count = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending|done|failed
+    created_count = Column(Integer, nullable=False, default=0)
+    skipped_count = Column(Integer, nullable=False, default=0)  # refs that already exist
+    error_count = Column(Integer, nullable=False, default=0)    # rows rejected
+    errors = Column(Text, nullable=True)      # JSON array of row errors
+    last_error = Column(Text, nullable=True)  # why the chunk last failed
+    attempts = Column(Integer, nullable=False, default=0)
+    completed_at = Column(DateTime, nullable=True)
+
+    job = relationship("LABulkImportJob", back_populates="chunks")
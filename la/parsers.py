@@ -1,6 +1,8 @@
 import re
 from typing import List, Optional
-from .schemas import Con29, LLC1, PlanningDecision, RoadsFootways, Charge
+from text_scanner import MultiPatternScanner, ScanResult, ScanRule
+from .planning_history import extract_planning_decisions
+from .schemas import Con29, LLC1, RoadsFootways, Charge
 
 _re_true = re.compile(r"\b(yes|present|true|y|provided|outstanding|payable|affected)\b", re.I)
 _re_false = re.compile(r"\b(no|absent|false|n|none|not\s*affected|missing)\b", re.I)
@@ -14,66 +16,91 @@ def _parse_bool(fragment: Optional[str]) -> Optional[bool]:
         return False
     return None
 
-def parse_llc1(text: str) -> LLC1:
+# Every keyword anchor of LLC1 and CON29, found in one pass over the text
+_SCANNER = MultiPatternScanner([
+    ScanRule("conservation_area", ("conservation",), r"\bconservation\s+area\b"),
+    ScanRule("listed_building", ("listed",), r"\blisted\s+building\b"),
+    ScanRule("tpo", ("tree", "tpo"), r"\b(tree\s+preservation|TPO)\b"),
+    ScanRule("s106", ("section", "s106"), r"\b(section\s*106|s106)\b"),
+    ScanRule("abutting", ("abutting",)),
+    ScanRule("highway", ("highway",)),
+    ScanRule("adopted", ("adopted",)),
+    ScanRule("enforcement", ("enforcement",), r"\benforcement\s+notice(?:s)?\b"),
+    ScanRule("contaminated", ("contaminated",), r"\bcontaminated\s+land\b"),
+    ScanRule("cil", ("cil",), r"\bCIL\b"),
+    ScanRule("flood_zone", ("flood",), r"\bflood\s*zone\s*(1|2|3)\b", re.I),
+    ScanRule("radon", ("radon",), r"\bradon\b"),
+    ScanRule("building_regs", ("building", "completion"),
+             r"\b(building\s*reg(ulation)?s?|completion\s*certificate)\b"),
+])
+
+_re_yes_no = re.compile(r"(yes|no|true|false)", re.I)
+_re_s106_answer = re.compile(r"(yes|no|true|false|outstanding|payable|none)", re.I)
+_re_cil_answer = re.compile(r"(yes|no|true|false|outstanding|none|payable)", re.I)
+_re_radon_answer = re.compile(r"(affected|not\s*affected|yes|no|true|false)", re.I)
+_re_br_answer = re.compile(r"(provided|missing|yes|no|true|false)", re.I)
+
+def scan_document(text: str) -> ScanResult:
+    """Anchor hits for parse_llc1/parse_con29; scan once and pass to both"""
+    return _SCANNER.scan(text or "")
+
+def _answer(scan: ScanResult, anchor: str, answer: re.Pattern) -> Optional[str]:
+    # Same result as re.search(anchor + ".*?" + answer, text, re.S)
+    m = scan.search_after(anchor, answer)
+    return m.group(1) if m else None
+
+def _adopted_answer(scan: ScanResult) -> Optional[str]:
+    # Same result as re.search("(?:abutting.*?adopted|highway.*adopted).*?(yes|no|true|false)"):
+    # only the leftmost of "abutting"/"highway" can match
+    lead = scan.first_of("abutting", "highway")
+    if lead is None:
+        return None
+    adopted = [hit for hit in scan.all("adopted") if hit.start >= lead.end]
+    if lead.name == "highway":
+        adopted.reverse()  # greedy: the last "adopted" that is followed by an answer
+    for hit in adopted:
+        m = _re_yes_no.search(scan.text, hit.end)
+        if m:
+            return m.group(1)
+        if lead.name == "abutting":
+            return None
+    return None
+
+def parse_llc1(text: str, scan: Optional[ScanResult] = None) -> LLC1:
+    scan = scan or scan_document(text)
     charges: List[Charge] = []
 
-    def add(charge_type: str, pattern: str):
-        present = bool(re.search(pattern, text or "", re.I|re.S))
-        charges.append(Charge(charge_type=charge_type, present=present, source="LLC1"))
+    def add(charge_type: str, anchor: str):
+        charges.append(Charge(charge_type=charge_type, present=anchor in scan, source="LLC1"))
 
-    add("ConservationArea", r"\bconservation\s+area\b")
-    add("ListedBuilding", r"\blisted\s+building\b")
-    add("TPO", r"\b(tree\s+preservation|TPO)\b")
-    add("S106", r"\b(section\s*106|s106)\b")
+    add("ConservationArea", "conservation_area")
+    add("ListedBuilding", "listed_building")
+    add("TPO", "tpo")
+    add("S106", "s106")
     return LLC1(charges=charges)
 
-def parse_con29(text: str) -> Con29:
+def parse_con29(text: str, scan: Optional[ScanResult] = None) -> Con29:
     text = text or ""
+    scan = scan or scan_document(text)
+
+    decisions = extract_planning_decisions(text)
 
-    decisions: List[PlanningDecision] = []
-    for ref, desc, decision, date in re.findall(
-        r"(?:ref(?:erence)?[:\s]*([A-Z0-9/\-]+))?.{0,80}?"
-        r"(?:desc(?:ription)?[:\s]*(.{0,160}?))?.{0,60}?"
-        r"(?:decision[:\s]*(granted|refused|approved|undetermined))?.{0,60}?"
-        r"(?:date[:\s]*([0-9]{1,2}\s\w+\s[0-9]{2,4}|[0-9\/\-]{6,10}))?",
-        text, re.I|re.S):
-        if any([ref, desc, decision, date]):
-            decisions.append(PlanningDecision(
-                ref=(ref or "N/A").strip(),
-                description=(desc or None).strip() if desc else None,
-                decision=(decision or None),
-                date=(date or None),
-                evidence=None
-            ))
-
-    m_adopt = re.search(r"(?:abutting.*?adopted|highway.*adopted).*?(yes|no|true|false)", text, re.I|re.S)
     highways = RoadsFootways(
-        abutting_highway_adopted=_parse_bool(m_adopt.group(1) if m_adopt else None),
+        abutting_highway_adopted=_parse_bool(_adopted_answer(scan)),
         authority=None,
         evidence=None
     )
 
-    m_enf = re.search(r"\benforcement\s+notice(?:s)?\b.*?(yes|no|true|false)", text, re.I|re.S)
-    enf = _parse_bool(m_enf.group(1) if m_enf else None)
-    m_contam = re.search(r"\bcontaminated\s+land\b.*?(yes|no|true|false)", text, re.I|re.S)
-    contam = _parse_bool(m_contam.group(1) if m_contam else None)
-
-    m_s106 = re.search(r"\b(section\s*106|s106)\b.*?(yes|no|true|false|outstanding|payable|none)", text, re.I|re.S)
-    s106 = _parse_bool(m_s106.group(2) if m_s106 else None)
-
-    m_cil = re.search(r"\bCIL\b.*?(yes|no|true|false|outstanding|none|payable)", text, re.I|re.S)
-    cil_out = _parse_bool(m_cil.group(1) if m_cil else None)
-
-    flood_zone = None
-    m_fz = re.search(r"\bflood\s*zone\s*(1|2|3)\b", text, re.I)
-    if m_fz:
-        flood_zone = m_fz.group(1)
+    enf = _parse_bool(_answer(scan, "enforcement", _re_yes_no))
+    contam = _parse_bool(_answer(scan, "contaminated", _re_yes_no))
+    s106 = _parse_bool(_answer(scan, "s106", _re_s106_answer))
+    cil_out = _parse_bool(_answer(scan, "cil", _re_cil_answer))
 
-    m_rad = re.search(r"\bradon\b.*?(affected|not\s*affected|yes|no|true|false)", text, re.I|re.S)
-    radon = _parse_bool(m_rad.group(1) if m_rad else None)
+    m_fz = scan.first("flood_zone")
+    flood_zone = m_fz.group(1) if m_fz else None
 
-    m_br = re.search(r"\b(building\s*reg(ulation)?s?|completion\s*certificate)\b.*?(provided|missing|yes|no|true|false)", text, re.I|re.S)
-    br_comp = _parse_bool(m_br.group(3) if m_br else None)
+    radon = _parse_bool(_answer(scan, "radon", _re_radon_answer))
+    br_comp = _parse_bool(_answer(scan, "building_regs", _re_br_answer))
 
     return Con29(
         planning_decisions=decisions,
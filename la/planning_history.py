@@ -0,0 +1,175 @@
+"""
+Planning History Extraction
+Line-aware tokeniser for planning decisions in CON29 replies (enquiry 1.1)
+
+Two layouts are recognised:
+
+- Labelled fields ("Reference: 21/01234/FUL", "Proposal: ...", "Decision:
+  Granted", "Date: 12 March 2021"), possibly several per line or one per
+  line. Fields accumulate into a record until a field repeats, a new
+  reference starts, or a numbered CON29 enquiry heading begins.
+- Table rows without labels ("21/01234/FUL  Rear extension  Granted
+  12/03/2021"), one record per planning reference on the line.
+
+Every pattern is anchored to a label or reference token and every
+quantifier is bounded, so each line is tokenised in time linear in its
+length and a document in time linear in its size.
+"""
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .schemas import PlanningDecision
+
+# Longest description kept per decision
+MAX_DESCRIPTION_CHARS = 160
+
+_REF_LABEL = r"(?:app(?:lication)?[ \t]{0,3}(?:no\.?|number|ref(?:erence)?)|ref(?:erence)?(?:[ \t]{0,3}no\.?)?)"
+_DESC_LABEL = r"(?:desc(?:ription)?|proposal|development)"
+_DATE_LABEL = r"(?:(?:decision[ \t]{0,3})?date(?:[ \t]{1,3}of[ \t]{1,3}decision)?|decided)"
+_DECISION_LABEL = r"(?:decision|outcome|status)"
+
+_LABEL = re.compile(
+    rf"\b(?:(?P<ref>{_REF_LABEL})|(?P<description>{_DESC_LABEL})|(?P<date>{_DATE_LABEL})|(?P<decision>{_DECISION_LABEL}))"
+    r"\b[ \t]{0,3}(?P<colon>[:#\-][ \t]{0,3})?",
+    re.I
+)
+
+_DECISIONS = r"granted|refused|approved|undetermined|withdrawn|pending"
+
+# Values, matched at the start of a labelled field
+_REF_VALUE = re.compile(r"[A-Z0-9][A-Z0-9/\-.]{1,30}", re.I)
+_DECISION_VALUE = re.compile(rf"(?:[\w\-]{{1,20}}[ \t]{{1,3}}){{0,3}}?({_DECISIONS})\b", re.I)
+_DATE = (
+    r"[0-9]{1,2}(?:st|nd|rd|th)?[ \t]{1,3}[A-Za-z]{3,9}\.?,?[ \t]{1,3}[0-9]{2,4}"
+    r"|[0-9]{4}-[0-9]{2}-[0-9]{2}"
+    r"|[0-9]{1,2}[/\-.][0-9]{1,2}[/\-.][0-9]{2,4}"
+)
+_DATE_VALUE = re.compile(rf"(?:{_DATE})\b")
+
+# Unlabelled table rows
+_REF_TOKEN = re.compile(
+    r"(?<![\w/])(?:[A-Z]{1,4}/)?[0-9]{2,4}/[0-9]{1,6}(?:/[A-Z]{1,6})?[A-Z]?(?![\w/])"
+)
+_DECISION_WORD = re.compile(rf"\b({_DECISIONS})\b", re.I)
+_DATE_TOKEN = re.compile(rf"(?<![\w/])(?:{_DATE})\b")
+
+# A numbered CON29 enquiry ("3.7 Outstanding notices") ends the current record
+_HEADING = re.compile(r"[ \t]{0,8}[0-9]{1,2}\.[0-9]{1,2}(?:\.[0-9]{1,2})?[ \t]{1,8}\(?[A-Za-z]")
+
+_SEPARATORS = " \t|,;:-–"
+
+Field = Tuple[str, str]
+
+
+def extract_planning_decisions(text: str) -> List[PlanningDecision]:
+    """
+    Planning decisions in a CON29 reply
+
+    Records need a reference or a decision to be reported; fields that
+    don't look like their label (a "Decision:" without a decision word, a
+    "Date:" without a date) are ignored rather than reported as empty rows.
+    """
+
+    decisions: List[PlanningDecision] = []
+    record: Dict[str, str] = {}
+
+    def flush() -> None:
+        if record.get("ref") or record.get("decision"):
+            decisions.append(_decision(record))
+        record.clear()
+
+    for line in (text or "").splitlines():
+        if _HEADING.match(line):
+            flush()
+
+        fields = list(_labelled_fields(line))
+        if fields:
+            for kind, value in fields:
+                if kind in record:
+                    flush()
+                record[kind] = value
+            continue
+
+        for row in _table_rows(line):
+            flush()
+            decisions.append(_decision(row))
+
+    flush()
+    return decisions
+
+
+def _decision(record: Dict[str, str]) -> PlanningDecision:
+    return PlanningDecision(
+        ref=record.get("ref") or "N/A",
+        description=record.get("description") or None,
+        decision=record.get("decision"),
+        date=record.get("date"),
+        evidence=None
+    )
+
+
+def _labelled_fields(line: str) -> Iterator[Field]:
+    """(field, value) for each label on the line whose value has the right shape"""
+
+    labels = []
+    for m in _LABEL.finditer(line):
+        kind = _label_kind(m)
+        value = _field_value(kind, line, m.end(), bool(m.group("colon")))
+        if value is not None:
+            labels.append((kind, m.start(), m.end(), value))
+
+    for i, (kind, _, end, value) in enumerate(labels):
+        if kind == "description":
+            stop = labels[i + 1][1] if i + 1 < len(labels) else len(line)
+            value = line[end:stop].strip(_SEPARATORS)[:MAX_DESCRIPTION_CHARS].strip() or None
+            if value is None:
+                continue
+        yield kind, value
+
+
+def _label_kind(m: "re.Match") -> str:
+    for kind in ("ref", "description", "date", "decision"):
+        if m.group(kind):
+            return kind
+    raise AssertionError("label without a kind")
+
+
+def _field_value(kind: str, line: str, position: int, colon: bool) -> Optional[str]:
+    """Value of a labelled field, or None if the label is just a word in prose"""
+
+    if kind == "ref":
+        m = _REF_VALUE.match(line, position)
+        if m and any(c.isdigit() for c in m.group()):
+            return m.group().rstrip(".-")
+        return None
+    if kind == "decision":
+        m = _DECISION_VALUE.match(line, position)
+        return m.group(1).lower() if m else None
+    if kind == "date":
+        m = _DATE_VALUE.match(line, position)
+        return m.group() if m else None
+    # Descriptions can't be validated, so they need an explicit colon
+    return "" if colon else None
+
+
+def _table_rows(line: str) -> Iterator[Dict[str, str]]:
+    """One record per planning reference on an unlabelled line"""
+
+    refs = list(_REF_TOKEN.finditer(line))
+    for i, ref in enumerate(refs):
+        stop = refs[i + 1].start() if i + 1 < len(refs) else len(line)
+        decision = _DECISION_WORD.search(line, ref.end(), stop)
+        date = _DATE_TOKEN.search(line, ref.end(), stop)
+        if decision is None and date is None:
+            continue
+
+        row = {"ref": ref.group()}
+        if decision:
+            row["decision"] = decision.group(1).lower()
+        if date:
+            row["date"] = date.group()
+        description_end = min(m.start() for m in (decision, date) if m is not None)
+        description = line[ref.end():description_end].strip(_SEPARATORS)[:MAX_DESCRIPTION_CHARS].strip()
+        if description:
+            row["description"] = description
+        yield row
@@ -6,6 +6,8 @@ from la.models import LAMatter, LAOrder, LADocument, LAFinding, LARisk
 from la.parsers import parse_llc1, parse_con29
 from la.schemas import LLC1, Con29
 from la.risk import run_rules
+from la.finding_store import llc1_findings, con29_findings, upsert_findings
+from text_store import text_store
 
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../data"))
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -16,46 +18,11 @@ def _save_blob(kind: str, content: bytes, order: LAOrder) -> str:
     with open(fpath, "wb") as f: f.write(content)
     return fpath
 
-def _upsert(db: Session, matter_id: str, key: str, value, ev_file: str, ev_page: int, conf: int = 90):
-    db.query(LAFinding).filter(LAFinding.matter_id == matter_id, LAFinding.key == key).delete()
-    db.add(LAFinding(matter_id=matter_id, key=key, value=json.dumps(value),
-                     evidence_file=ev_file, evidence_page=ev_page, confidence=conf))
-
 def _store_findings_llc1(db: Session, matter: LAMatter, model: LLC1):
-    ca = any(c.charge_type == "ConservationArea" and c.present for c in model.charges)
-    lb = any(c.charge_type == "ListedBuilding" and c.present for c in model.charges)
-    tpo = any(c.charge_type == "TPO" and c.present for c in model.charges)
-    a4  = any(c.charge_type == "Article4Direction" and c.present for c in model.charges)
-    _upsert(db, matter.id, "llc1.conservation_area.present", bool(ca), "LLC1", 1)
-    _upsert(db, matter.id, "llc1.listed_building.present", bool(lb), "LLC1", 1)
-    _upsert(db, matter.id, "llc1.tpo.present", bool(tpo), "LLC1", 1)
-    _upsert(db, matter.id, "llc1.article4.present", bool(a4), "LLC1", 1)
+    upsert_findings(db, llc1_findings(matter.id, model))
 
 def _store_findings_con29(db: Session, matter: LAMatter, model: Con29):
-    if model.roads_footways is not None:
-        _upsert(db, matter.id, "con29.roads_footways.abutting_highway_adopted",
-                model.roads_footways.abutting_highway_adopted, "CON29", 1)
-        if model.roads_footways.authority:
-            _upsert(db, matter.id, "con29.roads_footways.highways_authority",
-                    model.roads_footways.authority, "CON29", 1)
-    if model.enforcement_notices_present is not None:
-        _upsert(db, matter.id, "con29.enforcement_notices_present",
-                bool(model.enforcement_notices_present), "CON29", 1)
-    if model.contaminated_land_designation is not None:
-        _upsert(db, matter.id, "con29.contaminated_land_designation",
-                bool(model.contaminated_land_designation), "CON29", 1)
-    # NEW: extras
-    if model.s106_present is not None:
-        _upsert(db, matter.id, "con29.s106_present", bool(model.s106_present), "CON29", 1)
-    if model.cil_outstanding is not None:
-        _upsert(db, matter.id, "con29.cil_outstanding", bool(model.cil_outstanding), "CON29", 1)
-    if model.flood_zone is not None:
-        _upsert(db, matter.id, "con29.flood_zone", str(model.flood_zone), "CON29", 1)
-    if model.radon_affected is not None:
-        _upsert(db, matter.id, "con29.radon_affected", bool(model.radon_affected), "CON29", 1)
-    if model.building_regs_completion_present is not None:
-        _upsert(db, matter.id, "con29.building_regs_completion_present",
-                bool(model.building_regs_completion_present), "CON29", 1)
+    upsert_findings(db, con29_findings(matter.id, model))
 
 def parse_and_store(db: Session, matter: LAMatter, docs: List[Tuple[str, bytes]]):
     order = LAOrder(matter_id=matter.id, council_code="MANUAL", types=",".join(k for k,_ in docs), status="READY")
@@ -66,11 +33,12 @@ def parse_and_store(db: Session, matter: LAMatter, docs: List[Tuple[str, bytes]]
     db.commit(); db.refresh(order)
 
     for doc in order.documents:
-        with open(doc.file_path, "rb") as fh: b = fh.read()
+        # Text comes from the shared store; a document seen before isn't parsed again
+        text = text_store.get_or_extract(doc.file_path).text
         if doc.kind == "LLC1":
-            _store_findings_llc1(db, matter, parse_llc1(b))
+            _store_findings_llc1(db, matter, parse_llc1(text))
         elif doc.kind == "CON29":
-            _store_findings_con29(db, matter, parse_con29(b))
+            _store_findings_con29(db, matter, parse_con29(text))
     db.commit()
 
     # recompute risks
@@ -503,17 +503,18 @@ async def submit_qa_decision(
 async def get_sla_dashboard(db: Session = Depends(get_db)):
     """Get SLA dashboard data"""
     try:
-        overdue_matters = await sla_manager.get_overdue_matters(db)
-        at_risk_matters = await sla_manager.get_at_risk_matters(db)
+        counts = await sla_manager.get_sla_counts(db)
+        overdue_matters = await sla_manager.get_overdue_matters(db, limit=10)
+        at_risk_matters = await sla_manager.get_at_risk_matters(db, limit=10)
         qa_dashboard = await qa_workflow.get_review_dashboard_data(db)
         
         return {
             "success": True,
             "sla": {
-                "overdue_count": len(overdue_matters),
-                "at_risk_count": len(at_risk_matters),
-                "overdue_matters": overdue_matters[:10],  # Top 10
-                "at_risk_matters": at_risk_matters[:10]   # Top 10
+                "overdue_count": counts["overdue"],
+                "at_risk_count": counts["at_risk"],
+                "overdue_matters": overdue_matters,  # Top 10, most overdue first
+                "at_risk_matters": at_risk_matters   # Top 10, soonest due first
             },
             "qa": qa_dashboard
         }
@@ -14,6 +14,8 @@ import uuid
 import logging
 from pathlib import Path
 
+from search_index import BM25Index
+
 logger = logging.getLogger(__name__)
 
 class CitationType(Enum):
@@ -88,6 +90,8 @@ class AIResponse:
         if not self.response_id:
             self.response_id = str(uuid.uuid4())
 
+CITATION_FIELD_WEIGHTS = {"title": 3.0, "section_reference": 2.0, "content_excerpt": 1.0, "context": 1.0}
+
 class CitationEngine:
     """Core engine for AI citation enforcement and explainability"""
     
@@ -96,6 +100,7 @@ class CitationEngine:
         self.min_citations_required = 2
         self.min_confidence_threshold = 0.7
         self.citation_index = {}
+        self.search_index = BM25Index(CITATION_FIELD_WEIGHTS)
         self.load_citation_index()
     
     def load_citation_index(self):
@@ -112,6 +117,28 @@ class CitationEngine:
         except Exception as e:
             logger.error(f"Failed to load citation index: {e}")
             self.citation_index = {}
+        
+        self.search_index = BM25Index(CITATION_FIELD_WEIGHTS)
+        for citation_id, entry in self.citation_index.items():
+            self._index_citation(citation_id, entry)
+    
+    def add_citation(self, citation_id: str, entry: Dict[str, Any]):
+        """Add or replace a citation index entry (same fields as Citation)"""
+        self.citation_index[citation_id] = entry
+        self._index_citation(citation_id, entry)
+    
+    def remove_citation(self, citation_id: str) -> bool:
+        self.citation_index.pop(citation_id, None)
+        return self.search_index.remove(citation_id)
+    
+    def _index_citation(self, citation_id: str, entry: Dict[str, Any]):
+        self.search_index.add(citation_id, {
+            "title": entry.get("title"),
+            "section_reference": [entry.get("section_reference"), entry.get("paragraph_reference")],
+            "content_excerpt": entry.get("content_excerpt"),
+            "context": entry.get("context"),
+            "authority": entry.get("authority")
+        }, entry)
     
     def validate_ai_response(self, response: AIResponse) -> Dict[str, Any]:
         """Validate AI response meets citation and explainability requirements"""
@@ -217,9 +244,18 @@ class CitationEngine:
     
     def find_citations(self, query: str, lpa_code: str = None, limit: int = 10) -> List[Citation]:
         """Find relevant citations for a query"""
-        # This would integrate with vector search/semantic matching
-        # For now, return mock citations for demonstration
+        if len(self.search_index):
+            # National citations, plus local ones for the requested LPA
+            hits = self.search_index.search(
+                query, limit,
+                where=lambda _, entry: not entry.get("lpa_code") or entry.get("lpa_code") == lpa_code
+            )
+            if hits:
+                best = hits[0][1]
+                return [self._citation_from_entry(citation_id, entry, score / best, lpa_code)
+                        for citation_id, score, entry in hits]
         
+        # No citation index loaded (or nothing matched): fall back to mock citations for demonstration
         citations = []
         
         # Mock planning guidance citation
@@ -261,6 +297,27 @@ class CitationEngine:
         
         return citations[:limit]
     
+    def _citation_from_entry(self, citation_id: str, entry: Dict[str, Any], relevance: float,
+                             lpa_code: Optional[str]) -> Citation:
+        """Citation from an index entry; relevance is the BM25 score relative to the best hit"""
+        date = entry.get("date")
+        return Citation(
+            id=citation_id,
+            type=CitationType(entry.get("type", CitationType.PLANNING_GUIDANCE.value)),
+            quality=CitationQuality(entry.get("quality", CitationQuality.SECONDARY.value)),
+            title=entry.get("title", ""),
+            authority=entry.get("authority", ""),
+            date=datetime.fromisoformat(date) if isinstance(date, str) else (date or datetime.min),
+            url=entry.get("url"),
+            section_reference=entry.get("section_reference"),
+            page_numbers=entry.get("page_numbers"),
+            paragraph_reference=entry.get("paragraph_reference"),
+            relevance_score=round(relevance, 2),
+            content_excerpt=entry.get("content_excerpt", ""),
+            context=entry.get("context", ""),
+            lpa_code=entry.get("lpa_code") or lpa_code
+        )
+    
     def enhance_with_lpa_context(self, response: AIResponse, lpa_code: str) -> AIResponse:
         """Enhance response with LPA-specific context including HDT and 5YHLS data"""
         try:
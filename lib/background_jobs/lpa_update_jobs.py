@@ -9,14 +9,20 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 import os
 import json
+import random
+import time
 import requests
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import sqlite3
 
-from celery import current_task
-from ..background_jobs.job_scheduler import celery_app, DomusTask
+import redis
+from celery import chord, current_task
+from ..background_jobs.job_scheduler import celery_app, DomusTask, REDIS_URL
 from ..background_jobs.alert_system import AlertSystem, AlertLevel, AlertChannel
+from ..background_jobs.upstream_slots import (
+    UpstreamBusy, UpstreamSlots, jittered_backoff, upstream_for, upstream_limit
+)
 from ..lpa.data_updater import LPADataUpdater
 from ..lpa.appeals_processor import AppealsProcessor
 from ..lpa.constraints_updater import ConstraintsUpdater
@@ -27,12 +33,40 @@ lpa_data_updater = LPADataUpdater()
 appeals_processor = AppealsProcessor()
 constraints_updater = ConstraintsUpdater()
 alert_system = AlertSystem()
+upstream_slots = UpstreamSlots(redis.Redis.from_url(REDIS_URL))
+
+# Attempts per LPA before it is reported as failed
+LPA_UPDATE_MAX_ATTEMPTS = int(os.getenv('LPA_UPDATE_MAX_ATTEMPTS', '3'))
+
+# Mean wait before trying again for a slot on a busy upstream
+UPSTREAM_SLOT_WAIT_SECONDS = 20
+
+# Longest an LPA waits for a slot before it is reported as failed
+UPSTREAM_SLOT_MAX_WAIT_SECONDS = int(os.getenv('LPA_UPSTREAM_MAX_WAIT_SECONDS', '3600'))
+
+class LPAUpdateTask(DomusTask):
+    """Per-LPA subtask; waiting for an upstream slot isn't worth a retry alert"""
+    
+    # Slot waits and failed attempts are bounded by update_lpa itself; a
+    # subtask that exhausted Celery's retries would fail the whole chord
+    max_retries = None
+    
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        if isinstance(exc, UpstreamBusy):
+            logging.debug(f"Task {self.name} ({task_id}) waiting for upstream: {exc}")
+            return
+        super().on_retry(exc, task_id, args, kwargs, einfo)
 
 @celery_app.task(bind=True, base=DomusTask, name='lib.background_jobs.lpa_update_jobs.update_all_lpa_data')
 def update_all_lpa_data(self, priority_lpas: List[str] = None):
     """
     Update data for all LPAs or priority LPAs
     
+    Fans out one update_lpa subtask per LPA as a chord; they run in
+    parallel across workers, at most upstream_limit() at a time against
+    any one upstream. aggregate_lpa_updates collects their results into the
+    run statistics and freshness markers once all have finished.
+    
     Args:
         priority_lpas: List of LPA codes to prioritize, if None updates all
     """
@@ -41,18 +75,7 @@ def update_all_lpa_data(self, priority_lpas: List[str] = None):
     
     try:
         logger.info(f"Starting comprehensive LPA data update (task_id: {task_id})")
-        
-        # Initialize update statistics
-        update_stats = {
-            'started_at': datetime.utcnow().isoformat(),
-            'lpas_processed': 0,
-            'lpas_updated': 0,
-            'lpas_failed': 0,
-            'applications_updated': 0,
-            'constraints_updated': 0,
-            'policies_updated': 0,
-            'errors': []
-        }
+        started_at = datetime.utcnow().isoformat()
         
         # Get LPA list
         if priority_lpas:
@@ -63,78 +86,19 @@ def update_all_lpa_data(self, priority_lpas: List[str] = None):
         total_lpas = len(lpa_list)
         logger.info(f"Updating {total_lpas} LPAs")
         
-        # Process each LPA
-        for i, lpa_code in enumerate(lpa_list):
-            try:
-                # Update progress
-                progress = (i / total_lpas) * 90
-                self.update_state(
-                    state='PROGRESS',
-                    meta={
-                        'step': f'processing_lpa_{lpa_code}',
-                        'progress': progress,
-                        'current_lpa': lpa_code,
-                        'processed': i,
-                        'total': total_lpas
-                    }
-                )
-                
-                logger.info(f"Processing LPA: {lpa_code} ({i+1}/{total_lpas})")
-                
-                # Update individual LPA
-                lpa_result = _update_single_lpa(lpa_code)
-                
-                update_stats['lpas_processed'] += 1
-                
-                if lpa_result['success']:
-                    update_stats['lpas_updated'] += 1
-                    update_stats['applications_updated'] += lpa_result.get('applications_updated', 0)
-                    update_stats['constraints_updated'] += lpa_result.get('constraints_updated', 0)
-                    update_stats['policies_updated'] += lpa_result.get('policies_updated', 0)
-                else:
-                    update_stats['lpas_failed'] += 1
-                    update_stats['errors'].append(f"LPA {lpa_code}: {lpa_result.get('error', 'Unknown error')}")
-                
-            except Exception as e:
-                update_stats['lpas_failed'] += 1
-                error_msg = f"Failed to process LPA {lpa_code}: {e}"
-                update_stats['errors'].append(error_msg)
-                logger.error(error_msg)
-        
-        # Final statistics
-        self.update_state(state='PROGRESS', meta={'step': 'finalizing', 'progress': 95})
-        
-        update_stats['completed_at'] = datetime.utcnow().isoformat()
-        update_stats['duration_seconds'] = (
-            datetime.fromisoformat(update_stats['completed_at']) -
-            datetime.fromisoformat(update_stats['started_at'])
-        ).total_seconds()
-        
-        # Update global freshness tracking
-        _update_lpa_global_freshness()
+        if not lpa_list:
+            return aggregate_lpa_updates([], started_at, 0)
         
-        # Send notification
-        if update_stats['lpas_failed'] > 0:
-            alert_level = AlertLevel.WARNING
-            title = "⚠️ LPA Data Update Completed with Issues"
-            message = f"Updated {update_stats['lpas_updated']}/{total_lpas} LPAs successfully, {update_stats['lpas_failed']} failed"
-        else:
-            alert_level = AlertLevel.INFO
-            title = "✅ LPA Data Update Completed"
-            message = f"Successfully updated all {update_stats['lpas_updated']} LPAs"
+        header = [update_lpa.s(lpa_code, upstream_for(lpa_code)) for lpa_code in lpa_list]
+        aggregate = chord(header)(aggregate_lpa_updates.s(started_at, total_lpas))
         
-        alert_system.send_alert(
-            title=title,
-            message=message,
-            level=alert_level,
-            channels=[AlertChannel.SLACK],
-            metadata=update_stats,
-            throttle_key="lpa_update_complete"
-        )
-        
-        logger.info(f"LPA data update completed: {update_stats}")
-        
-        return update_stats
+        return {
+            'status': 'dispatched',
+            'started_at': started_at,
+            'lpas': total_lpas,
+            'upstreams': len({upstream_for(lpa_code) for lpa_code in lpa_list}),
+            'aggregate_task_id': aggregate.id
+        }
         
     except Exception as e:
         error_msg = f"LPA data update failed: {e}"
@@ -150,6 +114,132 @@ def update_all_lpa_data(self, priority_lpas: List[str] = None):
         
         raise
 
+@celery_app.task(bind=True, base=LPAUpdateTask, name='lib.background_jobs.lpa_update_jobs.update_lpa')
+def update_lpa(self, lpa_code: str, upstream: str, attempt: int = 0, waiting_since: float = None):
+    """
+    Update one LPA, holding a slot on its upstream while it runs
+    
+    Retries with jitter while the upstream is at its limit, for up to
+    UPSTREAM_SLOT_MAX_WAIT_SECONDS, and up to LPA_UPDATE_MAX_ATTEMPTS times
+    with jittered exponential backoff when the update fails. Always returns
+    a result (failures included) so the aggregation step runs.
+    """
+    logger = logging.getLogger(__name__)
+    waiting_since = waiting_since or time.time()
+    started = time.monotonic()
+    
+    try:
+        token = upstream_slots.acquire(upstream, upstream_limit(upstream))
+    except Exception as e:
+        logger.error(f"Could not take a slot on {upstream} for LPA {lpa_code}: {e}")
+        result = _failed_lpa_update(f"Upstream slots unavailable: {e}")
+    else:
+        if token is None:
+            if time.time() - waiting_since < UPSTREAM_SLOT_MAX_WAIT_SECONDS:
+                raise self.retry(
+                    exc=UpstreamBusy(upstream),
+                    kwargs={'attempt': attempt, 'waiting_since': waiting_since},
+                    countdown=random.uniform(0.5, 1.5) * UPSTREAM_SLOT_WAIT_SECONDS
+                )
+            result = _failed_lpa_update(f"Timed out waiting for a slot on {upstream}")
+        else:
+            try:
+                # Slow councils can take longer than a lease
+                with upstream_slots.renewing(upstream, token):
+                    result = _update_single_lpa(lpa_code)
+            except Exception as e:
+                result = _failed_lpa_update(str(e))
+            finally:
+                try:
+                    upstream_slots.release(upstream, token)
+                except Exception as e:
+                    # The lease expires on its own
+                    logger.warning(f"Could not release slot on {upstream} for LPA {lpa_code}: {e}")
+    
+    if not result['success'] and attempt + 1 < LPA_UPDATE_MAX_ATTEMPTS:
+        raise self.retry(
+            exc=RuntimeError(result.get('error')),
+            kwargs={'attempt': attempt + 1},
+            countdown=jittered_backoff(attempt)
+        )
+    
+    result.update({
+        'lpa_code': lpa_code,
+        'upstream': upstream,
+        'attempts': attempt + 1,
+        'duration_seconds': round(time.monotonic() - started, 3),
+        'completed_at': datetime.utcnow().isoformat()
+    })
+    return result
+
+@celery_app.task(bind=True, base=DomusTask, name='lib.background_jobs.lpa_update_jobs.aggregate_lpa_updates')
+def aggregate_lpa_updates(self, results: List[Dict[str, Any]], started_at: str, total_lpas: int):
+    """Combine per-LPA results into run statistics, freshness markers and the completion alert"""
+    logger = logging.getLogger(__name__)
+    
+    update_stats = {
+        'started_at': started_at,
+        'lpas_processed': len(results),
+        'lpas_updated': 0,
+        'lpas_failed': 0,
+        'lpas_retried': 0,
+        'applications_updated': 0,
+        'constraints_updated': 0,
+        'policies_updated': 0,
+        'slowest_lpas': [],
+        'errors': []
+    }
+    
+    for lpa_result in results:
+        if lpa_result['success']:
+            update_stats['lpas_updated'] += 1
+            update_stats['applications_updated'] += lpa_result.get('applications_updated', 0)
+            update_stats['constraints_updated'] += lpa_result.get('constraints_updated', 0)
+            update_stats['policies_updated'] += lpa_result.get('policies_updated', 0)
+        else:
+            update_stats['lpas_failed'] += 1
+            update_stats['errors'].append(f"LPA {lpa_result['lpa_code']}: {lpa_result.get('error') or 'Unknown error'}")
+        if lpa_result.get('attempts', 1) > 1:
+            update_stats['lpas_retried'] += 1
+    
+    update_stats['slowest_lpas'] = [
+        {'lpa_code': r['lpa_code'], 'upstream': r['upstream'], 'duration_seconds': r['duration_seconds']}
+        for r in sorted(results, key=lambda r: r.get('duration_seconds', 0), reverse=True)[:5]
+    ]
+    
+    update_stats['completed_at'] = datetime.utcnow().isoformat()
+    update_stats['duration_seconds'] = (
+        datetime.fromisoformat(update_stats['completed_at']) -
+        datetime.fromisoformat(started_at)
+    ).total_seconds()
+    
+    # Freshness markers for every LPA updated, then the global one
+    _update_lpa_freshness_bulk([(r['lpa_code'], r['completed_at']) for r in results if r['success']])
+    _update_lpa_global_freshness()
+    
+    # Send notification
+    if update_stats['lpas_failed'] > 0:
+        alert_level = AlertLevel.WARNING
+        title = "⚠️ LPA Data Update Completed with Issues"
+        message = f"Updated {update_stats['lpas_updated']}/{total_lpas} LPAs successfully, {update_stats['lpas_failed']} failed"
+    else:
+        alert_level = AlertLevel.INFO
+        title = "✅ LPA Data Update Completed"
+        message = f"Successfully updated all {update_stats['lpas_updated']} LPAs"
+    
+    alert_system.send_alert(
+        title=title,
+        message=message,
+        level=alert_level,
+        channels=[AlertChannel.SLACK],
+        metadata=update_stats,
+        throttle_key="lpa_update_complete"
+    )
+    
+    logger.info(f"LPA data update completed: {update_stats}")
+    
+    return update_stats
+
 @celery_app.task(bind=True, base=DomusTask, name='lib.background_jobs.lpa_update_jobs.ingest_appeals_objections')
 def ingest_appeals_objections(self, days_back: int = 7):
     """
@@ -510,22 +600,23 @@ def _update_single_lpa(lpa_code: str) -> Dict[str, Any]:
         # Update LPA information
         info_result = lpa_data_updater.update_lpa_information(lpa_code)
         
-        # Mark as successful if no major errors
+        # Mark as successful if no major errors; freshness is recorded by aggregate_lpa_updates
         result['success'] = True
         
-        # Update LPA freshness tracking
-        _update_individual_lpa_freshness(lpa_code)
-        
         return result
         
     except Exception as e:
-        return {
-            'success': False,
-            'applications_updated': 0,
-            'constraints_updated': 0,
-            'policies_updated': 0,
-            'error': str(e)
-        }
+        return _failed_lpa_update(str(e))
+
+def _failed_lpa_update(error: str) -> Dict[str, Any]:
+    """Result for an LPA whose update did not complete"""
+    return {
+        'success': False,
+        'applications_updated': 0,
+        'constraints_updated': 0,
+        'policies_updated': 0,
+        'error': error
+    }
 
 def _fetch_appeals_data(days_back: int) -> List[Dict[str, Any]]:
     """Fetch appeals data from Planning Inspectorate"""
@@ -667,18 +758,20 @@ def _update_lpa_global_freshness():
     except Exception as e:
         logging.error(f"Error updating LPA global freshness: {e}")
 
-def _update_individual_lpa_freshness(lpa_code: str):
-    """Update freshness tracking for individual LPA"""
+def _update_lpa_freshness_bulk(updated: List[Tuple[str, str]]):
+    """Update freshness tracking for many LPAs at once: (lpa_code, updated at ISO time)"""
+    if not updated:
+        return
     try:
         with get_db_connection() as conn:
-            conn.execute("""
+            conn.executemany("""
                 INSERT OR REPLACE INTO lpa_freshness 
                 (lpa_code, last_updated, status)
                 VALUES (?, ?, 'fresh')
-            """, (lpa_code, datetime.utcnow()))
+            """, [(lpa_code, datetime.fromisoformat(updated_at)) for lpa_code, updated_at in updated])
             conn.commit()
     except Exception as e:
-        logging.error(f"Error updating freshness for LPA {lpa_code}: {e}")
+        logging.error(f"Error updating freshness for {len(updated)} LPAs: {e}")
 
 def _update_appeals_freshness():
     """Update appeals data freshness"""
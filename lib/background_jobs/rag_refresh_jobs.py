@@ -18,6 +18,7 @@ from ..background_jobs.alert_system import AlertSystem, AlertLevel, AlertChannel
 from ..rag.knowledge_refresh import KnowledgeRefreshService
 from ..rag.document_processor import DocumentProcessor
 from ..rag.embeddings_manager import EmbeddingsManager
+from ..rag.embedding_store import EmbeddingStore
 from ..database import get_db_connection
 
 # Initialize services
@@ -26,6 +27,12 @@ document_processor = DocumentProcessor()
 embeddings_manager = EmbeddingsManager()
 alert_system = AlertSystem()
 
+# Vectors keyed by chunk content hash; refreshes only embed new or changed chunks
+embedding_store = EmbeddingStore(
+    embedder=lambda texts: embeddings_manager.embed_texts(texts),
+    model=os.getenv('EMBEDDING_MODEL', 'default')
+)
+
 @celery_app.task(bind=True, base=DomusTask, name='lib.background_jobs.rag_refresh_jobs.refresh_knowledge_base')
 def refresh_knowledge_base(self, incremental: bool = True, force_full: bool = False):
     """
@@ -64,7 +71,7 @@ def refresh_knowledge_base(self, incremental: bool = True, force_full: bool = Fa
         # Step 1: Fetch latest planning data
         self.update_state(state='PROGRESS', meta={'step': 'fetching_data', 'progress': 10})
         
-        planning_data = _fetch_latest_planning_data()
+        planning_data = _fetch_latest_planning_data(refresh_stats['errors'])
         refresh_stats['planning_data_fetched'] = len(planning_data)
         
         # Step 2: Process documents
@@ -89,6 +96,18 @@ def refresh_knowledge_base(self, incremental: bool = True, force_full: bool = Fa
                 refresh_stats['errors'].append(error_msg)
                 logger.error(error_msg)
         
+        # A full refresh replaces the whole index, which would drop every
+        # document from a source that failed to fetch or process; update in
+        # place instead
+        if not incremental and refresh_stats['errors']:
+            logger.warning(
+                f"{len(refresh_stats['errors'])} data source(s) failed; "
+                "falling back to an incremental update to keep their documents"
+            )
+            incremental = True
+            refresh_stats['incremental'] = True
+            refresh_stats['full_refresh_skipped'] = True
+        
         # Step 3: Update knowledge base
         self.update_state(state='PROGRESS', meta={'step': 'updating_knowledge_base', 'progress': 70})
         
@@ -108,9 +127,9 @@ def refresh_knowledge_base(self, incremental: bool = True, force_full: bool = Fa
         # Step 5: Cleanup and finalization
         self.update_state(state='PROGRESS', meta={'step': 'finalizing', 'progress': 95})
         
-        # Clean up old embeddings if full refresh
+        # Clean up old embedding files if full refresh
         if not incremental:
-            embeddings_manager.cleanup_orphaned_embeddings()
+            embedding_store.cleanup()
         
         # Update freshness tracking
         _update_knowledge_freshness()
@@ -217,10 +236,13 @@ def update_specific_lpa(self, lpa_code: str, force_refresh: bool = False):
 @celery_app.task(bind=True, base=DomusTask, name='lib.background_jobs.rag_refresh_jobs.rebuild_embeddings')
 def rebuild_embeddings(self, batch_size: int = 100):
     """
-    Rebuild all embeddings from scratch
+    Rebuild all embeddings into a shadow index and swap it in when complete
+    
+    Retrieval keeps serving the current index during the rebuild. Chunks
+    whose content hash is already stored reuse their vector.
     
     Args:
-        batch_size: Number of documents to process in each batch
+        batch_size: Number of chunks to embed in each batch
     """
     task_id = self.request.id
     logger = logging.getLogger(__name__)
@@ -238,33 +260,20 @@ def rebuild_embeddings(self, batch_size: int = 100):
             logger.warning("No documents found for embeddings rebuild")
             return {'status': 'no_documents', 'total_documents': 0}
         
-        # Clear existing embeddings
-        self.update_state(state='PROGRESS', meta={'step': 'clearing_embeddings', 'progress': 20})
-        embeddings_manager.clear_all_embeddings()
-        
-        # Process documents in batches
-        processed_count = 0
-        
-        for i in range(0, total_docs, batch_size):
-            batch = all_documents[i:i + batch_size]
-            
-            # Update progress
-            progress = 20 + (processed_count / total_docs) * 70
+        # Build the shadow index; searches use the current one until it is swapped in
+        def report_progress(processed_count):
             self.update_state(
                 state='PROGRESS',
                 meta={
                     'step': 'rebuilding_embeddings',
-                    'progress': progress,
+                    'progress': 20 + (processed_count / total_docs) * 70,
                     'processed': processed_count,
                     'total': total_docs
                 }
             )
-            
-            # Generate embeddings for batch
-            embeddings_manager.generate_embeddings_batch(batch)
-            processed_count += len(batch)
-            
-            logger.info(f"Processed {processed_count}/{total_docs} documents")
+        
+        rebuild_stats = embedding_store.rebuild(all_documents, progress=report_progress, batch_size=batch_size)
+        logger.info(f"Rebuilt embeddings for {rebuild_stats['documents']}/{total_docs} documents")
         
         # Finalize
         self.update_state(state='PROGRESS', meta={'step': 'finalizing', 'progress': 95})
@@ -275,13 +284,15 @@ def rebuild_embeddings(self, batch_size: int = 100):
         stats = {
             'status': 'success',
             'total_documents': total_docs,
-            'embeddings_generated': processed_count,
+            'embeddings_generated': rebuild_stats['embedded'],
+            'embeddings_reused': rebuild_stats['reused'],
+            'chunks': rebuild_stats['chunks'],
             'completed_at': datetime.utcnow().isoformat()
         }
         
         alert_system.send_alert(
             title="✅ Embeddings Rebuild Completed",
-            message=f"Successfully rebuilt embeddings for {processed_count} documents",
+            message=f"Successfully rebuilt embeddings for {rebuild_stats['documents']} documents",
             level=AlertLevel.INFO,
             channels=[AlertChannel.SLACK],
             metadata=stats
@@ -410,8 +421,8 @@ def _should_do_full_refresh() -> bool:
         logging.error(f"Error checking full refresh criteria: {e}")
         return False
 
-def _fetch_latest_planning_data() -> List[Dict[str, Any]]:
-    """Fetch latest planning data from all configured sources"""
+def _fetch_latest_planning_data(errors: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Fetch latest planning data from all configured sources, noting failed ones in `errors`"""
     try:
         data_sources = [
             {
@@ -448,14 +459,20 @@ def _fetch_latest_planning_data() -> List[Dict[str, Any]]:
                         'data': data,
                         'fetched_at': datetime.utcnow().isoformat()
                     })
+                elif errors is not None:
+                    errors.append(f"No data fetched from {source['name']}")
                 
             except Exception as e:
                 logging.error(f"Failed to fetch data from {source['name']}: {e}")
+                if errors is not None:
+                    errors.append(f"Failed to fetch data from {source['name']}: {e}")
         
         return planning_data
         
     except Exception as e:
         logging.error(f"Error fetching latest planning data: {e}")
+        if errors is not None:
+            errors.append(f"Error fetching latest planning data: {e}")
         return []
 
 def _fetch_lpa_specific_data(lpa_code: str, force_refresh: bool = False) -> Optional[Dict[str, Any]]:
@@ -486,15 +503,17 @@ def _update_embeddings(documents: List[Dict[str, Any]], incremental: bool = True
     """Update embeddings for processed documents"""
     try:
         if incremental:
-            stats = embeddings_manager.update_embeddings_incremental(documents)
+            stats = embedding_store.upsert_documents(documents)
         else:
-            stats = embeddings_manager.regenerate_embeddings(documents)
+            # Full refresh: the processed documents replace the whole index
+            stats = embedding_store.rebuild(documents)
         
         return {
-            'embeddings_updated': stats.get('updated', 0),
+            'embeddings_updated': stats.get('updated', stats.get('documents', 0)),
             'embeddings_added': stats.get('added', 0),
             'embeddings_removed': stats.get('removed', 0),
-            'embedding_errors': stats.get('errors', 0)
+            'embeddings_computed': stats.get('embedded', 0),
+            'embedding_errors': 0
         }
         
     except Exception as e:
@@ -0,0 +1,157 @@
+"""
+Per-upstream concurrency slots for fanned-out background jobs
+
+Many LPAs are served by the same upstream (a hosted planning-portal
+platform, or one council's own server), so per-LPA tasks running in
+parallel cap how many of them talk to each upstream at once.
+
+A slot is a member of a Redis sorted set per upstream, scored by the
+upstream's sequence number: a task holds a slot when fewer than `limit`
+members were added before it, otherwise it removes itself and tries again
+later. Reclaiming expired leases, numbering and ranking a new member run
+as one Lua script, so later arrivals can never overtake a holder and the
+cap is never exceeded. An upstream's keys share a hash tag, so the script
+also runs on Redis Cluster.
+
+Slots are leases: holders renew theirs while they work (see renewing()),
+and a worker that dies without releasing frees its slot after
+lease_seconds.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+REDIS_KEY_PREFIX = "domus:upstream_slots:"
+
+logger = logging.getLogger(__name__)
+
+# Concurrent tasks per upstream unless LPA_UPSTREAM_LIMITS says otherwise
+DEFAULT_UPSTREAM_LIMIT = int(os.getenv('LPA_UPSTREAM_LIMIT', '2'))
+
+# {"upstream": limit}
+UPSTREAM_LIMITS: Dict[str, int] = json.loads(os.getenv('LPA_UPSTREAM_LIMITS', '{}'))
+
+# {"upstream": ["LPA code", ...]} for LPAs sharing a platform; any other LPA is its own upstream
+LPA_UPSTREAMS: Dict[str, Iterable[str]] = json.loads(os.getenv('LPA_UPSTREAMS', '{}'))
+
+LEASE_SECONDS = int(os.getenv('LPA_UPSTREAM_LEASE_SECONDS', '900'))
+
+# KEYS: slots, leases, sequence; ARGV: token, now, lease expiry, key ttl
+# Returns the new member's rank among the upstream's slots
+_ACQUIRE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])
+if #expired > 0 then
+    redis.call('ZREM', KEYS[1], unpack(expired))
+    redis.call('ZREM', KEYS[2], unpack(expired))
+end
+local sequence = redis.call('INCR', KEYS[3])
+redis.call('ZADD', KEYS[1], sequence, ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+return redis.call('ZRANK', KEYS[1], ARGV[1])
+"""
+
+_UPSTREAM_BY_LPA = {code: upstream for upstream, codes in LPA_UPSTREAMS.items() for code in codes}
+
+
+def upstream_for(lpa_code: str) -> str:
+    """Upstream an LPA's data is fetched from"""
+    return _UPSTREAM_BY_LPA.get(lpa_code, f"lpa:{lpa_code}")
+
+
+def upstream_limit(upstream: str) -> int:
+    return int(UPSTREAM_LIMITS.get(upstream, DEFAULT_UPSTREAM_LIMIT))
+
+
+def jittered_backoff(attempt: int, base: float = 30.0, cap: float = 900.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2 ** attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class UpstreamBusy(Exception):
+    """All of an upstream's slots are taken"""
+
+
+class UpstreamSlots:
+    """Counting semaphore per upstream, shared by every worker through Redis"""
+
+    def __init__(self, redis_client, lease_seconds: float = LEASE_SECONDS):
+        self.redis = redis_client
+        self.lease_seconds = lease_seconds
+        self._acquire_script = redis_client.register_script(_ACQUIRE_SCRIPT)
+
+    def acquire(self, upstream: str, limit: int) -> Optional[str]:
+        """Take a slot; returns its token, or None if `limit` are already held"""
+        token = uuid.uuid4().hex
+        now = time.time()
+        rank = self._acquire_script(
+            keys=list(self._keys(upstream)),
+            args=[token, now, now + self.lease_seconds, self._key_ttl()]
+        )
+        if rank is not None and rank < limit:
+            return token
+
+        self.release(upstream, token)
+        return None
+
+    def renew(self, upstream: str, token: str) -> bool:
+        """Extend a held slot's lease; False if it had already been reclaimed"""
+        slots_key, leases_key, sequence_key = self._keys(upstream)
+        ttl = self._key_ttl()
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.zadd(leases_key, {token: time.time() + self.lease_seconds}, xx=True, ch=True)
+        pipe.expire(slots_key, ttl)
+        pipe.expire(leases_key, ttl)
+        pipe.expire(sequence_key, ttl)
+        return bool(pipe.execute()[0])
+
+    @contextmanager
+    def renewing(self, upstream: str, token: str) -> Iterator[None]:
+        """Renew a held slot's lease in a background thread until the block exits"""
+        stop = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    if not self.renew(upstream, token):
+                        logger.warning(f"Slot on {upstream} was reclaimed before it was released")
+                        return
+                except Exception as e:
+                    # Try again next interval; the lease is still valid for a while
+                    logger.warning(f"Could not renew slot on {upstream}: {e}")
+
+        thread = threading.Thread(target=keep_alive, name=f"slot-lease:{upstream}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def release(self, upstream: str, token: str):
+        slots_key, leases_key, _ = self._keys(upstream)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.zrem(slots_key, token)
+        pipe.zrem(leases_key, token)
+        pipe.execute()
+
+    def held(self, upstream: str) -> int:
+        return self.redis.zcard(self._keys(upstream)[0])
+
+    def _key_ttl(self) -> int:
+        # Idle upstreams don't leave keys behind
+        return int(self.lease_seconds * 2) + 1
+
+    def _keys(self, upstream: str) -> Tuple[str, str, str]:
+        """Slots, leases and sequence keys, hash-tagged to one cluster slot"""
+        base = REDIS_KEY_PREFIX + "{" + upstream + "}"
+        return base, base + ":leases", base + ":sequence"
@@ -0,0 +1,565 @@
+"""
+Content-addressed embedding store for the RAG knowledge base.
+
+Documents are split into chunks and every chunk is keyed by the SHA-256 of
+its normalised text and the embedding model name. A refresh only embeds
+chunks whose hash the store hasn't seen; unchanged chunks, and chunks
+shared by several documents, reuse the stored vector.
+
+Vectors are unit-length float32 rows in a flat file that readers
+memory-map. A JSON manifest names the vector file, how many of its rows are
+valid and which chunk uses which row. Writers replace the manifest
+atomically (os.replace), so a reader always sees one complete version:
+
+- upsert_documents appends vectors for new chunks to the current file, then
+  swaps in a manifest that counts them
+- rebuild writes every vector into a new (shadow) file, copying stored
+  vectors by hash and embedding only new text, and swaps in a manifest that
+  points at it when it is complete; searches keep using the previous
+  version until then
+
+Readers pick up a new manifest on their next search. Files no manifest
+refers to any more are deleted after a swap (memory maps already open on
+them stay valid).
+
+Search is exact, a blocked matrix-vector product over the memory map, until
+a rebuild finds IVF_MIN_ROWS rows; it then also trains an inverted file
+index (spherical k-means centroids, each row assigned to its nearest) and
+searches only score rows in the IVF_PROBES clusters nearest the query. Rows
+appended by later upserts are assigned to the existing centroids.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "data/embeddings")
+MANIFEST_NAME = "manifest.json"
+
+CHUNK_CHARS = 1500
+CHUNK_OVERLAP = 200
+
+# Texts per embedder call
+EMBED_BATCH = 64
+
+# Rows per block in exact search
+SEARCH_BLOCK_ROWS = 65536
+
+# Inverted file index: trained by rebuilds from this many rows, clusters probed per query
+IVF_MIN_ROWS = 50000
+IVF_PROBES = 8
+IVF_TRAIN_ITERATIONS = 10
+IVF_TRAIN_SAMPLES_PER_CLUSTER = 64
+
+# Keys of a knowledge document that aren't copied into chunk metadata
+DOCUMENT_TEXT_KEYS = ("id", "content", "text")
+
+# texts -> (len(texts), dim) array-like
+Embedder = Callable[[List[str]], Any]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalise_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def content_hash(text: str, model: str) -> str:
+    """Key of a chunk's vector: same text and model, same vector"""
+    return hashlib.sha256(f"{model}\0{normalise_text(text)}".encode("utf-8")).hexdigest()
+
+
+def document_text(document: Dict[str, Any]) -> str:
+    return document.get("content") or document.get("text") or ""
+
+
+def chunk_text(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Overlapping chunks of at most `size` characters, broken at sentence or word ends where possible"""
+    text = normalise_text(text)
+    if len(text) <= size:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            cut = text.rfind(". ", start + size // 2, end)
+            if cut == -1:
+                cut = text.rfind(" ", start + size // 2, end)
+            if cut != -1:
+                end = cut + 1
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        # Next chunk starts at a word boundary about `overlap` characters back
+        space = text.find(" ", end - overlap, end)
+        start = max(space + 1 if space != -1 else end - overlap, start + 1)
+    return [chunk for chunk in chunks if chunk]
+
+
+@dataclass
+class SearchHit:
+    """One retrieved chunk"""
+    chunk_id: str
+    document_id: str
+    score: float  # cosine similarity
+    text: str
+    metadata: Dict[str, Any]
+
+
+class _Snapshot:
+    """One manifest version with its vectors memory-mapped"""
+
+    def __init__(self, root: str, manifest: Dict[str, Any], key: Tuple[int, int, int]):
+        self.manifest = manifest
+        self.key = key
+        self.model: str = manifest["model"]
+        self.dim: int = manifest["dim"]
+        self.rows: int = manifest["rows"]
+        self.hashes: List[str] = manifest["hashes"]
+        self.chunks: List[Dict[str, Any]] = manifest["chunks"]
+        self.documents: Dict[str, str] = manifest["documents"]
+        self.files: Dict[str, Optional[str]] = manifest["files"]
+
+        self.vectors = _open_rows(os.path.join(root, self.files["vectors"]), np.float32, (self.rows, self.dim))
+        self.row_of = {h: row for row, h in enumerate(self.hashes)}
+
+        # Rows no chunk uses any more stay in the file until the next rebuild
+        self.row_chunks: Dict[int, List[int]] = {}
+        for i, chunk in enumerate(self.chunks):
+            self.row_chunks.setdefault(chunk["row"], []).append(i)
+        self.live = np.zeros(self.rows, dtype=bool)
+        self.live[list(self.row_chunks)] = True
+
+        self.centroids: Optional[np.ndarray] = None
+        if self.files.get("centroids"):
+            self.centroids = np.load(os.path.join(root, self.files["centroids"]))
+            assignments = _open_rows(os.path.join(root, self.files["assignments"]), np.int32, (self.rows,))
+            self.ivf_order = np.argsort(assignments, kind="stable")
+            self.ivf_bounds = np.searchsorted(assignments[self.ivf_order], np.arange(len(self.centroids) + 1))
+
+    def search(self, query: np.ndarray, k: int, where: Optional[Callable[[Dict[str, Any]], bool]]) -> List[SearchHit]:
+        if not self.chunks or k <= 0:
+            return []
+
+        if self.centroids is not None:
+            probes = min(IVF_PROBES, len(self.centroids))
+            nearest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+            rows = np.concatenate([self.ivf_order[self.ivf_bounds[c]:self.ivf_bounds[c + 1]] for c in nearest])
+            rows = np.sort(rows[self.live[rows]])
+            scores = self.vectors[rows] @ query if len(rows) else np.zeros(0, dtype=np.float32)
+        else:
+            scores = np.concatenate([
+                self.vectors[start:start + SEARCH_BLOCK_ROWS] @ query
+                for start in range(0, self.rows, SEARCH_BLOCK_ROWS)
+            ])
+            rows = np.flatnonzero(self.live)
+            scores = scores[rows]
+
+        # Each row has at least one chunk, so the best k rows hold the best k chunks
+        if where is None and len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+
+        hits: List[SearchHit] = []
+        for i in order:
+            for chunk_index in self.row_chunks[int(rows[i])]:
+                chunk = self.chunks[chunk_index]
+                if where is not None and not where(chunk):
+                    continue
+                hits.append(SearchHit(chunk["id"], chunk["document_id"], float(scores[i]),
+                                      chunk["text"], chunk["metadata"]))
+                if len(hits) == k:
+                    return hits
+        return hits
+
+
+class EmbeddingStore:
+    """
+    Embedding store in one directory, shared by every process using it
+
+    Args:
+        root: Store directory
+        embedder: Turns a list of texts into a (n, dim) array
+        model: Embedding model name; part of every chunk's hash, so a new
+            model means new vectors
+    """
+
+    def __init__(self, root: str = EMBEDDING_STORE_DIR, embedder: Optional[Embedder] = None,
+                 model: str = "default", batch_size: int = EMBED_BATCH):
+        self.root = root
+        self.embedder = embedder
+        self.model = model
+        self.batch_size = batch_size
+        self._current: Optional[_Snapshot] = None
+
+    # Reading
+
+    def search(self, query: Union[str, np.ndarray], k: int = 10,
+               where: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[SearchHit]:
+        """
+        Top k chunks by cosine similarity to a query text or vector
+
+        `where(chunk)` filters chunks (a dict with id, document_id, text and
+        metadata).
+        """
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return []
+        vector = self._embed([query])[0] if isinstance(query, str) else _unit_rows(np.asarray(query, np.float32)[None])[0]
+        if len(vector) != snapshot.dim:
+            raise ValueError(f"Query has {len(vector)} dimensions, store has {snapshot.dim}")
+        return snapshot.search(vector, k, where)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return {"documents": 0, "chunks": 0, "rows": 0, "live_rows": 0, "version": 0}
+        return {
+            "documents": len(snapshot.documents),
+            "chunks": len(snapshot.chunks),
+            "rows": snapshot.rows,
+            "live_rows": int(snapshot.live.sum()),
+            "model": snapshot.model,
+            "dim": snapshot.dim,
+            "ivf_clusters": len(snapshot.centroids) if snapshot.centroids is not None else 0,
+            "version": snapshot.manifest["version"],
+            "updated_at": snapshot.manifest["updated_at"],
+        }
+
+    def _snapshot(self) -> Optional[_Snapshot]:
+        """Current manifest version, reloaded when another writer has swapped in a new one"""
+        path = os.path.join(self.root, MANIFEST_NAME)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._current = None
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self._current is None or self._current.key != key:
+            with open(path, "r", encoding="utf-8") as f:
+                self._current = _Snapshot(self.root, json.load(f), key)
+        return self._current
+
+    # Writing
+
+    def upsert_documents(self, documents: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Add or replace documents in place
+
+        Documents whose text and metadata are unchanged are skipped; of the
+        rest, only chunks with unseen hashes are embedded. Their vectors are
+        appended to the current vector file.
+        """
+        stats = {"added": 0, "updated": 0, "unchanged": 0, "chunks": 0, "embedded": 0}
+        latest = {str(document["id"]): document for document in documents}
+
+        with self._write_lock():
+            snapshot = self._snapshot()
+            if snapshot is not None and snapshot.model != self.model:
+                raise ValueError(f"Store holds {snapshot.model} embeddings; rebuild it for {self.model}")
+
+            known = snapshot.documents if snapshot else {}
+            row_of = dict(snapshot.row_of) if snapshot else {}
+            changed: Dict[str, str] = {}
+            new_chunks: List[Dict[str, Any]] = []
+            pending: Dict[str, str] = {}
+            for document_id, document in latest.items():
+                document_hash = self._document_hash(document)
+                if known.get(document_id) == document_hash:
+                    stats["unchanged"] += 1
+                    continue
+                stats["updated" if document_id in known else "added"] += 1
+                changed[document_id] = document_hash
+                for chunk in self._chunks(document_id, document):
+                    if chunk["hash"] not in row_of:
+                        pending.setdefault(chunk["hash"], chunk["text"])
+                    new_chunks.append(chunk)
+            if not changed:
+                return stats
+
+            if snapshot is not None:
+                files, dim, rows, hashes = dict(snapshot.files), snapshot.dim, snapshot.rows, list(snapshot.hashes)
+            else:
+                files, dim, rows, hashes = {"vectors": _file_name("vectors", ".f32")}, None, 0, []
+
+            for batch in _batches(list(pending.items()), self.batch_size):
+                vectors = self._embed([text for _, text in batch])
+                dim = dim or vectors.shape[1]
+                if vectors.shape[1] != dim:
+                    raise ValueError(f"Embedder returned {vectors.shape[1]} dimensions, store has {dim}")
+                # Rows past the manifest's count are left over from an interrupted write
+                _append_rows(os.path.join(self.root, files["vectors"]), rows * dim * 4, vectors)
+                if snapshot is not None and snapshot.centroids is not None:
+                    assignments = np.argmax(vectors @ snapshot.centroids.T, axis=1).astype(np.int32)
+                    _append_rows(os.path.join(self.root, files["assignments"]), rows * 4, assignments)
+                for h, _ in batch:
+                    row_of[h] = rows
+                    hashes.append(h)
+                    rows += 1
+            stats["embedded"] = len(pending)
+
+            for chunk in new_chunks:
+                chunk["row"] = row_of[chunk["hash"]]
+            kept = [c for c in snapshot.chunks if c["document_id"] not in changed] if snapshot else []
+            stats["chunks"] = len(new_chunks)
+
+            self._commit(snapshot, files, dim or 0, rows, hashes, kept + new_chunks, {**known, **changed})
+        return stats
+
+    def remove_documents(self, document_ids: Iterable[str]) -> int:
+        """Drop documents; their vectors stay in the file until the next rebuild"""
+        ids = {str(document_id) for document_id in document_ids}
+        with self._write_lock():
+            snapshot = self._snapshot()
+            if snapshot is None or not ids & snapshot.documents.keys():
+                return 0
+            removed = ids & snapshot.documents.keys()
+            self._commit(
+                snapshot, dict(snapshot.files), snapshot.dim, snapshot.rows, list(snapshot.hashes),
+                [c for c in snapshot.chunks if c["document_id"] not in removed],
+                {d: h for d, h in snapshot.documents.items() if d not in removed}
+            )
+        return len(removed)
+
+    def rebuild(self, documents: Iterable[Dict[str, Any]],
+                progress: Optional[Callable[[int], None]] = None,
+                batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Replace the whole store with `documents` via a shadow vector file
+
+        Vectors already stored for the same model are copied rather than
+        re-embedded. Searches use the previous version until the new one is
+        swapped in at the end. `progress(documents_done)` is called after
+        embedding batch.
+        """
+        stats = {"documents": 0, "chunks": 0, "embedded": 0, "reused": 0, "removed": 0}
+        batch_size = batch_size or self.batch_size
+
+        with self._write_lock():
+            snapshot = self._snapshot()
+            previous = snapshot if snapshot is not None and snapshot.model == self.model else None
+            files: Dict[str, Optional[str]] = {"vectors": _file_name("vectors", ".f32")}
+            vector_path = os.path.join(self.root, files["vectors"])
+
+            hashes: List[str] = []
+            row_of: Dict[str, int] = {}
+            chunks: List[Dict[str, Any]] = []
+            documents_map: Dict[str, str] = {}
+            # (hash, previous row or None, text) waiting to be written, in row order
+            queue: List[Tuple[str, Optional[int], str]] = []
+            to_embed = 0
+            dim = previous.dim if previous else None
+
+            def flush():
+                nonlocal dim, to_embed
+                if not queue:
+                    return
+                texts = [text for _, old_row, text in queue if old_row is None]
+                embedded = self._embed(texts) if texts else None
+                if embedded is not None:
+                    dim = dim or embedded.shape[1]
+                    if embedded.shape[1] != dim:
+                        raise ValueError(f"Embedder returned {embedded.shape[1]} dimensions, expected {dim}")
+                block = np.empty((len(queue), dim), dtype=np.float32)
+                fresh = iter(embedded if embedded is not None else ())
+                for i, (_, old_row, _) in enumerate(queue):
+                    block[i] = previous.vectors[old_row] if old_row is not None else next(fresh)
+                with open(vector_path, "ab") as f:
+                    f.write(block.tobytes())
+                stats["embedded"] += len(texts)
+                stats["reused"] += len(queue) - len(texts)
+                queue.clear()
+                to_embed = 0
+
+            os.makedirs(self.root, exist_ok=True)
+            open(vector_path, "wb").close()
+            try:
+                for document in documents:
+                    document_id = str(document["id"])
+                    if document_id in documents_map:
+                        chunks = [c for c in chunks if c["document_id"] != document_id]
+                    documents_map[document_id] = self._document_hash(document)
+                    for chunk in self._chunks(document_id, document):
+                        h = chunk["hash"]
+                        if h not in row_of:
+                            row_of[h] = len(hashes)
+                            hashes.append(h)
+                            old_row = previous.row_of.get(h) if previous else None
+                            queue.append((h, old_row, chunk["text"]))
+                            to_embed += old_row is None
+                        chunk["row"] = row_of[h]
+                        chunks.append(chunk)
+                    stats["documents"] += 1
+                    if to_embed >= batch_size or len(queue) >= SEARCH_BLOCK_ROWS:
+                        flush()
+                        if progress:
+                            progress(stats["documents"])
+                flush()
+
+                if dim and len(hashes) >= IVF_MIN_ROWS:
+                    files.update(self._train_ivf(vector_path, len(hashes), dim))
+            except BaseException:
+                _remove_quietly(vector_path)
+                raise
+
+            stats["chunks"] = len(chunks)
+            stats["removed"] = len(snapshot.documents.keys() - documents_map.keys()) if snapshot else 0
+            self._commit(snapshot, files, dim or 0, len(hashes), hashes, chunks, documents_map)
+            if progress:
+                progress(stats["documents"])
+        return stats
+
+    def cleanup(self) -> int:
+        """Delete store files the current manifest doesn't use; returns how many"""
+        with self._write_lock():
+            return self._cleanup()
+
+    def _commit(self, snapshot: Optional[_Snapshot], files: Dict[str, Optional[str]], dim: int, rows: int,
+                hashes: List[str], chunks: List[Dict[str, Any]], documents: Dict[str, str]):
+        manifest = {
+            "version": (snapshot.manifest["version"] + 1) if snapshot else 1,
+            "model": self.model,
+            "dim": dim,
+            "rows": rows,
+            "files": files,
+            "hashes": hashes,
+            "chunks": chunks,
+            "documents": documents,
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        path = os.path.join(self.root, MANIFEST_NAME)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._cleanup()
+        logger.info("Embedding store %s: version %d, %d chunks, %d rows",
+                    self.root, manifest["version"], len(chunks), rows)
+
+    def _cleanup(self) -> int:
+        snapshot = self._snapshot()
+        in_use = {name for name in (snapshot.files.values() if snapshot else ()) if name}
+        removed = 0
+        for name in os.listdir(self.root):
+            if name.startswith(STORE_FILE_PREFIXES) and name not in in_use:
+                _remove_quietly(os.path.join(self.root, name))
+                removed += 1
+        return removed
+
+    def _train_ivf(self, vector_path: str, rows: int, dim: int) -> Dict[str, str]:
+        """Spherical k-means over a sample of the rows, then every row assigned to its nearest centroid"""
+        vectors = _open_rows(vector_path, np.float32, (rows, dim))
+        rng = np.random.default_rng(rows)
+        clusters = max(1, int(np.sqrt(rows)))
+        sample = vectors[np.sort(rng.choice(rows, min(rows, clusters * IVF_TRAIN_SAMPLES_PER_CLUSTER), replace=False))]
+        centroids = sample[rng.choice(len(sample), clusters, replace=False)].copy()
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            filled = np.bincount(nearest, minlength=clusters) > 0
+            centroids[filled] = _unit_rows(sums[filled])
+
+        files = {"centroids": _file_name("centroids", ".npy"), "assignments": _file_name("assignments", ".i32")}
+        np.save(os.path.join(self.root, files["centroids"]), centroids)
+        with open(os.path.join(self.root, files["assignments"]), "wb") as f:
+            for start in range(0, rows, SEARCH_BLOCK_ROWS):
+                block = vectors[start:start + SEARCH_BLOCK_ROWS]
+                f.write(np.argmax(block @ centroids.T, axis=1).astype(np.int32).tobytes())
+        return files
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if self.embedder is None:
+            raise RuntimeError("EmbeddingStore has no embedder")
+        vectors = np.asarray(self.embedder(texts), dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError(f"Embedder returned shape {vectors.shape} for {len(texts)} texts")
+        return _unit_rows(vectors)
+
+    def _document_hash(self, document: Dict[str, Any]) -> str:
+        return content_hash(document_text(document) + json.dumps(_metadata(document), sort_keys=True, default=str),
+                            self.model)
+
+    def _chunks(self, document_id: str, document: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        metadata = _metadata(document)
+        for n, text in enumerate(chunk_text(document_text(document))):
+            yield {"id": f"{document_id}#{n}", "document_id": document_id, "hash": content_hash(text, self.model),
+                   "text": text, "metadata": metadata}
+
+    @contextmanager
+    def _write_lock(self):
+        """One writer at a time per store directory"""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "a") as lock:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _metadata(document: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in document.items() if key not in DOCUMENT_TEXT_KEYS}
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+
+def _open_rows(path: str, dtype, shape: Tuple[int, ...]) -> np.ndarray:
+    if not shape[0]:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+def _append_rows(path: str, valid_bytes: int, rows: np.ndarray):
+    with open(path, "ab") as f:
+        if f.tell() > valid_bytes:
+            f.truncate(valid_bytes)
+        f.write(rows.tobytes())
+
+
+STORE_FILE_PREFIXES = ("vectors-", "centroids-", "assignments-", MANIFEST_NAME + ".")
+
+
+def _file_name(kind: str, suffix: str) -> str:
+    return f"{kind}-{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}{suffix}"
+
+
+def _batches(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+__all__ = ["EmbeddingStore", "SearchHit", "chunk_text", "content_hash"]
@@ -0,0 +1,255 @@
+"""
+Route Policy Table
+Compiled route -> policy lookup shared by rate limiting and credit enforcement
+
+RBAC is not part of the table: permissions stay with the routes' own
+require_permission dependencies.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import threading
+
+# Policy fields a route can carry
+POLICY_FIELDS = ('rate_limit', 'credit')
+
+ANY_METHOD = '*'
+
+# Exact matches outrank wildcards at any depth
+EXACT_RANK = 1_000_000
+
+class RouteMatch(NamedTuple):
+    """Policies that apply to one request"""
+    pattern: Optional[str]
+    params: Dict[str, str]
+    rate_limit: Optional[Dict[str, Any]]
+    credit: Optional[Dict[str, Any]]
+
+
+class _Entry:
+    """Policy fields registered for one pattern at a trie node"""
+
+    __slots__ = ('pattern', 'param_names', 'fields')
+
+    def __init__(self, pattern: str, param_names: Tuple[str, ...]):
+        self.pattern = pattern
+        self.param_names = param_names
+        self.fields: Dict[str, Any] = {}
+
+
+class _Node:
+    """Trie node for one path segment"""
+
+    __slots__ = ('static', 'param', 'exact', 'wildcard')
+
+    def __init__(self):
+        self.static: Dict[str, '_Node'] = {}
+        self.param: Optional['_Node'] = None
+        # method -> entry, for patterns ending here / ending in '*' here
+        self.exact: Dict[str, _Entry] = {}
+        self.wildcard: Dict[str, _Entry] = {}
+
+
+class RoutePolicyTable:
+    """
+    Radix trie over path segments mapping routes to their policies
+
+    Patterns are "/static/{param}/..." with an optional trailing "/*" that
+    matches any deeper path, and are registered per HTTP method or for any
+    method. Each field (rate limit, credit rule) is resolved
+    independently: an exact pattern beats a wildcard, a longer wildcard
+    prefix beats a shorter one, static segments beat parameters, and a
+    method-specific entry beats an any-method entry. Build the table once at
+    startup; a lookup walks one node per path segment instead of testing
+    every configured pattern.
+    """
+
+    def __init__(self, default_rate_limit: Optional[Dict[str, Any]] = None):
+        self.default_rate_limit = default_rate_limit
+        self._root = _Node()
+        self._patterns = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._patterns
+
+    def add(self, pattern: str, method: str = ANY_METHOD, **fields: Any) -> None:
+        """
+        Register policy fields for a route pattern
+
+        Args:
+            pattern: Path pattern, e.g. "/api/projects/{project_id}" or "/api/admin/*"
+            method: HTTP method, or '*' for any method
+            **fields: Either of rate_limit, credit
+        """
+
+        unknown = set(fields) - set(POLICY_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown route policy fields: {sorted(unknown)}")
+
+        segments = _split(pattern)
+        wildcard = bool(segments) and segments[-1] == '*'
+        if wildcard:
+            segments = segments[:-1]
+
+        node = self._root
+        param_names: List[str] = []
+        for segment in segments:
+            if '*' in segment:
+                raise ValueError(f"'*' is only supported as the last path segment: {pattern}")
+            if segment.startswith('{') and segment.endswith('}'):
+                param_names.append(segment[1:-1])
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, _Node())
+
+        with self._lock:
+            entries = node.wildcard if wildcard else node.exact
+            entry = entries.get(method.upper())
+            if entry is None:
+                entry = entries[method.upper()] = _Entry(pattern, tuple(param_names))
+                self._patterns += 1
+            entry.fields.update(fields)
+
+    def add_rate_limits(self, rate_limits: Dict[str, Dict[str, Any]]) -> None:
+        """Register RateLimiter-style limits (path -> config, plus 'default')"""
+
+        for path, config in rate_limits.items():
+            if path == 'default':
+                self.default_rate_limit = config
+            else:
+                self.add(path, rate_limit=config)
+
+    def add_credit_rules(self, rules: Dict[str, Dict[str, Any]]) -> None:
+        """Register credit enforcement rules keyed "METHOD /path\""""
+
+        for route_key, rule in rules.items():
+            method, path = _split_route_key(route_key)
+            self.add(path, method, credit=rule)
+
+    def match(self, method: Optional[str], path: str) -> RouteMatch:
+        """
+        Resolve every policy for a request in one trie walk
+
+        Args:
+            method: HTTP method (None to consider any-method entries only)
+            path: Request path without query string
+
+        Returns:
+            RouteMatch; rate_limit falls back to the default limit
+        """
+
+        method = method.upper() if method else ANY_METHOD
+        segments = _split(path)
+
+        # ((rank, visit order, method rank), entry, param values); highest wins
+        candidates: List[Tuple[Tuple[int, int, int], _Entry, List[str]]] = []
+        self._collect(self._root, segments, 0, [], method, candidates)
+        if len(candidates) > 1:
+            candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+
+        resolved: Dict[str, Any] = {}
+        for _, entry, _ in candidates:
+            for field, value in entry.fields.items():
+                resolved.setdefault(field, value)
+            if len(resolved) == len(POLICY_FIELDS):
+                break
+
+        pattern, params = None, {}
+        if candidates:
+            _, entry, values = candidates[0]
+            pattern = entry.pattern
+            params = dict(zip(entry.param_names, values))
+
+        return RouteMatch(
+            pattern=pattern,
+            params=params,
+            rate_limit=resolved.get('rate_limit', self.default_rate_limit),
+            credit=resolved.get('credit')
+        )
+
+    def _collect(
+        self,
+        node: _Node,
+        segments: List[str],
+        depth: int,
+        values: List[str],
+        method: str,
+        candidates: List[Tuple[Tuple[int, int, int], _Entry, List[str]]]
+    ) -> None:
+        """Depth-first walk, static children before the parameter child"""
+
+        # Rank: exact before wildcard and deeper before shallower; then
+        # nodes visited earlier (static branches) before later ones; then
+        # method-specific before any-method entries on the same node
+        if depth < len(segments) and node.wildcard:
+            _add_candidates(node.wildcard, method, depth * 2, values, candidates)
+
+        if depth == len(segments):
+            if node.exact:
+                _add_candidates(node.exact, method, EXACT_RANK, values, candidates)
+            return
+
+        child = node.static.get(segments[depth])
+        if child is not None:
+            self._collect(child, segments, depth + 1, values, method, candidates)
+        if node.param is not None and segments[depth]:
+            self._collect(node.param, segments, depth + 1, values + [segments[depth]], method, candidates)
+
+
+def _add_candidates(
+    entries: Dict[str, _Entry],
+    method: str,
+    rank: int,
+    values: List[str],
+    candidates: List[Tuple[Tuple[int, int, int], _Entry, List[str]]]
+) -> None:
+    order = -len(candidates)
+    if method != ANY_METHOD and method in entries:
+        candidates.append(((rank, order, 1), entries[method], values))
+    if ANY_METHOD in entries:
+        candidates.append(((rank, order, 0), entries[ANY_METHOD], values))
+
+
+def _split(path: str) -> List[str]:
+    return path.split('/')[1:] if path.startswith('/') else path.split('/')
+
+
+def _split_route_key(route_key: str) -> Tuple[str, str]:
+    method, _, path = route_key.partition(' ')
+    return method, path
+
+
+_shared_table: Optional[RoutePolicyTable] = None
+_shared_lock = threading.Lock()
+
+
+def build_route_policy_table(
+    rate_limits: Optional[Dict[str, Dict[str, Any]]] = None,
+    credit_rules: Optional[Dict[str, Dict[str, Any]]] = None
+) -> RoutePolicyTable:
+    """Compile a table from the rate limit and credit configs (defaults if omitted)"""
+
+    if rate_limits is None:
+        from lib.security.rate_limiter import DEFAULT_RATE_LIMITS
+        rate_limits = DEFAULT_RATE_LIMITS
+    if credit_rules is None:
+        from middleware.credit_enforcement import CREDIT_ENFORCEMENT_MAP
+        credit_rules = CREDIT_ENFORCEMENT_MAP
+
+    table = RoutePolicyTable()
+    table.add_rate_limits(rate_limits)
+    table.add_credit_rules(credit_rules)
+    return table
+
+
+def get_route_policy_table() -> RoutePolicyTable:
+    """Process-wide table built from the default configs on first use"""
+
+    global _shared_table
+    if _shared_table is None:
+        with _shared_lock:
+            if _shared_table is None:
+                _shared_table = build_route_policy_table()
+    return _shared_table
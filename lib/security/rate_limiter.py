@@ -5,52 +5,351 @@ Per-route rate limiting with different limits for different endpoints
 
 import time
 import json
+import math
+import os
+import queue
 import sqlite3
-from typing import Dict, Optional, Tuple
+import threading
+import atexit
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone, timedelta
-from collections import defaultdict
 import hashlib
 import logging
 
+from lib.route_policy import RoutePolicyTable, get_route_policy_table
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+
 logger = logging.getLogger(__name__)
 
+# Window used by the burst check, in seconds
+BURST_WINDOW_SECONDS = 10
+
+REDIS_KEY_PREFIX = "domus:rate_limit:"
+
+# Request-log writer: flush after this many records or this long after the
+# first unflushed record, whichever comes first
+LOG_BATCH_SIZE = 200
+LOG_FLUSH_INTERVAL_MS = 250
+LOG_MAX_PENDING = 10000
+
+# Rate limit configurations (path pattern -> limits); '*' as the last segment matches any deeper path
+DEFAULT_RATE_LIMITS: Dict[str, Dict[str, int]] = {
+    # Authentication endpoints
+    '/api/auth/login': {'requests': 5, 'window': 60, 'burst': 10},  # 5/min, burst 10
+    '/api/auth/signup': {'requests': 3, 'window': 300, 'burst': 5},  # 3/5min, burst 5
+    '/api/auth/reset-password': {'requests': 3, 'window': 300, 'burst': 5},
+
+    # API endpoints
+    '/api/planning-ai/analyze': {'requests': 10, 'window': 60, 'burst': 20},  # 10/min
+    '/api/auto-docs/generate': {'requests': 5, 'window': 60, 'burst': 10},  # 5/min
+    '/api/property/search': {'requests': 30, 'window': 60, 'burst': 50},  # 30/min
+
+    # Marketplace endpoints
+    '/api/marketplace/create-listing': {'requests': 5, 'window': 300, 'burst': 10},
+    '/api/marketplace/search': {'requests': 20, 'window': 60, 'burst': 40},
+
+    # Billing endpoints
+    '/api/billing/webhook': {'requests': 100, 'window': 60, 'burst': 200},  # Higher for webhooks
+    '/api/billing/upgrade': {'requests': 2, 'window': 300, 'burst': 3},
+
+    # Admin endpoints
+    '/api/admin/*': {'requests': 50, 'window': 60, 'burst': 100},
+
+    # Default for unspecified endpoints
+    'default': {'requests': 30, 'window': 60, 'burst': 60}  # 30/min default
+}
+
+
+class WindowCounter:
+    """
+    Sliding-window counter
+
+    Keeps only the counts for the current and previous fixed windows and
+    weights the previous count by how much of it still overlaps the sliding
+    window, so memory per client/endpoint is constant however many requests
+    arrive.
+    """
+
+    __slots__ = ('index', 'previous', 'current')
+
+    def __init__(self, index: int = 0, previous: int = 0, current: int = 0):
+        self.index = index
+        self.previous = previous
+        self.current = current
+
+    def roll(self, window: float, now: float) -> None:
+        """Advance to the fixed window containing `now`"""
+
+        index = int(now // window)
+        if index != self.index:
+            self.previous = self.current if index == self.index + 1 else 0
+            self.current = 0
+            self.index = index
+
+    def estimate(self, window: float, now: float) -> float:
+        """Approximate number of requests in the last `window` seconds"""
+
+        elapsed = now - self.index * window
+        return self.previous * (1 - elapsed / window) + self.current
+
+    def seconds_until_below(self, limit: int, window: float, now: float) -> float:
+        """Time until the estimate drops below `limit` if no more requests arrive"""
+
+        elapsed = now - self.index * window
+        if self.current < limit:
+            if self.previous <= 0:
+                return 0.0
+            return max(0.0, window * (1 - (limit - self.current) / self.previous) - elapsed)
+
+        # Only once the current window has become the previous one
+        return (window - elapsed) + window * (1 - limit / self.current)
+
+
+class BatchedLogWriter:
+    """
+    Asynchronous batched writer for rate limiter logs
+
+    Rows are queued without blocking the caller and written by a background
+    thread with one executemany and one commit per table per batch. A batch
+    is flushed once it holds `batch_size` rows or `flush_interval_ms` after
+    its first row was queued. The thread uses its own SQLite connection; for
+    databases without a file path (e.g. :memory:) rows are batched the same
+    way but written on the calling thread.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        db: sqlite3.Connection,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval_ms: float = LOG_FLUSH_INTERVAL_MS,
+        max_pending: int = LOG_MAX_PENDING
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.db_path = self._database_path(db)
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+        # Inline mode (no database file to open from the writer thread)
+        self._pending: List[Tuple[str, tuple]] = []
+        self._pending_since = 0.0
+
+        self.stats = {
+            'queued': 0,
+            'written': 0,
+            'flushes': 0,
+            'dropped': 0,
+            'errors': 0
+        }
+
+    @staticmethod
+    def _database_path(db: sqlite3.Connection) -> Optional[str]:
+        try:
+            for _, name, path in db.execute("PRAGMA database_list").fetchall():
+                if name == 'main':
+                    return path or None
+        except sqlite3.Error:
+            pass
+        return None
+
+    def write(self, table: str, row: tuple) -> None:
+        """Queue one row for `table`"""
+
+        if self.db_path is None:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append((table, row))
+            self.stats['queued'] += 1
+            if (len(self._pending) >= self.batch_size or
+                    time.monotonic() - self._pending_since >= self.flush_interval):
+                self._write_batch(self.db, self._pending)
+                self._pending = []
+            return
+
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((table, row))
+            self.stats['queued'] += 1
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Block until every row queued so far has been written"""
+
+        if self.db_path is None:
+            if self._pending:
+                self._write_batch(self.db, self._pending)
+                self._pending = []
+            return
+
+        if self._thread is None or not self._thread.is_alive():
+            return
+
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush outstanding rows and stop the writer thread"""
+
+        self.flush(timeout)
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="rate-limit-log-writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        batch: List[Tuple[str, tuple]] = []
+        deadline = 0.0
+
+        try:
+            while True:
+                timeout = max(0.0, deadline - time.monotonic()) if batch else None
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is self._STOP:
+                    break
+
+                if isinstance(item, threading.Event):
+                    self._write_batch(conn, batch)
+                    batch = []
+                    item.set()
+                    continue
+
+                if item is not None:
+                    if not batch:
+                        deadline = time.monotonic() + self.flush_interval
+                    batch.append(item)
+
+                if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                    self._write_batch(conn, batch)
+                    batch = []
+        finally:
+            self._write_batch(conn, batch)
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[str, tuple]]) -> None:
+        if not batch:
+            return
+
+        by_table: Dict[str, List[tuple]] = {}
+        for table, row in batch:
+            by_table.setdefault(table, []).append(row)
+
+        try:
+            for table, rows in by_table.items():
+                conn.executemany(_INSERT_STATEMENTS[table], rows)
+            conn.commit()
+            self.stats['written'] += len(batch)
+            self.stats['flushes'] += 1
+        except sqlite3.Error as e:
+            conn.rollback()
+            self.stats['errors'] += 1
+            self.stats['dropped'] += len(batch)
+            logger.error(f"Failed to write {len(batch)} rate limit log rows: {e}")
+
+
+_INSERT_STATEMENTS = {
+    'rate_limit_requests': """
+        INSERT INTO rate_limit_requests
+        (client_id, endpoint, ip_address, user_agent, user_id,
+         request_timestamp, request_info)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    'rate_limit_violations': """
+        INSERT INTO rate_limit_violations
+        (client_id, endpoint, ip_address, user_agent, user_id,
+         violation_timestamp, request_info)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+}
+
+
 class RateLimiter:
-    """Advanced rate limiter with per-route and per-user limits"""
+    """
+    Advanced rate limiter with per-route and per-user limits
+
+    Each client/endpoint pair holds two sliding-window counters, one over
+    the route's window and one over the burst window. Counters live in
+    process memory, or in Redis when a client or RATE_LIMIT_REDIS_URL is
+    configured so that every worker shares the same counts. Request and
+    violation logs go through a BatchedLogWriter instead of committing per
+    request.
+    """
     
-    def __init__(self, db_connection=None):
+    def __init__(
+        self,
+        db_connection=None,
+        redis_client: Optional[Any] = None,
+        redis_url: Optional[str] = None,
+        log_batch_size: int = LOG_BATCH_SIZE,
+        log_flush_interval_ms: float = LOG_FLUSH_INTERVAL_MS,
+        policy_table: Optional[RoutePolicyTable] = None
+    ):
+        """
+        Args:
+            db_connection: SQLite connection for the rate limit tables
+            redis_client: redis-py client for shared counters
+            redis_url: Redis URL for shared counters (defaults to RATE_LIMIT_REDIS_URL)
+            log_batch_size: Log rows written per batch
+            log_flush_interval_ms: Maximum delay before queued log rows are written
+            policy_table: Compiled route policies (defaults to the shared table)
+        """
         self.db = db_connection or self._get_db_connection()
-        
-        # Rate limit configurations
-        self.rate_limits = {
-            # Authentication endpoints
-            '/api/auth/login': {'requests': 5, 'window': 60, 'burst': 10},  # 5/min, burst 10
-            '/api/auth/signup': {'requests': 3, 'window': 300, 'burst': 5},  # 3/5min, burst 5
-            '/api/auth/reset-password': {'requests': 3, 'window': 300, 'burst': 5},
-            
-            # API endpoints
-            '/api/planning-ai/analyze': {'requests': 10, 'window': 60, 'burst': 20},  # 10/min
-            '/api/auto-docs/generate': {'requests': 5, 'window': 60, 'burst': 10},  # 5/min
-            '/api/property/search': {'requests': 30, 'window': 60, 'burst': 50},  # 30/min
-            
-            # Marketplace endpoints
-            '/api/marketplace/create-listing': {'requests': 5, 'window': 300, 'burst': 10},
-            '/api/marketplace/search': {'requests': 20, 'window': 60, 'burst': 40},
-            
-            # Billing endpoints
-            '/api/billing/webhook': {'requests': 100, 'window': 60, 'burst': 200},  # Higher for webhooks
-            '/api/billing/upgrade': {'requests': 2, 'window': 300, 'burst': 3},
-            
-            # Admin endpoints
-            '/api/admin/*': {'requests': 50, 'window': 60, 'burst': 100},
-            
-            # Default for unspecified endpoints
-            'default': {'requests': 30, 'window': 60, 'burst': 60}  # 30/min default
-        }
-        
-        # In-memory cache for fast lookups
-        self.memory_cache = defaultdict(lambda: defaultdict(list))
+        self.log_writer = BatchedLogWriter(
+            self.db, batch_size=log_batch_size, flush_interval_ms=log_flush_interval_ms
+        )
+
+        redis_url = redis_url or os.getenv('RATE_LIMIT_REDIS_URL')
+        if redis_client is None and redis_url:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package is not installed")
+            redis_client = redis.Redis.from_url(redis_url)
+        self.redis = redis_client
+        self.backend = 'redis' if self.redis is not None else 'memory'
+        
+        # Rate limit configurations, resolved through the compiled route table
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        if policy_table is None:
+            policy_table = get_route_policy_table()
+        self.policy_table = policy_table
+        
+        # (client_id, endpoint) -> (window counter, burst counter)
+        self.counters: Dict[Tuple[str, str], Tuple[WindowCounter, WindowCounter]] = {}
         self.cache_cleanup_interval = 300  # 5 minutes
         self.last_cleanup = time.time()
+
+        self.stats = {
+            'checks': 0,
+            'denied': 0,
+            'redis_round_trips': 0,
+            'redis_errors': 0
+        }
     
     def _get_db_connection(self):
         """Get database connection"""
@@ -61,17 +360,8 @@ class RateLimiter:
     def _get_rate_limit_config(self, endpoint: str) -> Dict:
         """Get rate limit configuration for endpoint"""
         
-        # Exact match
-        if endpoint in self.rate_limits:
-            return self.rate_limits[endpoint]
-        
-        # Wildcard match
-        for pattern, config in self.rate_limits.items():
-            if pattern.endswith('*') and endpoint.startswith(pattern[:-1]):
-                return config
-        
-        # Default
-        return self.rate_limits['default']
+        # Exact match, then the longest wildcard prefix, then the default
+        return self.policy_table.match(None, endpoint).rate_limit or self.rate_limits['default']
     
     def _get_client_identifier(self, request_info: Dict) -> str:
         """Generate client identifier for rate limiting"""
@@ -88,28 +378,18 @@ class RateLimiter:
         return f"ip:{ip_hash}"
     
     def _cleanup_memory_cache(self):
-        """Clean up expired entries from memory cache"""
+        """Drop counters whose windows have fully expired"""
         
         if time.time() - self.last_cleanup < self.cache_cleanup_interval:
             return
         
         current_time = time.time()
         
-        for client_id in list(self.memory_cache.keys()):
-            for endpoint in list(self.memory_cache[client_id].keys()):
-                # Remove entries older than 1 hour
-                self.memory_cache[client_id][endpoint] = [
-                    timestamp for timestamp in self.memory_cache[client_id][endpoint]
-                    if current_time - timestamp < 3600
-                ]
-                
-                # Remove empty endpoint entries
-                if not self.memory_cache[client_id][endpoint]:
-                    del self.memory_cache[client_id][endpoint]
-            
-            # Remove empty client entries
-            if not self.memory_cache[client_id]:
-                del self.memory_cache[client_id]
+        for key, (window_counter, burst_counter) in list(self.counters.items()):
+            window = self._get_rate_limit_config(key[1])['window']
+            # Both counts are zero once two windows have passed
+            if int(current_time // window) > window_counter.index + 1:
+                del self.counters[key]
         
         self.last_cleanup = current_time
         logger.debug("Rate limiter memory cache cleaned up")
@@ -118,67 +398,129 @@ class RateLimiter:
         """Check if request is within rate limits"""
         
         self._cleanup_memory_cache()
+        self.stats['checks'] += 1
         
         client_id = self._get_client_identifier(request_info)
         config = self._get_rate_limit_config(endpoint)
         current_time = time.time()
         
-        # Get request timestamps for this client/endpoint
-        request_times = self.memory_cache[client_id][endpoint]
-        
-        # Remove expired requests (outside window)
-        window_start = current_time - config['window']
-        valid_requests = [t for t in request_times if t > window_start]
-        
-        # Check rate limit
-        if len(valid_requests) >= config['requests']:
-            # Check burst limit
-            burst_window_start = current_time - 10  # 10 second burst window
-            recent_requests = [t for t in valid_requests if t > burst_window_start]
+        # Counts before this request; the Redis backend has already reserved
+        # a slot for it and releases the slot if the request is limited
+        counters = self._reserve_redis(client_id, endpoint, config, current_time) if self.redis is not None else None
+        reserved = counters is not None
+        if counters is None:
+            counters = self._memory_counters(client_id, endpoint, config, current_time)
+        window_counter, burst_counter = counters
+        
+        # Check rate limit, then the burst limit
+        if (window_counter.estimate(config['window'], current_time) >= config['requests'] and
+                burst_counter.estimate(BURST_WINDOW_SECONDS, current_time) >= config['burst']):
+            if reserved:
+                self._release_redis(client_id, endpoint, config, current_time)
             
-            if len(recent_requests) >= config['burst']:
-                # Rate limited
-                oldest_request = min(valid_requests)
-                reset_time = oldest_request + config['window']
-                
-                # Log rate limit violation
-                self._log_rate_limit_violation(client_id, endpoint, request_info)
-                
-                return {
-                    'allowed': False,
-                    'error': 'Rate limit exceeded',
-                    'limit': config['requests'],
-                    'window': config['window'],
-                    'current_requests': len(valid_requests),
-                    'reset_at': reset_time,
-                    'retry_after': int(reset_time - current_time)
-                }
+            # Allowed again as soon as either window drops below its limit
+            retry_after = min(
+                window_counter.seconds_until_below(config['requests'], config['window'], current_time),
+                burst_counter.seconds_until_below(config['burst'], BURST_WINDOW_SECONDS, current_time)
+            )
+            self.stats['denied'] += 1
+            
+            # Log rate limit violation
+            self._log_rate_limit_violation(client_id, endpoint, request_info)
+            
+            return {
+                'allowed': False,
+                'error': 'Rate limit exceeded',
+                'limit': config['requests'],
+                'window': config['window'],
+                'current_requests': round(window_counter.estimate(config['window'], current_time)),
+                'reset_at': current_time + retry_after,
+                'retry_after': max(1, math.ceil(retry_after))
+            }
         
         # Request allowed - record it
-        valid_requests.append(current_time)
-        self.memory_cache[client_id][endpoint] = valid_requests
+        window_counter.current += 1
+        burst_counter.current += 1
+        current_requests = round(window_counter.estimate(config['window'], current_time))
         
-        # Store in database for persistence
+        # Queue for the batched log writer
         self._store_request_log(client_id, endpoint, request_info)
         
         return {
             'allowed': True,
             'limit': config['requests'],
             'window': config['window'],
-            'current_requests': len(valid_requests),
-            'remaining': config['requests'] - len(valid_requests)
+            'current_requests': current_requests,
+            'remaining': max(0, config['requests'] - current_requests)
         }
     
+    def _memory_counters(self, client_id: str, endpoint: str, config: Dict,
+                         now: float) -> Tuple[WindowCounter, WindowCounter]:
+        """In-process (window, burst) counters for a client/endpoint"""
+        
+        counters = self.counters.get((client_id, endpoint))
+        if counters is None:
+            counters = self.counters[(client_id, endpoint)] = (WindowCounter(), WindowCounter())
+        
+        counters[0].roll(config['window'], now)
+        counters[1].roll(BURST_WINDOW_SECONDS, now)
+        return counters
+    
+    def _redis_keys(self, client_id: str, endpoint: str, window: float, now: float) -> Tuple[int, str, str]:
+        """(window index, current window key, previous window key)"""
+        
+        index = int(now // window)
+        prefix = f"{REDIS_KEY_PREFIX}{client_id}:{endpoint}:{window}:"
+        return index, f"{prefix}{index}", f"{prefix}{index - 1}"
+    
+    def _reserve_redis(self, client_id: str, endpoint: str, config: Dict,
+                       now: float) -> Optional[Tuple[WindowCounter, WindowCounter]]:
+        """
+        Count this request in Redis and return the counts from before it
+        
+        Current-window counters are incremented optimistically so an allowed
+        request costs one pipelined round trip. Returns None if Redis is
+        unavailable, in which case the in-process counters are used.
+        """
+        
+        windows = (config['window'], BURST_WINDOW_SECONDS)
+        try:
+            self.stats['redis_round_trips'] += 1
+            pipe = self.redis.pipeline(transaction=False)
+            for window in windows:
+                _, current_key, previous_key = self._redis_keys(client_id, endpoint, window, now)
+                pipe.incr(current_key)
+                pipe.expire(current_key, int(2 * window) + 1)
+                pipe.get(previous_key)
+            results = pipe.execute()
+        except Exception as e:
+            self.stats['redis_errors'] += 1
+            logger.warning(f"Rate limiter Redis error, using local counters: {e}")
+            return None
+        
+        counters = []
+        for position, window in enumerate(windows):
+            current, _, previous = results[position * 3:position * 3 + 3]
+            counters.append(WindowCounter(int(now // window), int(previous or 0), int(current) - 1))
+        return counters[0], counters[1]
+    
+    def _release_redis(self, client_id: str, endpoint: str, config: Dict, now: float):
+        """Undo the reservation made for a limited request"""
+        
+        try:
+            self.stats['redis_round_trips'] += 1
+            pipe = self.redis.pipeline(transaction=False)
+            for window in (config['window'], BURST_WINDOW_SECONDS):
+                pipe.decr(self._redis_keys(client_id, endpoint, window, now)[1])
+            pipe.execute()
+        except Exception as e:
+            self.stats['redis_errors'] += 1
+            logger.warning(f"Rate limiter Redis error releasing reservation: {e}")
+    
     def _log_rate_limit_violation(self, client_id: str, endpoint: str, request_info: Dict):
         """Log rate limit violation"""
         
-        cursor = self.db.cursor()
-        cursor.execute("""
-            INSERT INTO rate_limit_violations
-            (client_id, endpoint, ip_address, user_agent, user_id, 
-             violation_timestamp, request_info)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
+        self.log_writer.write('rate_limit_violations', (
             client_id,
             endpoint,
             request_info.get('ip_address'),
@@ -188,20 +530,12 @@ class RateLimiter:
             json.dumps(request_info)
         ))
         
-        self.db.commit()
-        
         logger.warning(f"Rate limit violation: {client_id} on {endpoint}")
     
     def _store_request_log(self, client_id: str, endpoint: str, request_info: Dict):
         """Store request log for analytics"""
         
-        cursor = self.db.cursor()
-        cursor.execute("""
-            INSERT INTO rate_limit_requests
-            (client_id, endpoint, ip_address, user_agent, user_id, 
-             request_timestamp, request_info)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
+        self.log_writer.write('rate_limit_requests', (
             client_id,
             endpoint,
             request_info.get('ip_address'),
@@ -210,8 +544,6 @@ class RateLimiter:
             datetime.now(timezone.utc).isoformat(),
             json.dumps(request_info)
         ))
-        
-        self.db.commit()
     
     def get_client_status(self, request_info: Dict) -> Dict:
         """Get current rate limit status for client"""
@@ -219,32 +551,78 @@ class RateLimiter:
         client_id = self._get_client_identifier(request_info)
         current_time = time.time()
         
+        endpoints = [endpoint for endpoint in self.rate_limits if endpoint != 'default']
+        shared = self._peek_redis(client_id, endpoints, current_time) if self.redis is not None else None
+        
         status = {}
         
-        for endpoint in self.rate_limits.keys():
-            if endpoint == 'default':
-                continue
-                
+        for endpoint in endpoints:
             config = self.rate_limits[endpoint]
-            request_times = self.memory_cache[client_id][endpoint]
             
-            # Count valid requests
-            window_start = current_time - config['window']
-            valid_requests = [t for t in request_times if t > window_start]
+            if shared is not None:
+                window_counter = shared[endpoint]
+            elif (client_id, endpoint) in self.counters:
+                window_counter = self._memory_counters(client_id, endpoint, config, current_time)[0]
+            else:
+                window_counter = WindowCounter(int(current_time // config['window']))
+            
+            current_requests = round(window_counter.estimate(config['window'], current_time))
             
             status[endpoint] = {
                 'limit': config['requests'],
                 'window': config['window'],
-                'current_requests': len(valid_requests),
-                'remaining': max(0, config['requests'] - len(valid_requests)),
-                'reset_at': min(valid_requests) + config['window'] if valid_requests else current_time
+                'current_requests': current_requests,
+                'remaining': max(0, config['requests'] - current_requests),
+                'reset_at': current_time + window_counter.seconds_until_below(
+                    config['requests'], config['window'], current_time
+                )
             }
         
         return status
     
+    def _peek_redis(self, client_id: str, endpoints: List[str], now: float) -> Optional[Dict[str, WindowCounter]]:
+        """Shared window counters for several endpoints in one round trip"""
+        
+        keys = []
+        for endpoint in endpoints:
+            _, current_key, previous_key = self._redis_keys(
+                client_id, endpoint, self.rate_limits[endpoint]['window'], now
+            )
+            keys.extend((current_key, previous_key))
+        
+        try:
+            self.stats['redis_round_trips'] += 1
+            values = self.redis.mget(keys)
+        except Exception as e:
+            self.stats['redis_errors'] += 1
+            logger.warning(f"Rate limiter Redis error, using local counters: {e}")
+            return None
+        
+        return {
+            endpoint: WindowCounter(
+                int(now // self.rate_limits[endpoint]['window']),
+                int(values[2 * i + 1] or 0),
+                int(values[2 * i] or 0)
+            )
+            for i, endpoint in enumerate(endpoints)
+        }
+    
+    def get_limiter_stats(self) -> Dict:
+        """Counter backend and log writer statistics"""
+        
+        return {
+            'backend': self.backend,
+            'tracked_counters': len(self.counters),
+            **self.stats,
+            'log_writer': dict(self.log_writer.stats)
+        }
+    
     def get_rate_limit_stats(self, days: int = 7) -> Dict:
         """Get rate limiting statistics"""
         
+        # Include rows still waiting in the log writer
+        self.log_writer.flush()
+        
         cursor = self.db.cursor()
         since_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
         
@@ -89,8 +89,14 @@ CREDIT_ENFORCEMENT_MAP: Dict[str, Dict[str, int]] = {
 class CreditEnforcementMiddleware:
     """Middleware to enforce credit deductions on specific endpoints"""
     
-    def __init__(self):
+    def __init__(self, policy_table=None):
         self.enforcement_rules = CREDIT_ENFORCEMENT_MAP
+        
+        # Compiled route table shared with the rate limiter
+        if policy_table is None:
+            from lib.route_policy import get_route_policy_table
+            policy_table = get_route_policy_table()
+        self.policy_table = policy_table
     
     async def check_and_deduct_credits(self, 
                                      request: Request, 
@@ -105,11 +111,10 @@ class CreditEnforcementMiddleware:
         route_key = f"{request.method} {request.url.path}"
         
         # Check if this endpoint requires credit deduction
-        if route_key not in self.enforcement_rules:
+        rule = self.policy_table.match(request.method, request.url.path).credit
+        if rule is None:
             return True  # No credits required for this endpoint
         
-        rule = self.enforcement_rules[route_key]
-        
         # If it's quota-limited (not credit-based)
         if "quota_type" in rule:
             return await self._check_quota_limit(user_id, org_id, rule["quota_type"])
@@ -10,8 +10,21 @@ import math
 import logging
 from datetime import datetime, timedelta
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# Profit margin a viable scheme must reach
+MIN_VIABLE_MARGIN_PERCENT = 15
+
+# Sensitivity steps: % changes, except finance_rate in percentage points
+SENSITIVITY_STEPS = {
+    "gdv": [-10, -5, 0, 5, 10],
+    "build_costs": [-10, -5, 0, 5, 10],
+    "land_cost": [-10, -5, 0, 5, 10],
+    "finance_rate": [-2, -1, 0, 1, 2]
+}
+
 @dataclass
 class UnitType:
     """Definition of a unit type in the scheme"""
@@ -137,9 +150,14 @@ class FinanceCosts:
     monitoring_fee: float = 0  # Lender monitoring fee
     exit_fee_percent: float = 1  # % of loan on exit
     
-    def calculate_finance_cost(self, total_cost: float) -> float:
-        """Calculate total finance cost based on development cashflow"""
-        monthly_rate = self.interest_rate_percent / 100 / 12
+    def calculate_finance_cost(self, total_cost: float, interest_rate_percent: Optional[float] = None) -> float:
+        """
+        Calculate total finance cost based on development cashflow
+        
+        Works elementwise on NumPy arrays of costs and rates as well as on floats.
+        """
+        rate = self.interest_rate_percent if interest_rate_percent is None else interest_rate_percent
+        monthly_rate = rate / 100 / 12
         
         # Simplified cashflow: assume costs drawn down evenly over development period
         # and sales occur evenly over sales period
@@ -210,7 +228,132 @@ class ViabilityResults:
     @property
     def is_viable(self) -> bool:
         """Check if development is viable"""
-        return self.net_profit > 0 and self.profit_margin_percent >= 15
+        return self.net_profit > 0 and self.profit_margin_percent >= MIN_VIABLE_MARGIN_PERCENT
+
+@dataclass
+class ViabilityGrid:
+    """
+    Viability evaluated over a grid of input changes
+    
+    Every result array has shape (len(gdv_changes), len(build_cost_changes),
+    len(land_cost_changes), len(finance_rate_changes)).
+    """
+    gdv_changes: np.ndarray  # % change in sale values
+    build_cost_changes: np.ndarray  # % change in build cost per sqft
+    land_cost_changes: np.ndarray  # % change in land purchase price
+    finance_rate_changes: np.ndarray  # percentage-point change in interest rate
+    gdv: np.ndarray
+    land_cost: np.ndarray
+    build_cost: np.ndarray
+    planning_cost: np.ndarray
+    finance_cost: np.ndarray
+    sales_cost: np.ndarray
+    developer_profit: np.ndarray
+    total_costs: np.ndarray
+    net_profit: np.ndarray
+    profit_margin_percent: np.ndarray
+    residual_land_value: np.ndarray
+    
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.net_profit.shape
+    
+    def index(self, gdv: float = 0, build_costs: float = 0, land_cost: float = 0,
+              finance_rate: float = 0) -> Tuple[int, int, int, int]:
+        """Grid position of a combination of changes (each must be one of the axis steps)"""
+        axes = (self.gdv_changes, self.build_cost_changes, self.land_cost_changes, self.finance_rate_changes)
+        position = []
+        for axis, value in zip(axes, (gdv, build_costs, land_cost, finance_rate)):
+            matches = np.flatnonzero(np.isclose(axis, value))
+            if not len(matches):
+                raise ValueError(f"{value} is not a step of this grid")
+            position.append(int(matches[0]))
+        return tuple(position)
+
+def evaluate_viability(
+    inputs: ViabilityInputs,
+    gdv_changes: Any = 0,
+    build_cost_changes: Any = 0,
+    land_cost_changes: Any = 0,
+    finance_rate_changes: Any = 0,
+    gdv: Any = None,
+    total_sqft: Any = None
+) -> Dict[str, np.ndarray]:
+    """
+    Viability sums as array operations; all array arguments broadcast together
+    
+    Changes are applied the way a sensitivity scenario changes the inputs:
+    sale values, build cost per sqft and land purchase price scale by the %
+    change (stamp duty and fees stay as assessed on the original price), and
+    the finance interest rate moves by percentage points. gdv and total_sqft
+    replace the scheme's GDV and floor area, e.g. with arrays of values for
+    alternative unit mixes.
+    """
+    g = np.asarray(gdv_changes, dtype=float)
+    b = np.asarray(build_cost_changes, dtype=float)
+    l = np.asarray(land_cost_changes, dtype=float)
+    r = np.asarray(finance_rate_changes, dtype=float)
+    
+    base_gdv = np.asarray(inputs.gdv if gdv is None else gdv, dtype=float)
+    gdv = base_gdv * (1 + g / 100)
+    
+    land = inputs.land_costs
+    land_cost = land.total + land.purchase_price * (l / 100)
+    
+    build = inputs.build_costs
+    sqft = np.asarray(build.total_sqft if total_sqft is None else total_sqft, dtype=float)
+    on_costs = 1 + (build.external_works_percent + build.contingency_percent + build.professional_fees_percent) / 100
+    build_cost = build.base_build_cost_sqft * sqft * on_costs * (1 + b / 100) + build.other_costs
+    
+    planning_cost = np.float64(inputs.planning_costs.total)
+    
+    pre_finance_cost = land_cost + build_cost + planning_cost
+    finance = inputs.finance_costs
+    finance_cost = finance.calculate_finance_cost(pre_finance_cost, finance.interest_rate_percent + r)
+    
+    sales_cost = inputs.sales_costs.calculate_total(gdv)
+    developer_profit = gdv * (inputs.developer_profit_percent / 100)
+    
+    total_costs = land_cost + build_cost + planning_cost + finance_cost + sales_cost + developer_profit
+    net_profit = gdv - total_costs
+    profit_margin_percent = np.divide(net_profit * 100, gdv, out=np.zeros(np.broadcast(net_profit, gdv).shape),
+                                      where=gdv > 0)
+    
+    shape = net_profit.shape
+    return {
+        "gdv": np.broadcast_to(gdv, shape),
+        "land_cost": np.broadcast_to(land_cost, shape),
+        "build_cost": np.broadcast_to(build_cost, shape),
+        "planning_cost": np.broadcast_to(planning_cost, shape),
+        "finance_cost": np.broadcast_to(finance_cost, shape),
+        "sales_cost": np.broadcast_to(sales_cost, shape),
+        "developer_profit": np.broadcast_to(developer_profit, shape),
+        "total_costs": total_costs,
+        "net_profit": net_profit,
+        "profit_margin_percent": profit_margin_percent,
+        "residual_land_value": np.broadcast_to(gdv - (total_costs - land_cost), shape)
+    }
+
+def evaluate_viability_grid(
+    inputs: ViabilityInputs,
+    gdv_changes: Any = (0,),
+    build_cost_changes: Any = (0,),
+    land_cost_changes: Any = (0,),
+    finance_rate_changes: Any = (0,)
+) -> ViabilityGrid:
+    """Evaluate viability for every combination of input changes in one NumPy pass (see evaluate_viability)"""
+    g = np.asarray(gdv_changes, dtype=float).reshape(-1, 1, 1, 1)
+    b = np.asarray(build_cost_changes, dtype=float).reshape(1, -1, 1, 1)
+    l = np.asarray(land_cost_changes, dtype=float).reshape(1, 1, -1, 1)
+    r = np.asarray(finance_rate_changes, dtype=float).reshape(1, 1, 1, -1)
+    
+    return ViabilityGrid(
+        gdv_changes=g.ravel(),
+        build_cost_changes=b.ravel(),
+        land_cost_changes=l.ravel(),
+        finance_rate_changes=r.ravel(),
+        **evaluate_viability(inputs, g, b, l, r)
+    )
 
 class DevelopmentCalculator:
     """Main development viability calculator"""
@@ -247,34 +390,25 @@ class DevelopmentCalculator:
         """Calculate complete viability assessment"""
         logger.info(f"Calculating viability for {inputs.project_name}")
         
-        # Calculate GDV
-        gdv = inputs.gdv
-        
-        # Calculate all cost components
-        land_cost = inputs.land_costs.total
-        build_cost = inputs.build_costs.total
-        planning_cost = inputs.planning_costs.total
-        
-        # Calculate finance costs based on total development cost
-        pre_finance_cost = land_cost + build_cost + planning_cost
-        finance_cost = inputs.finance_costs.calculate_finance_cost(pre_finance_cost)
-        
-        # Calculate sales costs
-        sales_cost = inputs.sales_costs.calculate_total(gdv)
-        
-        # Calculate developer profit
-        developer_profit = gdv * (inputs.developer_profit_percent / 100)
-        
-        # Total costs
-        total_costs = land_cost + build_cost + planning_cost + finance_cost + sales_cost + developer_profit
+        # The base case and every sensitivity scenario come from one grid evaluation
+        grid = evaluate_viability_grid(
+            inputs,
+            gdv_changes=SENSITIVITY_STEPS["gdv"],
+            build_cost_changes=SENSITIVITY_STEPS["build_costs"],
+            land_cost_changes=SENSITIVITY_STEPS["land_cost"],
+            finance_rate_changes=SENSITIVITY_STEPS["finance_rate"]
+        )
+        base = grid.index()
         
-        # Net profit
-        net_profit = gdv - total_costs
-        profit_margin_percent = (net_profit / gdv * 100) if gdv > 0 else 0
+        gdv = float(grid.gdv[base])
+        land_cost = float(grid.land_cost[base])
+        total_costs = float(grid.total_costs[base])
+        net_profit = float(grid.net_profit[base])
+        profit_margin_percent = float(grid.profit_margin_percent[base])
+        developer_profit = float(grid.developer_profit[base])
         
         # Residual land value (what could be paid for land)
-        costs_excluding_land = total_costs - land_cost
-        residual_land_value = gdv - costs_excluding_land
+        residual_land_value = float(grid.residual_land_value[base])
         
         # Land value metrics (assume 1 acre for now - would be calculated from actual site area)
         site_area_acres = 1.0  # This would come from project data
@@ -289,15 +423,15 @@ class DevelopmentCalculator:
         # Cost breakdown
         cost_breakdown = {
             "land": land_cost,
-            "build": build_cost,
-            "planning": planning_cost,
-            "finance": finance_cost,
-            "sales": sales_cost,
+            "build": float(grid.build_cost[base]),
+            "planning": float(grid.planning_cost[base]),
+            "finance": float(grid.finance_cost[base]),
+            "sales": float(grid.sales_cost[base]),
             "profit": developer_profit
         }
         
         # Sensitivity analysis
-        sensitivity_analysis = self._calculate_sensitivity(inputs)
+        sensitivity_analysis = self._calculate_sensitivity(grid)
         
         results = ViabilityResults(
             gdv=gdv,
@@ -319,6 +453,17 @@ class DevelopmentCalculator:
         
         return results
     
+    def sensitivity_grid(
+        self,
+        inputs: ViabilityInputs,
+        gdv_changes: Any = np.linspace(-20, 20, 20),
+        build_cost_changes: Any = np.linspace(-20, 20, 20),
+        finance_rate_changes: Any = np.linspace(-2.5, 2.5, 10),
+        land_cost_changes: Any = (0,)
+    ) -> ViabilityGrid:
+        """Full multi-variable sensitivity grid (default 20 × 20 × 10 scenarios)"""
+        return evaluate_viability_grid(inputs, gdv_changes, build_cost_changes, land_cost_changes, finance_rate_changes)
+    
     def _calculate_irr(self, inputs: ViabilityInputs, gdv: float, total_costs: float) -> float:
         """Calculate Internal Rate of Return (simplified)"""
         try:
@@ -338,56 +483,22 @@ class DevelopmentCalculator:
         except:
             return 0
     
-    def _calculate_sensitivity(self, inputs: ViabilityInputs) -> Dict[str, Dict[str, float]]:
-        """Calculate sensitivity analysis for key variables"""
-        base_result = self.calculate_viability(inputs)
-        base_profit = base_result.net_profit
-        
-        sensitivity_vars = {
-            "gdv": [-10, -5, 0, 5, 10],  # % changes
-            "build_costs": [-10, -5, 0, 5, 10],
-            "land_cost": [-10, -5, 0, 5, 10],
-            "finance_rate": [-2, -1, 0, 1, 2]  # Percentage point changes
-        }
+    def _calculate_sensitivity(self, grid: ViabilityGrid) -> Dict[str, Dict[str, float]]:
+        """Profit change for each variable moved on its own, from the sensitivity grid"""
+        base_profit = grid.net_profit[grid.index()]
         
         sensitivity_results = {}
         
-        for var_name, changes in sensitivity_vars.items():
+        for var_name, changes in SENSITIVITY_STEPS.items():
             sensitivity_results[var_name] = {}
             
             for change in changes:
-                # Create modified inputs
-                test_inputs = self._apply_sensitivity_change(inputs, var_name, change)
-                test_result = self.calculate_viability(test_inputs)
-                
-                profit_change = ((test_result.net_profit - base_profit) / base_profit * 100) if base_profit != 0 else 0
-                sensitivity_results[var_name][f"{change:+}%"] = round(profit_change, 1)
+                test_profit = grid.net_profit[grid.index(**{var_name: change})]
+                profit_change = ((test_profit - base_profit) / base_profit * 100) if base_profit != 0 else 0
+                sensitivity_results[var_name][f"{change:+}%"] = round(float(profit_change), 1)
         
         return sensitivity_results
     
-    def _apply_sensitivity_change(self, inputs: ViabilityInputs, var_name: str, change_percent: float) -> ViabilityInputs:
-        """Apply sensitivity change to inputs"""
-        # Deep copy inputs (simplified)
-        import copy
-        test_inputs = copy.deepcopy(inputs)
-        
-        if var_name == "gdv":
-            # Adjust all unit values
-            for unit in test_inputs.unit_types:
-                unit.value_per_sqft *= (1 + change_percent / 100)
-                unit.total_value = unit.count * unit.size_sqft * unit.value_per_sqft
-        
-        elif var_name == "build_costs":
-            test_inputs.build_costs.base_build_cost_sqft *= (1 + change_percent / 100)
-        
-        elif var_name == "land_cost":
-            test_inputs.land_costs.purchase_price *= (1 + change_percent / 100)
-        
-        elif var_name == "finance_rate":
-            test_inputs.finance_costs.interest_rate_percent += change_percent
-        
-        return test_inputs
-    
     def apply_planning_ai_scheme(self, ai_result: Dict[str, Any]) -> ViabilityInputs:
         """Convert Planning AI result to viability inputs"""
         # Extract scheme details from AI analysis
@@ -513,6 +624,9 @@ __all__ = [
     "SalesCosts",
     "ViabilityInputs",
     "ViabilityResults",
+    "ViabilityGrid",
+    "evaluate_viability",
+    "evaluate_viability_grid",
     "DevelopmentCalculator",
     "development_calculator",
     "create_sample_viability"
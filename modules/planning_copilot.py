@@ -10,10 +10,20 @@ from datetime import datetime, timedelta
 import logging
 import json
 import re
+import hashlib
 from abc import ABC, abstractmethod
 
+from search_index import BM25Index
+
 logger = logging.getLogger(__name__)
 
+# Results per knowledge type returned for a question
+SEARCH_TOP_K = 5
+
+LEGISLATION_FIELD_WEIGHTS = {"title": 3.0, "key": 2.0}
+PRECEDENT_FIELD_WEIGHTS = {"key_issues": 3.0, "development": 2.0, "relevance_keywords": 1.0}
+POLICY_FIELD_WEIGHTS = {"topic": 3.0}
+
 class CopilotMode(Enum):
     """Different modes of copilot operation"""
     PLANNING_ADVICE = "planning_advice"
@@ -106,11 +116,38 @@ class KnowledgeBase:
         if not hasattr(self, 'case_studies'):
             self.case_studies = []
 
+def _flatten_text(value: Any) -> List[str]:
+    """All strings (dict keys included) in nested dicts/lists, for indexing"""
+    if isinstance(value, dict):
+        return [text for key, item in value.items() for text in [str(key), *_flatten_text(item)]]
+    if isinstance(value, (list, tuple)):
+        return [text for item in value for text in _flatten_text(item)]
+    return [str(value)] if value is not None else []
+
+def _precedent_id(precedent: Dict[str, Any]) -> str:
+    """Index id for a precedent: its reference, else a hash of its content"""
+    reference = precedent.get("reference")
+    if reference:
+        return reference
+    content = json.dumps(precedent, sort_keys=True, default=str)
+    return "precedent_" + hashlib.sha1(content.encode("utf-8")).hexdigest()
+
 class PlanningKnowledgeBase:
     """Repository of planning knowledge for AI grounding"""
     
     def __init__(self):
         self.knowledge = self._initialize_knowledge_base()
+        
+        # Inverted indexes, built once here and kept current by the add_* methods
+        self.legislation_index = BM25Index(LEGISLATION_FIELD_WEIGHTS)
+        self.precedent_index = BM25Index(PRECEDENT_FIELD_WEIGHTS)
+        self.policy_index = BM25Index(POLICY_FIELD_WEIGHTS)
+        for key, leg in self.knowledge.legislation.items():
+            self._index_legislation(key, leg)
+        for precedent in self.knowledge.precedents:
+            self._index_precedent(precedent)
+        for topic, policy in self.knowledge.policies.items():
+            self._index_policy(topic, policy)
     
     def _initialize_knowledge_base(self) -> KnowledgeBase:
         """Initialize with planning knowledge"""
@@ -219,56 +256,84 @@ class PlanningKnowledgeBase:
             case_studies=case_studies
         )
     
-    def search_legislation(self, query: str) -> List[Dict[str, Any]]:
+    def add_legislation(self, key: str, legislation: Dict[str, Any]):
+        """Add or replace a legislation entry"""
+        self.knowledge.legislation[key] = legislation
+        self._index_legislation(key, legislation)
+    
+    def add_precedent(self, precedent: Dict[str, Any]):
+        """Add a planning precedent, replacing any with the same reference (or identical content)"""
+        doc_id = _precedent_id(precedent)
+        if doc_id in self.precedent_index:
+            self.knowledge.precedents = [p for p in self.knowledge.precedents if _precedent_id(p) != doc_id]
+        self.knowledge.precedents.append(precedent)
+        self._index_precedent(precedent)
+    
+    def add_policy(self, topic: str, policy: Dict[str, Any]):
+        """Add or replace policy guidance for a topic"""
+        self.knowledge.policies[topic] = policy
+        self._index_policy(topic, policy)
+    
+    def search_legislation(self, query: str, limit: int = SEARCH_TOP_K) -> List[Dict[str, Any]]:
         """Search legislation database"""
-        results = []
-        query_lower = query.lower()
-        
-        for key, leg in self.knowledge.legislation.items():
-            if any(term in leg.get("title", "").lower() for term in query_lower.split()):
-                results.append({
-                    "type": "legislation",
-                    "key": key,
-                    "title": leg.get("title"),
-                    "relevance": "high",
-                    "content": leg
-                })
-        
-        return results
+        return [
+            {
+                "type": "legislation",
+                "key": key,
+                "title": leg.get("title"),
+                "relevance": "high",
+                "relevance_score": round(score, 3),
+                "content": leg
+            }
+            for key, score, leg in self.legislation_index.search(query, limit)
+        ]
     
-    def search_precedents(self, query: str, project_context: Optional[ProjectContext] = None) -> List[Dict[str, Any]]:
+    def search_precedents(self, query: str, project_context: Optional[ProjectContext] = None,
+                          limit: int = SEARCH_TOP_K) -> List[Dict[str, Any]]:
         """Search planning precedents"""
-        results = []
-        query_terms = query.lower().split()
         
-        for precedent in self.knowledge.precedents:
-            # Check relevance based on keywords and query
-            relevance_score = 0
-            keywords = precedent.get("relevance_keywords", [])
-            
-            for term in query_terms:
-                if any(term in keyword for keyword in keywords):
-                    relevance_score += 1
-                if term in precedent.get("development", "").lower():
-                    relevance_score += 2
-                if term in precedent.get("key_issues", []):
-                    relevance_score += 3
-            
-            # Boost relevance if project context matches
-            if project_context:
-                if project_context.development_type.lower() in precedent.get("development", "").lower():
-                    relevance_score += 2
-            
-            if relevance_score > 0:
-                results.append({
-                    "type": "precedent", 
-                    "relevance_score": relevance_score,
-                    "content": precedent
-                })
-        
-        # Sort by relevance
-        results.sort(key=lambda x: x["relevance_score"], reverse=True)
-        return results
+        # Precedents for the same type of development are relevant even if the question doesn't say so
+        if project_context and project_context.development_type:
+            query = f"{query} {project_context.development_type}"
+        
+        return [
+            {
+                "type": "precedent",
+                "relevance_score": round(score, 3),
+                "content": precedent
+            }
+            for _, score, precedent in self.precedent_index.search(query, limit)
+        ]
+    
+    def search_policies(self, query: str, limit: int = SEARCH_TOP_K) -> List[Dict[str, Any]]:
+        """Search policy guidance"""
+        return [
+            {
+                "type": "policy",
+                "topic": topic,
+                "relevance_score": round(score, 3),
+                "content": policy
+            }
+            for topic, score, policy in self.policy_index.search(query, limit)
+        ]
+    
+    def _index_legislation(self, key: str, leg: Dict[str, Any]):
+        self.legislation_index.add(key, {
+            "key": key,
+            "title": leg.get("title"),
+            "body": _flatten_text({k: v for k, v in leg.items() if k not in ("title", "url")})
+        }, leg)
+    
+    def _index_precedent(self, precedent: Dict[str, Any]):
+        self.precedent_index.add(_precedent_id(precedent), {
+            "development": precedent.get("development"),
+            "key_issues": precedent.get("key_issues"),
+            "relevance_keywords": precedent.get("relevance_keywords"),
+            "body": [precedent.get("location"), precedent.get("decision"), precedent.get("inspector_comments")]
+        }, precedent)
+    
+    def _index_policy(self, topic: str, policy: Dict[str, Any]):
+        self.policy_index.add(topic, {"topic": topic, "body": _flatten_text(policy)}, policy)
     
     def get_policy_guidance(self, topic: str) -> Optional[Dict[str, Any]]:
         """Get policy guidance for specific topic"""
@@ -470,16 +535,9 @@ class PlanningCopilot:
         precedent_results = self.knowledge_base.search_precedents(question, project_context)
         results.extend(precedent_results)
         
-        # Get policy guidance for common topics
-        for topic in ["affordable_housing", "density", "design"]:
-            if topic in question.lower():
-                policy = self.knowledge_base.get_policy_guidance(topic)
-                if policy:
-                    results.append({
-                        "type": "policy",
-                        "topic": topic,
-                        "content": policy
-                    })
+        # Search policy guidance
+        policy_results = self.knowledge_base.search_policies(question)
+        results.extend(policy_results)
         
         return results
     
@@ -9,16 +9,52 @@ from enum import Enum
 import logging
 import math
 import random
+import time
 from itertools import product
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 from modules.development_calculator import (
     DevelopmentCalculator, ViabilityInputs, ViabilityResults,
-    UnitType, LandCosts, BuildCosts, PlanningCosts, FinanceCosts, SalesCosts
+    UnitType, LandCosts, BuildCosts, PlanningCosts, FinanceCosts, SalesCosts,
+    MIN_VIABLE_MARGIN_PERCENT, evaluate_viability
 )
 
 logger = logging.getLogger(__name__)
 
+# Unit mix strategies: share of units per unit template
+MIX_STRATEGIES = [
+    # All houses
+    {"2bed_house": 0.4, "3bed_house": 0.6},
+    # All flats
+    {"1bed_flat": 0.3, "2bed_flat": 0.7},
+    # Mixed development
+    {"1bed_flat": 0.2, "2bed_flat": 0.3, "2bed_house": 0.3, "3bed_house": 0.2},
+    # Family focused
+    {"2bed_house": 0.3, "3bed_house": 0.5, "4bed_house": 0.2},
+    # Starter homes
+    {"studio": 0.2, "1bed_flat": 0.4, "2bed_flat": 0.4},
+    # Premium mix
+    {"2bed_flat": 0.4, "3bed_house": 0.4, "4bed_house": 0.2}
+]
+
+UNIT_TEMPLATES = {
+    "studio": {"size_sqft": 400, "value_per_sqft": 520},
+    "1bed_flat": {"size_sqft": 550, "value_per_sqft": 480},
+    "2bed_flat": {"size_sqft": 750, "value_per_sqft": 450},
+    "2bed_house": {"size_sqft": 900, "value_per_sqft": 420},
+    "3bed_house": {"size_sqft": 1200, "value_per_sqft": 400},
+    "4bed_house": {"size_sqft": 1500, "value_per_sqft": 390},
+    "affordable_rent": {"size_sqft": 850, "value_per_sqft": 200},
+    "shared_ownership": {"size_sqft": 800, "value_per_sqft": 300}
+}
+
+# Below this many surviving candidates, evaluating in-process beats starting a pool
+POOL_MIN_CANDIDATES = 200
+POOL_CHUNK_SIZE = 64
+
 class OptimisationStrategy(Enum):
     """Different optimisation strategies"""
     PROFIT_MAXIMISE = "profit_maximise"
@@ -116,6 +152,11 @@ class SchemeVariant:
     def total_units(self) -> int:
         return sum(unit.count for unit in self.unit_types)
     
+    @property
+    def affordable_percent(self) -> float:
+        """Share of units that are affordable rent or shared ownership"""
+        return _affordable_percent([(unit.name, unit.count) for unit in self.unit_types])
+    
     @property
     def density_dph(self) -> float:
         """Calculate density in dwellings per hectare"""
@@ -144,6 +185,44 @@ class OptimisationParameters:
     explore_heights: bool = True
     explore_densities: bool = True
     explore_unit_mix: bool = True
+    max_units: int = 50  # Largest scheme searched (density caps it further)
+    unit_step: int = 1
+    affordable_steps: Tuple[float, ...] = (0, 5, 10, 15)  # Affordable % above the policy requirement explored
+    workers: Optional[int] = None  # Evaluation processes (None: CPU count, 0: in-process)
+
+@dataclass
+class SchemeSearchResult:
+    """Outcome of a scheme search"""
+    pareto_front: List[SchemeVariant]  # Non-dominated on profit, planning score and affordable share
+    candidates: int  # Variants in the search space
+    evaluated: int  # Variants given a full viability and planning assessment
+    pruned: Dict[str, int]  # Variants ruled out before full assessment, by reason
+    elapsed_seconds: float
+
+def _mix_counts(strategy: Dict[str, float], total_units: int) -> List[Tuple[str, int]]:
+    """Unit counts per template for a mix strategy at a scheme size"""
+    counts = [[name, max(1, round(total_units * proportion))] for name, proportion in strategy.items()]
+    
+    # Adjust to exact total if needed
+    actual_total = sum(count for _, count in counts)
+    if actual_total != total_units and counts:
+        counts[0][1] = max(1, counts[0][1] + total_units - actual_total)
+    return [(name, count) for name, count in counts]
+
+def _affordable_percent(counts: List[Tuple[str, int]]) -> float:
+    total = sum(count for _, count in counts)
+    affordable = sum(count for name, count in counts if "affordable" in name or "shared" in name)
+    return affordable / total * 100 if total > 0 else 0
+
+def _with_affordable(strategy: Dict[str, float], affordable_percent: float) -> Dict[str, float]:
+    """Mix strategy with market housing reduced proportionally to make room for affordable units"""
+    if affordable_percent <= 0:
+        return dict(strategy)
+    share = affordable_percent / 100
+    mixed = {name: proportion * (1 - share) for name, proportion in strategy.items()}
+    mixed["affordable_rent"] = share * 0.7
+    mixed["shared_ownership"] = share * 0.3
+    return mixed
 
 class VariantGenerator:
     """Generates scheme variants based on parameters"""
@@ -153,83 +232,41 @@ class VariantGenerator:
         self.calculator = DevelopmentCalculator()
         
         # Predefined unit type templates
-        self.unit_templates = {
-            "studio": {"size_sqft": 400, "value_per_sqft": 520},
-            "1bed_flat": {"size_sqft": 550, "value_per_sqft": 480},
-            "2bed_flat": {"size_sqft": 750, "value_per_sqft": 450},
-            "2bed_house": {"size_sqft": 900, "value_per_sqft": 420},
-            "3bed_house": {"size_sqft": 1200, "value_per_sqft": 400},
-            "4bed_house": {"size_sqft": 1500, "value_per_sqft": 390},
-            "affordable_rent": {"size_sqft": 850, "value_per_sqft": 200},
-            "shared_ownership": {"size_sqft": 800, "value_per_sqft": 300}
-        }
+        self.unit_templates = UNIT_TEMPLATES
+    
+    def mix_strategies(self) -> List[Dict[str, float]]:
+        """Mix strategies, plus affordable versions of each when policy requires affordable housing"""
+        strategies = [dict(strategy) for strategy in MIX_STRATEGIES]
+        if self.base_constraints.affordable_housing_percent > 0:
+            strategies += [_with_affordable(strategy, self.base_constraints.affordable_housing_percent)
+                           for strategy in MIX_STRATEGIES]
+        return strategies
+    
+    def build_unit_mix(self, strategy: Dict[str, float], total_units: int) -> List[UnitType]:
+        """Unit types for a mix strategy at a scheme size"""
+        return [
+            UnitType(
+                name=unit_name,
+                count=count,
+                size_sqft=self.unit_templates[unit_name]["size_sqft"],
+                size_sqm=0,
+                value_per_sqft=self.unit_templates[unit_name]["value_per_sqft"],
+                total_value=0
+            )
+            for unit_name, count in _mix_counts(strategy, total_units)
+        ]
     
     def generate_unit_mix_variants(self, total_units_range: Tuple[int, int]) -> List[List[UnitType]]:
         """Generate different unit mix combinations"""
-        variants = []
         min_units, max_units = total_units_range
-        
-        # Define mix strategies
-        mix_strategies = [
-            # All houses
-            {"2bed_house": 0.4, "3bed_house": 0.6},
-            # All flats
-            {"1bed_flat": 0.3, "2bed_flat": 0.7},
-            # Mixed development
-            {"1bed_flat": 0.2, "2bed_flat": 0.3, "2bed_house": 0.3, "3bed_house": 0.2},
-            # Family focused
-            {"2bed_house": 0.3, "3bed_house": 0.5, "4bed_house": 0.2},
-            # Starter homes
-            {"studio": 0.2, "1bed_flat": 0.4, "2bed_flat": 0.4},
-            # Premium mix
-            {"2bed_flat": 0.4, "3bed_house": 0.4, "4bed_house": 0.2}
-        ]
-        
-        # Add affordable housing variants if required
-        if self.base_constraints.affordable_housing_percent > 0:
-            for strategy in mix_strategies:
-                affordable_strategy = strategy.copy()
-                affordable_percent = self.base_constraints.affordable_housing_percent / 100
-                
-                # Reduce market housing proportionally
-                for unit_type in affordable_strategy:
-                    affordable_strategy[unit_type] *= (1 - affordable_percent)
-                
-                # Add affordable units
-                affordable_strategy["affordable_rent"] = affordable_percent * 0.7
-                affordable_strategy["shared_ownership"] = affordable_percent * 0.3
-                
-                mix_strategies.append(affordable_strategy)
+        strategies = self.mix_strategies()
         
         # Generate unit mixes for different total unit counts
-        for total_units in range(min_units, max_units + 1, 2):
-            for strategy in mix_strategies:
-                unit_types = []
-                
-                for unit_name, proportion in strategy.items():
-                    count = max(1, round(total_units * proportion))
-                    template = self.unit_templates[unit_name]
-                    
-                    unit_types.append(UnitType(
-                        name=unit_name,
-                        count=count,
-                        size_sqft=template["size_sqft"],
-                        size_sqm=0,
-                        value_per_sqft=template["value_per_sqft"],
-                        total_value=0
-                    ))
-                
-                # Adjust to exact total if needed
-                actual_total = sum(unit.count for unit in unit_types)
-                if actual_total != total_units and unit_types:
-                    difference = total_units - actual_total
-                    unit_types[0].count += difference
-                    if unit_types[0].count < 1:
-                        unit_types[0].count = 1
-                
-                variants.append(unit_types)
-        
-        return variants
+        return [
+            self.build_unit_mix(strategy, total_units)
+            for total_units in range(min_units, max_units + 1, 2)
+            for strategy in strategies
+        ]
     
     def calculate_planning_score(self, variant: SchemeVariant) -> PlanningScoreFactors:
         """Calculate planning score factors for a variant"""
@@ -310,81 +347,166 @@ class SchemeOptimiser:
                        site_constraints: SiteConstraints,
                        base_viability: ViabilityInputs,
                        parameters: OptimisationParameters) -> List[SchemeVariant]:
-        """Run complete scheme optimisation"""
+        """Run complete scheme optimisation; returns the Pareto front ordered for the strategy"""
         
         logger.info(f"Starting scheme optimisation with strategy: {parameters.strategy.value}")
         
+        result = self.search_schemes(site_constraints, base_viability, parameters)
+        
+        # Sort by combined score (descending), then apply strategy-specific filtering
+        variants = sorted(result.pareto_front, key=lambda v: v.combined_score, reverse=True)
+        variants = self._apply_strategy_filter(variants, parameters)
+        
+        logger.info(f"Generated {len(variants)} Pareto-optimal variants")
+        
+        return variants[:parameters.max_variants]
+    
+    def search_schemes(self,
+                       site_constraints: SiteConstraints,
+                       base_viability: ViabilityInputs,
+                       parameters: OptimisationParameters) -> SchemeSearchResult:
+        """
+        Search unit counts × mix strategies × affordable shares for the Pareto front
+        
+        Candidates are pruned before full assessment, cheapest test first:
+        
+        - density: more units than the site's maximum density allows
+        - viability_bound: whole mix strategies whose best possible margin
+          (ignoring land, planning and fixed costs, valuing all floorspace at
+          the mix's highest £/sqft) is below the viability threshold
+        - policy: affordable share below the policy requirement
+        - viability: base-case margin, computed for all remaining candidates
+          in one vectorised pass, below the threshold
+        
+        Survivors get the full viability (with sensitivity) and planning
+        assessment across a process pool.
+        """
+        started = time.perf_counter()
         self.generator = VariantGenerator(site_constraints)
-        variants = []
+        pruned = {"density": 0, "viability_bound": 0, "policy": 0, "duplicate": 0, "viability": 0}
         
         # Calculate feasible unit count range
         max_units_by_density = int(site_constraints.max_density_dph * (site_constraints.site_area_sqm / 10000))
         min_units = max(1, int(max_units_by_density * 0.3))
-        max_units = min(max_units_by_density, 50)  # Practical limit
-        
-        logger.info(f"Unit range: {min_units} - {max_units} units")
-        
-        # Generate unit mix variants
-        unit_mix_variants = self.generator.generate_unit_mix_variants((min_units, max_units))
-        
-        # Create scheme variants
-        for i, unit_mix in enumerate(unit_mix_variants[:parameters.max_variants]):
-            variant_id = f"VAR_{i+1:03d}"
-            
-            # Create variant inputs
-            variant_inputs = self._create_variant_inputs(base_viability, unit_mix)
-            
-            # Create variant
-            variant = SchemeVariant(
-                variant_id=variant_id,
-                name=f"Variant {i+1}",
-                description=self._generate_variant_description(unit_mix),
-                unit_types=unit_mix,
-                site_constraints=site_constraints,
-                planning_score_factors=PlanningScoreFactors(),
-                viability_inputs=variant_inputs
-            )
-            
-            # Calculate planning score
-            variant.planning_score_factors = self.generator.calculate_planning_score(variant)
-            variant.planning_score = variant.planning_score_factors.overall_score
-            
-            # Calculate viability
-            try:
-                variant.viability_results = self.calculator.calculate_viability(variant_inputs)
-            except Exception as e:
-                logger.warning(f"Viability calculation failed for {variant_id}: {e}")
-                continue
-            
-            # Check feasibility
-            if not variant.is_feasible:
-                continue
-            
-            # Check minimum thresholds
-            if variant.planning_score < parameters.min_planning_score:
-                variant.risk_factors.append("Below minimum planning score")
-            
-            if variant.viability_results.profit_margin_percent < parameters.min_profit_margin:
-                variant.risk_factors.append("Below minimum profit margin")
-            
-            # Calculate combined score
-            profit_score = min(100, variant.viability_results.profit_margin_percent * 2)  # Scale to 0-100
-            variant.combined_score = (
-                variant.planning_score * parameters.planning_weight +
-                profit_score * parameters.profit_weight
-            )
-            
-            variants.append(variant)
-        
-        # Sort by combined score (descending)
-        variants.sort(key=lambda v: v.combined_score, reverse=True)
-        
-        # Apply strategy-specific filtering
-        variants = self._apply_strategy_filter(variants, parameters)
-        
-        logger.info(f"Generated {len(variants)} feasible variants")
-        
-        return variants[:20]  # Return top 20
+        unit_counts = list(range(min_units, max(min_units, parameters.max_units) + 1, parameters.unit_step))
+        
+        required = site_constraints.affordable_housing_percent
+        affordable_levels = sorted({min(100.0, required + step) for step in parameters.affordable_steps}) \
+            if parameters.include_affordable else [required]
+        strategies = [_with_affordable(strategy, level) for strategy in MIX_STRATEGIES for level in affordable_levels]
+        candidates = len(unit_counts) * len(strategies)
+        
+        # Planning bound: density cap
+        within_density = [n for n in unit_counts if n <= max_units_by_density]
+        pruned["density"] = (len(unit_counts) - len(within_density)) * len(strategies)
+        
+        # Viability bound per strategy
+        margin_bound = self._margin_upper_bounds(base_viability, strategies)
+        viable_strategies = [i for i, bound in enumerate(margin_bound) if bound >= MIN_VIABLE_MARGIN_PERCENT]
+        pruned["viability_bound"] = (len(strategies) - len(viable_strategies)) * len(within_density)
+        
+        # Exact base-case screen of what is left
+        screened: List[Tuple[int, Dict[str, float]]] = []
+        gdv, sqft = [], []
+        seen = set()
+        for i in viable_strategies:
+            for total_units in within_density:
+                counts = _mix_counts(strategies[i], total_units)
+                if _affordable_percent(counts) + 1e-9 < required:
+                    pruned["policy"] += 1
+                    continue
+                # Nearby affordable levels can round to the same mix
+                if tuple(counts) in seen:
+                    pruned["duplicate"] += 1
+                    continue
+                seen.add(tuple(counts))
+                screened.append((total_units, strategies[i]))
+                gdv.append(sum(c * UNIT_TEMPLATES[name]["size_sqft"] * UNIT_TEMPLATES[name]["value_per_sqft"]
+                               for name, c in counts))
+                sqft.append(sum(c * UNIT_TEMPLATES[name]["size_sqft"] for name, c in counts))
+        
+        survivors = screened
+        if screened:
+            base = evaluate_viability(base_viability, gdv=np.array(gdv), total_sqft=np.array(sqft))
+            viable = (base["net_profit"] > 0) & (base["profit_margin_percent"] >= MIN_VIABLE_MARGIN_PERCENT)
+            survivors = [candidate for candidate, ok in zip(screened, viable) if ok]
+            pruned["viability"] = len(screened) - len(survivors)
+        
+        variants = self._evaluate(site_constraints, base_viability, parameters, survivors)
+        front = pareto_front(variants)
+        
+        logger.info(f"Scheme search: {candidates} candidates, {len(survivors)} evaluated, "
+                    f"{len(front)} on the Pareto front")
+        
+        return SchemeSearchResult(
+            pareto_front=front,
+            candidates=candidates,
+            evaluated=len(survivors),
+            pruned=pruned,
+            elapsed_seconds=time.perf_counter() - started
+        )
+    
+    def _margin_upper_bounds(self, base: ViabilityInputs, strategies: List[Dict[str, float]]) -> List[float]:
+        """Highest profit margin % any scheme of each strategy could reach"""
+        build = base.build_costs
+        finance = base.finance_costs
+        on_costs = 1 + (build.external_works_percent + build.contingency_percent + build.professional_fees_percent) / 100
+        finance_factor = finance.calculate_finance_cost(1.0) - finance.arrangement_fee - finance.monitoring_fee
+        cost_per_sqft = build.base_build_cost_sqft * on_costs * (1 + finance_factor)
+        gdv_share = (base.sales_costs.agent_fee_percent + base.sales_costs.legal_fees_percent
+                     + base.developer_profit_percent) / 100
+        
+        return [
+            (1 - gdv_share - cost_per_sqft / max(UNIT_TEMPLATES[name]["value_per_sqft"] for name in strategy)) * 100
+            for strategy in strategies
+        ]
+    
+    def _evaluate(self, site_constraints: SiteConstraints, base_viability: ViabilityInputs,
+                  parameters: OptimisationParameters,
+                  candidates: List[Tuple[int, Dict[str, float]]]) -> List[SchemeVariant]:
+        numbered = [(i + 1, total_units, strategy) for i, (total_units, strategy) in enumerate(candidates)]
+        chunks = [numbered[i:i + POOL_CHUNK_SIZE] for i in range(0, len(numbered), POOL_CHUNK_SIZE)]
+        jobs = [(site_constraints, base_viability, parameters, chunk) for chunk in chunks]
+        
+        if parameters.workers == 0 or len(candidates) < POOL_MIN_CANDIDATES:
+            results = map(_evaluate_candidates, jobs)
+            return [variant for batch in results for variant in batch]
+        
+        with ProcessPoolExecutor(max_workers=parameters.workers) as pool:
+            return [variant for batch in pool.map(_evaluate_candidates, jobs) for variant in batch]
+    
+    def _assess_variant(self, variant: SchemeVariant, parameters: OptimisationParameters) -> Optional[SchemeVariant]:
+        """Planning score, viability, risk factors and combined score; None if infeasible"""
+        
+        # Calculate planning score
+        variant.planning_score_factors = self.generator.calculate_planning_score(variant)
+        variant.planning_score = variant.planning_score_factors.overall_score
+        
+        # Calculate viability
+        try:
+            variant.viability_results = self.calculator.calculate_viability(variant.viability_inputs)
+        except Exception as e:
+            logger.warning(f"Viability calculation failed for {variant.variant_id}: {e}")
+            return None
+        
+        # Check feasibility
+        if not variant.is_feasible:
+            return None
+        
+        # Check minimum thresholds
+        if variant.planning_score < parameters.min_planning_score:
+            variant.risk_factors.append("Below minimum planning score")
+        
+        if variant.viability_results.profit_margin_percent < parameters.min_profit_margin:
+            variant.risk_factors.append("Below minimum profit margin")
+        
+        # Calculate combined score
+        profit_score = min(100, variant.viability_results.profit_margin_percent * 2)  # Scale to 0-100
+        variant.combined_score = (
+            variant.planning_score * parameters.planning_weight +
+            profit_score * parameters.profit_weight
+        )
+        return variant
     
     def _create_variant_inputs(self, base_inputs: ViabilityInputs, unit_mix: List[UnitType]) -> ViabilityInputs:
         """Create viability inputs for a variant"""
@@ -484,6 +606,49 @@ class SchemeOptimiser:
         # This would generate detailed Excel comparison
         return b"Excel comparison would be generated here"
 
+def _evaluate_candidates(job: Tuple[SiteConstraints, ViabilityInputs, OptimisationParameters,
+                                     List[Tuple[int, int, Dict[str, float]]]]) -> List[SchemeVariant]:
+    """Fully assess a batch of candidates (runs in a worker process); returns the feasible variants"""
+    site_constraints, base_viability, parameters, candidates = job
+    optimiser = SchemeOptimiser()
+    optimiser.generator = VariantGenerator(site_constraints)
+    
+    variants = []
+    for number, total_units, strategy in candidates:
+        unit_mix = optimiser.generator.build_unit_mix(strategy, total_units)
+        variant = SchemeVariant(
+            variant_id=f"VAR_{number:03d}",
+            name=f"Variant {number}",
+            description=optimiser._generate_variant_description(unit_mix),
+            unit_types=unit_mix,
+            site_constraints=site_constraints,
+            planning_score_factors=PlanningScoreFactors(),
+            viability_inputs=optimiser._create_variant_inputs(base_viability, unit_mix)
+        )
+        if optimiser._assess_variant(variant, parameters) is not None:
+            variants.append(variant)
+    return variants
+
+def pareto_front(variants: List[SchemeVariant]) -> List[SchemeVariant]:
+    """Variants not dominated on net profit, planning score and affordable share (all maximised)"""
+    if not variants:
+        return []
+    
+    points = np.array([
+        (v.viability_results.net_profit, v.planning_score, v.affordable_percent) for v in variants
+    ])
+    
+    # In descending profit order a variant can only be dominated by one already kept
+    order = np.lexsort((-points[:, 2], -points[:, 1], -points[:, 0]))
+    kept: List[int] = []
+    for i in order:
+        if kept:
+            front = points[kept]
+            if np.any(np.all(front >= points[i], axis=1) & np.any(front > points[i], axis=1)):
+                continue
+        kept.append(int(i))
+    return [variants[i] for i in kept]
+
 # Helper functions
 def create_sample_optimisation() -> Tuple[SiteConstraints, ViabilityInputs, OptimisationParameters]:
     """Create sample optimisation for testing"""
@@ -522,7 +687,9 @@ __all__ = [
     "PlanningScoreFactors",
     "SchemeVariant",
     "OptimisationParameters",
+    "SchemeSearchResult",
     "VariantGenerator",
+    "pareto_front",
     "SchemeOptimiser",
     "scheme_optimiser",
     "create_sample_optimisation"
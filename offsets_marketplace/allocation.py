@@ -0,0 +1,427 @@
+"""
+Offsets Allocation Solver
+Cost-optimal allocation of biodiversity units across suppliers for one demand or the whole market
+"""
+from typing import Dict, List, Optional, Tuple
+from decimal import Decimal, ROUND_FLOOR
+from dataclasses import dataclass, field
+from bisect import bisect_left
+
+
+# Units are traded in hundredths (matches the 0.1 minimum purchase with headroom)
+UNIT_RESOLUTION = Decimal("0.01")
+
+# Node budget for the single-demand branch and bound. Each node is O(log n),
+# so the search is bounded to roughly max_nodes * log(n) work; when the
+# budget is exhausted the best allocation found so far is returned with
+# optimal=False.
+DEFAULT_MAX_NODES = 200_000
+
+
+@dataclass
+class AllocationCandidate:
+    """A supply listing that can contribute units to a demand"""
+    listing_id: str
+    units_available: Decimal
+    price_per_unit: Decimal
+    minimum_purchase: Decimal = Decimal("0")
+
+
+@dataclass
+class AllocationResult:
+    """Allocation of units for a single demand"""
+    allocations: List[Tuple[str, Decimal]] = field(default_factory=list)
+    total_cost: Decimal = Decimal("0")
+    units_allocated: Decimal = Decimal("0")
+    feasible: bool = False
+    optimal: bool = False
+    nodes_explored: int = 0
+
+
+@dataclass
+class MarketAllocationResult:
+    """Allocation of scarce supply across many demands"""
+    allocations: Dict[str, List[Tuple[str, Decimal]]] = field(default_factory=dict)
+    total_cost: Decimal = Decimal("0")
+    units_allocated: Decimal = Decimal("0")
+    units_required: Decimal = Decimal("0")
+    fully_allocated_demands: int = 0
+    repaired_demands: List[str] = field(default_factory=list)
+    augmentations: int = 0
+
+
+def solve_demand_allocation(
+    candidates: List[AllocationCandidate],
+    required_units: Decimal,
+    max_suppliers: int,
+    max_nodes: int = DEFAULT_MAX_NODES
+) -> AllocationResult:
+    """
+    Minimum-cost allocation of `required_units` using at most `max_suppliers` listings
+
+    Branch and bound over candidates in price order. For any chosen set of
+    suppliers the cheapest fill takes the cheaper ones in full and the most
+    expensive one partially, so each branch either takes a listing in full,
+    closes the allocation with it, or skips it. When the remainder is below
+    the closing listing's minimum purchase, it takes its minimum and the
+    full takes are trimmed back (most expensive first, never below their own
+    minimums) to make room. Branches are pruned with the fractional greedy
+    fill (a lower bound that ignores the supplier limit and minimums) and
+    with the capacity of the largest remaining listings.
+
+    If no combination covers the requirement, the allocation covering the
+    most units up to the requirement (largest listings first) is returned
+    with feasible=False.
+    """
+
+    cands = sorted(
+        (c for c in candidates if c.units_available > 0),
+        key=lambda c: (c.price_per_unit, -c.units_available)
+    )
+    n = len(cands)
+
+    if n == 0 or max_suppliers < 1 or required_units <= 0:
+        return AllocationResult(feasible=required_units <= 0, optimal=True)
+
+    prices = [c.price_per_unit for c in cands]
+    units = [c.units_available for c in cands]
+
+    # Prefix sums for the fractional greedy lower bound
+    cum_units = [Decimal("0")] * (n + 1)
+    cum_cost = [Decimal("0")] * (n + 1)
+    for i in range(n):
+        cum_units[i + 1] = cum_units[i] + units[i]
+        cum_cost[i + 1] = cum_cost[i] + units[i] * prices[i]
+
+    # Largest `max_suppliers` listing sizes in each suffix, descending
+    suffix_top: List[List[Decimal]] = [[] for _ in range(n + 1)]
+    for i in range(n - 1, -1, -1):
+        suffix_top[i] = sorted(suffix_top[i + 1] + [units[i]], reverse=True)[:max_suppliers]
+
+    def greedy_bound(i: int, remaining: Decimal) -> Optional[Decimal]:
+        target = cum_units[i] + remaining
+        j = bisect_left(cum_units, target, lo=i + 1)
+        if j > n:
+            return None
+        return cum_cost[j - 1] - cum_cost[i] + prices[j - 1] * (target - cum_units[j - 1])
+
+    best_cost: Optional[Decimal] = None
+    best_choice: Tuple[Tuple[int, Decimal], ...] = ()
+    nodes = 0
+    exhausted = False
+
+    # (index, remaining units, supplier slots left, cost so far, chosen)
+    stack = [(0, required_units, max_suppliers, Decimal("0"), ())]
+
+    while stack:
+        i, remaining, slots, cost, chosen = stack.pop()
+
+        nodes += 1
+        if nodes > max_nodes:
+            exhausted = True
+            break
+
+        if i >= n:
+            continue
+
+        bound = greedy_bound(i, remaining)
+        if bound is None or (best_cost is not None and cost + bound >= best_cost):
+            continue
+        if sum(suffix_top[i][:slots]) < remaining:
+            continue
+
+        candidate = cands[i]
+
+        # Skip this listing (pushed first so the include branch is explored first)
+        stack.append((i + 1, remaining, slots, cost, chosen))
+
+        if units[i] >= remaining:
+            # Closes the allocation as the marginal (most expensive) supplier
+            if remaining >= candidate.minimum_purchase:
+                total, choice = cost + prices[i] * remaining, chosen + ((i, remaining),)
+            elif units[i] >= candidate.minimum_purchase:
+                trimmed = _trim_full_takes(cands, chosen, candidate.minimum_purchase - remaining)
+                if trimmed is None:
+                    continue
+                choice, saved = trimmed
+                total = cost - saved + prices[i] * candidate.minimum_purchase
+                choice += ((i, candidate.minimum_purchase),)
+            else:
+                continue
+            if best_cost is None or total < best_cost:
+                best_cost = total
+                best_choice = choice
+        elif slots > 1 and units[i] >= candidate.minimum_purchase:
+            stack.append((
+                i + 1, remaining - units[i], slots - 1,
+                cost + prices[i] * units[i], chosen + ((i, units[i]),)
+            ))
+
+    if best_cost is None:
+        result = _max_coverage_allocation(cands, required_units, max_suppliers)
+        result.nodes_explored = nodes
+        result.optimal = not exhausted
+        return result
+
+    return AllocationResult(
+        allocations=[(cands[i].listing_id, amount) for i, amount in best_choice],
+        total_cost=best_cost,
+        units_allocated=sum((amount for _, amount in best_choice), Decimal("0")),
+        feasible=True,
+        optimal=not exhausted,
+        nodes_explored=nodes
+    )
+
+
+def _trim_full_takes(
+    cands: List[AllocationCandidate],
+    chosen: Tuple[Tuple[int, Decimal], ...],
+    excess: Decimal
+) -> Optional[Tuple[Tuple[Tuple[int, Decimal], ...], Decimal]]:
+    """
+    Give back `excess` units from full takes, most expensive first
+
+    Returns the trimmed choice and the cost saved, or None if the full takes
+    cannot give back that much without going below their minimums.
+    """
+
+    trimmed = list(chosen)
+    saved = Decimal("0")
+    for k in range(len(trimmed) - 1, -1, -1):
+        if excess <= 0:
+            break
+        i, amount = trimmed[k]
+        give = min(excess, amount - cands[i].minimum_purchase)
+        if give > 0:
+            trimmed[k] = (i, amount - give)
+            saved += give * cands[i].price_per_unit
+            excess -= give
+
+    if excess > 0:
+        return None
+    return tuple(trimmed), saved
+
+
+def _max_coverage_allocation(
+    cands: List[AllocationCandidate],
+    required_units: Decimal,
+    max_suppliers: int
+) -> AllocationResult:
+    """Largest listings (cheapest first on ties), up to the requirement, when it cannot be met"""
+
+    allocations: List[Tuple[str, Decimal]] = []
+    total_cost = units_allocated = Decimal("0")
+    for c in sorted(cands, key=lambda c: (-c.units_available, c.price_per_unit)):
+        if len(allocations) == max_suppliers or units_allocated >= required_units:
+            break
+        amount = min(c.units_available, required_units - units_allocated)
+        if amount < c.minimum_purchase:
+            continue
+        allocations.append((c.listing_id, amount))
+        total_cost += amount * c.price_per_unit
+        units_allocated += amount
+
+    return AllocationResult(
+        allocations=allocations,
+        total_cost=total_cost,
+        units_allocated=units_allocated,
+        feasible=units_allocated >= required_units
+    )
+
+
+def solve_market_allocation(
+    requirements: Dict[str, Decimal],
+    supplies: Dict[str, AllocationCandidate],
+    compatible: Dict[str, List[str]],
+    max_suppliers: Optional[int] = None
+) -> MarketAllocationResult:
+    """
+    Allocate scarce supply across many demands at once
+
+    Solved as min-cost max-flow (source -> listing -> demand -> sink). Cost
+    sits only on the listing side (a listing's price is the same for every
+    demand), so the routable supply forms a polymatroid and the greedy
+    algorithm is exact: listings are taken in ascending price order and each
+    pushes as many units as augmenting paths allow, possibly re-routing
+    units already placed. This allocates the most units overall, at minimum
+    total cost among such allocations. Quantities are discretised to
+    UNIT_RESOLUTION.
+
+    Runtime is O(E) per augmenting path with at most O(L + D) paths in
+    practice; nodes that fail to reach an unmet demand are never searched
+    again (augmentation cannot make them reachable).
+
+    Flow solutions ignore the per-demand supplier limit; demands that end up
+    with more than `max_suppliers` listings are re-solved individually with
+    solve_demand_allocation against the remaining capacity.
+
+    Args:
+        requirements: demand id -> units required
+        supplies: listing id -> candidate (capacity and price)
+        compatible: demand id -> listing ids it may buy from
+        max_suppliers: per-demand supplier limit (None for no limit)
+    """
+
+    listing_ids = [lid for lid, s in supplies.items() if s.units_available > 0]
+    demand_ids = [did for did, units in requirements.items() if units > 0]
+
+    demands_by_listing: Dict[str, List[str]] = {}
+    for did in demand_ids:
+        for lid in dict.fromkeys(compatible.get(did, [])):
+            if lid in supplies:
+                demands_by_listing.setdefault(lid, []).append(did)
+
+    unmet = {did: _to_steps(requirements[did]) for did in demand_ids}
+    # flow[did][lid]: steps routed from a listing to a demand
+    flow: Dict[str, Dict[str, int]] = {did: {} for did in demand_ids}
+    dead_listings: set = set()
+    dead_demands: set = set()
+    augmentations = 0
+
+    for lid in sorted(listing_ids, key=lambda l: supplies[l].price_per_unit):
+        supply = _to_steps(supplies[lid].units_available)
+        neighbours = demands_by_listing.get(lid, [])
+
+        # Direct placements first - no search needed
+        for did in neighbours:
+            if supply <= 0:
+                break
+            if unmet[did] > 0:
+                push = min(supply, unmet[did])
+                flow[did][lid] = flow[did].get(lid, 0) + push
+                unmet[did] -= push
+                supply -= push
+                augmentations += 1
+
+        # Then re-route earlier placements to make room
+        while supply > 0 and lid not in dead_listings:
+            path = _augmenting_path(lid, demands_by_listing, flow, unmet, dead_listings, dead_demands)
+            if path is None:
+                break
+
+            # path alternates demand, listing, demand, ..., ending at an unmet demand
+            push = min(supply, unmet[path[-1]])
+            for k in range(1, len(path), 2):
+                push = min(push, flow[path[k - 1]][path[k]])
+
+            previous = lid
+            for k, node in enumerate(path):
+                if k % 2 == 0:
+                    flow[node][previous] = flow[node].get(previous, 0) + push
+                else:
+                    flow[path[k - 1]][node] -= push
+                    if flow[path[k - 1]][node] == 0:
+                        del flow[path[k - 1]][node]
+                    previous = node
+            unmet[path[-1]] -= push
+            supply -= push
+            augmentations += 1
+
+    allocations: Dict[str, List[Tuple[str, Decimal]]] = {did: [] for did in demand_ids}
+    remaining_capacity = {lid: supplies[lid].units_available for lid in listing_ids}
+    for did in demand_ids:
+        for lid, steps in flow[did].items():
+            if steps > 0:
+                amount = steps * UNIT_RESOLUTION
+                allocations[did].append((lid, amount))
+                remaining_capacity[lid] -= amount
+
+    repaired = []
+    if max_suppliers is not None:
+        for did in demand_ids:
+            if len(allocations[did]) <= max_suppliers:
+                continue
+
+            # Release this demand's allocation and re-solve it under the limit
+            for lid, amount in allocations[did]:
+                remaining_capacity[lid] += amount
+
+            single = solve_demand_allocation(
+                [
+                    AllocationCandidate(
+                        listing_id=lid,
+                        units_available=remaining_capacity[lid],
+                        price_per_unit=supplies[lid].price_per_unit,
+                        minimum_purchase=supplies[lid].minimum_purchase
+                    )
+                    for lid in compatible.get(did, []) if lid in remaining_capacity
+                ],
+                requirements[did],
+                max_suppliers
+            )
+
+            allocations[did] = single.allocations
+            for lid, amount in single.allocations:
+                remaining_capacity[lid] -= amount
+            repaired.append(did)
+
+    result = MarketAllocationResult(
+        allocations={did: allocs for did, allocs in allocations.items() if allocs},
+        units_required=sum((requirements[did] for did in demand_ids), Decimal("0")),
+        repaired_demands=repaired,
+        augmentations=augmentations
+    )
+    for did, allocs in result.allocations.items():
+        allocated = sum((amount for _, amount in allocs), Decimal("0"))
+        result.units_allocated += allocated
+        result.total_cost += sum((amount * supplies[lid].price_per_unit for lid, amount in allocs), Decimal("0"))
+        if allocated >= requirements[did] - UNIT_RESOLUTION:
+            result.fully_allocated_demands += 1
+
+    return result
+
+
+def _to_steps(units: Decimal) -> int:
+    """Whole UNIT_RESOLUTION steps in a quantity (rounded down)"""
+    return int((units / UNIT_RESOLUTION).to_integral_value(rounding=ROUND_FLOOR))
+
+
+def _augmenting_path(
+    start: str,
+    demands_by_listing: Dict[str, List[str]],
+    flow: Dict[str, Dict[str, int]],
+    unmet: Dict[str, int],
+    dead_listings: set,
+    dead_demands: set
+) -> Optional[List[str]]:
+    """
+    Breadth-first search for a residual path from a listing to an unmet demand
+
+    Moves go listing -> compatible demand, or demand -> a listing currently
+    routing units to it (re-routing those units elsewhere). Returns the path
+    as [demand, listing, demand, ...] or None, in which case every node
+    visited is marked dead.
+    """
+
+    parent: Dict[str, str] = {}
+    parent_listing: Dict[str, str] = {}
+    visited_listings = {start}
+    frontier = [start]
+
+    while frontier:
+        next_frontier = []
+        for lid in frontier:
+            for did in demands_by_listing.get(lid, []):
+                if did in parent or did in dead_demands:
+                    continue
+                parent[did] = lid
+                if unmet[did] > 0:
+                    path = [did]
+                    node = lid
+                    while node != start:
+                        path.append(node)
+                        demand = parent_listing[node]
+                        path.append(demand)
+                        node = parent[demand]
+                    path.reverse()
+                    return path
+                for other in flow[did]:
+                    if other not in visited_listings and other not in dead_listings:
+                        visited_listings.add(other)
+                        parent_listing[other] = did
+                        next_frontier.append(other)
+        frontier = next_frontier
+
+    dead_listings.update(visited_listings)
+    dead_demands.update(parent)
+    return None
@@ -0,0 +1,313 @@
+"""
+Offsets Batch Match Scoring
+Vectorised (NumPy) scoring of supply/demand candidate pairs for the matching engine
+"""
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+from .schemas import (
+    OffsetSupplyListing, OffsetDemandRequest, OffsetMatch, HabitatType,
+    LocationStrategicSignificance
+)
+
+
+# Maximum absolute difference between batch and scalar component scores.
+# The scalar path uses Decimal arithmetic, the batch path float64, so scores
+# agree to well within this bound; pairs sitting exactly on the
+# minimum_match_score threshold may fall on either side of it.
+SCORE_TOLERANCE = 1e-6
+
+EARTH_RADIUS_KM = 6371
+
+
+class BatchMatchScorer:
+    """
+    Scores many candidate pairs in one vectorised pass
+
+    Mirrors MatchingEngine._quick_compatibility_check and
+    MatchingEngine._calculate_match, but evaluates the whole candidate set
+    as arrays and only builds OffsetMatch objects for pairs that survive
+    both the compatibility filter and the minimum match score.
+    """
+
+    def __init__(
+        self,
+        habitat_compatibility: Dict[HabitatType, Dict[HabitatType, float]],
+        strategic_compatibility: Dict[LocationStrategicSignificance, float]
+    ):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required for batch match scoring")
+
+        self.habitat_index = {habitat: i for i, habitat in enumerate(HabitatType)}
+
+        # Dense [demand habitat, supply habitat] compatibility matrix
+        n = len(self.habitat_index)
+        self.compatibility_matrix = np.zeros((n, n), dtype=np.float64)
+        for demand_habitat, row in habitat_compatibility.items():
+            for supply_habitat, compatibility in row.items():
+                self.compatibility_matrix[
+                    self.habitat_index[demand_habitat], self.habitat_index[supply_habitat]
+                ] = compatibility
+
+        self.strategic_compatibility = {
+            significance: float(multiplier)
+            for significance, multiplier in strategic_compatibility.items()
+        }
+
+    def score_candidates(
+        self,
+        demand_candidates: List[Tuple[OffsetDemandRequest, List[OffsetSupplyListing]]],
+        criteria: Any,
+        allow_partial_units: bool = False
+    ) -> List[OffsetMatch]:
+        """
+        Score candidate listings for each demand
+
+        Args:
+            demand_candidates: (demand, candidate listings) pairs
+            criteria: MatchingCriteria
+            allow_partial_units: Keep listings that cover only part of the requirement
+
+        Returns:
+            OffsetMatch objects for compatible pairs scoring at least
+            criteria.minimum_match_score, in candidate order
+        """
+
+        demands: List[OffsetDemandRequest] = []
+        listings: List[OffsetSupplyListing] = []
+        listing_positions: Dict[str, int] = {}
+        pair_demand: List[int] = []
+        pair_listing: List[int] = []
+
+        for demand, candidates in demand_candidates:
+            if not demand:
+                continue
+            demand_pos = len(demands)
+            demands.append(demand)
+
+            for supply in candidates:
+                if not supply:
+                    continue
+                listing_pos = listing_positions.get(supply.listing_id)
+                if listing_pos is None:
+                    listing_pos = listing_positions[supply.listing_id] = len(listings)
+                    listings.append(supply)
+                pair_demand.append(demand_pos)
+                pair_listing.append(listing_pos)
+
+        if not pair_demand:
+            return []
+
+        pd = np.asarray(pair_demand, dtype=np.intp)
+        pl = np.asarray(pair_listing, dtype=np.intp)
+
+        listing_arrays = self._listing_arrays(listings)
+        demand_arrays = self._demand_arrays(demands)
+
+        # Cheap scalar filters first (mirrors _quick_compatibility_check)
+        price_tolerance = 1 + criteria.price_tolerance_percent / 100
+        keep = (
+            (listing_arrays['units_available'][pl] > 0) &
+            (listing_arrays['price'][pl] <= demand_arrays['max_price'][pd] * price_tolerance) &
+            (listing_arrays['delivery'][pl] <= demand_arrays['required_by'][pd])
+        )
+        if not allow_partial_units:
+            keep &= listing_arrays['units_available'][pl] >= demand_arrays['required_units'][pd]
+
+        has_coordinates = listing_arrays['has_coordinates'][pl] & demand_arrays['has_coordinates'][pd]
+        distance = self._haversine(
+            demand_arrays['lat'][pd], demand_arrays['lon'][pd],
+            listing_arrays['lat'][pl], listing_arrays['lon'][pl]
+        )
+        distance = np.where(has_coordinates, distance, 0.0)
+
+        if criteria.max_distance_km > 0:
+            keep &= ~has_coordinates | (distance <= criteria.max_distance_km)
+
+        pd, pl, distance, has_coordinates = pd[keep], pl[keep], distance[keep], has_coordinates[keep]
+        if pd.size == 0:
+            return []
+
+        habitat_score, habitat_compatible = self._habitat_scores(pd, pl, listing_arrays, demand_arrays)
+
+        pd, pl = pd[habitat_compatible], pl[habitat_compatible]
+        distance, has_coordinates = distance[habitat_compatible], has_coordinates[habitat_compatible]
+        habitat_score = habitat_score[habitat_compatible]
+        if pd.size == 0:
+            return []
+
+        # Location preference (mirrors _calculate_location_preference_score)
+        location_score = np.where(demand_arrays['same_nca'][pd], 0.3, 0.0)
+        if criteria.prefer_same_authority:
+            location_score += 0.5 * self._authority_matches(pd, pl, demands, listings)
+        max_distance = demand_arrays['max_distance'][pd]
+        within = has_coordinates & (distance <= max_distance)
+        location_score += np.where(within, (1.0 - distance / max_distance) * 0.2, 0.0)
+        location_score = np.minimum(location_score, 1.0)
+
+        # Timeline compatibility with buffer (mirrors _check_timeline_compatibility)
+        buffer_days = criteria.timeline_buffer_months * 30
+        timeline_ok = listing_arrays['delivery'][pl] <= demand_arrays['required_by'][pd] + buffer_days
+
+        # Overall score (mirrors OffsetMatch.calculate_match_score)
+        overall = (
+            habitat_score * 0.4 +
+            location_score * 0.3 +
+            np.maximum(0.0, 1.0 - distance / 100) * 0.2 +
+            np.where(timeline_ok, 0.1, 0.0)
+        )
+
+        survivors = np.nonzero(overall >= criteria.minimum_match_score - SCORE_TOLERANCE)[0]
+
+        matches = []
+        expires_date = datetime.now() + timedelta(days=30)  # 30-day match expiry
+        for k in survivors.tolist():
+            demand = demands[pd[k]]
+            supply = listings[pl[k]]
+            matched_units = min(demand.required_units, supply.units_available)
+
+            match = OffsetMatch(
+                supply_listing_id=supply.listing_id,
+                demand_request_id=demand.request_id,
+                matched_units=matched_units,
+                unit_price=supply.price_per_unit,
+                total_value=matched_units * supply.price_per_unit,
+                distance_km=Decimal(str(float(distance[k]))),
+                habitat_type_match_score=Decimal(str(float(habitat_score[k]))),
+                location_preference_score=Decimal(str(float(location_score[k]))),
+                timeline_compatibility=bool(timeline_ok[k]),
+                expires_date=expires_date
+            )
+
+            if match.overall_match_score >= Decimal(str(criteria.minimum_match_score)):
+                matches.append(match)
+
+        return matches
+
+    def _listing_arrays(self, listings: List[OffsetSupplyListing]) -> Dict[str, Any]:
+        """Column arrays for listing attributes plus a CSR layout of habitat units"""
+
+        n = len(listings)
+        lat = np.full(n, np.nan)
+        lon = np.full(n, np.nan)
+        unit_counts = np.zeros(n, dtype=np.intp)
+        unit_habitat: List[int] = []
+        unit_strategic: List[float] = []
+        unit_weight: List[float] = []
+
+        for i, listing in enumerate(listings):
+            if listing.coordinates:
+                lat[i], lon[i] = listing.coordinates
+            units = listing.available_habitat_units
+            unit_counts[i] = len(units)
+            for unit in units:
+                unit_habitat.append(self.habitat_index[unit.habitat_type])
+                unit_strategic.append(self.strategic_compatibility.get(unit.strategic_significance, 1.0))
+                unit_weight.append(float(unit.baseline_units or 0))
+
+        return {
+            'units_available': np.array([float(l.units_available) for l in listings]),
+            'price': np.array([float(l.price_per_unit) for l in listings]),
+            'delivery': np.array([l.delivery_completion_date.toordinal() for l in listings], dtype=np.int64),
+            'lat': lat,
+            'lon': lon,
+            'has_coordinates': ~np.isnan(lat),
+            'unit_counts': unit_counts,
+            'unit_starts': np.cumsum(unit_counts) - unit_counts,
+            'unit_habitat': np.asarray(unit_habitat, dtype=np.intp),
+            'unit_strategic': np.asarray(unit_strategic, dtype=np.float64),
+            'unit_weight': np.asarray(unit_weight, dtype=np.float64)
+        }
+
+    def _demand_arrays(self, demands: List[OffsetDemandRequest]) -> Dict[str, Any]:
+        """Column arrays for demand attributes plus best compatibility per supply habitat"""
+
+        n = len(demands)
+        lat = np.full(n, np.nan)
+        lon = np.full(n, np.nan)
+
+        # best_compatibility[d, h]: best compatibility of supply habitat h with
+        # any habitat demand d accepts
+        best_compatibility = np.zeros((n, len(self.habitat_index)))
+
+        for i, demand in enumerate(demands):
+            if demand.development_coordinates:
+                lat[i], lon[i] = demand.development_coordinates
+            rows = [self.habitat_index[h] for h in set(demand.required_habitat_types)]
+            if rows:
+                best_compatibility[i] = self.compatibility_matrix[rows].max(axis=0)
+
+        return {
+            'required_units': np.array([float(d.required_units) for d in demands]),
+            'max_price': np.array([float(d.max_price_per_unit) for d in demands]),
+            'required_by': np.array([d.required_by_date.toordinal() for d in demands], dtype=np.int64),
+            'max_distance': np.array([float(d.max_distance_km) for d in demands]),
+            'same_nca': np.array([bool(d.same_national_character_area) for d in demands]),
+            'lat': lat,
+            'lon': lon,
+            'has_coordinates': ~np.isnan(lat),
+            'best_compatibility': best_compatibility
+        }
+
+    def _habitat_scores(self, pd, pl, listing_arrays, demand_arrays) -> Tuple[Any, Any]:
+        """
+        Weighted habitat match score and habitat compatibility flag per pair
+
+        Expands every pair into its listing's habitat units, looks up the
+        demand's best compatibility for each unit and reduces back per pair.
+        """
+
+        counts = listing_arrays['unit_counts'][pl]
+        pair_of_unit = np.repeat(np.arange(pd.size), counts)
+        offsets = np.cumsum(counts) - counts
+        unit = (
+            listing_arrays['unit_starts'][pl][pair_of_unit] +
+            np.arange(pair_of_unit.size) - offsets[pair_of_unit]
+        )
+
+        compatibility = demand_arrays['best_compatibility'][
+            pd[pair_of_unit], listing_arrays['unit_habitat'][unit]
+        ]
+        compatible = np.bincount(pair_of_unit, weights=compatibility > 0, minlength=pd.size) > 0
+
+        weight = listing_arrays['unit_weight'][unit]
+        weight = np.where(weight > 0, weight, 0.0)
+        weighted = compatibility * listing_arrays['unit_strategic'][unit] * weight
+
+        total_compatibility = np.bincount(pair_of_unit, weights=weighted, minlength=pd.size)
+        total_weight = np.bincount(pair_of_unit, weights=weight, minlength=pd.size)
+
+        score = np.divide(
+            total_compatibility, total_weight,
+            out=np.zeros(pd.size), where=total_weight > 0
+        )
+        return np.minimum(score, 1.0), compatible
+
+    def _authority_matches(self, pd, pl, demands, listings) -> Any:
+        """Preferred local authority substring matches (string work stays in Python)"""
+
+        matches = np.zeros(pd.size)
+        has_authorities = np.array([bool(d.preferred_local_authorities) for d in demands])
+
+        for k in np.nonzero(has_authorities[pd])[0].tolist():
+            postcode = listings[pl[k]].postcode.lower()
+            if any(auth.lower() in postcode for auth in demands[pd[k]].preferred_local_authorities):
+                matches[k] = 1.0
+        return matches
+
+    @staticmethod
+    def _haversine(lat1, lon1, lat2, lon2) -> Any:
+        """Vectorised Haversine distance in kilometres (nan where coordinates are missing)"""
+
+        lat1, lon1, lat2, lon2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+        a = (np.sin((lat2 - lat1) / 2) ** 2 +
+             np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+        return 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0))) * EARTH_RADIUS_KM
@@ -2,7 +2,7 @@
 Offsets Demand Management
 Handles developer offset needs and biodiversity net gain requirements
 """
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
 import asyncio
 from datetime import datetime, date, timedelta
 from decimal import Decimal
@@ -13,6 +13,7 @@ from .schemas import (
     OffsetDemandRequest, HabitatType, DemandStatus, BiodiversityAssessment,
     HabitatUnit, HabitatCondition, LocationStrategicSignificance
 )
+from .search_index import MarketplaceSearchIndex
 
 
 class DemandManager:
@@ -25,6 +26,14 @@ class DemandManager:
         self._demand_requests: Dict[str, OffsetDemandRequest] = {}
         self._biodiversity_assessments: Dict[str, BiodiversityAssessment] = {}
         
+        # Secondary indexes for searches
+        self.search_index = MarketplaceSearchIndex(
+            range_fields=('required_units', 'total_budget', 'max_price_per_unit', 'required_by_date')
+        )
+        
+        # Async callbacks notified as listener(event, request_id) after writes
+        self._listeners: List[Callable[[str, str], Awaitable[None]]] = []
+        
         # BNG calculation parameters
         self.bng_percentage_requirement = Decimal("10")  # 10% net gain requirement
         self.temporal_multipliers = {
@@ -35,6 +44,31 @@ class DemandManager:
             'beyond_3_years': Decimal("0.80")
         }
     
+    def add_listener(self, listener: Callable[[str, str], Awaitable[None]]) -> None:
+        """Register an async callback for 'demand_created' / 'demand_updated' events"""
+        self._listeners.append(listener)
+    
+    async def _notify(self, event: str, request_id: str) -> None:
+        """Notify listeners of a demand request change"""
+        for listener in self._listeners:
+            await listener(event, request_id)
+    
+    def _index_request(self, request: OffsetDemandRequest) -> None:
+        """Refresh a demand request's search index entries after a write"""
+        self.search_index.index(
+            request.request_id,
+            status=request.status,
+            habitat_types=request.required_habitat_types,
+            coordinates=request.development_coordinates,
+            created=request.created_date,
+            ranges={
+                'required_units': request.required_units,
+                'total_budget': request.total_budget or Decimal("0"),
+                'max_price_per_unit': request.max_price_per_unit,
+                'required_by_date': request.required_by_date
+            }
+        )
+    
     async def create_demand_request(
         self,
         developer_details: Dict[str, str],
@@ -94,6 +128,8 @@ class DemandManager:
         # Store assessment and request
         self._biodiversity_assessments[biodiversity_assessment.assessment_id] = biodiversity_assessment
         self._demand_requests[demand_request.request_id] = demand_request
+        self._index_request(demand_request)
+        await self._notify('demand_created', demand_request.request_id)
         
         return demand_request
     
@@ -203,6 +239,8 @@ class DemandManager:
         request = self._demand_requests[request_id]
         request.status = status
         request.last_updated = datetime.now()
+        self._index_request(request)
+        await self._notify('demand_updated', request_id)
         
         return True
     
@@ -216,12 +254,13 @@ class DemandManager:
         min_units: Optional[Decimal] = None,
         max_units: Optional[Decimal] = None,
         min_budget: Optional[Decimal] = None,
+        min_price_per_unit: Optional[Decimal] = None,
         max_distance_km: Optional[int] = None,
         center_coordinates: Optional[Tuple[float, float]] = None,
         local_authorities: Optional[List[str]] = None,
         required_by_date: Optional[date] = None,
         status_filter: Optional[List[DemandStatus]] = None,
-        limit: int = 50,
+        limit: Optional[int] = 50,
         offset: int = 0
     ) -> List[OffsetDemandRequest]:
         """
@@ -232,60 +271,87 @@ class DemandManager:
             min_units: Minimum biodiversity units required
             max_units: Maximum biodiversity units required  
             min_budget: Minimum budget available
+            min_price_per_unit: Minimum price per unit the developer will pay
             max_distance_km: Maximum distance from center coordinates
             center_coordinates: Center point for distance filtering
             local_authorities: Filter by development location
             required_by_date: Must be required by this date
             status_filter: Filter by request status
-            limit: Maximum results to return
+            limit: Maximum results to return (None for no limit)
             offset: Pagination offset
             
         Returns:
-            List of matching demand requests
+            List of matching demand requests, most recent first
+        """
+        
+        requests, _ = await self.search_demand_requests_page(
+            habitat_types=habitat_types,
+            min_units=min_units,
+            max_units=max_units,
+            min_budget=min_budget,
+            min_price_per_unit=min_price_per_unit,
+            max_distance_km=max_distance_km,
+            center_coordinates=center_coordinates,
+            local_authorities=local_authorities,
+            required_by_date=required_by_date,
+            status_filter=status_filter,
+            limit=limit,
+            offset=offset
+        )
+        return requests
+    
+    async def search_demand_requests_page(
+        self,
+        habitat_types: Optional[List[HabitatType]] = None,
+        min_units: Optional[Decimal] = None,
+        max_units: Optional[Decimal] = None,
+        min_budget: Optional[Decimal] = None,
+        min_price_per_unit: Optional[Decimal] = None,
+        max_distance_km: Optional[int] = None,
+        center_coordinates: Optional[Tuple[float, float]] = None,
+        local_authorities: Optional[List[str]] = None,
+        required_by_date: Optional[date] = None,
+        status_filter: Optional[List[DemandStatus]] = None,
+        limit: Optional[int] = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[OffsetDemandRequest], Optional[str]]:
         """
+        Cursor-paginated demand search
         
-        results = []
+        Filters are answered from the search index; pass the returned cursor
+        back to fetch the next page without re-sorting the result set.
         
-        for request in self._demand_requests.values():
-            
-            # Status filter
-            if status_filter and request.status not in status_filter:
-                continue
-            
-            # Units filter
-            if min_units and request.required_units < min_units:
-                continue
-            
-            if max_units and request.required_units > max_units:
-                continue
-            
-            # Budget filter
-            if min_budget and (request.total_budget or Decimal("0")) < min_budget:
-                continue
-            
-            # Habitat type filter
-            if habitat_types:
-                request_habitat_types = set(request.required_habitat_types)
-                if not any(ht in request_habitat_types for ht in habitat_types):
-                    continue
-            
-            # Required by date filter
-            if required_by_date and request.required_by_date > required_by_date:
-                continue
-            
-            # Distance filter (simplified)
-            if max_distance_km and center_coordinates and request.development_coordinates:
-                distance = self._calculate_distance(center_coordinates, request.development_coordinates)
-                if distance > max_distance_km:
-                    continue
-            
-            results.append(request)
+        Returns:
+            (requests, next_cursor) - next_cursor is None on the last page
+        """
         
-        # Sort by created date (most recent first)
-        results.sort(key=lambda x: x.created_date, reverse=True)
+        spatial = bool(max_distance_km and center_coordinates)
+        
+        def within_distance(request_id: str) -> bool:
+            coordinates = self._demand_requests[request_id].development_coordinates
+            if not spatial or not coordinates:
+                return True
+            return self._calculate_distance(center_coordinates, coordinates) <= max_distance_km
+        
+        request_ids, next_cursor = self.search_index.search(
+            within_distance,
+            statuses=status_filter,
+            habitat_types=habitat_types,
+            center=center_coordinates if spatial else None,
+            radius_km=max_distance_km if spatial else None,
+            ranges={
+                'required_units': (min_units or None, max_units or None),
+                'total_budget': (min_budget or None, None),
+                'max_price_per_unit': (min_price_per_unit or None, None),
+                'required_by_date': (None, required_by_date)
+            },
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
         
-        # Apply pagination
-        return results[offset:offset + limit]
+        return [self._demand_requests[request_id] for request_id in request_ids], next_cursor
     
     async def get_demand_statistics(self) -> Dict[str, Any]:
         """Get demand marketplace statistics"""
@@ -545,6 +611,8 @@ class DemandManager:
             # Store assessment and request
             self._biodiversity_assessments[assessment.assessment_id] = assessment
             self._demand_requests[demand_request.request_id] = demand_request
+            self._index_request(demand_request)
+            await self._notify('demand_created', demand_request.request_id)
             mock_requests.append(demand_request)
         
         return mock_requests
@@ -0,0 +1,159 @@
+"""
+Offsets Incremental Matching
+Persistent candidate-match table kept current from supply and demand events
+"""
+from typing import Dict, List, Any, Optional, Set
+
+from .schemas import OffsetMatch, ListingStatus, DemandStatus
+from .spatial_index import DemandSpatialIndex
+from .matching import MatchingEngine, MatchingCriteria
+
+
+class IncrementalMatcher:
+    """
+    Event-driven matcher
+
+    Subscribes to SupplyManager and DemandManager events and recomputes only
+    the table rows a change can affect: a listing event rescoring the nearby
+    habitat-compatible SEARCHING demands (via a demand spatial index), a
+    demand event rescoring the nearby compatible active listings (via the
+    supply spatial index). Per-event cost is proportional to that
+    neighbourhood rather than to demands x listings.
+    """
+
+    def __init__(self, engine: MatchingEngine, criteria: Optional[MatchingCriteria] = None):
+        self.engine = engine
+        self.criteria = criteria or MatchingCriteria()
+        self.demand_index = DemandSpatialIndex()
+
+        # demand id -> listing id -> match, plus the reverse postings
+        self._rows: Dict[str, Dict[str, OffsetMatch]] = {}
+        self._listing_rows: Dict[str, Set[str]] = {}
+
+        self._stats = {
+            'events_processed': 0,
+            'pairs_scored': 0,
+            'full_rebuilds': 0
+        }
+
+        engine.supply_manager.add_listener(self.on_supply_event)
+        engine.demand_manager.add_listener(self.on_demand_event)
+
+    async def rebuild(self) -> None:
+        """Recompute the whole table (initial load or recovery)"""
+
+        self._rows.clear()
+        self._listing_rows.clear()
+        self.demand_index = DemandSpatialIndex()
+
+        demands = await self.engine.demand_manager.search_demand_requests(
+            status_filter=[DemandStatus.SEARCHING],
+            limit=None
+        )
+        for demand in demands:
+            await self._refresh_demand(demand.request_id)
+
+        self._stats['full_rebuilds'] += 1
+
+    async def on_supply_event(self, event: str, listing_id: str) -> None:
+        """Listing created, status changed, or units reserved/sold"""
+
+        self._stats['events_processed'] += 1
+        await self._refresh_listing(listing_id)
+
+    async def on_demand_event(self, event: str, request_id: str) -> None:
+        """Demand created or status changed"""
+
+        self._stats['events_processed'] += 1
+        await self._refresh_demand(request_id)
+
+    async def _refresh_demand(self, request_id: str) -> None:
+        """Recompute every row for one demand"""
+
+        for listing_id in self._rows.pop(request_id, {}):
+            self._drop_posting(listing_id, request_id)
+
+        demand = await self.engine.demand_manager.get_demand_request(request_id)
+        if not demand or demand.status != DemandStatus.SEARCHING:
+            self.demand_index.remove(request_id)
+            return
+
+        self.demand_index.add(
+            demand, self.engine._compatible_supply_habitats(demand.required_habitat_types)
+        )
+
+        candidates = await self.engine._indexed_supply_candidates(demand, self.criteria)
+        self._stats['pairs_scored'] += len(candidates)
+
+        matches = await self.engine._score_demand_candidates([(demand, candidates)], self.criteria)
+        for match in matches:
+            self._insert(match)
+
+    async def _refresh_listing(self, listing_id: str) -> None:
+        """Recompute every row for one listing"""
+
+        for request_id in self._listing_rows.pop(listing_id, set()):
+            rows = self._rows.get(request_id)
+            if rows is not None:
+                rows.pop(listing_id, None)
+
+        listing = await self.engine.supply_manager.get_listing(listing_id)
+        if (not listing or listing.status != ListingStatus.ACTIVE or
+                listing.units_available < self.engine.MIN_MATCHABLE_UNITS):
+            return
+
+        demand_ids = self.demand_index.candidate_ids(
+            {unit.habitat_type for unit in listing.available_habitat_units},
+            center=listing.coordinates,
+            radius_km=self.criteria.max_distance_km
+        )
+
+        demand_candidates = []
+        for request_id in demand_ids:
+            demand = await self.engine.demand_manager.get_demand_request(request_id)
+            if demand and demand.status == DemandStatus.SEARCHING:
+                demand_candidates.append((demand, [listing]))
+        self._stats['pairs_scored'] += len(demand_candidates)
+
+        matches = await self.engine._score_demand_candidates(demand_candidates, self.criteria)
+        for match in matches:
+            self._insert(match)
+
+    def _insert(self, match: OffsetMatch) -> None:
+        self._rows.setdefault(match.demand_request_id, {})[match.supply_listing_id] = match
+        self._listing_rows.setdefault(match.supply_listing_id, set()).add(match.demand_request_id)
+
+    def _drop_posting(self, listing_id: str, request_id: str) -> None:
+        postings = self._listing_rows.get(listing_id)
+        if postings is not None:
+            postings.discard(request_id)
+            if not postings:
+                del self._listing_rows[listing_id]
+
+    def tracks_demand(self, request_id: str) -> bool:
+        """Whether the demand is SEARCHING and maintained in the table"""
+        return request_id in self.demand_index
+
+    def matches_for_demand(self, request_id: str) -> List[OffsetMatch]:
+        """Current candidate matches for a demand"""
+        return list(self._rows.get(request_id, {}).values())
+
+    def matches_for_listing(self, listing_id: str) -> List[OffsetMatch]:
+        """Current candidate matches for a listing"""
+        return [
+            self._rows[request_id][listing_id]
+            for request_id in self._listing_rows.get(listing_id, set())
+        ]
+
+    def all_matches(self) -> List[OffsetMatch]:
+        """Every current candidate match"""
+        return [match for rows in self._rows.values() for match in rows.values()]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Table size and event processing statistics"""
+
+        return {
+            **self._stats,
+            'tracked_demands': len(self.demand_index),
+            'candidate_matches': sum(len(rows) for rows in self._rows.values())
+        }
@@ -16,6 +16,11 @@ from .schemas import (
 )
 from .supply import SupplyManager
 from .demand import DemandManager
+from .batch_scoring import BatchMatchScorer, NUMPY_AVAILABLE
+from .allocation import (
+    AllocationCandidate, MarketAllocationResult,
+    solve_demand_allocation, solve_market_allocation
+)
 
 
 @dataclass
@@ -44,6 +49,14 @@ class MatchingCriteria:
     
     # Minimum match score threshold
     minimum_match_score: float = 0.4
+    
+    # Candidate generation - prune supply via the spatial/habitat index
+    # instead of scanning every active listing for every demand
+    use_spatial_index: bool = True
+    
+    # Score all candidate pairs in one vectorised pass (requires numpy,
+    # falls back to per-pair scoring otherwise)
+    use_batch_scoring: bool = True
 
 
 class MatchingEngine:
@@ -51,6 +64,9 @@ class MatchingEngine:
     Advanced matching engine for biodiversity offset supply and demand
     """
     
+    # Listings with fewer available units than this are never matched
+    MIN_MATCHABLE_UNITS = Decimal("0.1")
+    
     def __init__(self, supply_manager: SupplyManager, demand_manager: DemandManager):
         self.supply_manager = supply_manager
         self.demand_manager = demand_manager
@@ -95,6 +111,29 @@ class MatchingEngine:
             LocationStrategicSignificance.MEDIUM: 1.0,
             LocationStrategicSignificance.LOW: 0.9
         }
+        
+        self._batch_scorer = (
+            BatchMatchScorer(self.habitat_compatibility, self.strategic_compatibility)
+            if NUMPY_AVAILABLE else None
+        )
+        
+        # Event-maintained candidate table (see enable_incremental_matching)
+        self._incremental = None
+    
+    def enable_incremental_matching(self, criteria: Optional[MatchingCriteria] = None):
+        """
+        Maintain candidate matches incrementally from supply/demand events
+        
+        find_matches calls using the same criteria are then answered from
+        the table instead of being recomputed. Call `await rebuild()` on the
+        returned IncrementalMatcher if the managers already hold data.
+        """
+        
+        from .incremental import IncrementalMatcher
+        
+        if self._incremental is None:
+            self._incremental = IncrementalMatcher(self, criteria)
+        return self._incremental
     
     async def find_matches(
         self,
@@ -119,7 +158,15 @@ class MatchingEngine:
         if criteria is None:
             criteria = MatchingCriteria()
         
-        matches = []
+        # Answer from the incrementally maintained table when it applies
+        incremental = self._incremental
+        if (incremental is not None and criteria == incremental.criteria and not supply_listing_id and
+                (not demand_request_id or incremental.tracks_demand(demand_request_id))):
+            if demand_request_id:
+                matches = incremental.matches_for_demand(demand_request_id)
+            else:
+                matches = incremental.all_matches()
+            return self._rank_and_store(matches, max_matches)
         
         # Get demand requests to match
         if demand_request_id:
@@ -127,61 +174,172 @@ class MatchingEngine:
             demand_requests = [demand_request] if demand_request else []
         else:
             demand_requests = await self.demand_manager.search_demand_requests(
-                status_filter=[DemandStatus.SEARCHING]
+                status_filter=[DemandStatus.SEARCHING],
+                limit=None
             )
         
         # Get supply listings to match
         if supply_listing_id:
             supply_listing = await self.supply_manager.get_listing(supply_listing_id)
             supply_listings = [supply_listing] if supply_listing else []
+        elif criteria.use_spatial_index:
+            # Resolved per demand from the supply spatial index
+            supply_listings = None
         else:
             supply_listings = await self.supply_manager.search_supply_listings(
                 status_filter=[ListingStatus.ACTIVE],
-                min_units=Decimal("0.1")  # Only listings with available units
+                min_units=self.MIN_MATCHABLE_UNITS,  # Only listings with available units
+                limit=None
             )
         
+        # Collect candidate listings per demand
+        demand_candidates = await self._collect_demand_candidates(
+            demand_requests, supply_listings, criteria
+        )
+        
         # Generate all possible matches
+        matches = await self._score_demand_candidates(demand_candidates, criteria)
+        
+        return self._rank_and_store(matches, max_matches)
+    
+    def _rank_and_store(self, matches: List[OffsetMatch], max_matches: int) -> List[OffsetMatch]:
+        """Keep the best `max_matches` matches by score and store them"""
+        
+        # Sort by match score (highest first)
+        matches.sort(key=lambda x: x.overall_match_score or 0, reverse=True)
+        
+        # Store matches
+        for match in matches[:max_matches]:
+            self._matches[match.match_id] = match
+        
+        return matches[:max_matches]
+    
+    async def _collect_demand_candidates(
+        self,
+        demand_requests: List[OffsetDemandRequest],
+        supply_listings: Optional[List[OffsetSupplyListing]],
+        criteria: MatchingCriteria
+    ) -> List[Tuple[OffsetDemandRequest, List[OffsetSupplyListing]]]:
+        """Pair each demand with its candidate listings (from the spatial index if supply_listings is None)"""
+        
+        demand_candidates = []
         for demand in demand_requests:
             if not demand:
                 continue
-                
-            for supply in supply_listings:
+            
+            if supply_listings is None:
+                candidates = await self._indexed_supply_candidates(demand, criteria)
+            else:
+                candidates = supply_listings
+            
+            demand_candidates.append((demand, candidates))
+        
+        return demand_candidates
+    
+    async def _score_demand_candidates(
+        self,
+        demand_candidates: List[Tuple[OffsetDemandRequest, List[OffsetSupplyListing]]],
+        criteria: MatchingCriteria,
+        allow_partial_units: bool = False
+    ) -> List[OffsetMatch]:
+        """Score candidate pairs, vectorised when available"""
+        
+        if criteria.use_batch_scoring and self._batch_scorer is not None:
+            return self._batch_scorer.score_candidates(
+                demand_candidates, criteria, allow_partial_units=allow_partial_units
+            )
+        return await self._score_candidates(
+            demand_candidates, criteria, allow_partial_units=allow_partial_units
+        )
+    
+    async def _score_candidates(
+        self,
+        demand_candidates: List[Tuple[OffsetDemandRequest, List[OffsetSupplyListing]]],
+        criteria: MatchingCriteria,
+        allow_partial_units: bool = False
+    ) -> List[OffsetMatch]:
+        """Score candidate pairs one at a time (scalar path)"""
+        
+        matches = []
+        
+        for demand, candidates in demand_candidates:
+            for supply in candidates:
                 if not supply or supply.units_available <= 0:
                     continue
                 
                 # Quick compatibility check
-                if not await self._quick_compatibility_check(demand, supply, criteria):
+                if not await self._quick_compatibility_check(
+                    demand, supply, criteria, allow_partial_units=allow_partial_units
+                ):
                     continue
                 
                 # Calculate detailed match
                 match = await self._calculate_match(demand, supply, criteria)
                 
-                if match and match.overall_match_score >= criteria.minimum_match_score:
+                if match and match.overall_match_score >= Decimal(str(criteria.minimum_match_score)):
                     matches.append(match)
         
-        # Sort by match score (highest first)
-        matches.sort(key=lambda x: x.overall_match_score or 0, reverse=True)
+        return matches
+    
+    async def _indexed_supply_candidates(
+        self,
+        demand: OffsetDemandRequest,
+        criteria: MatchingCriteria
+    ) -> List[OffsetSupplyListing]:
+        """
+        Active listings that could match a demand, pruned via the supply spatial index
         
-        # Store matches
-        for match in matches[:max_matches]:
-            self._matches[match.match_id] = match
+        Only listings offering a habitat compatible with the demand and lying
+        within the bounding box of `criteria.max_distance_km` (or without
+        coordinates) are returned; exact checks are left to
+        `_quick_compatibility_check`.
+        """
         
-        return matches[:max_matches]
+        candidate_ids = self.supply_manager.spatial_index.candidate_ids(
+            self._compatible_supply_habitats(demand.required_habitat_types),
+            center=demand.development_coordinates,
+            radius_km=criteria.max_distance_km
+        )
+        
+        candidates = []
+        for listing_id in candidate_ids:
+            listing = await self.supply_manager.get_listing(listing_id)
+            if (listing and listing.status == ListingStatus.ACTIVE and
+                    listing.units_available >= self.MIN_MATCHABLE_UNITS):
+                candidates.append(listing)
+        
+        # Same order as the full scan so ties in match score resolve identically
+        candidates.sort(key=lambda x: x.created_date, reverse=True)
+        
+        return candidates
+    
+    def _compatible_supply_habitats(self, demand_habitat_types: List[HabitatType]) -> set:
+        """Supply habitat types with non-zero compatibility for any of the demanded types"""
+        
+        compatible = set()
+        for demand_habitat in demand_habitat_types:
+            for supply_habitat, compatibility in self.habitat_compatibility.get(demand_habitat, {}).items():
+                if compatibility > 0:
+                    compatible.add(supply_habitat)
+        
+        return compatible
     
     async def _quick_compatibility_check(
         self,
         demand: OffsetDemandRequest,
         supply: OffsetSupplyListing,
-        criteria: MatchingCriteria
+        criteria: MatchingCriteria,
+        allow_partial_units: bool = False
     ) -> bool:
         """Quick compatibility check to filter obviously incompatible matches"""
         
         # Check if supply has enough units
-        if supply.units_available < demand.required_units:
+        if not allow_partial_units and supply.units_available < demand.required_units:
             return False
         
         # Check price compatibility
-        if supply.price_per_unit > demand.max_price_per_unit * (1 + criteria.price_tolerance_percent / 100):
+        price_tolerance = Decimal(str(1 + criteria.price_tolerance_percent / 100))
+        if supply.price_per_unit > demand.max_price_per_unit * price_tolerance:
             return False
         
         # Check timeline compatibility
@@ -521,58 +679,176 @@ class MatchingEngine:
     async def find_optimal_match_combination(
         self,
         demand_request_id: str,
-        max_suppliers: int = 3
+        max_suppliers: int = 3,
+        criteria: Optional[MatchingCriteria] = None
     ) -> List[OffsetMatch]:
         """
         Find optimal combination of suppliers to meet demand requirements
         
         This is useful when no single supplier can meet all requirements,
         but a combination of suppliers can provide an optimal solution.
+        Minimises total cost for the required units using at most
+        `max_suppliers` compatible listings (see solve_demand_allocation).
+        If no combination covers the requirement, the combination covering
+        the most units is returned.
         """
         
+        if criteria is None:
+            criteria = MatchingCriteria()
+        
         demand = await self.demand_manager.get_demand_request(demand_request_id)
         if not demand:
             return []
         
-        # Find all potential matches
-        all_matches = await self.find_matches(demand_request_id=demand_request_id, max_matches=100)
+        # Compatible listings, including those that can only cover part of the requirement
+        candidate_matches = await self._partial_candidate_matches([demand], criteria)
+        
+        result = solve_demand_allocation(
+            await self._allocation_candidates(candidate_matches),
+            demand.required_units,
+            max_suppliers
+        )
+        
+        return self._store_allocated_matches(candidate_matches, result.allocations)
+    
+    async def allocate_market(
+        self,
+        max_suppliers: int = 3,
+        criteria: Optional[MatchingCriteria] = None
+    ) -> Dict[str, Any]:
+        """
+        Allocate available supply across all searching demands at once
+        
+        Maximises the units allocated and, among such allocations, minimises
+        total cost (see solve_market_allocation). Each demand uses at most
+        `max_suppliers` listings and only habitat-compatible listings.
+        
+        Returns:
+            Allocated matches per demand plus market totals
+        """
         
-        # Use greedy algorithm to find optimal combination
-        selected_matches = []
-        remaining_units = demand.required_units
-        used_suppliers = set()
+        if criteria is None:
+            criteria = MatchingCriteria()
         
-        # Sort matches by efficiency (match score per unit)
-        efficiency_sorted_matches = sorted(
-            all_matches,
-            key=lambda m: (m.overall_match_score or 0) / float(m.matched_units),
-            reverse=True
+        demand_requests = await self.demand_manager.search_demand_requests(
+            status_filter=[DemandStatus.SEARCHING],
+            limit=None
         )
         
-        for match in efficiency_sorted_matches:
-            
-            # Skip if we've already used this supplier
-            if match.supply_listing_id in used_suppliers:
+        candidate_matches = await self._partial_candidate_matches(demand_requests, criteria)
+        
+        compatible: Dict[str, List[str]] = {}
+        for match in candidate_matches:
+            compatible.setdefault(match.demand_request_id, []).append(match.supply_listing_id)
+        
+        supplies = {
+            candidate.listing_id: candidate
+            for candidate in await self._allocation_candidates(candidate_matches, use_listing_units=True)
+        }
+        
+        result: MarketAllocationResult = solve_market_allocation(
+            {demand.request_id: demand.required_units for demand in demand_requests},
+            supplies,
+            compatible,
+            max_suppliers=max_suppliers
+        )
+        
+        matches_by_demand = {
+            demand_id: self._store_allocated_matches(
+                [m for m in candidate_matches if m.demand_request_id == demand_id],
+                allocations
+            )
+            for demand_id, allocations in result.allocations.items()
+        }
+        
+        return {
+            'matches': matches_by_demand,
+            'total_cost': result.total_cost,
+            'units_allocated': result.units_allocated,
+            'units_required': result.units_required,
+            'demands_considered': len(demand_requests),
+            'fully_allocated_demands': result.fully_allocated_demands
+        }
+    
+    async def _partial_candidate_matches(
+        self,
+        demand_requests: List[OffsetDemandRequest],
+        criteria: MatchingCriteria
+    ) -> List[OffsetMatch]:
+        """Scored matches for the demands, keeping listings that cover only part of a requirement"""
+        
+        if criteria.use_spatial_index:
+            supply_listings = None
+        else:
+            supply_listings = await self.supply_manager.search_supply_listings(
+                status_filter=[ListingStatus.ACTIVE],
+                min_units=self.MIN_MATCHABLE_UNITS,
+                limit=None
+            )
+        
+        demand_candidates = await self._collect_demand_candidates(
+            demand_requests, supply_listings, criteria
+        )
+        return await self._score_demand_candidates(
+            demand_candidates, criteria, allow_partial_units=True
+        )
+    
+    async def _allocation_candidates(
+        self,
+        matches: List[OffsetMatch],
+        use_listing_units: bool = False
+    ) -> List[AllocationCandidate]:
+        """
+        Allocation solver inputs for candidate matches
+        
+        Capacity is the match's units (capped at the demand requirement) or,
+        with use_listing_units, the listing's full availability.
+        """
+        
+        candidates = {}
+        for match in matches:
+            if match.supply_listing_id in candidates:
                 continue
-            
-            # Skip if we don't need more units
-            if remaining_units <= 0:
-                break
-            
-            # Skip if we've reached max suppliers
-            if len(selected_matches) >= max_suppliers:
-                break
-            
-            # Adjust matched units if we don't need the full amount
-            if match.matched_units > remaining_units:
-                match.matched_units = remaining_units
-                match.total_value = match.matched_units * match.unit_price
-            
-            selected_matches.append(match)
-            remaining_units -= match.matched_units
-            used_suppliers.add(match.supply_listing_id)
+            listing = await self.supply_manager.get_listing(match.supply_listing_id)
+            if not listing:
+                continue
+            candidates[match.supply_listing_id] = AllocationCandidate(
+                listing_id=listing.listing_id,
+                units_available=listing.units_available if use_listing_units else match.matched_units,
+                price_per_unit=match.unit_price,
+                minimum_purchase=listing.minimum_unit_purchase
+            )
+        
+        return list(candidates.values())
+    
+    def _store_allocated_matches(
+        self,
+        candidate_matches: List[OffsetMatch],
+        allocations: List[Tuple[str, Decimal]]
+    ) -> List[OffsetMatch]:
+        """Copy candidate matches with their allocated units and store them"""
+        
+        by_listing = {match.supply_listing_id: match for match in candidate_matches}
+        
+        selected = []
+        for listing_id, units in allocations:
+            match = by_listing[listing_id]
+            allocated = OffsetMatch(
+                supply_listing_id=match.supply_listing_id,
+                demand_request_id=match.demand_request_id,
+                matched_units=units,
+                unit_price=match.unit_price,
+                total_value=units * match.unit_price,
+                distance_km=match.distance_km,
+                habitat_type_match_score=match.habitat_type_match_score,
+                location_preference_score=match.location_preference_score,
+                timeline_compatibility=match.timeline_compatibility,
+                expires_date=match.expires_date
+            )
+            self._matches[allocated.match_id] = allocated
+            selected.append(allocated)
         
-        return selected_matches
+        return selected
     
     async def suggest_price_adjustment(
         self,
@@ -18,6 +18,7 @@ from .schemas import (
 from .supply import SupplyManager
 from .demand import DemandManager
 from .matching import MatchingEngine, MatchingCriteria
+from .search_index import InvalidCursorError
 
 
 # Initialize router
@@ -28,6 +29,9 @@ supply_manager = SupplyManager()
 demand_manager = DemandManager()
 matching_engine = MatchingEngine(supply_manager, demand_manager)
 
+# Keep default-criteria matches current as listings and demands change
+matching_engine.enable_incremental_matching()
+
 
 # Request/Response Models
 class SupplyListingResponse(BaseModel):
@@ -131,7 +135,8 @@ async def search_supply_listings(
     local_authority: Optional[str] = Query(None, description="Local authority name"),
     status_filter: Optional[List[ListingStatus]] = Query([ListingStatus.ACTIVE], description="Listing status"),
     limit: int = Query(20, ge=1, le=100, description="Maximum results to return"),
-    offset: int = Query(0, ge=0, description="Results offset for pagination")
+    offset: int = Query(0, ge=0, description="Results offset for pagination"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor")
 ):
     """
     Search biodiversity offset supply listings
@@ -141,16 +146,17 @@ async def search_supply_listings(
     """
     try:
         
-        listings = await supply_manager.search_supply_listings(
+        listings, next_cursor = await supply_manager.search_supply_listings_page(
             habitat_types=habitat_types,
             min_units=min_units,
             max_units=max_units,
-            max_price=max_price,
+            max_price_per_unit=max_price,
             postcode_area=postcode_area,
-            local_authority=local_authority,
+            local_authorities=[local_authority] if local_authority else None,
             status_filter=status_filter,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
         
         # Get total count for pagination
@@ -162,9 +168,12 @@ async def search_supply_listings(
             "total_count": total_count,
             "limit": limit,
             "offset": offset,
-            "has_more": len(listings) == limit
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         }
     
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
@@ -285,7 +294,8 @@ async def search_demand_requests(
     local_authority: Optional[str] = Query(None, description="Preferred local authority"),
     status_filter: Optional[List[DemandStatus]] = Query([DemandStatus.SEARCHING], description="Request status"),
     limit: int = Query(20, ge=1, le=100, description="Maximum results to return"),
-    offset: int = Query(0, ge=0, description="Results offset for pagination")
+    offset: int = Query(0, ge=0, description="Results offset for pagination"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's next_cursor")
 ):
     """
     Search biodiversity offset demand requests
@@ -295,15 +305,16 @@ async def search_demand_requests(
     """
     try:
         
-        requests = await demand_manager.search_demand_requests(
+        requests, next_cursor = await demand_manager.search_demand_requests_page(
             habitat_types=habitat_types,
             min_units=min_units,
             max_units=max_units,
-            min_price=min_price,
-            local_authority=local_authority,
+            min_price_per_unit=min_price,
+            local_authorities=[local_authority] if local_authority else None,
             status_filter=status_filter,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
         
         total_count = len(requests) + offset
@@ -314,9 +325,12 @@ async def search_demand_requests(
             "total_count": total_count,
             "limit": limit,
             "offset": offset,
-            "has_more": len(requests) == limit
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         }
     
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
@@ -496,6 +510,35 @@ async def find_optimal_match_combination(
         raise HTTPException(status_code=500, detail=f"Optimization failed: {str(e)}")
 
 
+@router.post("/matching/market-allocation", response_model=Dict[str, Any])
+async def allocate_market(
+    max_suppliers: int = Body(3, ge=1, le=5, embed=True, description="Maximum number of suppliers per demand")
+):
+    """
+    Allocate available supply across all searching demands at once
+    
+    Allocates as many units as the market can supply, at minimum total cost,
+    respecting habitat compatibility and the per-demand supplier limit.
+    """
+    try:
+        
+        allocation = await matching_engine.allocate_market(max_suppliers=max_suppliers)
+        
+        return {
+            "success": True,
+            "matches": allocation['matches'],
+            "total_cost": float(allocation['total_cost']),
+            "units_allocated": float(allocation['units_allocated']),
+            "units_required": float(allocation['units_required']),
+            "demands_considered": allocation['demands_considered'],
+            "fully_allocated_demands": allocation['fully_allocated_demands'],
+            "message": f"Allocated {float(allocation['units_allocated']):.2f} of {float(allocation['units_required']):.2f} required units"
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Market allocation failed: {str(e)}")
+
+
 # Analytics and Statistics Endpoints
 
 @router.get("/analytics/market-overview", response_model=Dict[str, Any])
@@ -98,15 +98,15 @@ class HabitatUnit(BaseModel):
             
             # Strategic significance multipliers
             strategic_multipliers = {
-                LocationStrategicSignificance.VERY_HIGH: 1.5,
-                LocationStrategicSignificance.HIGH: 1.15,
-                LocationStrategicSignificance.MEDIUM: 1.1,
-                LocationStrategicSignificance.LOW: 1.0
+                LocationStrategicSignificance.VERY_HIGH: Decimal("1.5"),
+                LocationStrategicSignificance.HIGH: Decimal("1.15"),
+                LocationStrategicSignificance.MEDIUM: Decimal("1.1"),
+                LocationStrategicSignificance.LOW: Decimal("1.0")
             }
             
             strategic_mult = strategic_multipliers.get(
                 values.get('strategic_significance', LocationStrategicSignificance.LOW), 
-                1.0
+                Decimal("1.0")
             )
             
             return area * distinctiveness * condition * strategic_mult
@@ -335,15 +335,15 @@ class OffsetMatch(BaseModel):
     def calculate_match_score(cls, v, values):
         """Calculate overall match quality score"""
         # Weight different factors
-        habitat_score = values.get('habitat_type_match_score', 0) * 0.4
-        location_score = values.get('location_preference_score', 0) * 0.3
+        habitat_score = values.get('habitat_type_match_score', 0) * Decimal("0.4")
+        location_score = values.get('location_preference_score', 0) * Decimal("0.3")
         
         # Distance penalty (closer is better)
         distance = values.get('distance_km', 100)
-        distance_score = max(0, 1 - (distance / 100)) * 0.2  # Penalty increases with distance
+        distance_score = max(0, 1 - (distance / 100)) * Decimal("0.2")  # Penalty increases with distance
         
         # Timeline compatibility 
-        timeline_score = 0.1 if values.get('timeline_compatibility', False) else 0
+        timeline_score = Decimal("0.1") if values.get('timeline_compatibility', False) else 0
         
         return habitat_score + location_score + distance_score + timeline_score
 
@@ -0,0 +1,311 @@
+"""
+Offsets Search Index
+Secondary indexes over supply listings and demand requests, maintained on write
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+import base64
+
+from .spatial_index import SpatialHabitatIndex
+
+
+# When the most selective posting holds at most this share of the items it is
+# materialised and sorted; otherwise the created-date ordering is walked
+SORT_CANDIDATES_RATIO = 0.25
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+class SortedKeyIndex:
+    """
+    Item ids ordered by a comparable key
+
+    Backed by a sorted list of (key, item_id) pairs, so range counts and range
+    scans are O(log n) plus the size of the range.
+    """
+
+    def __init__(self):
+        self._pairs: List[Tuple[Any, str]] = []
+        self._keys: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    def key_for(self, item_id: str) -> Any:
+        return self._keys.get(item_id)
+
+    def add(self, item_id: str, key: Any) -> None:
+        """Index (or re-index) an item under a key; None keys are not indexed"""
+
+        if item_id in self._keys:
+            if self._keys[item_id] == key:
+                return
+            self.remove(item_id)
+
+        if key is None:
+            return
+
+        insort(self._pairs, (key, item_id))
+        self._keys[item_id] = key
+
+    def remove(self, item_id: str) -> None:
+        key = self._keys.pop(item_id, None)
+        if key is None:
+            return
+
+        position = bisect_left(self._pairs, (key, item_id))
+        if position < len(self._pairs) and self._pairs[position] == (key, item_id):
+            del self._pairs[position]
+
+    def _bounds(self, low: Any = None, high: Any = None) -> Tuple[int, int]:
+        start = 0 if low is None else bisect_left(self._pairs, (low,))
+        # (high, <anything>) sorts after (high,) so use the key alone as the bound
+        end = len(self._pairs) if high is None else bisect_right(self._pairs, high, key=lambda pair: pair[0])
+        return start, max(start, end)
+
+    def count_range(self, low: Any = None, high: Any = None) -> int:
+        """Number of items with low <= key <= high"""
+        start, end = self._bounds(low, high)
+        return end - start
+
+    def ids_in_range(self, low: Any = None, high: Any = None) -> Set[str]:
+        """Ids of items with low <= key <= high"""
+        start, end = self._bounds(low, high)
+        return {item_id for _, item_id in self._pairs[start:end]}
+
+    def iter_descending(self, before: Any = None) -> Iterator[str]:
+        """Ids in descending key order, starting strictly below `before`"""
+
+        end = len(self._pairs) if before is None else bisect_left(self._pairs, (before,))
+        for position in range(end - 1, -1, -1):
+            yield self._pairs[position][1]
+
+
+class MarketplaceSearchIndex:
+    """
+    Secondary indexes for marketplace searches
+
+    Maintains, per item: status postings, habitat postings and a spatial grid
+    (shared with the matching engine's SpatialHabitatIndex), named sorted
+    indexes for range filters (price, units, dates, budget), and a
+    created-date ordering used for cursor pagination.
+
+    Managers re-index an item after every write that changes an indexed
+    value. Queries intersect postings starting from the most selective
+    constraint, and pages resume from an opaque created-date cursor.
+    """
+
+    def __init__(self, range_fields: Iterable[str], spatial_index: Optional[SpatialHabitatIndex] = None):
+        self.spatial_index = spatial_index if spatial_index is not None else SpatialHabitatIndex()
+
+        self._status_postings: Dict[Any, Set[str]] = {}
+        self._status: Dict[str, Any] = {}
+        self._ranges: Dict[str, SortedKeyIndex] = {name: SortedKeyIndex() for name in range_fields}
+
+        # (created_date, -sequence): descending walk gives newest first and,
+        # for equal timestamps, insertion order - the old stable sort's order
+        self._created = SortedKeyIndex()
+        self._sequence: Dict[str, int] = {}
+        self._next_sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._status)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._status
+
+    def index(
+        self,
+        item_id: str,
+        status: Any,
+        habitat_types: Iterable[Any],
+        coordinates: Optional[Tuple[float, float]],
+        created: datetime,
+        ranges: Dict[str, Any]
+    ) -> None:
+        """Index (or re-index) an item"""
+
+        previous = self._status.get(item_id)
+        if item_id in self._status and previous != status:
+            self._status_postings[previous].discard(item_id)
+        self._status_postings.setdefault(status, set()).add(item_id)
+        self._status[item_id] = status
+
+        self.spatial_index.add_item(item_id, coordinates, habitat_types)
+
+        for name, value in ranges.items():
+            self._ranges[name].add(item_id, value)
+
+        if item_id not in self._sequence:
+            self._sequence[item_id] = self._next_sequence
+            self._next_sequence += 1
+        self._created.add(item_id, (created, -self._sequence[item_id]))
+
+    def remove(self, item_id: str) -> None:
+        """Drop an item from every index"""
+
+        status = self._status.pop(item_id, None)
+        if status is not None:
+            self._status_postings[status].discard(item_id)
+
+        self.spatial_index.remove(item_id)
+        for sorted_index in self._ranges.values():
+            sorted_index.remove(item_id)
+        self._created.remove(item_id)
+        self._sequence.pop(item_id, None)
+
+    def search(
+        self,
+        accept: Callable[[str], bool],
+        statuses: Optional[Iterable[Any]] = None,
+        habitat_types: Optional[Iterable[Any]] = None,
+        center: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+        ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+        limit: Optional[int] = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        One page of matching ids, newest first
+
+        Selective queries materialise the smallest index posting, probe the
+        other constraints per id and sort only the survivors. Broad queries
+        walk the created-date ordering from the cursor and probe each id, so
+        a page costs roughly limit / selectivity lookups however deep it is.
+
+        Args:
+            accept: Exact per-item check applied after index pruning (e.g.
+                haversine distance, which the grid only bounds)
+            statuses: Allowed statuses
+            habitat_types: Item must carry at least one of these
+            center: Query coordinates for spatial pruning
+            radius_km: Search radius (items without coordinates always pass)
+            ranges: Range field name -> (low, high); None bounds are open
+            limit: Page size (None for no limit)
+            offset: Items to skip after the cursor position
+            cursor: Cursor returned with the previous page
+
+        Returns:
+            (ids, next_cursor) - next_cursor is None on the last page
+        """
+
+        before = self._decode_cursor(cursor) if cursor else None
+        constraints = self._constraints(statuses, habitat_types, center, radius_km, ranges)
+
+        if constraints and constraints[0][0] <= SORT_CANDIDATES_RATIO * len(self):
+            _, materialise, _ = constraints[0]
+            probes = [probe for _, _, probe in constraints[1:]]
+            keyed = sorted(
+                (self._created.key_for(item_id), item_id) for item_id in materialise()
+                if all(probe(item_id) for probe in probes)
+            )
+            end = len(keyed) if before is None else bisect_left(keyed, (before,))
+            ordered: Iterable[str] = (keyed[i][1] for i in range(end - 1, -1, -1))
+        else:
+            probes = [probe for _, _, probe in constraints]
+            ordered = (
+                item_id for item_id in self._created.iter_descending(before)
+                if all(probe(item_id) for probe in probes)
+            )
+
+        ids: List[str] = []
+        skipped = 0
+        has_more = False
+        for item_id in ordered:
+            if not accept(item_id):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            if limit is not None and len(ids) >= limit:
+                has_more = True
+                break
+            ids.append(item_id)
+
+        next_cursor = self._encode_cursor(self._created.key_for(ids[-1])) if ids and has_more else None
+        return ids, next_cursor
+
+    def _constraints(
+        self,
+        statuses: Optional[Iterable[Any]],
+        habitat_types: Optional[Iterable[Any]],
+        center: Optional[Tuple[float, float]],
+        radius_km: Optional[float],
+        ranges: Optional[Dict[str, Tuple[Any, Any]]]
+    ) -> List[Tuple[int, Callable[[], Set[str]], Callable[[str], bool]]]:
+        """Query constraints as (posting size, materialise, probe), smallest first"""
+
+        constraints: List[Tuple[int, Callable[[], Set[str]], Callable[[str], bool]]] = []
+
+        if statuses:
+            allowed = set(statuses)
+            constraints.append((
+                sum(len(self._status_postings.get(s, ())) for s in allowed),
+                lambda: set().union(*(self._status_postings.get(s, set()) for s in allowed)),
+                lambda item_id: self._status.get(item_id) in allowed
+            ))
+
+        if habitat_types:
+            wanted = set(habitat_types)
+            buckets = self.spatial_index._habitat_buckets
+            constraints.append((
+                sum(len(buckets.get(h, ())) for h in wanted),
+                lambda: self.spatial_index.ids_for_habitats(wanted),
+                lambda item_id: any(item_id in buckets.get(h, ()) for h in wanted)
+            ))
+
+        for name, (low, high) in (ranges or {}).items():
+            if low is None and high is None:
+                continue
+            sorted_index = self._ranges[name]
+            constraints.append((
+                sorted_index.count_range(low, high),
+                lambda s=sorted_index, lo=low, hi=high: s.ids_in_range(lo, hi),
+                lambda item_id, s=sorted_index, lo=low, hi=high: _in_range(s.key_for(item_id), lo, hi)
+            ))
+
+        if center and radius_km and radius_km > 0:
+            spatial_ids = self.spatial_index.ids_within_bbox(center, radius_km) | self.spatial_index._unlocated
+            constraints.append((len(spatial_ids), lambda: spatial_ids, spatial_ids.__contains__))
+
+        constraints.sort(key=lambda constraint: constraint[0])
+        return constraints
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index sizes"""
+
+        return {
+            'indexed_items': len(self),
+            'status_postings': {getattr(s, 'value', s): len(ids) for s, ids in self._status_postings.items() if ids},
+            'range_indexes': {name: len(s) for name, s in self._ranges.items()},
+            'spatial': self.spatial_index.get_stats()
+        }
+
+    @staticmethod
+    def _encode_cursor(key: Tuple[datetime, int]) -> str:
+        created, negative_sequence = key
+        raw = f"{created.isoformat()}|{-negative_sequence}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            created, sequence = raw.split("|")
+            return (datetime.fromisoformat(created), -int(sequence))
+        except (ValueError, UnicodeDecodeError) as e:
+            raise InvalidCursorError(f"Invalid pagination cursor: {cursor}") from e
+
+
+def _in_range(value: Any, low: Any, high: Any) -> bool:
+    if value is None:
+        return False
+    if low is not None and value < low:
+        return False
+    if high is not None and value > high:
+        return False
+    return True
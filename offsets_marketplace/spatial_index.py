@@ -0,0 +1,201 @@
+"""
+Offsets Spatial Index
+Grid indexes over supply and demand coordinates with per-habitat buckets for candidate pruning
+"""
+from typing import Dict, Iterable, Optional, Set, Tuple
+import math
+
+from .schemas import OffsetSupplyListing, OffsetDemandRequest, HabitatType
+
+
+KM_PER_DEGREE_LAT = 111.195
+
+
+class SpatialHabitatIndex:
+    """
+    Spatial grid index over marketplace items
+
+    Items are bucketed into fixed-size lat/lon cells and by habitat type.
+    Items without coordinates are tracked separately so that distance
+    filtering never hides them (matching the brute-force behaviour).
+    Status and unit availability change frequently and are deliberately NOT
+    indexed here - callers check them on the pruned candidate set.
+    """
+
+    def __init__(self, cell_size_km: float = 10.0):
+        self.cell_size_deg = cell_size_km / KM_PER_DEGREE_LAT
+
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._habitat_buckets: Dict[HabitatType, Set[str]] = {}
+        self._unlocated: Set[str] = set()
+        self._entries: Dict[str, Tuple[Optional[Tuple[int, int]], Tuple[HabitatType, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._entries
+
+    def _cell_for(self, coordinates: Tuple[float, float]) -> Tuple[int, int]:
+        lat, lon = coordinates
+        return (
+            int(math.floor(lat / self.cell_size_deg)),
+            int(math.floor(lon / self.cell_size_deg))
+        )
+
+    def add_item(
+        self,
+        item_id: str,
+        coordinates: Optional[Tuple[float, float]],
+        habitat_types: Iterable[HabitatType]
+    ) -> None:
+        """Index (or re-index) an item"""
+
+        if item_id in self._entries:
+            self.remove(item_id)
+
+        cell = self._cell_for(coordinates) if coordinates else None
+        habitats = tuple(set(habitat_types))
+
+        if cell is None:
+            self._unlocated.add(item_id)
+        else:
+            self._cells.setdefault(cell, set()).add(item_id)
+
+        for habitat_type in habitats:
+            self._habitat_buckets.setdefault(habitat_type, set()).add(item_id)
+
+        self._entries[item_id] = (cell, habitats)
+
+    def remove(self, item_id: str) -> None:
+        """Drop an item from the index"""
+
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return
+
+        cell, habitats = entry
+        if cell is None:
+            self._unlocated.discard(item_id)
+        else:
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._cells[cell]
+
+        for habitat_type in habitats:
+            bucket = self._habitat_buckets.get(habitat_type)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._habitat_buckets[habitat_type]
+
+    def ids_for_habitats(self, habitat_types: Iterable[HabitatType]) -> Set[str]:
+        """All item ids indexed under at least one of the given habitat types"""
+
+        result: Set[str] = set()
+        for habitat_type in habitat_types:
+            result |= self._habitat_buckets.get(habitat_type, set())
+        return result
+
+    def ids_within_bbox(self, center: Tuple[float, float], radius_km: float) -> Set[str]:
+        """
+        Item ids in grid cells overlapping the bounding box of a radius
+
+        This is a superset of the items within `radius_km`; exact distance
+        filtering is left to the caller.
+        """
+
+        lat, lon = center
+        dlat = radius_km / KM_PER_DEGREE_LAT
+
+        # Longitude degrees shrink towards the poles - size the box for the
+        # widest latitude it spans so no in-range cell is missed
+        max_abs_lat = min(abs(lat) + dlat, 89.9)
+        dlon = radius_km / (KM_PER_DEGREE_LAT * math.cos(math.radians(max_abs_lat)))
+
+        min_i, min_j = self._cell_for((lat - dlat, lon - dlon))
+        max_i, max_j = self._cell_for((lat + dlat, lon + dlon))
+
+        result: Set[str] = set()
+
+        # Small indexes can have fewer occupied cells than the box covers
+        if (max_i - min_i + 1) * (max_j - min_j + 1) > len(self._cells):
+            for (i, j), bucket in self._cells.items():
+                if min_i <= i <= max_i and min_j <= j <= max_j:
+                    result |= bucket
+            return result
+
+        for i in range(min_i, max_i + 1):
+            for j in range(min_j, max_j + 1):
+                bucket = self._cells.get((i, j))
+                if bucket:
+                    result |= bucket
+
+        return result
+
+    def candidate_ids(
+        self,
+        habitat_types: Iterable[HabitatType],
+        center: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None
+    ) -> Set[str]:
+        """
+        Candidate item ids for a query
+
+        Args:
+            habitat_types: Habitat types to look up
+            center: Query coordinates (no spatial pruning if None)
+            radius_km: Search radius (no spatial pruning if None or <= 0)
+
+        Returns:
+            Ids that offer a compatible habitat and are either within the
+            radius bounding box or have no coordinates
+        """
+
+        habitat_ids = self.ids_for_habitats(habitat_types)
+
+        if not center or not radius_km or radius_km <= 0:
+            return habitat_ids
+
+        spatial_ids = self.ids_within_bbox(center, radius_km) | self._unlocated
+
+        return habitat_ids & spatial_ids
+
+    def get_stats(self) -> Dict[str, int]:
+        """Index occupancy statistics"""
+
+        return {
+            'indexed_items': len(self._entries),
+            'occupied_cells': len(self._cells),
+            'unlocated_items': len(self._unlocated),
+            'habitat_buckets': len(self._habitat_buckets)
+        }
+
+
+class SupplySpatialIndex(SpatialHabitatIndex):
+    """Supply listings by site coordinates and offered habitat types"""
+
+    def add(self, listing: OffsetSupplyListing) -> None:
+        """Index (or re-index) a listing"""
+
+        self.add_item(
+            listing.listing_id,
+            listing.coordinates,
+            (unit.habitat_type for unit in listing.available_habitat_units)
+        )
+
+
+class DemandSpatialIndex(SpatialHabitatIndex):
+    """
+    Demand requests by development coordinates and acceptable supply habitats
+
+    Demands are bucketed under every supply habitat type they could accept,
+    so a listing's own habitat types find the demands it can serve.
+    """
+
+    def add(self, demand: OffsetDemandRequest, compatible_supply_habitats: Iterable[HabitatType]) -> None:
+        """Index (or re-index) a demand"""
+
+        self.add_item(demand.request_id, demand.development_coordinates, compatible_supply_habitats)
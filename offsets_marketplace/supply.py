@@ -2,7 +2,7 @@
 Offsets Supply Management
 Handles landowner offset supply listings and habitat baseline data
 """
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
 import asyncio
 from datetime import datetime, date, timedelta
 from decimal import Decimal
@@ -14,6 +14,8 @@ from .schemas import (
     OffsetSupplyListing, HabitatUnit, HabitatType, HabitatCondition,
     LocationStrategicSignificance, ListingStatus, BiodiversityAssessment
 )
+from .spatial_index import SupplySpatialIndex
+from .search_index import MarketplaceSearchIndex
 
 
 class SupplyManager:
@@ -26,6 +28,18 @@ class SupplyManager:
         self._listings: Dict[str, OffsetSupplyListing] = {}
         self._assessments: Dict[str, BiodiversityAssessment] = {}
         
+        # Spatial/habitat index used by the matching engine for candidate pruning
+        self.spatial_index = SupplySpatialIndex()
+        
+        # Secondary indexes for searches (shares the spatial/habitat index)
+        self.search_index = MarketplaceSearchIndex(
+            range_fields=('price_per_unit', 'units_available', 'delivery_completion_date'),
+            spatial_index=self.spatial_index
+        )
+        
+        # Async callbacks notified as listener(event, listing_id) after writes
+        self._listeners: List[Callable[[str, str], Awaitable[None]]] = []
+        
         # DEFRA biodiversity metric lookup tables
         self.habitat_distinctiveness_scores = {
             HabitatType.GRASSLAND_MODIFIED: 2,
@@ -51,6 +65,30 @@ class SupplyManager:
             HabitatCondition.NA: Decimal("1.0")
         }
     
+    def add_listener(self, listener: Callable[[str, str], Awaitable[None]]) -> None:
+        """Register an async callback for 'listing_created' / 'listing_updated' events"""
+        self._listeners.append(listener)
+    
+    async def _notify(self, event: str, listing_id: str) -> None:
+        """Notify listeners of a listing change"""
+        for listener in self._listeners:
+            await listener(event, listing_id)
+    
+    def _index_listing(self, listing: OffsetSupplyListing) -> None:
+        """Refresh a listing's search and spatial index entries after a write"""
+        self.search_index.index(
+            listing.listing_id,
+            status=listing.status,
+            habitat_types=(unit.habitat_type for unit in listing.available_habitat_units),
+            coordinates=listing.coordinates,
+            created=listing.created_date,
+            ranges={
+                'price_per_unit': listing.price_per_unit,
+                'units_available': listing.units_available,
+                'delivery_completion_date': listing.delivery_completion_date
+            }
+        )
+    
     async def create_supply_listing(
         self,
         landowner_details: Dict[str, str],
@@ -110,6 +148,8 @@ class SupplyManager:
         
         # Store listing
         self._listings[listing.listing_id] = listing
+        self._index_listing(listing)
+        await self._notify('listing_created', listing.listing_id)
         
         return listing
     
@@ -156,6 +196,8 @@ class SupplyManager:
         listing = self._listings[listing_id]
         listing.status = status
         listing.last_updated = datetime.now()
+        self._index_listing(listing)
+        await self._notify('listing_updated', listing_id)
         
         return True
     
@@ -179,6 +221,8 @@ class SupplyManager:
         # Reserve units
         listing.units_reserved += units_to_reserve
         listing.last_updated = datetime.now()
+        self._index_listing(listing)
+        await self._notify('listing_updated', listing_id)
         
         return True
     
@@ -217,6 +261,9 @@ class SupplyManager:
         if listing.units_available <= 0:
             listing.status = ListingStatus.SOLD
         
+        self._index_listing(listing)
+        await self._notify('listing_updated', listing_id)
+        
         return True
     
     async def get_listing(self, listing_id: str) -> Optional[OffsetSupplyListing]:
@@ -227,13 +274,15 @@ class SupplyManager:
         self,
         habitat_types: Optional[List[HabitatType]] = None,
         min_units: Optional[Decimal] = None,
+        max_units: Optional[Decimal] = None,
         max_price_per_unit: Optional[Decimal] = None,
         max_distance_km: Optional[int] = None,
         center_coordinates: Optional[Tuple[float, float]] = None,
+        postcode_area: Optional[str] = None,
         local_authorities: Optional[List[str]] = None,
         delivery_by_date: Optional[date] = None,
         status_filter: Optional[List[ListingStatus]] = None,
-        limit: int = 50,
+        limit: Optional[int] = 50,
         offset: int = 0
     ) -> List[OffsetSupplyListing]:
         """
@@ -242,63 +291,93 @@ class SupplyManager:
         Args:
             habitat_types: Filter by habitat types
             min_units: Minimum biodiversity units available
+            max_units: Maximum biodiversity units available
             max_price_per_unit: Maximum price per unit
             max_distance_km: Maximum distance from center coordinates
             center_coordinates: Center point for distance filtering
+            postcode_area: Postcode area prefix (e.g. 'OX', 'M')
             local_authorities: Filter by local authority
             delivery_by_date: Must be deliverable by this date
             status_filter: Filter by listing status
-            limit: Maximum results to return
+            limit: Maximum results to return (None for no limit)
             offset: Pagination offset
             
         Returns:
-            List of matching supply listings
+            List of matching supply listings, most recent first
+        """
+        
+        listings, _ = await self.search_supply_listings_page(
+            habitat_types=habitat_types,
+            min_units=min_units,
+            max_units=max_units,
+            max_price_per_unit=max_price_per_unit,
+            max_distance_km=max_distance_km,
+            center_coordinates=center_coordinates,
+            postcode_area=postcode_area,
+            local_authorities=local_authorities,
+            delivery_by_date=delivery_by_date,
+            status_filter=status_filter,
+            limit=limit,
+            offset=offset
+        )
+        return listings
+    
+    async def search_supply_listings_page(
+        self,
+        habitat_types: Optional[List[HabitatType]] = None,
+        min_units: Optional[Decimal] = None,
+        max_units: Optional[Decimal] = None,
+        max_price_per_unit: Optional[Decimal] = None,
+        max_distance_km: Optional[int] = None,
+        center_coordinates: Optional[Tuple[float, float]] = None,
+        postcode_area: Optional[str] = None,
+        local_authorities: Optional[List[str]] = None,
+        delivery_by_date: Optional[date] = None,
+        status_filter: Optional[List[ListingStatus]] = None,
+        limit: Optional[int] = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[OffsetSupplyListing], Optional[str]]:
         """
+        Cursor-paginated supply search
         
-        results = []
+        Filters are answered from the search index; pass the returned cursor
+        back to fetch the next page without re-sorting the result set.
         
-        for listing in self._listings.values():
-            
-            # Status filter
-            if status_filter and listing.status not in status_filter:
-                continue
-            
-            # Units filter
-            if min_units and listing.units_available < min_units:
-                continue
-            
-            # Price filter  
-            if max_price_per_unit and listing.price_per_unit > max_price_per_unit:
-                continue
-            
-            # Habitat type filter
-            if habitat_types:
-                listing_habitat_types = {unit.habitat_type for unit in listing.available_habitat_units}
-                if not any(ht in listing_habitat_types for ht in habitat_types):
-                    continue
-            
-            # Delivery date filter
-            if delivery_by_date and listing.delivery_completion_date > delivery_by_date:
-                continue
-            
-            # Distance filter (simplified - would use proper geospatial in production)
-            if max_distance_km and center_coordinates and listing.coordinates:
-                distance = self._calculate_distance(center_coordinates, listing.coordinates)
-                if distance > max_distance_km:
-                    continue
-            
-            # Local authority filter (would need proper lookup)
-            if local_authorities:
-                # Simplified - would use postcode to LA mapping
-                pass
-            
-            results.append(listing)
+        Returns:
+            (listings, next_cursor) - next_cursor is None on the last page
+        """
         
-        # Sort by created date (most recent first)
-        results.sort(key=lambda x: x.created_date, reverse=True)
+        # Local authority filter would need a postcode to LA mapping - not applied
+        
+        spatial = bool(max_distance_km and center_coordinates)
+        area = postcode_area.strip().upper() if postcode_area else None
+        
+        def accept(listing_id: str) -> bool:
+            listing = self._listings[listing_id]
+            if area and self._postcode_area(listing.postcode) != area:
+                return False
+            if not spatial or not listing.coordinates:
+                return True
+            return self._calculate_distance(center_coordinates, listing.coordinates) <= max_distance_km
+        
+        listing_ids, next_cursor = self.search_index.search(
+            accept,
+            statuses=status_filter,
+            habitat_types=habitat_types,
+            center=center_coordinates if spatial else None,
+            radius_km=max_distance_km if spatial else None,
+            ranges={
+                'units_available': (min_units or None, max_units or None),
+                'price_per_unit': (None, max_price_per_unit or None),
+                'delivery_completion_date': (None, delivery_by_date)
+            },
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
         
-        # Apply pagination
-        return results[offset:offset + limit]
+        return [self._listings[listing_id] for listing_id in listing_ids], next_cursor
     
     async def get_supply_statistics(self) -> Dict[str, Any]:
         """Get supply marketplace statistics"""
@@ -348,6 +427,16 @@ class SupplyManager:
             }
         }
     
+    @staticmethod
+    def _postcode_area(postcode: str) -> str:
+        """Leading letters of a UK postcode ('OX1 2AB' -> 'OX')"""
+        area = ""
+        for char in postcode.strip().upper():
+            if not char.isalpha():
+                break
+            area += char
+        return area
+    
     def _calculate_distance(self, coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
         """Calculate distance between two coordinates (simplified)"""
         # Simplified distance calculation - would use proper geospatial library in production
@@ -444,6 +533,8 @@ class SupplyManager:
             )
             
             self._listings[listing.listing_id] = listing
+            self._index_listing(listing)
+            await self._notify('listing_created', listing.listing_id)
             mock_listings.append(listing)
         
         return mock_listings
@@ -0,0 +1,247 @@
+"""
+Page-level OCR for PDFs.
+
+Only pages without an extractable text layer are rasterised (one page at a
+time, to bound memory) and OCR'd, in parallel across a process pool. OCR
+output is cached on disk keyed by a hash of each page's content stream and
+images, so re-processing a partially re-uploaded bundle only OCRs the pages
+that changed.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pytesseract
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    OCR_AVAILABLE = True
+except Exception:
+    OCR_AVAILABLE = False
+
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "data/ocr_cache")
+OCR_DPI = 300
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+MAX_OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Pages with less native text than this are treated as scanned
+MIN_PAGE_TEXT_CHARS = 25
+
+# How deep to follow Form XObjects when fingerprinting a page
+_FINGERPRINT_DEPTH = 3
+
+
+@dataclass
+class PageOCRResult:
+    """Text of a document assembled from native and OCR'd pages"""
+    pages: List[str]
+    native_pages: int = 0
+    ocr_pages: int = 0
+    cached_pages: int = 0
+    failed_pages: List[int] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(self.pages).strip()
+
+    @property
+    def ocr_applied(self) -> bool:
+        return bool(self.ocr_pages or self.cached_pages)
+
+
+class PageOCRCache:
+    """OCR text per page on disk, shared by every process using the directory"""
+
+    def __init__(self, directory: str = OCR_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key: str, text: str) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("OCR cache write failed for %s: %s", key, e)
+
+
+def page_fingerprint(page) -> str:
+    """Hash of what a page renders: geometry, content stream and the images/forms it draws"""
+    h = hashlib.sha256()
+    h.update(repr([float(v) for v in page.mediabox]).encode())
+    h.update(str(page.get("/Rotate", 0)).encode())
+    contents = page.get_contents()
+    if contents is not None:
+        h.update(contents.get_data())
+    _hash_xobjects(page.get("/Resources"), h, 0)
+    return h.hexdigest()
+
+
+def _hash_xobjects(resources, h, depth: int) -> None:
+    if resources is None or depth > _FINGERPRINT_DEPTH:
+        return
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return
+    xobjects = xobjects.get_object()
+    for name in sorted(xobjects):
+        obj = xobjects[name].get_object()
+        h.update(name.encode())
+        raw = getattr(obj, "_data", None)
+        h.update(raw if raw is not None else obj.get_data())
+        if obj.get("/Subtype") == "/Form":
+            _hash_xobjects(obj.get("/Resources"), h, depth + 1)
+
+
+def read_native_pages(path: str) -> List[Tuple[str, Optional[str]]]:
+    """(native text, fingerprint) per page"""
+    from PyPDF2 import PdfReader
+
+    pages = []
+    for page in PdfReader(path).pages:
+        try:
+            text = page.extract_text() or ""
+        except Exception:
+            text = ""
+        try:
+            fingerprint = page_fingerprint(page)
+        except Exception:
+            fingerprint = None
+        pages.append((text, fingerprint))
+    return pages
+
+
+def count_pages(path: str) -> int:
+    """Page count without a text layer reader (poppler)"""
+    return int(pdfinfo_from_path(path)["Pages"])
+
+
+def ocr_page(path: str, page_number: int, dpi: int = OCR_DPI, lang: str = OCR_LANG) -> str:
+    """Rasterise and OCR a single page (runs in a worker process)"""
+    images = convert_from_path(path, dpi=dpi, first_page=page_number + 1, last_page=page_number + 1)
+    return pytesseract.image_to_string(images[0], lang=lang) if images else ""
+
+
+@contextmanager
+def _as_path(source: Union[str, bytes]) -> Iterator[str]:
+    """Worker processes need a file to read; spill bytes to a temp file"""
+    if isinstance(source, str):
+        yield source
+        return
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        yield path
+    finally:
+        os.unlink(path)
+
+
+def extract_pages(
+    source: Union[str, bytes],
+    min_page_chars: int = MIN_PAGE_TEXT_CHARS,
+    dpi: int = OCR_DPI,
+    lang: str = OCR_LANG,
+    max_workers: int = MAX_OCR_WORKERS,
+    cache: Optional[PageOCRCache] = None,
+    executor: Optional[Executor] = None,
+    ocr: bool = True,
+) -> PageOCRResult:
+    """
+    Native text per page, OCR'ing only the pages that lack a text layer.
+
+    Args:
+        source: PDF path or bytes
+        min_page_chars: Native text below this length marks a page for OCR
+        dpi: Rasterisation resolution
+        lang: Tesseract language
+        max_workers: OCR processes (a pool is only started for 2+ pages)
+        cache: OCR text cache (defaults to OCR_CACHE_DIR)
+        executor: Use this executor instead of starting a process pool
+        ocr: False to return native text only
+    """
+    cache = cache if cache is not None else PageOCRCache()
+
+    with _as_path(source) as path:
+        try:
+            native = read_native_pages(path)
+        except Exception as e:
+            if not OCR_AVAILABLE or not ocr:
+                raise
+            # Unreadable text layer: OCR every page, uncached
+            logger.info("Native PDF read failed (%s), OCR'ing all pages", e)
+            native = [("", None)] * count_pages(path)
+
+        result = PageOCRResult(pages=[text for text, _ in native])
+        needed = [i for i, (text, _) in enumerate(native) if len(text.strip()) < min_page_chars]
+        result.native_pages = len(native) - len(needed)
+        if not needed or not OCR_AVAILABLE or not ocr:
+            return result
+
+        keys = {}
+        todo = []
+        for i in needed:
+            fingerprint = native[i][1]
+            if fingerprint is not None:
+                keys[i] = hashlib.sha256(f"{fingerprint}:{dpi}:{lang}".encode()).hexdigest()
+                cached = cache.get(keys[i])
+                if cached is not None:
+                    result.pages[i] = cached
+                    result.cached_pages += 1
+                    continue
+            todo.append(i)
+
+        for i, text, error in _run_ocr(path, todo, dpi, lang, max_workers, executor):
+            if error is not None:
+                logger.warning("OCR failed for page %d of %s: %s", i + 1, path, error)
+                result.failed_pages.append(i)
+                continue
+            result.pages[i] = text
+            result.ocr_pages += 1
+            if i in keys:
+                cache.set(keys[i], text)
+
+    return result
+
+
+def _run_ocr(path, pages, dpi, lang, max_workers, executor):
+    """Yield (page, text, error) for each page"""
+    if not pages:
+        return
+    if len(pages) == 1 and executor is None:
+        try:
+            yield pages[0], ocr_page(path, pages[0], dpi, lang), None
+        except Exception as e:
+            yield pages[0], "", e
+        return
+
+    own = executor is None
+    pool = executor or ProcessPoolExecutor(max_workers=min(max_workers, len(pages)))
+    try:
+        futures = [(i, pool.submit(ocr_page, path, i, dpi, lang)) for i in pages]
+        for i, future in futures:
+            try:
+                yield i, future.result(), None
+            except Exception as e:
+                yield i, "", e
+    finally:
+        if own:
+            pool.shutdown()
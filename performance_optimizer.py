@@ -4,6 +4,7 @@ Phase 2B: Performance & Scalability Enhancements
 
 Upgrades for handling 10,000+ matters/month
 """
+import os
 import redis
 from typing import Dict, Any, List, Optional
 from fastapi import BackgroundTasks
@@ -136,23 +137,23 @@ def process_document_async(matter_id: str, document_data: bytes, document_type:
 
 @celery_app.task 
 def bulk_sla_check():
-    """Check SLA status for all active matters"""
-    from sla import sla_manager
-    from la.models import LAMatter
+    """Recompute SLA status for all open matters (scheduled; see beat_schedule below)"""
+    from sla import ensure_sla_index, sla_manager
     
-    with DatabasePool().get_db_session() as db:
-        active_matters = db.query(LAMatter).filter(
-            LAMatter.status.in_(["created", "in_progress", "assigned"])
-        ).all()
-        
-        updated_count = 0
-        for matter in active_matters:
-            old_status = matter.sla_status
-            new_status = sla_manager.check_sla_status(matter.id, db)
-            if old_status != new_status:
-                updated_count += 1
+    db_pool = DatabasePool()
+    ensure_sla_index(db_pool.engine)
+    with db_pool.get_db_session() as db:
+        updated_count = sla_manager.recompute_sla_statuses(db)
                 
-        return {"matters_checked": len(active_matters), "updated": updated_count}
+    return {"updated": updated_count}
+
+# Statuses move as time passes, so they are recomputed on a schedule rather than per request
+celery_app.conf.beat_schedule = {
+    'recompute-sla-status': {
+        'task': 'performance_optimizer.bulk_sla_check',
+        'schedule': float(os.getenv('SLA_RECOMPUTE_SECONDS', '900')),
+    },
+}
 
 # API Rate limiting
 class RateLimiter:
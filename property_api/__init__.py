@@ -79,6 +79,7 @@ from .epc_data import EPCDataAdapter, get_epc_data
 from .flood_risk import FloodRiskAdapter, get_flood_risk_data
 from .planning_history import PlanningHistoryAdapter, get_planning_history
 from .cache import PropertyDataCache, CacheManager
+from .upstream import UpstreamPool, TokenBucket, upstream_pool, close_upstream_sessions
 from .aggregator import PropertyDataAggregator, get_comprehensive_property_report, get_property_summary
 
 __version__ = "1.0.0"
@@ -95,5 +96,9 @@ __all__ = [
     "get_flood_risk_data", 
     "get_planning_history",
     "get_comprehensive_property_report",
-    "get_property_summary"
+    "get_property_summary",
+    "UpstreamPool",
+    "TokenBucket",
+    "upstream_pool",
+    "close_upstream_sessions"
 ]
\ No newline at end of file
@@ -2,7 +2,7 @@
 Property Data Aggregator
 Combines data from all property API sources into comprehensive property reports
 """
-from typing import Dict, List, Any, Optional, Tuple, Union
+from typing import Dict, List, Any, Optional, Tuple, Union, AsyncIterator, Awaitable, Callable
 import asyncio
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
@@ -15,6 +15,16 @@ from .planning_history import PlanningHistoryAdapter, get_planning_history
 from .cache import get_cache
 
 
+# Comprehensive reports are fresh for REPORT_TTL_HOURS, then served stale for
+# up to REPORT_STALE_HOURS more while a background refresh runs
+REPORT_TTL_HOURS = 2
+REPORT_STALE_HOURS = 22
+
+# Portfolio (batch) summaries
+DEFAULT_BATCH_CONCURRENCY = 10
+BATCH_PLANNING_RADIUS_M = 50
+
+
 @dataclass
 class PropertySummary:
     """Comprehensive property data summary"""
@@ -111,54 +121,23 @@ class PropertyDataAggregator:
             Comprehensive property report dictionary
         """
         
-        # Check cache
         cache_key = f"comprehensive_{search_type}_{identifier}_{include_planning_radius}"
-        cached_report = await self.cache.get(cache_key)
-        
-        if cached_report:
-            return cached_report
-        
-        # Gather data from all sources in parallel
-        data_tasks = [
-            self._get_land_registry_data(identifier, search_type),
-            self._get_epc_data(identifier, search_type),
-            self._get_flood_risk_data(identifier, search_type),
-            self._get_planning_history_data(identifier, search_type, include_planning_radius)
-        ]
         
         try:
-            results = await asyncio.gather(*data_tasks, return_exceptions=True)
-            
-            land_registry_data, epc_data, flood_risk_data, planning_data = results
-            
-            # Handle exceptions
-            if isinstance(land_registry_data, Exception):
-                self.logger.warning(f"Land Registry error: {land_registry_data}")
-                land_registry_data = None
-            
-            if isinstance(epc_data, Exception):
-                self.logger.warning(f"EPC data error: {epc_data}")
-                epc_data = None
-            
-            if isinstance(flood_risk_data, Exception):
-                self.logger.warning(f"Flood risk error: {flood_risk_data}")
-                flood_risk_data = None
-            
-            if isinstance(planning_data, Exception):
-                self.logger.warning(f"Planning history error: {planning_data}")
-                planning_data = None
-            
-            # Create comprehensive report
-            report = await self._compile_comprehensive_report(
-                identifier, search_type, land_registry_data, 
-                epc_data, flood_risk_data, planning_data
+            # Concurrent misses share one fan-out and expired reports are
+            # served while a single background refresh runs. Both run in
+            # their own adapter context: the shared flight must not depend on
+            # whichever caller started it staying inside its `async with`
+            return await self.cache.get_or_compute(
+                cache_key,
+                lambda: _generate_report_detached(
+                    identifier, search_type, include_planning_radius
+                ),
+                ttl_hours=REPORT_TTL_HOURS,
+                stale_ttl_hours=REPORT_STALE_HOURS,
+                cacheable=_has_source_data
             )
             
-            # Cache the report
-            await self.cache.set(cache_key, report, ttl_hours=2)
-            
-            return report
-            
         except Exception as e:
             self.logger.error(f"Error generating property report: {e}")
             return {
@@ -168,6 +147,49 @@ class PropertyDataAggregator:
                 'timestamp': datetime.now().isoformat()
             }
     
+    async def _generate_comprehensive_report(
+        self,
+        identifier: str,
+        search_type: str,
+        include_planning_radius: int
+    ) -> Dict[str, Any]:
+        """Fan out to all adapters and compile the report (uncached)"""
+        
+        # Gather data from all sources in parallel
+        data_tasks = [
+            self._get_land_registry_data(identifier, search_type),
+            self._get_epc_data(identifier, search_type),
+            self._get_flood_risk_data(identifier, search_type),
+            self._get_planning_history_data(identifier, search_type, include_planning_radius)
+        ]
+        
+        results = await asyncio.gather(*data_tasks, return_exceptions=True)
+        
+        land_registry_data, epc_data, flood_risk_data, planning_data = results
+        
+        # Handle exceptions
+        if isinstance(land_registry_data, Exception):
+            self.logger.warning(f"Land Registry error: {land_registry_data}")
+            land_registry_data = None
+        
+        if isinstance(epc_data, Exception):
+            self.logger.warning(f"EPC data error: {epc_data}")
+            epc_data = None
+        
+        if isinstance(flood_risk_data, Exception):
+            self.logger.warning(f"Flood risk error: {flood_risk_data}")
+            flood_risk_data = None
+        
+        if isinstance(planning_data, Exception):
+            self.logger.warning(f"Planning history error: {planning_data}")
+            planning_data = None
+        
+        # Create comprehensive report
+        return await self._compile_comprehensive_report(
+            identifier, search_type, land_registry_data, 
+            epc_data, flood_risk_data, planning_data
+        )
+    
     async def get_property_summary(
         self,
         identifier: str,
@@ -197,6 +219,101 @@ class PropertyDataAggregator:
         
         return summary
     
+    async def stream_property_summaries(
+        self,
+        identifiers: List[str],
+        search_type: str = 'address',
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Property summaries for a portfolio, yielded as each one completes
+        
+        Repeated identifiers are computed once. Addresses are grouped by
+        postcode and the postcode-level lookups (flood risk, price paid,
+        area planning history) run once per postcode and are shared by every
+        address in it; only EPC is looked up per address. Identifiers with
+        no recognisable postcode fall back to get_property_summary.
+        
+        Args:
+            identifiers: Addresses or postcodes
+            search_type: Type of identifier ('address' or 'postcode')
+            max_concurrency: Maximum summaries being built at once
+            
+        Yields:
+            Dicts with index, identifier, success and data (the summary) or error,
+            in completion order
+        """
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        postcode_lookups: Dict[Tuple[str, str], asyncio.Task] = {}
+        
+        def shared(kind: str, postcode: str, factory: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+            key = (kind, postcode)
+            if key not in postcode_lookups:
+                postcode_lookups[key] = asyncio.ensure_future(factory())
+            return postcode_lookups[key]
+        
+        async def build(identifier: str) -> Optional[PropertySummary]:
+            async with semaphore:
+                postcode = (
+                    identifier if search_type == 'postcode'
+                    else self._extract_postcode_from_address(identifier)
+                )
+                if not postcode:
+                    return await self.get_property_summary(identifier, search_type)
+                
+                # Canonical 'OX1 2AB' form so spacing variants share lookups
+                compact = ''.join(postcode.split()).upper()
+                postcode = f"{compact[:-3]} {compact[-3:]}"
+                
+                land_registry_data, flood_risk_data, planning_data, epc_data = await asyncio.gather(
+                    shared('land_registry', postcode,
+                           lambda: self._get_land_registry_data(postcode, 'postcode')),
+                    shared('flood_risk', postcode,
+                           lambda: self._get_flood_risk_data(postcode, 'postcode')),
+                    shared('planning_history', postcode,
+                           lambda: self._get_planning_history_data(postcode, 'postcode', BATCH_PLANNING_RADIUS_M)),
+                    self._get_epc_data(identifier, search_type)
+                )
+                
+                report = await self._compile_comprehensive_report(
+                    identifier, search_type, land_registry_data,
+                    epc_data, flood_risk_data, planning_data
+                )
+                return self._extract_property_summary(report)
+        
+        # One build per distinct identifier, fanned back out to every position
+        positions: Dict[str, List[int]] = {}
+        for index, identifier in enumerate(identifiers):
+            positions.setdefault(identifier.strip(), []).append(index)
+        
+        async def run(identifier: str) -> Tuple[str, Optional[PropertySummary], Optional[str]]:
+            try:
+                return identifier, await build(identifier), None
+            except Exception as e:
+                self.logger.warning(f"Batch summary failed for {identifier}: {e}")
+                return identifier, None, str(e)
+        
+        tasks = [asyncio.ensure_future(run(identifier)) for identifier in positions]
+        
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                identifier, summary, error = await next_done
+                for index in positions[identifier]:
+                    if error is not None:
+                        yield {'index': index, 'identifier': identifier, 'success': False, 'error': error}
+                    else:
+                        yield {
+                            'index': index,
+                            'identifier': identifier,
+                            'success': summary is not None,
+                            'data': asdict(summary) if summary else None
+                        }
+        finally:
+            # Client disconnected or consumer stopped early
+            for task in tasks + list(postcode_lookups.values()):
+                task.cancel()
+    
     async def get_comparable_properties(
         self,
         identifier: str,
@@ -799,6 +916,24 @@ class PropertyDataAggregator:
         return None
 
 
+def _has_source_data(report: Dict[str, Any]) -> bool:
+    """Whether any source contributed to a report; empty reports aren't cached"""
+    return any(report['report_metadata']['data_sources'].values())
+
+
+async def _generate_report_detached(
+    identifier: str,
+    search_type: str,
+    include_planning_radius: int
+) -> Dict[str, Any]:
+    """Build a report with its own adapters (shared flights outlive the caller's)"""
+    
+    async with PropertyDataAggregator() as aggregator:
+        return await aggregator._generate_comprehensive_report(
+            identifier, search_type, include_planning_radius
+        )
+
+
 # Convenience function for comprehensive property reports
 async def get_comprehensive_property_report(
     identifier: str,
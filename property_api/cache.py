@@ -3,14 +3,49 @@ Property Data Cache System
 Manages caching for all property API data with configurable TTL and storage backends
 """
 import asyncio
+import functools
 import json
 import hashlib
-from typing import Any, Dict, Optional, Union
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
 from datetime import datetime, timedelta
 import aiofiles
 import os
+import zlib
 from pathlib import Path
 
+try:
+    import redis.asyncio as redis_async
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis_async = None
+
+
+# Default directory shared by the file-backed caches
+DEFAULT_CACHE_DIR = "/tmp/domus_property_cache"
+
+# Redis tier settings
+REDIS_KEY_PREFIX = "domus:property_cache:"
+L1_MAX_ENTRIES = 1000
+L1_TTL_SECONDS = 300
+
+# Serialised payloads above this size are zlib-compressed; the first byte
+# records the encoding
+COMPRESS_MIN_BYTES = 1024
+_RAW, _ZLIB = b"j", b"z"
+
+# Key marking a stale-while-revalidate envelope written by get_or_compute
+SWR_FRESH_UNTIL = '__swr_fresh_until__'
+
+logger = logging.getLogger(__name__)
+
+# Eviction stops once the file cache is back under this share of max_size_mb
+FILE_CACHE_LOW_WATER = 0.8
+
 
 class PropertyDataCache:
     """
@@ -22,7 +57,12 @@ class PropertyDataCache:
         cache_name: str,
         ttl_hours: int = 24,
         backend: str = 'file',
-        max_size_mb: int = 100
+        max_size_mb: int = 100,
+        cache_dir: Optional[str] = None,
+        redis_client: Optional[Any] = None,
+        redis_url: Optional[str] = None,
+        l1_max_entries: int = L1_MAX_ENTRIES,
+        l1_ttl_seconds: int = L1_TTL_SECONDS
     ):
         """
         Initialize cache system
@@ -32,6 +72,13 @@ class PropertyDataCache:
             ttl_hours: Time to live in hours
             backend: Storage backend ('file', 'memory', 'redis')
             max_size_mb: Maximum cache size in megabytes
+            cache_dir: Directory for the file backend
+            redis_client: redis.asyncio-compatible client for the redis backend
+                (created from redis_url / REDIS_URL if not given)
+            redis_url: Redis URL for the redis backend
+            l1_max_entries: Per-process memory tier size for the redis backend
+            l1_ttl_seconds: Longest an entry is served from the memory tier
+                before Redis is consulted again
         """
         self.cache_name = cache_name
         self.ttl_hours = ttl_hours
@@ -39,20 +86,46 @@ class PropertyDataCache:
         self.max_size_mb = max_size_mb
         
         # File-based cache settings
-        self.cache_dir = Path("/tmp/domus_property_cache")
-        self.cache_dir.mkdir(exist_ok=True)
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # File cache index: file name -> (size bytes, expiry timestamp), in
+        # LRU order (least recently used first). Built from one directory
+        # scan on first use, then maintained on every get/set/delete.
+        self._file_index: Optional[OrderedDict[str, Tuple[int, float]]] = None
+        self._file_bytes = 0
         
         # In-memory cache
         self._memory_cache: Dict[str, Dict[str, Any]] = {}
         self._access_times: Dict[str, datetime] = {}
         
+        # Redis backend: bounded per-process L1 (key -> (expiry timestamp,
+        # value), LRU order) in front of the shared L2 Redis tier
+        self._redis = redis_client
+        self._redis_url = redis_url or os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        self._l1: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self.l1_max_entries = l1_max_entries
+        self.l1_ttl_seconds = l1_ttl_seconds
+        
         # Cache statistics
         self.stats = {
             'hits': 0,
             'misses': 0,
             'sets': 0,
-            'evictions': 0
+            'evictions': 0,
+            'directory_scans': 0,
+            'l1_hits': 0,
+            'l2_hits': 0,
+            'redis_round_trips': 0,
+            'redis_errors': 0,
+            'coalesced': 0,
+            'stale_served': 0,
+            'refreshes': 0
         }
+        
+        # Single-flight: cache key -> in-progress computation
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
     
     async def get(self, key: str) -> Optional[Any]:
         """
@@ -110,6 +183,161 @@ class PropertyDataCache:
             print(f"Cache set error for key {key}: {e}")
             return False
     
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_hours: Optional[float] = None,
+        stale_ttl_hours: Optional[float] = None,
+        refresh: Optional[Callable[[], Awaitable[Any]]] = None,
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Get a value, computing it on a miss
+        
+        Concurrent misses for the same key share one in-flight computation
+        (single-flight, per process). With stale_ttl_hours, entries are kept
+        that much longer than ttl_hours; a caller hitting an expired entry
+        gets it immediately while one background refresh runs.
+        
+        Args:
+            key: Cache key
+            compute: Coroutine factory producing the value (None is not cached)
+            ttl_hours: Freshness period, defaults to instance TTL
+            stale_ttl_hours: How long past expiry a value may still be served
+            refresh: Coroutine factory for background refreshes, for when
+                compute depends on the caller's lifetime (defaults to compute)
+            cacheable: Predicate a computed value must pass to be stored;
+                values failing it are returned but not cached
+            
+        Returns:
+            Cached, stale or freshly computed value
+        """
+        
+        ttl = ttl_hours or self.ttl_hours
+        entry = await self.get(key)
+        
+        if entry is not None:
+            if not (isinstance(entry, dict) and SWR_FRESH_UNTIL in entry):
+                return entry
+            
+            if entry[SWR_FRESH_UNTIL] > time.time():
+                return entry['value']
+            
+            # Stale - serve it and revalidate once in the background
+            self.stats['stale_served'] += 1
+            if self._current_flight(key) is None:
+                self.stats['refreshes'] += 1
+                task = self._start_flight(key, refresh or compute, ttl, stale_ttl_hours, cacheable)
+                self._background.add(task)
+                task.add_done_callback(self._refresh_done)
+            return entry['value']
+        
+        flight = self._current_flight(key)
+        if flight is not None:
+            self.stats['coalesced'] += 1
+        else:
+            flight = self._start_flight(key, compute, ttl, stale_ttl_hours, cacheable)
+        
+        # Shield so one cancelled caller does not cancel the shared computation
+        return await asyncio.shield(flight)
+    
+    def _current_flight(self, key: str) -> Optional[asyncio.Task]:
+        flight = self._inflight.get(key)
+        if flight is None or flight.done() or flight.get_loop() is not asyncio.get_running_loop():
+            return None
+        return flight
+    
+    def _start_flight(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_hours: float,
+        stale_ttl_hours: Optional[float],
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> asyncio.Task:
+        """Run compute once and store its result; registered as the key's flight"""
+        
+        async def run() -> Any:
+            try:
+                value = await compute()
+                if value is not None and (cacheable is None or cacheable(value)):
+                    if stale_ttl_hours:
+                        envelope = {SWR_FRESH_UNTIL: time.time() + ttl_hours * 3600, 'value': value}
+                        await self.set(key, envelope, ttl_hours + stale_ttl_hours)
+                    else:
+                        await self.set(key, value, ttl_hours)
+                return value
+            finally:
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+        
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        return task
+    
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # The stale value stays in place until the next attempt
+            logger.warning(f"Background refresh failed for {self.cache_name}: {task.exception()}")
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Get several values at once
+        
+        The redis backend answers from the memory tier first and fetches the
+        rest with a single MGET; other backends look keys up one by one.
+        
+        Args:
+            keys: Cache keys
+            
+        Returns:
+            Dict of key -> value for the keys that were found
+        """
+        
+        if self.backend not in ('file', 'memory'):
+            try:
+                return await self._get_many_from_redis(keys)
+            except Exception as e:
+                print(f"Cache get_many error: {e}")
+                self.stats['misses'] += len(keys)
+                return {}
+        
+        found = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+    
+    async def set_many(self, items: Dict[str, Any], ttl_hours: Optional[int] = None) -> bool:
+        """
+        Set several values at once (one pipelined round trip on redis)
+        
+        Args:
+            items: Dict of key -> value
+            ttl_hours: Custom TTL, defaults to instance TTL
+            
+        Returns:
+            True if every value was cached
+        """
+        
+        ttl = ttl_hours or self.ttl_hours
+        
+        if self.backend not in ('file', 'memory'):
+            try:
+                success = await self._set_many_to_redis(items, ttl)
+            except Exception as e:
+                print(f"Cache set_many error: {e}")
+                return False
+            if success:
+                self.stats['sets'] += len(items)
+            return success
+        
+        results = [await self.set(key, value, ttl) for key, value in items.items()]
+        return all(results)
+    
     async def delete(self, key: str) -> bool:
         """
         Delete value from cache
@@ -163,20 +391,28 @@ class PropertyDataCache:
         
         cache_size = await self._get_cache_size()
         
-        return {
+        stats = {
             **self.stats,
             'hit_rate_percent': round(hit_rate, 2),
             'cache_size_mb': round(cache_size, 2),
             'backend': self.backend,
             'ttl_hours': self.ttl_hours
         }
+        
+        if self.backend == 'file':
+            stats['indexed_files'] = len(self._load_file_index())
+        elif self.backend not in ('memory',):
+            stats['l1_entries'] = len(self._l1)
+        
+        return stats
     
     def _generate_cache_key(self, key: str) -> str:
         """Generate standardized cache key"""
         full_key = f"{self.cache_name}:{key}"
-        # Hash long keys to avoid filesystem limitations
+        # Hash long keys to avoid filesystem limitations, keeping the namespace
+        # so the file backend can recognise its own entries
         if len(full_key) > 200:
-            return hashlib.md5(full_key.encode()).hexdigest()
+            return f"{self.cache_name}:{hashlib.md5(full_key.encode()).hexdigest()}"
         return full_key.replace('/', '_').replace('\\', '_')
     
     def _generate_cache_path(self, key: str) -> Path:
@@ -184,36 +420,112 @@ class PropertyDataCache:
         cache_key = self._generate_cache_key(key)
         return self.cache_dir / f"{cache_key}.json"
     
+    def _load_file_index(self) -> "OrderedDict[str, Tuple[int, float]]":
+        """
+        File cache index, rebuilt from a single directory scan on first use
+        
+        Expiry is stored as each file's mtime (see _set_to_file), so one
+        scandir pass recovers size and expiry without opening any file.
+        Recovered entries start in expiry order as an approximation of LRU.
+        """
+        
+        if self._file_index is not None:
+            return self._file_index
+        
+        entries = []
+        prefix = f"{self.cache_name}:"
+        self.stats['directory_scans'] += 1
+        
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not (entry.name.startswith(prefix) and entry.name.endswith('.json')):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+        except FileNotFoundError:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        entries.sort()
+        self._file_index = OrderedDict((name, (size, expires)) for expires, name, size in entries)
+        self._file_bytes = sum(size for _, _, size in entries)
+        
+        return self._file_index
+    
+    def _index_file(self, name: str, size: int, expires: float) -> None:
+        """Add or refresh an index entry as most recently used"""
+        
+        index = self._load_file_index()
+        previous = index.pop(name, None)
+        if previous is not None:
+            self._file_bytes -= previous[0]
+        
+        index[name] = (size, expires)
+        self._file_bytes += size
+    
+    def _drop_file(self, name: str) -> None:
+        """Remove a cache file and its index entry"""
+        
+        index = self._load_file_index()
+        previous = index.pop(name, None)
+        if previous is not None:
+            self._file_bytes -= previous[0]
+        
+        (self.cache_dir / name).unlink(missing_ok=True)
+    
     async def _get_from_file(self, key: str) -> Optional[Any]:
         """Get value from file cache"""
         
         cache_path = self._generate_cache_path(key)
+        name = cache_path.name
+        index = self._load_file_index()
         
-        if not cache_path.exists():
+        entry = index.get(name)
+        if entry is not None and entry[1] < time.time():
+            # Expired - no need to read it
+            self._drop_file(name)
             self.stats['misses'] += 1
             return None
         
+        # Files written by other processes sharing the directory are not in
+        # this index yet, so a miss still checks the filesystem
         try:
             async with aiofiles.open(cache_path, 'r') as f:
                 content = await f.read()
-                cache_data = json.loads(content)
+        except FileNotFoundError:
+            if entry is not None:
+                self._drop_file(name)
+            self.stats['misses'] += 1
+            return None
+        
+        try:
+            cache_data = json.loads(content)
             
             # Check expiry
             expiry = datetime.fromisoformat(cache_data['expires'])
             if datetime.now() > expiry:
                 # Expired - delete file
-                cache_path.unlink(missing_ok=True)
+                self._drop_file(name)
                 self.stats['misses'] += 1
                 return None
             
-            self.stats['hits'] += 1
-            return cache_data['value']
-            
         except Exception as e:
             # Clean up corrupted cache file
-            cache_path.unlink(missing_ok=True)
+            self._drop_file(name)
             self.stats['misses'] += 1
             return None
+        
+        # Mark as most recently used
+        if entry is not None:
+            index.move_to_end(name)
+        else:
+            self._index_file(name, len(content.encode()), expiry.timestamp())
+        
+        self.stats['hits'] += 1
+        return cache_data['value']
     
     async def _set_to_file(self, key: str, value: Any, ttl_hours: int) -> bool:
         """Set value in file cache"""
@@ -228,26 +540,38 @@ class PropertyDataCache:
             'ttl_hours': ttl_hours
         }
         
+        # Write to a temp file and rename so readers (including other
+        # workers) never see a partially written entry
+        temp_path = self.cache_dir / f".{cache_path.name}.{uuid.uuid4().hex}.tmp"
+        
         try:
-            async with aiofiles.open(cache_path, 'w') as f:
-                await f.write(json.dumps(cache_data, indent=2))
+            payload = json.dumps(cache_data, indent=2).encode()
+            
+            async with aiofiles.open(temp_path, 'wb') as f:
+                await f.write(payload)
             
-            # Clean up old cache files if approaching size limit
+            # mtime carries the expiry so the index can be rebuilt from stat alone
+            expires_ts = expires.timestamp()
+            os.utime(temp_path, (time.time(), expires_ts))
+            os.replace(temp_path, cache_path)
+            
+            self._index_file(cache_path.name, len(payload), expires_ts)
+            
+            # Evict least recently used entries if over the size limit
             await self._cleanup_file_cache()
             
             return True
             
         except Exception as e:
+            temp_path.unlink(missing_ok=True)
             print(f"Error writing cache file: {e}")
             return False
     
     async def _delete_from_file(self, key: str) -> bool:
         """Delete from file cache"""
         
-        cache_path = self._generate_cache_path(key)
-        
         try:
-            cache_path.unlink(missing_ok=True)
+            self._drop_file(self._generate_cache_path(key).name)
             return True
         except Exception:
             return False
@@ -256,9 +580,8 @@ class PropertyDataCache:
         """Clear file cache for this cache name"""
         
         try:
-            pattern = f"{self.cache_name}:*"
-            for cache_file in self.cache_dir.glob(f"{self.cache_name}_*.json"):
-                cache_file.unlink(missing_ok=True)
+            for name in list(self._load_file_index()):
+                self._drop_file(name)
             return True
         except Exception:
             return False
@@ -332,54 +655,185 @@ class PropertyDataCache:
         
         return True
     
+    def _redis_client(self):
+        """Shared Redis client, created on first use"""
+        
+        if self._redis is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package is not installed")
+            self._redis = redis_async.from_url(self._redis_url)
+        return self._redis
+    
+    def _redis_key(self, key: str) -> str:
+        return REDIS_KEY_PREFIX + self._generate_cache_key(key)
+    
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        """Compact JSON, zlib-compressed when large"""
+        
+        raw = json.dumps(value, separators=(',', ':'), default=str).encode()
+        if len(raw) >= COMPRESS_MIN_BYTES:
+            return _ZLIB + zlib.compress(raw, 6)
+        return _RAW + raw
+    
+    @staticmethod
+    def _decode(payload: bytes) -> Any:
+        if payload[:1] == _ZLIB:
+            return json.loads(zlib.decompress(payload[1:]))
+        return json.loads(payload[1:])
+    
+    def _l1_get(self, cache_key: str) -> Optional[Any]:
+        entry = self._l1.get(cache_key)
+        if entry is None:
+            return None
+        
+        expires, value = entry
+        if expires < time.time():
+            del self._l1[cache_key]
+            return None
+        
+        self._l1.move_to_end(cache_key)
+        return value
+    
+    def _l1_set(self, cache_key: str, value: Any, ttl_seconds: float) -> None:
+        self._l1[cache_key] = (time.time() + min(ttl_seconds, self.l1_ttl_seconds), value)
+        self._l1.move_to_end(cache_key)
+        
+        while len(self._l1) > self.l1_max_entries:
+            self._l1.popitem(last=False)
+            self.stats['evictions'] += 1
+    
     async def _get_from_redis(self, key: str) -> Optional[Any]:
-        """Get value from Redis cache (placeholder)"""
-        # This would implement Redis integration
-        # For now, fall back to memory cache
-        return await self._get_from_memory(key)
+        """Get value from the memory tier, falling back to Redis"""
+        return (await self._get_many_from_redis([key])).get(key)
+    
+    async def _get_many_from_redis(self, keys: List[str]) -> Dict[str, Any]:
+        """Memory tier lookups, then one MGET for the remaining keys"""
+        
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        
+        for key in keys:
+            value = self._l1_get(self._redis_key(key))
+            if value is not None:
+                found[key] = value
+                self.stats['l1_hits'] += 1
+            else:
+                missing.append(key)
+        
+        if missing:
+            redis_keys = [self._redis_key(key) for key in missing]
+            try:
+                self.stats['redis_round_trips'] += 1
+                async with self._redis_client().pipeline(transaction=False) as pipe:
+                    pipe.mget(redis_keys)
+                    for redis_key in redis_keys:
+                        pipe.pttl(redis_key)
+                    payloads, *ttls_ms = await pipe.execute()
+            except Exception as e:
+                # Degrade to the memory tier rather than failing the lookup
+                print(f"Redis cache unavailable for {self.cache_name}: {e}")
+                self.stats['redis_errors'] += 1
+                payloads, ttls_ms = [], []
+            
+            for key, redis_key, payload, ttl_ms in zip(missing, redis_keys, payloads, ttls_ms):
+                if payload is None:
+                    continue
+                value = self._decode(payload)
+                found[key] = value
+                self.stats['l2_hits'] += 1
+                self._l1_set(redis_key, value, ttl_ms / 1000 if ttl_ms > 0 else self.l1_ttl_seconds)
+        
+        self.stats['hits'] += len(found)
+        self.stats['misses'] += len(keys) - len(found)
+        return found
     
     async def _set_to_redis(self, key: str, value: Any, ttl_hours: int) -> bool:
-        """Set value in Redis cache (placeholder)"""
-        # This would implement Redis integration
-        # For now, fall back to memory cache
-        return await self._set_to_memory(key, value, ttl_hours)
+        """Set value in Redis and the memory tier"""
+        return await self._set_many_to_redis({key: value}, ttl_hours)
+    
+    async def _set_many_to_redis(self, items: Dict[str, Any], ttl_hours: int) -> bool:
+        """Pipelined SETEX for every item, mirrored into the memory tier"""
+        
+        ttl_seconds = int(ttl_hours * 3600)
+        if ttl_seconds <= 0:
+            return False
+        
+        encoded = {self._redis_key(key): self._encode(value) for key, value in items.items()}
+        for (redis_key, _), value in zip(encoded.items(), items.values()):
+            self._l1_set(redis_key, value, ttl_seconds)
+        
+        try:
+            self.stats['redis_round_trips'] += 1
+            async with self._redis_client().pipeline(transaction=False) as pipe:
+                for redis_key, payload in encoded.items():
+                    pipe.set(redis_key, payload, ex=ttl_seconds)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            # The memory tier still serves this worker
+            print(f"Redis cache unavailable for {self.cache_name}: {e}")
+            self.stats['redis_errors'] += 1
+            return False
     
     async def _delete_from_redis(self, key: str) -> bool:
-        """Delete from Redis cache (placeholder)"""
-        # This would implement Redis integration
-        return await self._delete_from_memory(key)
+        """Delete from Redis and the memory tier"""
+        
+        redis_key = self._redis_key(key)
+        self._l1.pop(redis_key, None)
+        
+        self.stats['redis_round_trips'] += 1
+        await self._redis_client().delete(redis_key)
+        return True
     
     async def _clear_redis_cache(self) -> bool:
-        """Clear Redis cache (placeholder)"""
-        # This would implement Redis integration
-        return await self._clear_memory_cache()
+        """Clear this cache's keys from Redis and the memory tier"""
+        
+        self._l1.clear()
+        
+        client = self._redis_client()
+        pattern = f"{REDIS_KEY_PREFIX}{self.cache_name}:*"
+        batch = []
+        async for redis_key in client.scan_iter(match=pattern, count=500):
+            batch.append(redis_key)
+            if len(batch) >= 500:
+                self.stats['redis_round_trips'] += 1
+                await client.unlink(*batch)
+                batch = []
+        if batch:
+            self.stats['redis_round_trips'] += 1
+            await client.unlink(*batch)
+        
+        return True
     
-    async def _cleanup_file_cache(self):
-        """Clean up old file cache entries"""
+    async def _cleanup_file_cache(self, purge_expired: bool = False):
+        """
+        Evict file cache entries using the in-process index
+        
+        Pops least recently used entries until the cache is back under the
+        low-water mark; each entry is evicted at most once per insert, so
+        eviction is amortised O(1) per set. With purge_expired, expired
+        entries are swept first (periodic cleanup).
+        """
         
         try:
-            cache_size = await self._get_cache_size()
+            index = self._load_file_index()
             
-            if cache_size > self.max_size_mb:
-                # Get all cache files with their modification times
-                cache_files = []
-                for cache_file in self.cache_dir.glob("*.json"):
-                    try:
-                        stat = cache_file.stat()
-                        cache_files.append((cache_file, stat.st_mtime))
-                    except:
-                        continue
-                
-                # Sort by modification time (oldest first)
-                cache_files.sort(key=lambda x: x[1])
-                
-                # Delete oldest files until under size limit
-                for cache_file, _ in cache_files:
-                    if await self._get_cache_size() <= self.max_size_mb * 0.8:
-                        break
-                    
-                    cache_file.unlink(missing_ok=True)
+            if purge_expired:
+                now = time.time()
+                for name in [n for n, (_, expires) in index.items() if expires < now]:
+                    self._drop_file(name)
                     self.stats['evictions'] += 1
+            
+            limit = self.max_size_mb * 1024 * 1024
+            if self._file_bytes <= limit:
+                return
+            
+            low_water = limit * FILE_CACHE_LOW_WATER
+            while index and self._file_bytes > low_water:
+                name = next(iter(index))
+                self._drop_file(name)
+                self.stats['evictions'] += 1
                     
         except Exception as e:
             print(f"Error during cache cleanup: {e}")
@@ -422,13 +876,8 @@ class PropertyDataCache:
         """Get cache size in MB"""
         
         if self.backend == 'file':
-            total_size = 0
-            for cache_file in self.cache_dir.glob("*.json"):
-                try:
-                    total_size += cache_file.stat().st_size
-                except:
-                    continue
-            return total_size / (1024 * 1024)  # Convert to MB
+            self._load_file_index()
+            return self._file_bytes / (1024 * 1024)  # Convert to MB
         
         elif self.backend == 'memory':
             # Rough estimation
@@ -453,7 +902,7 @@ class CacheManager:
         # Default cache configurations
         self.cache_configs = {
             'land_registry': {'ttl_hours': 24, 'backend': 'file'},
-            'epc_data': {'ttl_hours': 12, 'backend': 'file'},
+            'epc_data': {'ttl_hours': 24, 'backend': 'file'},
             'flood_risk': {'ttl_hours': 24, 'backend': 'file'},
             'planning_history': {'ttl_hours': 6, 'backend': 'file'},  # More frequent updates
             'postcode_geocoding': {'ttl_hours': 168, 'backend': 'memory'},  # 7 days, rarely changes
@@ -474,10 +923,13 @@ class CacheManager:
         if cache_name not in self.caches:
             config = self.cache_configs.get(cache_name, {})
             
+            # PROPERTY_CACHE_BACKEND=redis shares every cache across workers
+            backend = os.getenv('PROPERTY_CACHE_BACKEND') or config.get('backend', 'file')
+            
             self.caches[cache_name] = PropertyDataCache(
                 cache_name=cache_name,
                 ttl_hours=config.get('ttl_hours', 24),
-                backend=config.get('backend', 'file'),
+                backend=backend,
                 max_size_mb=config.get('max_size_mb', 100)
             )
         
@@ -507,9 +959,10 @@ class CacheManager:
         cleanup_tasks = []
         for cache in self.caches.values():
             if cache.backend == 'file':
-                cleanup_tasks.append(cache._cleanup_file_cache())
+                cleanup_tasks.append(cache._cleanup_file_cache(purge_expired=True))
             elif cache.backend == 'memory':
                 cleanup_tasks.append(cache._cleanup_memory_cache())
+            # Redis expires entries itself; the memory tier is size-bounded
         
         if cleanup_tasks:
             await asyncio.gather(*cleanup_tasks, return_exceptions=True)
@@ -536,41 +989,44 @@ async def clear_all_caches() -> Dict[str, bool]:
 
 
 # Cache decorators
-def cached(cache_name: str, ttl_hours: int = 24, key_func=None):
+def cached(
+    cache_name: str,
+    ttl_hours: int = 24,
+    key_func=None,
+    stale_ttl_hours: Optional[float] = None
+):
     """
     Decorator to cache function results
     
+    Concurrent calls that miss on the same key share one execution; see
+    PropertyDataCache.get_or_compute.
+    
     Args:
         cache_name: Name of the cache to use
         ttl_hours: Time to live in hours
         key_func: Function to generate cache key from args
+        stale_ttl_hours: Serve expired results this much longer while
+            refreshing in the background
     """
     def decorator(func):
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
             # Generate cache key
             if key_func:
                 cache_key = key_func(*args, **kwargs)
             else:
                 # Simple key based on function name and args
-                import hashlib
                 key_parts = [func.__name__] + [str(arg) for arg in args]
                 key_parts.extend([f"{k}={v}" for k, v in sorted(kwargs.items())])
                 cache_key = hashlib.md5('_'.join(key_parts).encode()).hexdigest()
             
-            # Try to get from cache
             cache = get_cache(cache_name)
-            cached_result = await cache.get(cache_key)
-            
-            if cached_result is not None:
-                return cached_result
-            
-            # Execute function and cache result
-            result = await func(*args, **kwargs)
-            
-            if result is not None:
-                await cache.set(cache_key, result, ttl_hours)
-            
-            return result
+            return await cache.get_or_compute(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                ttl_hours=ttl_hours,
+                stale_ttl_hours=stale_ttl_hours
+            )
         
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
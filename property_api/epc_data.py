@@ -10,7 +10,8 @@ from datetime import datetime, timedelta
 import re
 from dataclasses import dataclass, asdict
 
-from .cache import PropertyDataCache
+from .cache import get_cache
+from .upstream import upstream_pool
 
 
 @dataclass
@@ -72,42 +73,30 @@ class EPCDataAdapter:
         }
         
         self.session: Optional[aiohttp.ClientSession] = None
-        self.cache = PropertyDataCache('epc_data', ttl_hours=24)
-        self.rate_limit_delay = 0.5  # Seconds between requests
-        self.last_request_time = 0
+        self.cache = get_cache('epc_data')
+        self.limiter = upstream_pool.get_limiter('epc_data')
         
         # API authentication (would be configured via environment variables)
         self.api_key = None  # Set via environment variable in production
         
     async def __aenter__(self):
-        headers = {
-            'User-Agent': 'Domus-Planning-AI/1.0',
-            'Accept': 'application/json'
-        }
+        headers = {}
         
         # Add authentication header if API key available
         if self.api_key:
             headers['Authorization'] = f'Basic {self.api_key}'
         
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=30),
-            headers=headers
-        )
+        # Process-wide pooled session (keep-alive, DNS cache)
+        self.session = upstream_pool.get_session('epc_data', timeout_seconds=30, headers=headers)
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        # The shared session outlives this adapter; see close_upstream_sessions()
+        self.session = None
     
     async def _rate_limit(self):
-        """Enforce rate limiting between API calls"""
-        current_time = asyncio.get_event_loop().time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.rate_limit_delay:
-            await asyncio.sleep(self.rate_limit_delay - time_since_last)
-        
-        self.last_request_time = asyncio.get_event_loop().time()
+        """Wait for the shared per-upstream token bucket"""
+        await self.limiter.acquire()
     
     async def get_epc_by_postcode(
         self, 
@@ -10,7 +10,8 @@ from datetime import datetime, timedelta
 import re
 from dataclasses import dataclass, asdict
 
-from .cache import PropertyDataCache
+from .cache import get_cache
+from .upstream import upstream_pool
 
 
 @dataclass
@@ -56,33 +57,21 @@ class LandRegistryAdapter:
             'uk_companies': 'https://landregistry.data.gov.uk/data/cc/'
         }
         self.session: Optional[aiohttp.ClientSession] = None
-        self.cache = PropertyDataCache('land_registry', ttl_hours=24)
-        self.rate_limit_delay = 1.0  # Seconds between requests
-        self.last_request_time = 0
+        self.cache = get_cache('land_registry')
+        self.limiter = upstream_pool.get_limiter('land_registry')
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=30),
-            headers={
-                'User-Agent': 'Domus-Planning-AI/1.0',
-                'Accept': 'application/json'
-            }
-        )
+        # Process-wide pooled session (keep-alive, DNS cache)
+        self.session = upstream_pool.get_session('land_registry', timeout_seconds=30)
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        # The shared session outlives this adapter; see close_upstream_sessions()
+        self.session = None
     
     async def _rate_limit(self):
-        """Enforce rate limiting between API calls"""
-        current_time = asyncio.get_event_loop().time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.rate_limit_delay:
-            await asyncio.sleep(self.rate_limit_delay - time_since_last)
-        
-        self.last_request_time = asyncio.get_event_loop().time()
+        """Wait for the shared per-upstream token bucket"""
+        await self.limiter.acquire()
     
     async def get_title_data(self, title_number: str) -> Optional[LandRegistryTitle]:
         """
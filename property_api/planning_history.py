@@ -10,7 +10,8 @@ from datetime import datetime, timedelta
 import re
 from dataclasses import dataclass, asdict
 
-from .cache import PropertyDataCache
+from .cache import get_cache
+from .upstream import upstream_pool
 
 
 @dataclass
@@ -72,9 +73,8 @@ class PlanningHistoryAdapter:
         }
         
         self.session: Optional[aiohttp.ClientSession] = None
-        self.cache = PropertyDataCache('planning_history', ttl_hours=6)  # Shorter TTL for planning data
-        self.rate_limit_delay = 2.0  # Conservative rate limiting
-        self.last_request_time = 0
+        self.cache = get_cache('planning_history')
+        self.limiter = upstream_pool.get_limiter('planning_history')
         
         # Authority system mappings (simplified - would be comprehensive in production)
         self.authority_systems = {
@@ -86,28 +86,17 @@ class PlanningHistoryAdapter:
         }
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=45),
-            headers={
-                'User-Agent': 'Domus-Planning-AI/1.0',
-                'Accept': 'application/json'
-            }
-        )
+        # Process-wide pooled session (keep-alive, DNS cache)
+        self.session = upstream_pool.get_session('planning_history', timeout_seconds=45)
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        # The shared session outlives this adapter; see close_upstream_sessions()
+        self.session = None
     
     async def _rate_limit(self):
-        """Enforce rate limiting between API calls"""
-        current_time = asyncio.get_event_loop().time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.rate_limit_delay:
-            await asyncio.sleep(self.rate_limit_delay - time_since_last)
-        
-        self.last_request_time = asyncio.get_event_loop().time()
+        """Wait for the shared per-upstream token bucket"""
+        await self.limiter.acquire()
     
     async def get_planning_history_by_address(
         self, 
@@ -3,8 +3,11 @@ Property API FastAPI Router
 Provides REST endpoints for external property data integration
 """
 from fastapi import APIRouter, HTTPException, Query, Path, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncIterator
+from datetime import datetime
+import json
 import logging
 
 from . import (
@@ -16,6 +19,7 @@ from . import (
     get_planning_history,
     cache_stats,
     clear_all_caches,
+    close_upstream_sessions,
     PropertyDataAggregator
 )
 
@@ -42,6 +46,12 @@ class PlanningSearchRequest(PropertySearchRequest):
     years_back: int = Field(10, description="Years of history to retrieve", ge=1, le=20)
 
 
+class BatchStreamRequest(BaseModel):
+    identifiers: List[str] = Field(..., description="Addresses or postcodes", min_length=1, max_length=1000)
+    search_type: str = Field("address", description="Type of identifier", pattern="^(address|postcode)$")
+    max_concurrency: int = Field(10, description="Summaries built concurrently", ge=1, le=50)
+
+
 class FloodRiskResponse(BaseModel):
     postcode: str
     coordinates: Optional[tuple] = None
@@ -52,6 +62,12 @@ class FloodRiskResponse(BaseModel):
     recommendations: List[str]
 
 
+@router.on_event("shutdown")
+async def close_property_api_sessions():
+    """Close the pooled upstream HTTP sessions"""
+    await close_upstream_sessions()
+
+
 # Health check endpoint
 @router.get("/health", summary="Health Check")
 async def health_check():
@@ -400,6 +416,41 @@ async def batch_property_summaries(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.post("/batch/summaries/stream",
+            summary="Stream Portfolio Property Summaries",
+            description="Summaries for up to 1000 properties, streamed as NDJSON as each completes")
+async def stream_batch_property_summaries(request: BatchStreamRequest) -> StreamingResponse:
+    """
+    Stream summaries for a portfolio of properties
+    
+    One JSON object per line: a result row per identifier (with its index in
+    the request) in completion order, then a final summary row. Postcode-level
+    lookups are shared across addresses in the same postcode.
+    """
+    
+    async def ndjson_lines() -> AsyncIterator[str]:
+        successful = 0
+        
+        async with PropertyDataAggregator() as aggregator:
+            async for row in aggregator.stream_property_summaries(
+                request.identifiers,
+                search_type=request.search_type,
+                max_concurrency=request.max_concurrency
+            ):
+                successful += row['success']
+                yield json.dumps({'type': 'result', **row}, default=str) + "\n"
+        
+        yield json.dumps({
+            'type': 'summary',
+            'total_requested': len(request.identifiers),
+            'successful': successful,
+            'failed': len(request.identifiers) - successful,
+            'timestamp': datetime.now().isoformat()
+        }) + "\n"
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 # API documentation helper
 @router.get("/",
            summary="Property API Documentation",
@@ -420,7 +471,8 @@ async def api_documentation() -> Dict[str, Any]:
             'planning_history': 'POST /property-api/planning-history - Planning application history',
             'comparables': 'GET /property-api/comparables/{identifier} - Comparable properties',
             'area_stats': 'GET /property-api/area-stats/{postcode} - Area statistics',
-            'batch_summaries': 'POST /property-api/batch/summaries - Multiple property summaries'
+            'batch_summaries': 'POST /property-api/batch/summaries - Multiple property summaries',
+            'batch_summaries_stream': 'POST /property-api/batch/summaries/stream - Portfolio summaries as NDJSON'
         },
         'data_sources': [
             'HM Land Registry',
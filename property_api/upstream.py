@@ -0,0 +1,167 @@
+"""
+Upstream HTTP Pooling
+Process-wide aiohttp sessions and token-bucket rate limiters shared by the property data adapters
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+
+
+# Per-upstream limits: (requests per second, burst size, max concurrent connections).
+# Average rates match the adapters' previous fixed delays between calls.
+UPSTREAM_LIMITS: Dict[str, Tuple[float, int, int]] = {
+    'land_registry': (1.0, 3, 4),
+    'epc_data': (2.0, 4, 4),
+    'flood_risk': (1.0, 3, 4),
+    'planning_history': (0.5, 2, 2)
+}
+
+DEFAULT_LIMITS = (1.0, 2, 2)
+
+# Connector settings shared by every upstream session
+DNS_CACHE_TTL_SECONDS = 300
+KEEPALIVE_TIMEOUT_SECONDS = 30
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Domus-Planning-AI/1.0',
+    'Accept': 'application/json'
+}
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter
+
+    Allows bursts of up to `capacity` requests, refilling at `rate` tokens
+    per second. Waiters are served in arrival order; the lock is only held
+    while waiting for a token, so admitted requests run concurrently.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+        # asyncio.Lock binds to the loop it first waits on
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.stats = {
+            'acquired': 0,
+            'waited': 0,
+            'wait_seconds': 0.0
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def acquire(self) -> None:
+        """Wait for and take one token"""
+
+        async with self._get_lock():
+            self._refill()
+            if self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+                self.stats['waited'] += 1
+                self.stats['wait_seconds'] += wait
+                await asyncio.sleep(wait)
+                self._refill()
+
+            self._tokens -= 1
+            self.stats['acquired'] += 1
+
+
+class UpstreamPool:
+    """
+    One pooled aiohttp session and one rate limiter per upstream
+
+    Sessions keep connections alive and cache DNS lookups across adapter
+    instances and requests. A session is bound to the event loop it was
+    created on, so a new one is made if the running loop changes (e.g.
+    between asyncio.run calls); close_all() closes them on shutdown.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+        self._limiters: Dict[str, TokenBucket] = {}
+
+    def get_limiter(self, upstream: str) -> TokenBucket:
+        """Shared rate limiter for an upstream"""
+
+        if upstream not in self._limiters:
+            rate, burst, _ = UPSTREAM_LIMITS.get(upstream, DEFAULT_LIMITS)
+            self._limiters[upstream] = TokenBucket(rate, burst)
+        return self._limiters[upstream]
+
+    def get_session(
+        self,
+        upstream: str,
+        timeout_seconds: float = 30,
+        headers: Optional[Dict[str, str]] = None
+    ) -> aiohttp.ClientSession:
+        """
+        Shared session for an upstream on the running event loop
+
+        Args:
+            upstream: Upstream name (see UPSTREAM_LIMITS)
+            timeout_seconds: Total request timeout
+            headers: Extra default headers (e.g. authentication)
+        """
+
+        loop = asyncio.get_running_loop()
+
+        session_loop, session = self._sessions.get(upstream, (None, None))
+        if session is None or session.closed or session_loop is not loop:
+            _, _, max_connections = UPSTREAM_LIMITS.get(upstream, DEFAULT_LIMITS)
+            connector = aiohttp.TCPConnector(
+                limit=max_connections,
+                limit_per_host=max_connections,
+                ttl_dns_cache=DNS_CACHE_TTL_SECONDS,
+                keepalive_timeout=KEEPALIVE_TIMEOUT_SECONDS
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=timeout_seconds),
+                headers={**DEFAULT_HEADERS, **(headers or {})}
+            )
+            self._sessions[upstream] = (loop, session)
+
+        return session
+
+    async def close_all(self) -> None:
+        """Close every session created on the running loop (application shutdown)"""
+
+        loop = asyncio.get_running_loop()
+        for upstream in [u for u, (l, _) in self._sessions.items() if l is loop]:
+            _, session = self._sessions.pop(upstream)
+            if not session.closed:
+                await session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Open sessions and limiter statistics per upstream"""
+
+        return {
+            'open_sessions': sum(1 for _, s in self._sessions.values() if not s.closed),
+            'limiters': {name: dict(limiter.stats) for name, limiter in self._limiters.items()}
+        }
+
+
+# Global pool instance
+upstream_pool = UpstreamPool()
+
+
+async def close_upstream_sessions() -> None:
+    """Close the shared upstream sessions"""
+    await upstream_pool.close_all()
@@ -1,3 +1,5 @@
+from text_scanner import MultiPatternScanner, ScanRule
+
 RULES = [
     {"code":"FLOOD_ZONE_2","severity":"medium","needles":["flood zone 2","flood risk 2","flood zone two"]},
     {"code":"LISTED_BUILDING","severity":"high","needles":["listed building"]},
@@ -7,11 +9,14 @@ RULES = [
     {"code":"RADON_AFFECTED","severity":"low","needles":["radon protection","radon affected"]},
     {"code":"ENFORCEMENT_NOTICE","severity":"high","needles":["enforcement notice"]},
 ]
+# Every needle of every rule, matched case-insensitively in one pass
+_SCANNER = MultiPatternScanner(ScanRule(r["code"], tuple(r["needles"])) for r in RULES)
+
 def run(text: str):
-    t = (text or "").lower()
+    hits = _SCANNER.scan(text or "")
     findings, risks = [], []
     for r in RULES:
-        if any(n in t for n in r["needles"]):
+        if r["code"] in hits:
             risks.append({
                 "code": r["code"],
                 "severity": r["severity"],
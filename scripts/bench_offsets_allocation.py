@@ -0,0 +1,81 @@
+"""
+Benchmark the offsets allocation solvers at realistic market sizes.
+
+Single demand: branch and bound vs a greedy baseline (largest listings first,
+capped at max_suppliers). Market: min-cost flow across all demands.
+
+Usage:
+    CANDIDATES=50,200,1000 MARKETS=1000x100,5000x500,20000x5000 python scripts/bench_offsets_allocation.py
+"""
+import os, sys, time, random
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from offsets_marketplace.allocation import (
+    AllocationCandidate, solve_demand_allocation, solve_market_allocation
+)
+
+
+def rand_candidate(rng, i):
+    return AllocationCandidate(
+        listing_id=f"L{i}",
+        units_available=Decimal(rng.randint(5, 200)) / 10,
+        price_per_unit=Decimal(rng.randint(12000, 25000)),
+        minimum_purchase=Decimal("0.1")
+    )
+
+
+def greedy(candidates, required, max_suppliers):
+    """Previous behaviour: take the largest listings first until covered"""
+    remaining, cost, used = required, Decimal("0"), 0
+    for c in sorted(candidates, key=lambda c: c.units_available, reverse=True):
+        if remaining <= 0 or used >= max_suppliers:
+            break
+        take = min(remaining, c.units_available)
+        cost += take * c.price_per_unit
+        remaining -= take
+        used += 1
+    return cost if remaining <= 0 else None
+
+
+def bench_single(sizes, rng):
+    print(f"{'candidates':>10} {'K':>3} {'required':>9} {'greedy £':>14} {'optimal £':>14} "
+          f"{'saving':>7} {'nodes':>8} {'ms':>8} {'proven':>6}")
+    for n in sizes:
+        candidates = [rand_candidate(rng, i) for i in range(n)]
+        for k in (3, 5):
+            required = Decimal(rng.randint(200, 400)) / 10
+            t0 = time.perf_counter()
+            result = solve_demand_allocation(candidates, required, k)
+            ms = (time.perf_counter() - t0) * 1000
+            base = greedy(candidates, required, k)
+            saving = f"{(1 - result.total_cost / base) * 100:.1f}%" if base and result.feasible else "-"
+            print(f"{n:>10} {k:>3} {float(required):>9.1f} {float(base or 0):>14,.0f} "
+                  f"{float(result.total_cost):>14,.0f} {saving:>7} {result.nodes_explored:>8} "
+                  f"{ms:>8.1f} {str(result.optimal):>6}")
+
+
+def bench_market(markets, rng):
+    print(f"\n{'listings':>9} {'demands':>8} {'units req':>10} {'allocated':>10} {'full':>6} "
+          f"{'augments':>9} {'s':>7}")
+    for n_listings, n_demands in markets:
+        supplies = {c.listing_id: c for c in (rand_candidate(rng, i) for i in range(n_listings))}
+        ids = list(supplies)
+        requirements = {f"D{j}": Decimal(rng.randint(10, 300)) / 10 for j in range(n_demands)}
+        compatible = {d: rng.sample(ids, min(50, len(ids))) for d in requirements}
+
+        t0 = time.perf_counter()
+        result = solve_market_allocation(requirements, supplies, compatible, max_suppliers=3)
+        elapsed = time.perf_counter() - t0
+
+        print(f"{n_listings:>9} {n_demands:>8} {float(result.units_required):>10.1f} "
+              f"{float(result.units_allocated):>10.1f} {result.fully_allocated_demands:>6} "
+              f"{result.augmentations:>9} {elapsed:>7.2f}")
+
+
+if __name__ == "__main__":
+    rng = random.Random(int(os.getenv("SEED", "42")))
+    bench_single([int(x) for x in os.getenv("CANDIDATES", "50,200,1000").split(",")], rng)
+    bench_market([tuple(int(v) for v in m.split("x"))
+                  for m in os.getenv("MARKETS", "1000x100,5000x500,20000x5000").split(",")], rng)
@@ -0,0 +1,115 @@
+"""
+Benchmark offsets matching: spatial-index candidate pruning vs full scan,
+and vectorised batch scoring vs per-pair scalar scoring.
+
+Usage:
+    SIZES=1000,10000,100000 DEMANDS=10 MAX_KM=30 python scripts/bench_offsets_matching.py
+"""
+import os, sys, time, random, asyncio
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from offsets_marketplace import (
+    SupplyManager, DemandManager, MatchingEngine, MatchingCriteria,
+    BiodiversityAssessment, HabitatUnit, HabitatType, HabitatCondition, ListingStatus
+)
+from offsets_marketplace.batch_scoring import SCORE_TOLERANCE
+
+# Rough bounding box of England
+LAT_RANGE = (50.5, 54.5)
+LON_RANGE = (-4.0, 0.5)
+
+HABITATS = [h.value for h in HabitatType if h != HabitatType.DEVELOPED_SEALED]
+LOST_HABITATS = [
+    HabitatType.WOODLAND_BROADLEAF, HabitatType.GRASSLAND_SPECIES_RICH,
+    HabitatType.WETLAND_FRESHWATER, HabitatType.HEATHLAND_LOWLAND
+]
+
+
+def rand_coords(rng):
+    return (rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))
+
+
+async def build_market(n_listings, n_demands, seed=42):
+    rng = random.Random(seed)
+    supply, demand = SupplyManager(), DemandManager()
+
+    for i in range(n_listings):
+        listing = await supply.create_supply_listing(
+            landowner_details={"name": f"Landowner {i}", "contact": f"l{i}@example.com"},
+            site_details={"name": f"Site {i}", "postcode": "OX1 2AB",
+                          "coordinates": rand_coords(rng), "area_hectares": 10},
+            habitat_data=[{"habitat_type": rng.choice(HABITATS), "condition": "moderate",
+                           "area_hectares": rng.uniform(1, 5)} for _ in range(rng.randint(1, 3))],
+            pricing_terms={"price_per_unit": rng.randint(12000, 25000),
+                           "delivery_completion_date": date.today() + timedelta(days=rng.randint(90, 700))},
+        )
+        await supply.update_listing_status(listing.listing_id, ListingStatus.ACTIVE)
+
+    for i in range(n_demands):
+        lost = rng.choice(LOST_HABITATS)
+        assessment = BiodiversityAssessment(
+            site_reference=f"DEV-{i}", postcode="OX1 2AB", local_authority="Oxford",
+            assessment_date=date.today(), assessor_name="Bench", assessor_qualification="CIEEM",
+            baseline_habitats=[HabitatUnit(habitat_type=lost, condition=HabitatCondition.MODERATE,
+                                           area_hectares=Decimal("1.0"), distinctiveness_score=6,
+                                           condition_score=Decimal("2.0"))],
+        )
+        await demand.create_demand_request(
+            developer_details={"name": f"Developer {i}", "contact": f"d{i}@example.com"},
+            project_details={"name": f"Project {i}", "description": "Bench", "postcode": "OX1 2AB",
+                             "coordinates": rand_coords(rng), "planning_reference": f"APP/{i}"},
+            biodiversity_assessment=assessment,
+            requirements={"max_price_per_unit": 30000, "required_by_date": date.today() + timedelta(days=900)},
+        )
+
+    return MatchingEngine(supply, demand)
+
+
+async def timed(engine, criteria):
+    t0 = time.perf_counter()
+    matches = await engine.find_matches(criteria=criteria, max_matches=10**9)
+    return time.perf_counter() - t0, matches
+
+
+def assert_scores_match(scalar, batch):
+    by_pair = {(m.demand_request_id, m.supply_listing_id): m for m in batch}
+    assert set(by_pair) == {(m.demand_request_id, m.supply_listing_id) for m in scalar}, \
+        "batch scoring returned different matches"
+    for m in scalar:
+        b = by_pair[(m.demand_request_id, m.supply_listing_id)]
+        for field in ("overall_match_score", "habitat_type_match_score",
+                      "location_preference_score", "distance_km"):
+            assert abs(float(getattr(m, field)) - float(getattr(b, field))) <= SCORE_TOLERANCE, field
+        assert m.timeline_compatibility == b.timeline_compatibility
+
+
+async def main():
+    sizes = [int(x) for x in os.getenv("SIZES", "1000,10000,100000").split(",")]
+    n_demands = int(os.getenv("DEMANDS", "10"))
+    max_km = int(os.getenv("MAX_KM", "30"))
+
+    print(f"{'listings':>10} {'demands':>8} {'full scan s':>12} {'indexed s':>10} "
+          f"{'+batch s':>9} {'speedup':>8} {'matches':>8}")
+    for n in sizes:
+        engine = await build_market(n, n_demands)
+
+        brute_t, brute = await timed(engine, MatchingCriteria(
+            max_distance_km=max_km, use_spatial_index=False, use_batch_scoring=False))
+        index_t, indexed = await timed(engine, MatchingCriteria(
+            max_distance_km=max_km, use_spatial_index=True, use_batch_scoring=False))
+        batch_t, batch = await timed(engine, MatchingCriteria(
+            max_distance_km=max_km, use_spatial_index=True, use_batch_scoring=True))
+
+        pairs = lambda ms: {(m.demand_request_id, m.supply_listing_id) for m in ms}
+        assert pairs(brute) == pairs(indexed), "indexed path returned different matches"
+        assert_scores_match(indexed, batch)
+
+        print(f"{n:>10} {n_demands:>8} {brute_t:>12.3f} {index_t:>10.3f} {batch_t:>9.3f} "
+              f"{brute_t / max(batch_t, 1e-9):>7.1f}x {len(batch):>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""
+Benchmark and fuzz corpus for planning-decision extraction.
+
+Generates 1-10 MB inputs of each corpus shape below and times
+extract_planning_decisions on them, reporting throughput and the worst
+seconds-per-MB seen, which should stay flat as inputs grow. The previous
+findall regex is timed on the smaller LEGACY_MB input for comparison.
+
+Corpus shapes:
+    history     realistic CON29 planning history: labelled records, table
+                rows and filler prose
+    one_line    the same content with every newline removed (PDF text
+                layers often come out as one long line)
+    label_soup  labels with no values ("decision: date: ref: ...")
+    ref_soup    slash/digit runs that almost look like references and dates
+    word_run    one unbroken run of word characters and decision words
+    random      random printable bytes with labels sprinkled in
+
+Usage:
+    SIZES_MB=1,5,10 LEGACY_MB=0.05 python scripts/bench_planning_decisions.py
+"""
+import os, random, re, string, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from la.planning_history import extract_planning_decisions
+
+LEGACY = re.compile(
+    r"(?:ref(?:erence)?[:\s]*([A-Z0-9/\-]+))?.{0,80}?"
+    r"(?:desc(?:ription)?[:\s]*(.{0,160}?))?.{0,60}?"
+    r"(?:decision[:\s]*(granted|refused|approved|undetermined))?.{0,60}?"
+    r"(?:date[:\s]*([0-9]{1,2}\s\w+\s[0-9]{2,4}|[0-9\/\-]{6,10}))?",
+    re.I | re.S
+)
+
+PROPOSALS = ["Single storey rear extension", "Change of use from office to residential (C3)",
+             "Loft conversion with rear dormer", "Erection of detached garage", "Replacement windows"]
+DECISIONS = ["Granted", "Refused", "Approved", "Withdrawn", "Conditionally approved", "Undetermined"]
+
+
+def _ref(rng):
+    return f"{rng.choice(['', 'P/', 'DC/'])}{rng.randint(10, 24)}/" \
+           f"{rng.randint(1, 99999):05d}/{rng.choice(['FUL', 'HH', 'LBC', 'OUT'])}"
+
+
+def _date(rng):
+    return rng.choice([f"{rng.randint(1, 28)} March {rng.randint(1990, 2024)}",
+                       f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1990, 2024)}"])
+
+
+def history(rng):
+    kind = rng.random()
+    if kind < 0.4:
+        return (f"Reference: {_ref(rng)}\nProposal: {rng.choice(PROPOSALS)}\n"
+                f"Decision: {rng.choice(DECISIONS)}\nDate of decision: {_date(rng)}\n")
+    if kind < 0.8:
+        return f"{_ref(rng)} | {rng.choice(PROPOSALS)} | {rng.choice(DECISIONS)} | {_date(rng)}\n"
+    return ("1.1 Planning and building decisions. The council has no record of any other decision, "
+            "reference or date relating to this property beyond those listed.\n")
+
+
+def label_soup(rng):
+    return rng.choice(["decision: ", "date: ", "ref: ", "description: ", "Reference No. ", "status - "])
+
+
+def ref_soup(rng):
+    return rng.choice(["12/", "1/", "03/2021", "/", "2019/1234", "-", "12.03.", "P/"]) + rng.choice(["", " "])
+
+
+def word_run(rng):
+    return rng.choice(["refgranted", "decisiondate", "a" * rng.randint(1, 50), "referenced", "granted"])
+
+
+def random_text(rng):
+    return "".join(rng.choice(string.printable) for _ in range(rng.randint(1, 40))) + rng.choice(
+        ["", " Decision: ", " Ref: ", " 21/0001/FUL ", " Date: "])
+
+
+SHAPES = {
+    "history": history,
+    "one_line": history,
+    "label_soup": label_soup,
+    "ref_soup": ref_soup,
+    "word_run": word_run,
+    "random": random_text,
+}
+
+
+def make_corpus(shape, size, seed=16):
+    rng = random.Random(seed)
+    make = SHAPES[shape]
+    parts, length = [], 0
+    while length < size:
+        part = make(rng)
+        parts.append(part)
+        length += len(part)
+    text = "".join(parts)
+    return text.replace("\n", " ") if shape == "one_line" else text
+
+
+def timed(fn, text):
+    t0 = time.perf_counter()
+    result = fn(text)
+    return time.perf_counter() - t0, result
+
+
+if __name__ == "__main__":
+    sizes = [float(x) for x in os.getenv("SIZES_MB", "1,5,10").split(",")]
+    legacy_mb = float(os.getenv("LEGACY_MB", "0.05"))
+
+    print(f"{'shape':>11} {'MB':>5} {'seconds':>8} {'MB/s':>7} {'s/MB':>6} {'rows':>7}")
+    worst = 0.0
+    for shape in SHAPES:
+        for mb in sizes:
+            text = make_corpus(shape, int(mb * 1024 * 1024))
+            elapsed, rows = timed(extract_planning_decisions, text)
+            worst = max(worst, elapsed / mb)
+            print(f"{shape:>11} {mb:>5} {elapsed:>8.2f} {mb / elapsed:>7.1f} {elapsed / mb:>6.2f} {len(rows):>7}")
+
+        text = make_corpus(shape, int(legacy_mb * 1024 * 1024))
+        elapsed, rows = timed(lambda t: [m for m in LEGACY.findall(t) if any(m)], text)
+        print(f"{'legacy':>11} {legacy_mb:>5} {elapsed:>8.2f} {legacy_mb / elapsed:>7.1f} "
+              f"{elapsed / legacy_mb:>6.2f} {len(rows):>7}")
+
+    print(f"worst case: {worst:.2f} s/MB")
@@ -0,0 +1,89 @@
+"""
+Benchmark per-call overhead of RateLimiter.check_rate_limit.
+
+Compares the sliding-window counters with batched log writes against the
+previous behaviour (a timestamp list per client/endpoint rebuilt on every
+call and a synchronous INSERT + commit per allowed request), on a file-backed
+SQLite database. Set REDIS_URL to also time the shared Redis backend.
+
+Usage:
+    CALLS=20000 CLIENTS=200 python scripts/bench_rate_limiter.py
+"""
+import os, sys, time, json, random, sqlite3, tempfile
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.security.rate_limiter import RateLimiter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limit_requests
+    (client_id, endpoint, ip_address, user_agent, user_id, request_timestamp, request_info);
+CREATE TABLE IF NOT EXISTS rate_limit_violations
+    (client_id, endpoint, ip_address, user_agent, user_id, violation_timestamp, request_info);
+"""
+
+ENDPOINTS = ['/api/property/search', '/api/marketplace/search', '/api/billing/webhook', '/api/other']
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class PreviousLimiter:
+    """Previous behaviour: timestamp lists and a commit per allowed request"""
+
+    def __init__(self, db, limits):
+        self.db, self.limits = db, limits
+        self.memory_cache = defaultdict(lambda: defaultdict(list))
+
+    def check(self, endpoint, client_id, request_info):
+        config = self.limits.get(endpoint, self.limits['default'])
+        now = time.time()
+        valid = [t for t in self.memory_cache[client_id][endpoint] if t > now - config['window']]
+        if len(valid) >= config['requests'] and len([t for t in valid if t > now - 10]) >= config['burst']:
+            return False
+        valid.append(now)
+        self.memory_cache[client_id][endpoint] = valid
+        self.db.execute(
+            "INSERT INTO rate_limit_requests VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (client_id, endpoint, None, None, request_info.get('user_id'), str(now), json.dumps(request_info))
+        )
+        self.db.commit()
+        return True
+
+
+def workload(rng, calls, clients):
+    return [(rng.choice(ENDPOINTS), {'user_id': rng.randrange(clients)}) for _ in range(calls)]
+
+
+def timed(label, calls, fn):
+    t0 = time.perf_counter()
+    allowed = sum(1 for endpoint, info in calls if fn(endpoint, info))
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28} {elapsed * 1e6 / len(calls):>10.1f} {allowed:>9} {len(calls):>7}")
+
+
+if __name__ == "__main__":
+    rng = random.Random(int(os.getenv("SEED", "42")))
+    calls = workload(rng, int(os.getenv("CALLS", "20000")), int(os.getenv("CLIENTS", "200")))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'limiter':<28} {'us/call':>10} {'allowed':>9} {'calls':>7}")
+
+        previous = PreviousLimiter(connect(os.path.join(tmp, "previous.db")), RateLimiter(connect(":memory:")).rate_limits)
+        timed("previous (list + commit)", calls,
+              lambda endpoint, info: previous.check(endpoint, f"user:{info['user_id']}", info))
+
+        limiter = RateLimiter(connect(os.path.join(tmp, "counters.db")))
+        timed("sliding window + batched", calls, lambda endpoint, info: limiter.check_rate_limit(endpoint, info)['allowed'])
+        limiter.log_writer.close()
+        print(f"  log writer: {limiter.log_writer.stats}")
+
+        if os.getenv("REDIS_URL"):
+            shared = RateLimiter(connect(os.path.join(tmp, "redis.db")), redis_url=os.environ["REDIS_URL"])
+            timed("redis counters + batched", calls, lambda endpoint, info: shared.check_rate_limit(endpoint, info)['allowed'])
+            shared.log_writer.close()
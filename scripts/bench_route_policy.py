@@ -0,0 +1,83 @@
+"""
+Benchmark route policy lookups against per-request pattern scans.
+
+Generates a few hundred rate-limit and credit patterns (static segments,
+{param} segments and trailing wildcards) and times resolving both policies
+for a request: the compiled RoutePolicyTable versus the
+previous approach of an exact dict lookup followed by a scan over every
+pattern, once per policy source.
+
+Usage:
+    PATTERNS=100,300,1000 LOOKUPS=20000 python scripts/bench_route_policy.py
+"""
+import os, re, sys, time, random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.route_policy import build_route_policy_table
+
+WORDS = ['api', 'projects', 'docs', 'planning', 'billing', 'admin', 'marketplace', 'sites',
+         'reports', 'jobs', 'export', 'analyse', 'search', 'upload', 'status', 'users']
+METHODS = ['GET', 'POST', 'PUT', 'DELETE']
+
+
+def make_patterns(rng, n):
+    patterns = set()
+    while len(patterns) < n:
+        segments = ['api'] + [rng.choice(WORDS + ['{id}']) for _ in range(rng.randint(1, 4))]
+        if rng.random() < 0.15:
+            segments.append('*')
+        patterns.add('/' + '/'.join(segments))
+    return sorted(patterns)
+
+
+def compile_scan(patterns):
+    """Previous style: exact dict, then regexes tested in order"""
+    exact = {p: p for p in patterns if '{' not in p and not p.endswith('*')}
+    scans = [
+        (re.compile('^' + re.sub(r'\{[^}]+\}', '[^/]+', p[:-1] if p.endswith('*') else p)
+                    + ('.*' if p.endswith('*') else '$')), p)
+        for p in patterns if p not in exact
+    ]
+
+    def lookup(path):
+        if path in exact:
+            return exact[path]
+        for regex, pattern in scans:
+            if regex.match(path):
+                return pattern
+        return None
+    return lookup
+
+
+def bench(n, lookups, rng):
+    rate_patterns = make_patterns(rng, n)
+    credit_patterns = {f"{rng.choice(METHODS)} {p}": p for p in make_patterns(rng, n // 3)}
+
+    t0 = time.perf_counter()
+    table = build_route_policy_table({p: p for p in rate_patterns}, credit_patterns)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    scanners = [compile_scan(rate_patterns),
+                compile_scan([k.split(' ')[1] for k in credit_patterns])]
+
+    requests = [(rng.choice(METHODS), '/api/' + '/'.join(
+        rng.choice(WORDS + ['p-123', 'x']) for _ in range(rng.randint(1, 5)))) for _ in range(lookups)]
+
+    t0 = time.perf_counter()
+    hits = sum(1 for method, path in requests if table.match(method, path).rate_limit is not None)
+    trie_us = (time.perf_counter() - t0) * 1e6 / lookups
+
+    t0 = time.perf_counter()
+    scan_hits = sum(1 for method, path in requests if [scan(path) for scan in scanners][0] is not None)
+    scan_us = (time.perf_counter() - t0) * 1e6 / lookups
+
+    print(f"{len(table):>9} {build_ms:>9.1f} {trie_us:>9.2f} {scan_us:>9.2f} {hits:>7} {scan_hits:>7}")
+
+
+if __name__ == "__main__":
+    rng = random.Random(int(os.getenv("SEED", "42")))
+    lookups = int(os.getenv("LOOKUPS", "20000"))
+    print(f"{'patterns':>9} {'build ms':>9} {'trie us':>9} {'scan us':>9} {'hits':>7} {'scan':>7}")
+    for n in (int(x) for x in os.getenv("PATTERNS", "100,300,1000").split(",")):
+        bench(n, lookups, rng)
@@ -0,0 +1,88 @@
+"""
+Benchmark knowledge-base search with the BM25 index against the old scan.
+
+Builds a knowledge base with DOCS synthetic precedents and times top-k
+precedent searches through the inverted index and through the previous
+per-precedent keyword loop. Words are drawn Zipf-style from the planning
+vocabulary below plus VOCAB made-up words, so common terms such as
+"residential" appear in a large share of precedents, as they would in
+real appeal decisions.
+
+Usage:
+    DOCS=30000 VOCAB=5000 QUERIES=200 python scripts/bench_search_index.py
+"""
+import itertools, os, random, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.planning_copilot import PlanningKnowledgeBase
+
+WORDS = ("residential density design heritage conservation character affordable housing flood risk "
+         "parking highway access trees ecology biodiversity amenity overlooking daylight noise drainage "
+         "green belt openness viability infrastructure school transport station retail office flats "
+         "houses bungalow extension dormer basement listed building enforcement appeal").split()
+
+
+def old_search(precedents, query):
+    results = []
+    query_terms = query.lower().split()
+    for precedent in precedents:
+        relevance_score = 0
+        keywords = precedent.get("relevance_keywords", [])
+        for term in query_terms:
+            if any(term in keyword for keyword in keywords):
+                relevance_score += 1
+            if term in precedent.get("development", "").lower():
+                relevance_score += 2
+            if term in precedent.get("key_issues", []):
+                relevance_score += 3
+        if relevance_score > 0:
+            results.append((relevance_score, precedent))
+    results.sort(key=lambda x: x[0], reverse=True)
+    return results
+
+
+if __name__ == "__main__":
+    n_docs = int(os.getenv("DOCS", "30000"))
+    n_queries = int(os.getenv("QUERIES", "200"))
+    rng = random.Random(0)
+    syllables = ["ba", "ce", "di", "fo", "gu", "ha", "ke", "li", "mo", "nu", "pa", "re", "si", "to", "vu", "wy"]
+    vocabulary = WORDS + ["".join(rng.choices(syllables, k=4)) for _ in range(int(os.getenv("VOCAB", "5000")))]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+
+    def words(n):
+        return rng.choices(vocabulary, cum_weights=cum_weights, k=n)
+
+    precedents = [
+        {
+            "reference": f"APP/{i:06d}",
+            "development": " ".join(words(5)),
+            "key_issues": words(3),
+            "inspector_comments": " ".join(words(12)),
+            "relevance_keywords": words(4),
+        }
+        for i in range(n_docs)
+    ]
+    kb = PlanningKnowledgeBase()
+    t0 = time.perf_counter()
+    for precedent in precedents:
+        kb.add_precedent(precedent)
+    build_s = time.perf_counter() - t0
+    queries = [" ".join(words(4)) for _ in range(n_queries)]
+
+    t0 = time.perf_counter()
+    for query in queries:
+        kb.search_precedents(query, limit=10)
+    index_s = (time.perf_counter() - t0) / n_queries
+
+    old_queries = queries[:max(1, n_queries // 20)]
+    t0 = time.perf_counter()
+    for query in old_queries:
+        old_search(kb.knowledge.precedents, query)
+    scan_s = (time.perf_counter() - t0) / len(old_queries)
+
+    print(f"precedents:        {n_docs}")
+    print(f"index build:       {build_s:8.2f} s  (incremental adds)")
+    print(f"BM25 top-10:       {index_s * 1000:8.3f} ms/query")
+    print(f"keyword scan:      {scan_s * 1000:8.3f} ms/query")
+    print(f"speed-up:          {scan_s / index_s:8.1f}x")
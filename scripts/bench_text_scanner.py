@@ -0,0 +1,155 @@
+"""
+Benchmark keyword extraction on large CON29 texts.
+
+Builds CON29-style documents of the requested size from the sample CON29
+texts in data/ (plus any .txt files under CORPUS, e.g. extracted real-world
+search packs) interleaved with a random subset of generated enquiry/answer
+sections, so some anchors are absent as in real packs, then times
+the previous approach (one regex search per LLC1/CON29 field plus a substring
+test per risk needle) against one MultiPatternScanner pass per document
+feeding parse_llc1, the CON29 keyword fields and the risk rules.
+
+Usage:
+    SIZES_MB=0.1,1,5 DOCS=5 CORPUS=/path/to/texts python scripts/bench_text_scanner.py
+"""
+import glob, os, random, re, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import risk_engine
+from la.parsers import (_adopted_answer, _answer, _re_br_answer, _re_cil_answer, _re_radon_answer,
+                        _re_s106_answer, _re_yes_no, parse_llc1, scan_document)
+
+ENQUIRIES = [
+    "1.1 Planning and building decisions and pending applications. Reference: {ref} Description: {desc} "
+    "Decision: {decision} Date: {date}",
+    "2.1 Roadways, footways and footpaths. The road abutting the property is {adopted} adopted highway: {yn}",
+    "3.7 Outstanding notices. Enforcement notice served: {yn}",
+    "3.12 Contaminated land. Entered in the register of contaminated land: {yn}",
+    "3.9 Planning obligations. Section 106 agreement: {obligation}",
+    "3.13 Community Infrastructure Levy (CIL) liability: {obligation}",
+    "3.14 Radon gas. The property is in a radon {radon} area.",
+    "Environmental: Flood Zone {zone}. Surface water flooding risk: {level}",
+    "Building Regulations completion certificate: {provided}",
+    "The property is {in_} a conservation area. Tree Preservation Order (TPO) {tpo}.",
+    "Local Authority: {council} Council, Site Address: {n} High Street, Tel 01234 567890",
+]
+FILLER = ("The information in this reply is given by the council from its records and does not cover "
+          "matters outside the enquiries raised. Officers are not able to comment on the accuracy of "
+          "third party information supplied with this search. ")
+
+
+def load_corpus():
+    texts = []
+    for path in glob.glob(os.path.join(ROOT, "data", "*CON29*.bin")):
+        with open(path, "rb") as f:
+            raw = f.read()
+        if not raw.startswith(b"%PDF"):
+            texts.append(raw.decode("utf-8", "ignore"))
+    corpus = os.getenv("CORPUS")
+    if corpus:
+        for path in glob.glob(os.path.join(corpus, "**", "*.txt"), recursive=True):
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                texts.append(f.read())
+    return texts
+
+
+def make_document(rng, size, corpus):
+    # Like a real pack, a document only mentions some of the designations
+    sections = rng.sample(ENQUIRIES, rng.randint(3, len(ENQUIRIES)))
+    parts, length = [], 0
+    while length < size:
+        if corpus and rng.random() < 0.2:
+            part = rng.choice(corpus)
+        else:
+            part = rng.choice(sections).format(
+                ref=f"{rng.choice(['', 'SP/', 'DC/'])}{rng.randint(10, 24)}/{rng.randint(1, 9999)}",
+                desc=rng.choice(["Single storey rear extension", "Change of use to HMO", "Loft conversion"]),
+                decision=rng.choice(["granted", "refused", "approved"]),
+                date=f"{rng.randint(1, 28)} March {rng.randint(1990, 2024)}",
+                adopted=rng.choice(["", "not"]), yn=rng.choice(["yes", "no"]),
+                obligation=rng.choice(["none", "outstanding", "payable", "no"]),
+                radon=rng.choice(["affected", "not affected"]), zone=rng.choice("123"),
+                level=rng.choice(["low", "medium", "high"]), provided=rng.choice(["provided", "missing"]),
+                in_=rng.choice(["in", "not in"]), tpo=rng.choice(["applies", "none"]),
+                council=rng.choice(["Cheshire East", "Leeds City", "Camden"]), n=rng.randint(1, 200),
+            ) + " " + FILLER * rng.randint(0, 3)
+        parts.append(part)
+        length += len(part) + 1
+    return "\n".join(parts)
+
+
+LEGACY_FIELDS = [
+    (re.compile(p, re.I | re.S), g) for p, g in [
+        (r"(?:abutting.*?adopted|highway.*adopted).*?(yes|no|true|false)", 1),
+        (r"\benforcement\s+notice(?:s)?\b.*?(yes|no|true|false)", 1),
+        (r"\bcontaminated\s+land\b.*?(yes|no|true|false)", 1),
+        (r"\b(section\s*106|s106)\b.*?(yes|no|true|false|outstanding|payable|none)", 2),
+        (r"\bCIL\b.*?(yes|no|true|false|outstanding|none|payable)", 1),
+        (r"\bflood\s*zone\s*(1|2|3)\b", 1),
+        (r"\bradon\b.*?(affected|not\s*affected|yes|no|true|false)", 1),
+        (r"\b(building\s*reg(ulation)?s?|completion\s*certificate)\b.*?(provided|missing|yes|no|true|false)", 3),
+    ]
+]
+LEGACY_LLC1 = [re.compile(p, re.I | re.S) for p in [
+    r"\bconservation\s+area\b", r"\blisted\s+building\b", r"\b(tree\s+preservation|TPO)\b", r"\b(section\s*106|s106)\b",
+]]
+
+
+def legacy(text):
+    fields = []
+    for regex, group in LEGACY_FIELDS:
+        m = regex.search(text)
+        fields.append(m.group(group) if m else None)
+    charges = [bool(regex.search(text)) for regex in LEGACY_LLC1]
+    lowered = text.lower()
+    risks = {r["code"] for r in risk_engine.RULES if any(n in lowered for n in r["needles"])}
+    return fields, charges, risks
+
+
+def scanned(text):
+    scan = scan_document(text)
+    fz = scan.first("flood_zone")
+    fields = [
+        _adopted_answer(scan),
+        _answer(scan, "enforcement", _re_yes_no),
+        _answer(scan, "contaminated", _re_yes_no),
+        _answer(scan, "s106", _re_s106_answer),
+        _answer(scan, "cil", _re_cil_answer),
+        fz.group(1) if fz else None,
+        _answer(scan, "radon", _re_radon_answer),
+        _answer(scan, "building_regs", _re_br_answer),
+    ]
+    charges = [c.present for c in parse_llc1(text, scan).charges]
+    risks = {r["code"] for r in risk_engine.run(text)["risks"]}
+    return fields, charges, risks
+
+
+def timed(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+if __name__ == "__main__":
+    rng = random.Random(int(os.getenv("SEED", "29")))
+    repeat = int(os.getenv("REPEAT", "3"))
+    corpus = load_corpus()
+    docs = int(os.getenv("DOCS", "5"))
+    print(f"{'size MB':>8} {'legacy ms':>10} {'scanner ms':>11} {'MB/s':>7} {'same':>5}")
+    for mb in (float(x) for x in os.getenv("SIZES_MB", "0.1,1,5").split(",")):
+        legacy_ms = scanner_ms = 0.0
+        same = True
+        for _ in range(docs):
+            text = make_document(rng, int(mb * 1024 * 1024), corpus)
+            elapsed, expected = timed(legacy, text, repeat)
+            legacy_ms += elapsed / docs
+            elapsed, actual = timed(scanned, text, repeat)
+            scanner_ms += elapsed / docs
+            same = same and expected == actual
+        print(f"{mb:>8} {legacy_ms:>10.1f} {scanner_ms:>11.1f} "
+              f"{mb / (scanner_ms / 1000):>7.1f} {str(same):>5}")
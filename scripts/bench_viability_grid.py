@@ -0,0 +1,72 @@
+"""
+Benchmark the vectorised viability grid against per-scenario evaluation.
+
+The per-scenario path is how sensitivity scenarios used to be evaluated: deep
+copy the inputs, apply the change and run the scalar viability sums again.
+Both paths are checked to give the same net profit at every grid point.
+
+Usage:
+    GRID=20,20,10 REPEAT=5 python scripts/bench_viability_grid.py
+"""
+import copy, os, sys, time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.development_calculator import create_sample_viability, development_calculator
+
+
+def scalar_net_profit(inputs):
+    gdv = inputs.gdv
+    land, build, planning = inputs.land_costs.total, inputs.build_costs.total, inputs.planning_costs.total
+    finance = inputs.finance_costs.calculate_finance_cost(land + build + planning)
+    sales = inputs.sales_costs.calculate_total(gdv)
+    profit = gdv * (inputs.developer_profit_percent / 100)
+    return gdv - (land + build + planning + finance + sales + profit)
+
+
+def per_scenario(inputs, gdv_changes, build_changes, rate_changes):
+    out = np.empty((len(gdv_changes), len(build_changes), 1, len(rate_changes)))
+    for i, g in enumerate(gdv_changes):
+        for j, b in enumerate(build_changes):
+            for k, r in enumerate(rate_changes):
+                test = copy.deepcopy(inputs)
+                for unit in test.unit_types:
+                    unit.value_per_sqft *= 1 + g / 100
+                    unit.total_value = unit.count * unit.size_sqft * unit.value_per_sqft
+                test.build_costs.base_build_cost_sqft *= 1 + b / 100
+                test.finance_costs.interest_rate_percent += r
+                out[i, j, 0, k] = scalar_net_profit(test)
+    return out
+
+
+def timed(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+if __name__ == "__main__":
+    n_gdv, n_build, n_rate = (int(x) for x in os.getenv("GRID", "20,20,10").split(","))
+    repeat = int(os.getenv("REPEAT", "5"))
+    inputs = create_sample_viability()
+    gdv_changes = np.linspace(-20, 20, n_gdv)
+    build_changes = np.linspace(-20, 20, n_build)
+    rate_changes = np.linspace(-2.5, 2.5, n_rate)
+
+    grid_s, grid = timed(lambda: development_calculator.sensitivity_grid(
+        inputs, gdv_changes, build_changes, rate_changes), repeat)
+    loop_s, loop = timed(lambda: per_scenario(inputs, gdv_changes, build_changes, rate_changes), max(1, repeat // 5))
+    full_s, _ = timed(lambda: development_calculator.calculate_viability(inputs), repeat)
+
+    assert np.allclose(grid.net_profit, loop, rtol=1e-9, atol=1e-6)
+    scenarios = grid.net_profit.size
+    print(f"scenarios:           {scenarios}")
+    print(f"per-scenario path:   {loop_s * 1000:9.2f} ms  ({loop_s / scenarios * 1e6:.1f} us/scenario)")
+    print(f"vectorised grid:     {grid_s * 1000:9.2f} ms  ({grid_s / scenarios * 1e6:.3f} us/scenario)")
+    print(f"speed-up:            {loop_s / grid_s:9.1f}x")
+    print(f"calculate_viability: {full_s * 1000:9.2f} ms  (base case + 20 sensitivity scenarios)")
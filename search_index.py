@@ -0,0 +1,226 @@
+"""
+In-memory BM25 retrieval over short documents.
+
+Text is tokenised into lowercase words, stop words are dropped and the rest
+are reduced with a light suffix-stripping stemmer, so "planning" and "plans"
+or "dwellings" and "dwelling" meet. Each term keeps a posting list
+of (document slot, weighted term frequency); documents may have several
+fields, each field's term counts multiplied by its weight.
+
+Queries only touch the posting lists of their own terms. Scores for those
+postings are computed with NumPy and the top k taken with argpartition, so a
+query costs roughly the number of postings it reads, not the number of
+documents. The length-normalised term-frequency part of each posting's score
+is cached per term, leaving one multiply-add per posting at query time.
+Documents can be added, replaced and removed at any time; the caches are
+rebuilt lazily, per term, by the queries that follow.
+"""
+import math
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+# Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOP_WORDS = frozenset("""
+a about an and are as at be been but by can could do does for from has have how i if in into is it its
+may me my no not of on or our should so than that the their them then there these they this to us was
+we what when where which who will with would you your
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# (suffix, replacement, minimum stem length left) tried in order, first match wins
+_SUFFIXES = (
+    ("ational", "ate", 3), ("ization", "ize", 3), ("fulness", "ful", 3), ("iveness", "ive", 3),
+    ("ations", "ate", 3), ("ation", "ate", 3), ("ments", "", 4), ("ment", "", 4),
+    ("ness", "", 3), ("ings", "", 3), ("ing", "", 3), ("ies", "y", 2), ("ied", "y", 2),
+    ("sses", "ss", 2), ("edly", "", 3), ("ed", "", 3), ("ly", "", 3), ("es", "", 3),
+    ("s", "", 3),
+)
+
+FieldText = Union[str, Iterable[str], None]
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Light English stemmer; strips one common suffix"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, replacement, min_stem in _SUFFIXES:
+        if word.endswith(suffix):
+            root = word[:-len(suffix)]
+            if len(root) < min_stem or (suffix == "s" and word[-2] in "su"):
+                continue
+            if suffix in ("ing", "ings", "ed", "edly") and len(root) > 2 and root[-1] == root[-2] and root[-1] not in "lsz":
+                root = root[:-1]  # planning -> plan, permitted -> permit
+            word = root + replacement
+            break
+    # housing, houses and house all become hous
+    return word[:-1] if len(word) >= 4 and word.endswith("e") else word
+
+
+def tokenize(text: FieldText) -> List[str]:
+    """Stemmed, stop-word-free terms of a string (or of each string in an iterable)"""
+    if not text:
+        return []
+    if not isinstance(text, str):
+        text = " ".join(str(part) for part in text if part)
+    return [stem(word) for word in _WORD.findall(text.lower().replace("_", " ")) if word not in STOP_WORDS]
+
+
+class BM25Index:
+    """
+    Incrementally updated BM25 index
+
+    Documents are added with a string id, their text (a string, or a mapping
+    of field name to text weighted by field_weights) and an optional payload
+    returned with search results.
+    """
+
+    def __init__(self, field_weights: Optional[Mapping[str, float]] = None, k1: float = BM25_K1, b: float = BM25_B):
+        self.field_weights = dict(field_weights or {})
+        self.k1 = k1
+        self.b = b
+
+        self._slots: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._payloads: List[Any] = []
+        self._doc_terms: List[Dict[str, float]] = []
+        self._lengths: List[float] = []
+        self._free: List[int] = []
+        self._total_length = 0.0
+
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # term -> (slots, tf part of the BM25 score), rebuilt when the term's postings or the lengths change
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._norm_array: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slots
+
+    def add(self, doc_id: str, text: Union[FieldText, Mapping[str, FieldText]], payload: Any = None) -> None:
+        """Index a document, replacing any existing document with the same id"""
+        if doc_id in self._slots:
+            self.remove(doc_id)
+
+        terms: Dict[str, float] = {}
+        fields = text.items() if isinstance(text, Mapping) else ((None, text),)
+        for field, value in fields:
+            weight = self.field_weights.get(field, 1.0) if field is not None else 1.0
+            for term in tokenize(value):
+                terms[term] = terms.get(term, 0.0) + weight
+
+        slot = self._free.pop() if self._free else len(self._ids)
+        if slot == len(self._ids):
+            self._ids.append(None)
+            self._payloads.append(None)
+            self._doc_terms.append({})
+            self._lengths.append(0.0)
+        self._slots[doc_id] = slot
+        self._ids[slot] = doc_id
+        self._payloads[slot] = payload
+        self._doc_terms[slot] = terms
+        self._lengths[slot] = sum(terms.values())
+        self._total_length += self._lengths[slot]
+
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[slot] = frequency
+        self._invalidate_norms()
+
+    def remove(self, doc_id: str) -> bool:
+        """Drop a document; False if it wasn't indexed"""
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return False
+        for term in self._doc_terms[slot]:
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths[slot]
+        self._ids[slot] = None
+        self._payloads[slot] = None
+        self._doc_terms[slot] = {}
+        self._lengths[slot] = 0.0
+        self._free.append(slot)
+        self._invalidate_norms()
+        return True
+
+    def payload(self, doc_id: str) -> Any:
+        slot = self._slots.get(doc_id)
+        return self._payloads[slot] if slot is not None else None
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        where: Optional[Callable[[str, Any], bool]] = None
+    ) -> List[Tuple[str, float, Any]]:
+        """
+        Top k (doc id, score, payload) for a query, best first
+
+        Only documents sharing at least one term with the query are
+        returned. `where(doc_id, payload)` filters candidates; ranking then
+        walks down the scored candidates until k pass.
+        """
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self._postings]
+        if not terms or k <= 0 or not self._slots:
+            return []
+
+        n_docs = len(self._slots)
+        scores = np.zeros(len(self._ids))
+        for term in terms:
+            slots, impacts = self._term_arrays(term)
+            idf = math.log(1 + (n_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+            scores[slots] += idf * impacts
+
+        matched = np.flatnonzero(scores)
+        if where is None and len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        # Ties keep insertion (slot) order
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+
+        results = []
+        for slot in ranked:
+            doc_id, payload = self._ids[slot], self._payloads[slot]
+            if where is not None and not where(doc_id, payload):
+                continue
+            results.append((doc_id, float(scores[slot]), payload))
+            if len(results) == k:
+                break
+        return results
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Posting slots and tf * (k1 + 1) / (tf + norm) for each"""
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            slots = np.fromiter(postings.keys(), dtype=np.intp, count=len(postings))
+            frequencies = np.fromiter(postings.values(), dtype=float, count=len(postings))
+            impacts = frequencies * (self.k1 + 1) / (frequencies + self._norms()[slots])
+            arrays = self._arrays[term] = (slots, impacts)
+        return arrays
+
+    def _norms(self) -> np.ndarray:
+        """k1 * (1 - b + b * length / average length) per slot"""
+        if self._norm_array is None:
+            lengths = np.array(self._lengths)
+            average = self._total_length / len(self._slots) if self._slots else 1.0
+            self._norm_array = self.k1 * (1 - self.b + self.b * lengths / (average or 1.0))
+        return self._norm_array
+
+    def _invalidate_norms(self) -> None:
+        # Document lengths feed every term's impacts through the average length
+        self._norm_array = None
+        self._arrays.clear()
+
+
+__all__ = ["BM25Index", "STOP_WORDS", "stem", "tokenize"]
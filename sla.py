@@ -3,13 +3,149 @@ SLA Management Module for LA System
 Handles service level agreements, deadlines, and escalations
 """
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+import os
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Any, Set, Union
+from sqlalchemy import case, func, update
 from sqlalchemy.orm import Session
 from db import get_db
 
 logger = logging.getLogger(__name__)
 
+# Matters in these statuses are finished and have no live SLA
+CLOSED_STATUSES = ("issued", "cancelled")
+
+# England & Wales bank holidays moved from their usual date, and one-off extra holidays
+MOVED_BANK_HOLIDAYS = {
+    date(2002, 5, 27): date(2002, 6, 4),
+    date(2012, 5, 28): date(2012, 6, 4),
+    date(2020, 5, 4): date(2020, 5, 8),
+    date(2022, 5, 30): date(2022, 6, 2),
+}
+EXTRA_BANK_HOLIDAYS = (
+    date(2002, 6, 3), date(2011, 4, 29), date(2012, 6, 5),
+    date(2022, 6, 3), date(2022, 9, 19), date(2023, 5, 8),
+)
+
+def _easter_sunday(year: int) -> date:
+    """Gregorian Easter (anonymous algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def _nth_monday(year: int, month: int, last: bool = False) -> date:
+    if last:
+        end = (date(year, month + 1, 1) if month < 12 else date(year + 1, 1, 1)) - timedelta(days=1)
+        return end - timedelta(days=end.weekday())
+    first = date(year, month, 1)
+    return first + timedelta(days=(7 - first.weekday()) % 7)
+
+def england_wales_bank_holidays(year: int) -> List[date]:
+    """Bank holidays in England & Wales for a year, with weekend substitute days"""
+    new_year = date(year, 1, 1)
+    if new_year.weekday() >= 5:
+        new_year += timedelta(days=7 - new_year.weekday())
+    easter = _easter_sunday(year)
+
+    # Christmas and Boxing Day falling at a weekend move to the following Monday/Tuesday
+    christmas, boxing = date(year, 12, 25), date(year, 12, 26)
+    if christmas.weekday() == 5:
+        christmas, boxing = date(year, 12, 27), date(year, 12, 28)
+    elif christmas.weekday() == 6:
+        christmas, boxing = date(year, 12, 27), date(year, 12, 26)
+    elif boxing.weekday() == 5:
+        boxing = date(year, 12, 28)
+
+    holidays = [
+        new_year,
+        easter - timedelta(days=2),
+        easter + timedelta(days=1),
+        _nth_monday(year, 5),
+        _nth_monday(year, 5, last=True),
+        _nth_monday(year, 8, last=True),
+        christmas,
+        boxing,
+    ]
+    holidays = [MOVED_BANK_HOLIDAYS.get(d, d) for d in holidays]
+    holidays.extend(d for d in EXTRA_BANK_HOLIDAYS if d.year == year)
+    return sorted(holidays)
+
+class BusinessCalendar:
+    """
+    Working-day arithmetic over a precomputed calendar
+
+    For every day in [first_year, last_year] the calendar holds the running
+    count of working days, and the list of working days in order, so adding
+    N working days is two array lookups. Dates outside the range fall back
+    to weekday-only arithmetic.
+    """
+
+    def __init__(self, holidays: Iterable[date] = (), first_year: int = 2000, last_year: int = 2060):
+        self.holidays: Set[date] = set(holidays)
+        self._base = date(first_year, 1, 1).toordinal()
+        end = date(last_year, 12, 31).toordinal()
+        holiday_ordinals = {d.toordinal() for d in self.holidays}
+
+        self._count = array("i")     # working days in [base, day]
+        self._working = array("i")   # ordinals of working days
+        for ordinal in range(self._base, end + 1):
+            if (ordinal - 1) % 7 < 5 and ordinal not in holiday_ordinals:
+                self._working.append(ordinal)
+            self._count.append(len(self._working))
+
+    def is_business_day(self, day: Union[date, datetime]) -> bool:
+        return day.weekday() < 5 and _as_date(day) not in self.holidays
+
+    def add_business_days(self, start: Union[date, datetime], business_days: int) -> Union[date, datetime]:
+        """The date business_days working days after start (start itself if business_days <= 0), same time of day"""
+        if business_days <= 0:
+            return start
+        ordinal = start.toordinal()
+        index = ordinal - self._base
+        if 0 <= index < len(self._count):
+            position = self._count[index] + business_days - 1
+            if position < len(self._working):
+                return start + timedelta(days=self._working[position] - ordinal)
+        return start + timedelta(days=_add_weekdays(ordinal, business_days) - ordinal)
+
+def _as_date(day: Union[date, datetime]) -> date:
+    return day.date() if isinstance(day, datetime) else day
+
+def _add_weekdays(ordinal: int, business_days: int) -> int:
+    # Count from the Friday before a weekend start; whole weeks keep the weekday
+    weekday = (ordinal - 1) % 7
+    if weekday >= 5:
+        ordinal -= weekday - 4
+    weeks, rest = divmod(business_days, 5)
+    ordinal += 7 * weeks
+    while rest:
+        ordinal += 1
+        if (ordinal - 1) % 7 < 5:
+            rest -= 1
+    return ordinal
+
+def _extra_closure_days() -> List[date]:
+    """Council closure days from SLA_EXTRA_HOLIDAYS (comma-separated ISO dates)"""
+    days = []
+    for value in os.getenv("SLA_EXTRA_HOLIDAYS", "").split(","):
+        try:
+            if value.strip():
+                days.append(date.fromisoformat(value.strip()))
+        except ValueError:
+            logger.warning("Ignoring invalid SLA_EXTRA_HOLIDAYS date: %s", value)
+    return days
+
+business_calendar = BusinessCalendar(
+    [d for year in range(2000, 2061) for d in england_wales_bank_holidays(year)] + _extra_closure_days()
+)
+
 class SLAManager:
     """Manages SLA timelines and escalations"""
     
@@ -29,6 +165,9 @@ class SLAManager:
             "overdue": 0,       # Mark overdue on due date
             "urgent_escalation": -1  # Urgent escalation 1 day after due
         }
+        
+        # Working days exclude weekends and England & Wales bank holidays
+        self.calendar = business_calendar
     
     async def calculate_sla_dates(self, matter_data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate SLA due dates based on matter requirements"""
@@ -74,17 +213,46 @@ class SLAManager:
             return {"error": str(e)}
     
     def _add_business_days(self, start_date: datetime, business_days: int) -> datetime:
-        """Add business days (excluding weekends)"""
-        current_date = start_date
-        days_added = 0
+        """Add business days (excluding weekends and bank holidays)"""
+        return self.calendar.add_business_days(start_date, business_days)
+    
+    def _sla_status_case(self, due_date, now: datetime):
+        """SQL CASE giving the same status as check_sla_status for a due date column"""
+        thresholds = self.escalation_thresholds
+        return case(
+            (due_date >= now + timedelta(days=thresholds["at_risk"] + 1), "on_time"),
+            (due_date >= now + timedelta(days=thresholds["overdue"] + 1), "at_risk"),
+            (due_date >= now + timedelta(days=thresholds["urgent_escalation"]), "overdue"),
+            else_="urgent_overdue"
+        )
+    
+    def recompute_sla_statuses(self, db: Session, now: Optional[datetime] = None,
+                               matter_ids: Optional[List[str]] = None) -> int:
+        """
+        Recompute sla_status for all open matters (or just matter_ids) in one UPDATE
         
-        while days_added < business_days:
-            current_date += timedelta(days=1)
-            # Skip weekends (Saturday=5, Sunday=6)
-            if current_date.weekday() < 5:
-                days_added += 1
+        Only rows whose status changes are written. Returns the number updated.
+        """
+        from la.models import LAMatter
+        
+        now = now or datetime.now()
+        new_status = self._sla_status_case(LAMatter.sla_due_date, now)
+        stmt = (
+            update(LAMatter)
+            .where(
+                LAMatter.sla_due_date.isnot(None),
+                LAMatter.status.notin_(CLOSED_STATUSES),
+                LAMatter.sla_status != new_status
+            )
+            .values(sla_status=new_status)
+            .execution_options(synchronize_session=False)
+        )
+        if matter_ids is not None:
+            stmt = stmt.where(LAMatter.id.in_(matter_ids))
         
-        return current_date
+        updated = db.execute(stmt).rowcount
+        db.commit()
+        return updated
     
     async def check_sla_status(self, matter_id: str, db: Session) -> Dict[str, Any]:
         """Check current SLA status for a matter"""
@@ -155,91 +323,101 @@ class SLAManager:
             logger.error(f"SLA event creation failed: {e}")
             return False
     
-    async def get_overdue_matters(self, db: Session) -> List[Dict[str, Any]]:
+    def _dashboard_rows(self, db: Session, *criteria, limit: Optional[int] = None):
+        from la.models import LAMatter
+        
+        # Columns only, served by the (status, sla_due_date) index; most urgent first
+        query = db.query(
+            LAMatter.id, LAMatter.ref, LAMatter.address, LAMatter.status,
+            LAMatter.assigned_to, LAMatter.priority, LAMatter.sla_due_date
+        ).filter(
+            LAMatter.status.notin_(CLOSED_STATUSES), *criteria
+        ).order_by(LAMatter.sla_due_date)
+        return query.limit(limit).all() if limit else query.all()
+    
+    async def get_overdue_matters(self, db: Session, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get all overdue matters for dashboard"""
         try:
             from la.models import LAMatter
             
             now = datetime.now()
-            overdue_matters = db.query(LAMatter).filter(
-                LAMatter.sla_due_date < now,
-                LAMatter.status.notin_(["issued", "cancelled"])
-            ).all()
-            
-            results = []
-            for matter in overdue_matters:
-                days_overdue = (now - matter.sla_due_date).days
-                results.append({
-                    "id": matter.id,
-                    "ref": matter.ref,
-                    "address": matter.address,
-                    "status": matter.status,
-                    "assigned_to": matter.assigned_to,
-                    "days_overdue": days_overdue,
-                    "priority": matter.priority,
-                    "due_date": matter.sla_due_date.isoformat()
-                })
-            
-            return results
+            rows = self._dashboard_rows(db, LAMatter.sla_due_date < now, limit=limit)
+            
+            return [{
+                "id": row.id,
+                "ref": row.ref,
+                "address": row.address,
+                "status": row.status,
+                "assigned_to": row.assigned_to,
+                "days_overdue": (now - row.sla_due_date).days,
+                "priority": row.priority,
+                "due_date": row.sla_due_date.isoformat()
+            } for row in rows]
             
         except Exception as e:
             logger.error(f"Overdue matters query failed: {e}")
             return []
     
-    async def get_at_risk_matters(self, db: Session) -> List[Dict[str, Any]]:
+    async def get_at_risk_matters(self, db: Session, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get matters approaching SLA deadline"""
         try:
             from la.models import LAMatter
             
             now = datetime.now()
             risk_threshold = now + timedelta(days=self.escalation_thresholds["at_risk"])
+            rows = self._dashboard_rows(
+                db, LAMatter.sla_due_date <= risk_threshold, LAMatter.sla_due_date >= now, limit=limit
+            )
             
-            at_risk_matters = db.query(LAMatter).filter(
-                LAMatter.sla_due_date <= risk_threshold,
-                LAMatter.sla_due_date >= now,
-                LAMatter.status.notin_(["issued", "cancelled"])
-            ).all()
-            
-            results = []
-            for matter in at_risk_matters:
-                days_until_due = (matter.sla_due_date - now).days
-                results.append({
-                    "id": matter.id,
-                    "ref": matter.ref, 
-                    "address": matter.address,
-                    "status": matter.status,
-                    "assigned_to": matter.assigned_to,
-                    "days_until_due": days_until_due,
-                    "priority": matter.priority,
-                    "due_date": matter.sla_due_date.isoformat()
-                })
-            
-            return results
+            return [{
+                "id": row.id,
+                "ref": row.ref,
+                "address": row.address,
+                "status": row.status,
+                "assigned_to": row.assigned_to,
+                "days_until_due": (row.sla_due_date - now).days,
+                "priority": row.priority,
+                "due_date": row.sla_due_date.isoformat()
+            } for row in rows]
             
         except Exception as e:
             logger.error(f"At-risk matters query failed: {e}")
             return []
     
+    async def get_sla_counts(self, db: Session) -> Dict[str, int]:
+        """Overdue and at-risk matter counts in one query"""
+        from la.models import LAMatter
+        
+        now = datetime.now()
+        risk_threshold = now + timedelta(days=self.escalation_thresholds["at_risk"])
+        due = LAMatter.sla_due_date
+        overdue, at_risk = db.query(
+            func.count(case((due < now, 1))),
+            func.count(case(((due >= now) & (due <= risk_threshold), 1)))
+        ).filter(LAMatter.status.notin_(CLOSED_STATUSES)).one()
+        return {"overdue": overdue, "at_risk": at_risk}
+    
     async def update_matter_sla_status(self, matter_id: str, db: Session) -> bool:
         """Update matter SLA status based on current timeline"""
         try:
             from la.models import LAMatter
             
-            sla_status = await self.check_sla_status(matter_id, db)
-            if "error" in sla_status:
+            if not db.query(LAMatter.id).filter(LAMatter.id == matter_id, LAMatter.sla_due_date.isnot(None)).first():
                 return False
-            
-            matter = db.query(LAMatter).filter(LAMatter.id == matter_id).first()
-            if matter:
-                matter.sla_status = sla_status["status"]
-                db.commit()
-                return True
-                
-            return False
+            self.recompute_sla_statuses(db, matter_ids=[matter_id])
+            return True
             
         except Exception as e:
             logger.error(f"SLA status update failed: {e}")
             return False
 
+def ensure_sla_index(bind) -> None:
+    """Create the (status, sla_due_date) index on la_matters tables made before it existed"""
+    from la.models import LAMatter
+    
+    for index in LAMatter.__table__.indexes:
+        if index.name == "ix_la_matters_status_sla_due":
+            index.create(bind, checkfirst=True)
+
 # Global SLA manager instance
 sla_manager = SLAManager()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import la.bulk_documents as bd
+from db import Base
+from la.finding_store import finding_row, upsert_findings
+from la.models import LADocument, LAFinding, LAMatter, LAOrder, LARisk
+from text_store import DocumentTextStore
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'docs.db'}")
+    Base.metadata.create_all(engine, tables=[m.__table__ for m in (LAMatter, LAOrder, LADocument, LAFinding, LARisk)])
+    monkeypatch.setattr(bd, "text_store", DocumentTextStore(str(tmp_path / "store")))
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_folder_backfill_writes_findings_and_risks(tmp_path, db, workers):
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    for i in range(5):
+        db.add(LAMatter(id=f"m{i}", ref=f"REF{i}"))
+        (folder / f"REF{i}_LLC1.pdf").write_text("This is in a Conservation Area.")
+        (folder / f"REF{i}_CON29.pdf").write_text("Enforcement notice: yes. Flood Zone 3.")
+    (folder / "UNKNOWN_CON29.pdf").write_text("Flood Zone 2")
+    (folder / "notes.txt").write_text("ignored")
+    # A stale finding and a risk from an earlier search are replaced, not duplicated
+    db.add(LAFinding(matter_id="m0", key="con29.flood_zone", value=json.dumps("1")))
+    db.add(LARisk(matter_id="m0", code="FloodZone3", severity="HIGH", message="old"))
+    db.commit()
+
+    results = bd.process_document_folder(db, str(folder), matter_ids=["m0", "m1", "m2", "m3"],
+                                         workers=workers, batch_size=3, dest_dir=str(tmp_path / "data"))
+    assert results == {"processed": 4, "errors": [], "matched": 4, "unmatched_refs": 2}
+
+    findings = {(f.matter_id, f.key): json.loads(f.value) for f in db.query(LAFinding)}
+    assert len(findings) == db.query(LAFinding).count()
+    assert findings[("m0", "con29.flood_zone")] == "3"
+    assert findings[("m3", "llc1.conservation_area.present")] is True
+    assert not any(matter_id == "m4" for matter_id, _ in findings)
+
+    risks = sorted((r.matter_id, r.code) for r in db.query(LARisk).filter(LARisk.matter_id == "m0"))
+    assert risks == [("m0", "ConservationArea"), ("m0", "EnforcementNotice"), ("m0", "FloodZone3")]
+    assert db.query(LAOrder).count() == 4 and db.query(LADocument).count() == 8
+
+
+def test_upsert_keeps_last_row_per_key(db):
+    rows = [finding_row("m", "k", i, "CON29", 1) for i in range(3)] + [finding_row("n", "k", 9, "CON29", 1)]
+    assert upsert_findings(db, rows, batch_size=1) == 2
+    assert upsert_findings(db, [finding_row("m", "k", 5, "CON29", 1)]) == 1
+    db.commit()
+    assert sorted((f.matter_id, json.loads(f.value)) for f in db.query(LAFinding)) == [("m", 5), ("n", 9)]
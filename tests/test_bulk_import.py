@@ -0,0 +1,79 @@
+import csv
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import la.bulk_import as bi
+from db import Base
+from la.models import LABulkImportChunk, LABulkImportJob, LAMatter
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    Base.metadata.create_all(engine, tables=[t.__table__ for t in (LAMatter, LABulkImportJob, LABulkImportChunk)])
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(bi, "SessionLocal", factory)
+    return factory
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ref", "applicant_name", "property_address", "llc1_requested", "priority"])
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_chunks_cover_rows_with_multiline_fields(tmp_path):
+    rows = [[f"R{i}", "Ann\nSmith" if i % 3 == 0 else "Bob", f"{i} High St", "false", "urgent"] for i in range(23)]
+    path = _write_csv(tmp_path / "m.csv", rows)
+
+    header, chunks = bi.plan_chunks(path, chunk_rows=5)
+    assert header[0] == "ref" and [c[3] for c in chunks] == [5, 5, 5, 5, 3]
+    read = [row for start, end, _, _ in chunks for row in bi.read_chunk(path, header, start, end)]
+    assert [r["ref"] for r in read] == [r[0] for r in rows]
+    assert read[0]["applicant_name"] == "Ann\nSmith"
+
+
+def test_interrupted_import_resumes_without_duplicates(tmp_path, monkeypatch, session_factory):
+    rows = [[f"R{i}", "Ann", f"{i} High St", "false", "urgent"] for i in range(10)]
+    rows.append(["", "No Ref", "1 Low Rd", "true", ""])
+    rows.append(["R99", "No Address", "", "true", ""])
+    path = _write_csv(tmp_path / "m.csv", rows)
+    enqueued = []
+    monkeypatch.setattr(bi, "enqueue_chunks", lambda job_id, indexes: enqueued.extend(indexes) or "test")
+
+    db = session_factory()
+    job = bi.start_import(db, path, "m.csv", chunk_rows=4)
+    assert enqueued == [0, 1, 2] and job.total_rows == 12
+
+    # Chunk 0 finishes (and a re-delivery of it is a no-op), then the workers "crash"
+    assert bi.import_chunk(job.id, 0)["created"] == 4
+    assert bi.import_chunk(job.id, 0)["already_done"]
+    status = bi.import_status(db, job.id)
+    assert status["status"] == "running" and status["processed_rows"] == 4
+
+    enqueued.clear()
+    assert bi.resume_import(db, job.id)["resumed_chunks"] == 2 and enqueued == [1, 2]
+    for index in enqueued:
+        bi.import_chunk(job.id, index)
+
+    status = bi.import_status(db, job.id)
+    assert status["status"] == "completed" and status["progress_percent"] == 100.0
+    assert status["matters_created"] == 11 and status["rows_rejected"] == 1
+    assert status["errors"] == ["Row 12: property_address is required"]
+
+    matters = {m.ref: m for m in db.query(LAMatter)}
+    assert len(matters) == 11
+    assert matters["R0"].llc1_requested == "false" and matters["R0"].priority == "urgent"
+    assert matters["R0"].fee_calculated == 92.0 and matters["R0"].sla_due_date is not None
+    assert matters[f"BULK-{job.id[:8].upper()}-11"].address == "1 Low Rd"
+
+    # Re-importing the same file skips every existing ref
+    again = bi.start_import(db, path, "m.csv", chunk_rows=4)
+    for index in range(3):
+        bi.import_chunk(again.id, index)
+    assert bi.import_status(db, again.id)["rows_skipped"] == 10
+    db.close()
@@ -0,0 +1,52 @@
+import copy
+
+import numpy as np
+
+from modules.development_calculator import create_sample_viability, development_calculator, evaluate_viability_grid
+
+
+def _scalar(inputs):
+    gdv = inputs.gdv
+    land, build, planning = inputs.land_costs.total, inputs.build_costs.total, inputs.planning_costs.total
+    finance = inputs.finance_costs.calculate_finance_cost(land + build + planning)
+    total = land + build + planning + finance + inputs.sales_costs.calculate_total(gdv) + gdv * 0.2
+    return gdv - total, gdv - (total - land)
+
+
+def _changed(inputs, g, b, l, r):
+    test = copy.deepcopy(inputs)
+    for unit in test.unit_types:
+        unit.value_per_sqft *= 1 + g / 100
+        unit.total_value = unit.count * unit.size_sqft * unit.value_per_sqft
+    test.build_costs.base_build_cost_sqft *= 1 + b / 100
+    test.land_costs.purchase_price *= 1 + l / 100
+    test.finance_costs.interest_rate_percent += r
+    return test
+
+
+def test_grid_matches_scalar_scenarios():
+    inputs = create_sample_viability()
+    axes = ([-15, 0, 7.5], [-10, 3], [-5, 0, 20], [-1.5, 0, 2])
+    grid = evaluate_viability_grid(inputs, *axes)
+    assert grid.shape == (3, 2, 3, 3)
+    for i, g in enumerate(axes[0]):
+        for j, b in enumerate(axes[1]):
+            for k, l in enumerate(axes[2]):
+                for m, r in enumerate(axes[3]):
+                    net, rlv = _scalar(_changed(inputs, g, b, l, r))
+                    assert np.isclose(grid.net_profit[i, j, k, m], net)
+                    assert np.isclose(grid.residual_land_value[i, j, k, m], rlv)
+
+
+def test_calculate_viability_and_sensitivity():
+    inputs = create_sample_viability()
+    results = development_calculator.calculate_viability(inputs)
+    net, rlv = _scalar(inputs)
+    assert np.isclose(results.net_profit, net) and np.isclose(results.residual_land_value, rlv)
+    assert isinstance(results.net_profit, float)
+
+    up = _scalar(_changed(inputs, 0, 5, 0, 0))[0]
+    assert results.sensitivity_analysis["build_costs"]["+5%"] == round((up - net) / net * 100, 1)
+    assert results.sensitivity_analysis["finance_rate"]["+0%"] == 0.0
+
+    assert development_calculator.sensitivity_grid(inputs).shape == (20, 20, 1, 10)
@@ -0,0 +1,99 @@
+import hashlib
+
+import numpy as np
+
+import lib.rag.embedding_store as es
+from lib.rag.embedding_store import EmbeddingStore, chunk_text
+
+
+class BagOfWords:
+    """Deterministic hashed bag-of-words embedder that records what it embeds"""
+
+    def __init__(self, dim=64):
+        self.dim = dim
+        self.embedded = []
+
+    def __call__(self, texts):
+        self.embedded.extend(texts)
+        out = np.zeros((len(texts), self.dim))
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                out[i, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+        return out
+
+
+DOCS = [
+    {"id": "nppf", "content": "National planning policy framework housing supply", "source": "gov"},
+    {"id": "flood", "content": "Flood risk sequential test for new dwellings", "source": "gov"},
+    {"id": "copy", "content": "Flood risk sequential test for new dwellings", "source": "lpa"},
+    {"id": "trees", "content": "Tree preservation orders protect trees", "source": "lpa"},
+]
+
+
+def test_incremental_upsert_only_embeds_new_chunks(tmp_path):
+    embedder = BagOfWords()
+    store = EmbeddingStore(str(tmp_path), embedder, model="bow")
+    stats = store.upsert_documents(DOCS)
+    assert stats == {"added": 4, "updated": 0, "unchanged": 0, "chunks": 4, "embedded": 3}
+
+    hits = store.search("flood risk dwellings", k=2)
+    assert {h.document_id for h in hits} == {"flood", "copy"} and hits[0].score == hits[1].score
+    assert [h.document_id for h in store.search("flood", k=3, where=lambda c: c["metadata"]["source"] == "lpa")][0] == "copy"
+
+    embedder.embedded.clear()
+    changed = [dict(DOCS[0]), dict(DOCS[3], content="Tree preservation orders and hedgerows")]
+    assert store.upsert_documents(changed) == {"added": 0, "updated": 1, "unchanged": 1, "chunks": 1, "embedded": 1}
+    assert embedder.embedded == ["Tree preservation orders and hedgerows"]
+    assert store.search("hedgerows", k=1)[0].document_id == "trees"
+
+    # A second reader sees the new version; removed documents drop out of results
+    reader = EmbeddingStore(str(tmp_path), embedder, model="bow")
+    assert reader.remove_documents(["copy"]) == 1
+    assert [h.document_id for h in store.search("flood risk", k=4)][0] == "flood"
+    assert "copy" not in {h.document_id for h in store.search("flood risk", k=4)}
+    assert store.stats()["rows"] == 4 and store.stats()["live_rows"] == 3
+
+
+def test_rebuild_swaps_shadow_index_and_reuses_vectors(tmp_path, monkeypatch):
+    embedder = BagOfWords()
+    store = EmbeddingStore(str(tmp_path), embedder, model="bow", batch_size=1)
+    store.upsert_documents(DOCS)
+    reader = EmbeddingStore(str(tmp_path), embedder, model="bow")
+    seen_during_rebuild = []
+
+    def progress(done):
+        # Mid-rebuild the previous version is still served in full
+        seen_during_rebuild.append({h.document_id for h in reader.search("flood risk", k=10)})
+
+    embedder.embedded.clear()
+    new_docs = DOCS[:2] + [{"id": "heritage", "content": "Listed building consent for heritage assets"}]
+    stats = store.rebuild(iter(new_docs), progress=progress)
+    assert stats == {"documents": 3, "chunks": 3, "embedded": 1, "reused": 2, "removed": 2}
+    assert [t for t in embedder.embedded if t != "flood risk"] == ["Listed building consent for heritage assets"]
+    assert seen_during_rebuild[0] == {"nppf", "flood", "copy", "trees"}
+    assert {h.document_id for h in reader.search("flood risk", k=10)} == {"nppf", "flood", "heritage"}
+    assert reader.stats()["rows"] == reader.stats()["live_rows"] == 3
+    assert sorted(p.name.split("-")[0] for p in tmp_path.iterdir() if not p.name.startswith(".")) == \
+        ["manifest.json", "vectors"]
+
+
+def test_ivf_search_finds_exact_neighbours(tmp_path, monkeypatch):
+    monkeypatch.setattr(es, "IVF_MIN_ROWS", 100)
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(8, 32))
+    vectors = {f"d{i}": centres[i % 8] + 0.05 * rng.normal(size=32) for i in range(400)}
+    store = EmbeddingStore(str(tmp_path), lambda texts: np.array([vectors[t] for t in texts]), model="fixed")
+    store.rebuild({"id": key, "content": key} for key in vectors)
+    assert store.stats()["ivf_clusters"] == 20
+
+    store.upsert_documents([{"id": "late", "content": "d3"}])
+    for key in ("d0", "d3", "d123", "d399"):
+        assert key in {h.document_id for h in store.search(vectors[key], k=2)}
+
+
+def test_chunk_text_overlaps_at_word_boundaries():
+    text = " ".join(f"word{i}" for i in range(600))
+    chunks = chunk_text(text, size=300, overlap=50)
+    assert all(len(c) <= 300 for c in chunks) and chunks[0].startswith("word0 ")
+    assert all(c.split()[0].startswith("word") for c in chunks)
+    assert chunks[-1].endswith("word599")
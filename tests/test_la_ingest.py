@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from la.ingest import IngestFile, IngestJobRegistry, PageExtractionPipeline, spool_upload
+
+PAGES = {"a.pdf": 40, "b.pdf": 25, "c.pdf": 3}
+
+
+class FakeUpload:
+    def __init__(self, filename, data):
+        self.filename = filename
+        self._data = io.BytesIO(data)
+
+    async def read(self, size=-1):
+        return self._data.read(size)
+
+
+def test_spool_upload_in_chunks(tmp_path):
+    data = bytes(range(256)) * 1000
+    path, size, sha256 = asyncio.run(spool_upload(FakeUpload("../bundle.pdf", data), str(tmp_path), chunk_size=4096))
+    assert size == len(data) and open(path, "rb").read() == data
+    assert sha256 == hashlib.sha256(data).hexdigest()
+    assert path.startswith(str(tmp_path)) and path.endswith("_bundle.pdf")
+
+
+def test_pipeline_extracts_files_concurrently_with_bounded_queue():
+    lock = threading.Lock()
+    active, seen = [0], {"max_active": 0, "files_interleaved": set()}
+
+    def extract(path, page):
+        with lock:
+            active[0] += 1
+            seen["max_active"] = max(seen["max_active"], active[0])
+            seen["files_interleaved"].add(path)
+        time.sleep(0.001)
+        with lock:
+            active[0] -= 1
+        if path == "b.pdf" and page == 7:
+            raise ValueError("corrupt page")
+        return f"{path}:{page}"
+
+    stored = {}
+
+    def persist(job, upload, text):
+        stored[upload.filename] = (upload.status, text)
+
+    async def run():
+        pipeline = PageExtractionPipeline(
+            max_workers=3, queue_size=4, executor=ThreadPoolExecutor(3),
+            count_pages=lambda path: PAGES[path] if path in PAGES else 1 / 0, extract_page=extract
+        )
+        registry = IngestJobRegistry()
+        files = [IngestFile(name, name, 0) for name in list(PAGES) + ["missing.pdf"]]
+        job = registry.create("matter-1", files)
+        task = registry.start(job, pipeline, persist)
+
+        # Producers block on the bounded queue, so progress is visible mid-run
+        await asyncio.sleep(0.01)
+        mid = job.to_dict()
+        await task
+        await pipeline.close()
+        return job, mid, pipeline
+
+    job, mid, pipeline = asyncio.run(run())
+
+    assert mid["status"] == "processing" and 0 < mid["pages_done"] < sum(PAGES.values())
+    assert seen["max_active"] <= 3 and seen["files_interleaved"] == set(PAGES)
+
+    result = job.to_dict()
+    assert result["status"] == "completed" and result["progress"] == 1.0
+    by_name = {f["filename"]: f for f in result["files"]}
+    assert by_name["b.pdf"]["failed_pages"] == [8]
+    assert by_name["missing.pdf"]["status"] == "failed"
+
+    assert stored["a.pdf"] == ("completed", "\n".join(f"a.pdf:{i}" for i in range(40)))
+    assert stored["b.pdf"][1].split("\n")[7] == ""
+    assert stored["missing.pdf"][0] == "failed" and "extraction failed" in stored["missing.pdf"][1]
+    assert pipeline.stats["pages_extracted"] == sum(PAGES.values()) - 1
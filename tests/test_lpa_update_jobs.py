@@ -0,0 +1,136 @@
+import importlib.util
+import sys
+import time
+import types
+
+import fakeredis
+import pytest
+import redis
+
+
+class _Service:
+    """Stand-in for a service lpa_update_jobs constructs at import time"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: {}
+
+
+def _stub(name, *attrs):
+    """Register a stand-in module unless the real one can be imported"""
+    try:
+        if importlib.util.find_spec(name) is not None:
+            return
+    except ModuleNotFoundError:
+        pass
+    module = types.ModuleType(name)
+    module.__path__ = []
+    for attr in attrs:
+        setattr(module, attr, _Service)
+    sys.modules.setdefault(name, module)
+
+
+# job_scheduler and lpa_update_jobs import database, LPA, RAG, monitoring
+# and billing services that aren't part of this tree; parents come first
+for _name, *_attrs in (
+    ("lib.database", "get_db_connection"),
+    ("lib.rag.knowledge_refresh", "KnowledgeRefreshService"),
+    ("lib.lpa",),
+    ("lib.lpa.data_updater", "LPADataUpdater"),
+    ("lib.lpa.appeals_processor", "AppealsProcessor"),
+    ("lib.lpa.constraints_updater", "ConstraintsUpdater"),
+    ("lib.monitoring",),
+    ("lib.monitoring.metrics", "MetricsCollector"),
+    ("lib.billing.usage_tracker", "UsageTracker"),
+):
+    _stub(_name, *_attrs)
+
+from lib.background_jobs import lpa_update_jobs as jobs  # noqa: E402
+from lib.background_jobs.upstream_slots import UpstreamSlots  # noqa: E402
+
+
+def _updated(lpa_code):
+    return {'success': True, 'applications_updated': 1, 'constraints_updated': 0,
+            'policies_updated': 0, 'error': None}
+
+
+@pytest.fixture
+def slots(monkeypatch):
+    slots = UpstreamSlots(fakeredis.FakeRedis(), lease_seconds=60)
+    monkeypatch.setattr(jobs, "upstream_slots", slots)
+    monkeypatch.setattr(jobs, "upstream_limit", lambda upstream: 1)
+    return slots
+
+
+def run(lpa_code="E60000001", upstream="idox"):
+    result = jobs.update_lpa.apply(args=(lpa_code, upstream))
+    assert result.successful(), result.traceback
+    return result.get()
+
+
+def test_failed_updates_retry_then_return_a_failure(slots, monkeypatch):
+    calls = []
+
+    def flaky(lpa_code):
+        calls.append(lpa_code)
+        raise RuntimeError("portal down")
+
+    monkeypatch.setattr(jobs, "_update_single_lpa", flaky)
+    result = run()
+    assert result['success'] is False and "portal down" in result['error']
+    assert result['attempts'] == len(calls) == jobs.LPA_UPDATE_MAX_ATTEMPTS
+    assert slots.held("idox") == 0
+
+
+def test_busy_upstream_waits_past_celerys_default_retries(slots, monkeypatch):
+    holder = slots.acquire("idox", 1)
+    acquire, polls = slots.acquire, []
+
+    def polled(upstream, limit):
+        polls.append(upstream)
+        if len(polls) == 6:
+            slots.release("idox", holder)
+        return acquire(upstream, limit)
+
+    monkeypatch.setattr(slots, "acquire", polled)
+    monkeypatch.setattr(jobs, "_update_single_lpa", _updated)
+    result = run()
+    assert result['success'] is True and result['attempts'] == 1
+    assert len(polls) == 6
+
+
+def test_slot_wait_is_capped(slots, monkeypatch):
+    slots.acquire("idox", 1)
+    monkeypatch.setattr(jobs, "UPSTREAM_SLOT_MAX_WAIT_SECONDS", 0)
+    monkeypatch.setattr(jobs, "_update_single_lpa", _updated)
+    result = run()
+    assert result['success'] is False and "Timed out" in result['error']
+    assert result['attempts'] == jobs.LPA_UPDATE_MAX_ATTEMPTS
+
+
+def test_unreachable_redis_returns_a_failure(slots, monkeypatch):
+    def unreachable(upstream, limit):
+        raise redis.ConnectionError("connection refused")
+
+    monkeypatch.setattr(slots, "acquire", unreachable)
+    result = run()
+    assert result['success'] is False and "connection refused" in result['error']
+
+
+def test_slot_lease_is_renewed_during_a_slow_update(monkeypatch):
+    slots = UpstreamSlots(fakeredis.FakeRedis(), lease_seconds=0.15)
+    monkeypatch.setattr(jobs, "upstream_slots", slots)
+    monkeypatch.setattr(jobs, "upstream_limit", lambda upstream: 1)
+    contenders = []
+
+    def slow(lpa_code):
+        time.sleep(0.4)
+        contenders.append(slots.acquire("idox", 1))
+        return _updated(lpa_code)
+
+    monkeypatch.setattr(jobs, "_update_single_lpa", slow)
+    assert run()['success'] is True
+    assert contenders == [None]
+    assert slots.held("idox") == 0
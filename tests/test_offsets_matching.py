@@ -0,0 +1,227 @@
+import asyncio, random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from offsets_marketplace import (
+    SupplyManager, DemandManager, MatchingEngine, MatchingCriteria,
+    BiodiversityAssessment, HabitatUnit, HabitatType, HabitatCondition, ListingStatus, DemandStatus
+)
+from offsets_marketplace.batch_scoring import SCORE_TOLERANCE, NUMPY_AVAILABLE
+
+LOST = [HabitatType.WOODLAND_BROADLEAF, HabitatType.GRASSLAND_SPECIES_RICH,
+        HabitatType.WETLAND_FRESHWATER, HabitatType.HEATHLAND_LOWLAND]
+
+
+async def _market(n_listings=300, n_demands=8):
+    rng = random.Random(7)
+    supply, demand = SupplyManager(), DemandManager()
+    habitats = [h.value for h in HabitatType if h != HabitatType.DEVELOPED_SEALED]
+    for i in range(n_listings):
+        coords = None if i % 25 == 0 else (rng.uniform(51, 52.5), rng.uniform(-2.5, 0))
+        listing = await supply.create_supply_listing(
+            landowner_details={"name": f"L{i}", "contact": "l@example.com"},
+            site_details={"name": f"Site {i}", "postcode": "OX1 2AB", "coordinates": coords, "area_hectares": 10},
+            habitat_data=[{"habitat_type": rng.choice(habitats), "condition": "moderate",
+                           "area_hectares": rng.uniform(1, 5),
+                           "strategic_significance": rng.choice(["low", "medium", "high"])}
+                          for _ in range(rng.randint(1, 3))],
+            pricing_terms={"price_per_unit": rng.randint(12000, 25000),
+                           "delivery_completion_date": date.today() + timedelta(days=rng.randint(90, 700))},
+        )
+        await supply.update_listing_status(listing.listing_id, ListingStatus.ACTIVE)
+    for i in range(n_demands):
+        assessment = BiodiversityAssessment(
+            site_reference=f"DEV-{i}", postcode="OX1 2AB", local_authority="Oxford",
+            assessment_date=date.today(), assessor_name="T", assessor_qualification="CIEEM",
+            baseline_habitats=[HabitatUnit(habitat_type=rng.choice(LOST), condition=HabitatCondition.MODERATE,
+                                           area_hectares=Decimal("1.0"), distinctiveness_score=6,
+                                           condition_score=Decimal("2.0"))],
+        )
+        await demand.create_demand_request(
+            developer_details={"name": f"D{i}", "contact": "d@example.com"},
+            project_details={"name": f"P{i}", "description": "Test", "postcode": "OX1 2AB",
+                             "coordinates": (rng.uniform(51, 52.5), rng.uniform(-2.5, 0)),
+                             "planning_reference": f"APP/{i}"},
+            biodiversity_assessment=assessment,
+            requirements={"max_price_per_unit": 30000, "preferred_authorities": ["ox"],
+                          "required_by_date": date.today() + timedelta(days=900)},
+        )
+    return MatchingEngine(supply, demand)
+
+
+def _find(engine, **criteria):
+    return asyncio.run(engine.find_matches(criteria=MatchingCriteria(**criteria), max_matches=10**6))
+
+
+def _pairs(matches):
+    return {(m.demand_request_id, m.supply_listing_id) for m in matches}
+
+
+def test_spatial_index_matches_full_scan():
+    engine = asyncio.run(_market())
+    full = _find(engine, max_distance_km=40, use_spatial_index=False, use_batch_scoring=False)
+    indexed = _find(engine, max_distance_km=40, use_spatial_index=True, use_batch_scoring=False)
+    assert full
+    assert _pairs(full) == _pairs(indexed)
+
+
+@pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy not installed")
+def test_batch_scoring_matches_scalar_within_tolerance():
+    engine = asyncio.run(_market())
+    scalar = _find(engine, max_distance_km=40, use_batch_scoring=False)
+    batch = _find(engine, max_distance_km=40, use_batch_scoring=True)
+    assert _pairs(scalar) == _pairs(batch)
+    by_pair = {(m.demand_request_id, m.supply_listing_id): m for m in batch}
+    for m in scalar:
+        b = by_pair[(m.demand_request_id, m.supply_listing_id)]
+        for field in ("overall_match_score", "habitat_type_match_score", "location_preference_score", "distance_km"):
+            assert abs(float(getattr(m, field)) - float(getattr(b, field))) <= SCORE_TOLERANCE
+        assert m.timeline_compatibility == b.timeline_compatibility
+        assert m.matched_units == b.matched_units
+
+
+def test_allocation_is_cheapest_combination():
+    import itertools
+    from offsets_marketplace.allocation import AllocationCandidate, solve_demand_allocation
+
+    rng = random.Random(3)
+    for _ in range(100):
+        candidates = [AllocationCandidate(str(i), Decimal(rng.randint(1, 60)) / 10, Decimal(rng.randint(100, 300)))
+                      for i in range(rng.randint(1, 8))]
+        required, k = Decimal(rng.randint(5, 150)) / 10, rng.randint(1, 4)
+        best = None
+        for size in range(1, k + 1):
+            for combo in itertools.combinations(sorted(candidates, key=lambda c: c.price_per_unit), size):
+                remaining, cost = required, Decimal("0")
+                for c in combo:
+                    take = min(remaining, c.units_available)
+                    cost, remaining = cost + take * c.price_per_unit, remaining - take
+                if remaining <= 0 and (best is None or cost < best):
+                    best = cost
+        result = solve_demand_allocation(candidates, required, k)
+        assert result.feasible == (best is not None)
+        if best is not None:
+            assert result.total_cost == best and result.units_allocated == required
+
+
+def test_allocation_respects_minimum_purchases():
+    import itertools
+    from offsets_marketplace.allocation import AllocationCandidate, solve_demand_allocation
+
+    result = solve_demand_allocation([AllocationCandidate("A", Decimal("11.95"), Decimal(1), Decimal("0.1")),
+                                      AllocationCandidate("B", Decimal(5), Decimal(2), Decimal("0.1"))],
+                                     Decimal(12), 3)
+    assert result.feasible and result.optimal
+    assert result.allocations == [("A", Decimal("11.9")), ("B", Decimal("0.1"))]
+    assert result.total_cost == Decimal("12.1")
+
+    rng = random.Random(11)
+    for _ in range(150):
+        candidates = [AllocationCandidate(str(i), Decimal(rng.randint(1, 60)) / 10, Decimal(rng.randint(100, 300)),
+                                          Decimal(rng.randint(0, 30)) / 10)
+                      for i in range(rng.randint(1, 7))]
+        required, k = Decimal(rng.randint(5, 150)) / 10, rng.randint(1, 4)
+        best = None
+        for size in range(1, k + 1):
+            for combo in itertools.combinations(sorted(candidates, key=lambda c: c.price_per_unit), size):
+                # Every listing at its minimum, then the rest filled cheapest first
+                if any(c.units_available < c.minimum_purchase for c in combo):
+                    continue
+                remaining = required - sum(c.minimum_purchase for c in combo)
+                if remaining < 0:
+                    continue
+                cost = sum(c.minimum_purchase * c.price_per_unit for c in combo)
+                for c in combo:
+                    take = min(remaining, c.units_available - c.minimum_purchase)
+                    cost, remaining = cost + take * c.price_per_unit, remaining - take
+                if remaining <= 0 and (best is None or cost < best):
+                    best = cost
+        result = solve_demand_allocation(candidates, required, k)
+        assert result.feasible == (best is not None)
+        assert len(result.allocations) <= k and result.units_allocated <= required
+        for listing_id, amount in result.allocations:
+            listing = candidates[int(listing_id)]
+            assert listing.minimum_purchase <= amount <= listing.units_available
+        if best is not None:
+            assert result.total_cost == best and result.units_allocated == required
+
+
+def test_optimal_combination_and_market_allocation():
+    engine = asyncio.run(_market())
+    demand_id = next(iter(engine.demand_manager._demand_requests))
+    combo = asyncio.run(engine.find_optimal_match_combination(demand_id, max_suppliers=3))
+    assert 0 < len(combo) <= 3
+    assert len({m.supply_listing_id for m in combo}) == len(combo)
+
+    market = asyncio.run(engine.allocate_market(max_suppliers=3))
+    used = {}
+    for demand_id, matches in market['matches'].items():
+        assert len(matches) <= 3
+        assert sum(m.matched_units for m in matches) <= engine.demand_manager._demand_requests[demand_id].required_units
+        for m in matches:
+            used[m.supply_listing_id] = used.get(m.supply_listing_id, 0) + m.matched_units
+    for listing_id, units in used.items():
+        assert units <= engine.supply_manager._listings[listing_id].units_available
+
+
+def test_incremental_table_tracks_full_recompute():
+    async def run():
+        engine = await _market(n_listings=200, n_demands=6)
+        matcher = engine.enable_incremental_matching(MatchingCriteria(max_distance_km=40))
+        await matcher.rebuild()
+
+        listings = list(engine.supply_manager._listings)
+        demands = list(engine.demand_manager._demand_requests)
+        await engine.supply_manager.reserve_units(listings[1], Decimal("5"))
+        await engine.supply_manager.update_listing_status(listings[2], ListingStatus.WITHDRAWN)
+        await engine.demand_manager.update_demand_status(demands[0], DemandStatus.CANCELLED)
+
+        full = await engine.find_matches(
+            criteria=MatchingCriteria(max_distance_km=40, use_spatial_index=False), max_matches=10**6)
+        table = await engine.find_matches(criteria=matcher.criteria, max_matches=10**6)
+        return full, table, matcher
+
+    full, table, matcher = asyncio.run(run())
+    assert full and _pairs(full) == _pairs(table)
+    assert matcher.get_stats()['events_processed'] == 3
+
+
+def test_indexed_search_and_cursor_pagination():
+    async def run():
+        engine = await _market(n_listings=400, n_demands=4)
+        supply = engine.supply_manager
+        listings = list(supply._listings.values())
+        await supply.reserve_units(listings[3].listing_id, listings[3].units_available)
+        await supply.update_listing_status(listings[5].listing_id, ListingStatus.WITHDRAWN)
+
+        query = dict(habitat_types=[HabitatType.WOODLAND_BROADLEAF, HabitatType.SCRUBLAND],
+                     min_units=Decimal("2"), max_price_per_unit=Decimal("20000"),
+                     max_distance_km=60, center_coordinates=(51.7, -1.2),
+                     delivery_by_date=date.today() + timedelta(days=500),
+                     status_filter=[ListingStatus.ACTIVE])
+        expected = [
+            l for l in sorted(listings, key=lambda l: l.created_date, reverse=True)
+            if l.status == ListingStatus.ACTIVE and l.units_available >= Decimal("2")
+            and l.price_per_unit <= Decimal("20000")
+            and {u.habitat_type for u in l.available_habitat_units} & set(query['habitat_types'])
+            and l.delivery_completion_date <= query['delivery_by_date']
+            and (not l.coordinates or supply._calculate_distance((51.7, -1.2), l.coordinates) <= 60)
+        ]
+        everything = await supply.search_supply_listings(**query, limit=None)
+
+        pages, cursor = [], None
+        while True:
+            page, cursor = await supply.search_supply_listings_page(**query, limit=7, cursor=cursor)
+            pages.extend(page)
+            if cursor is None:
+                break
+        unfiltered, _ = await supply.search_supply_listings_page(limit=None)
+        return expected, everything, pages, unfiltered, listings
+
+    expected, everything, pages, unfiltered, listings = asyncio.run(run())
+    assert expected
+    ids = lambda ls: [l.listing_id for l in ls]
+    assert ids(everything) == ids(expected) == ids(pages)
+    assert ids(unfiltered) == ids(sorted(listings, key=lambda l: l.created_date, reverse=True))
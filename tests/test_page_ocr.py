@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import page_ocr
+from page_ocr import PageOCRCache, extract_pages, page_fingerprint
+
+
+class Obj(dict):
+    """Minimal stand-in for PyPDF2 dictionary/stream objects"""
+
+    def __init__(self, data=b"", **entries):
+        super().__init__(entries)
+        self._data = data
+
+    def get_object(self):
+        return self
+
+    def get_data(self):
+        return self._data
+
+
+class Page(Obj):
+    mediabox = (0, 0, 595, 842)
+
+    def get_contents(self):
+        return Obj(b"q 595 0 0 842 0 0 cm /Im0 Do Q")
+
+
+def _scan(image):
+    return Page(**{"/Resources": Obj(**{"/XObject": Obj(**{"/Im0": Obj(image)})})})
+
+
+def test_fingerprint_follows_drawn_images():
+    assert page_fingerprint(_scan(b"img-1")) == page_fingerprint(_scan(b"img-1"))
+    assert page_fingerprint(_scan(b"img-1")) != page_fingerprint(_scan(b"img-2"))
+    form = Obj(b"form", **{"/Subtype": "/Form", "/Resources": Obj(**{"/XObject": Obj(**{"/Im1": Obj(b"a")})})})
+    nested = lambda data: Page(**{"/Resources": Obj(**{"/XObject": Obj(**{"/Fm0": form, "/Im0": Obj(data)})})})
+    assert page_fingerprint(nested(b"x")) != page_fingerprint(nested(b"y"))
+
+
+def test_only_text_less_and_changed_pages_are_ocrd(tmp_path, monkeypatch):
+    bundle = {"pages": [("Native text layer on this page, long enough.", "fp-0"), ("", "fp-1"),
+                        (" ", "fp-2"), ("", "fp-3")]}
+    ocr_calls = []
+
+    def fake_ocr(path, page_number, dpi, lang):
+        ocr_calls.append(page_number)
+        if bundle["pages"][page_number][1] == "fp-bad":
+            raise RuntimeError("tesseract crashed")
+        return f"ocr {bundle['pages'][page_number][1]}"
+
+    monkeypatch.setattr(page_ocr, "OCR_AVAILABLE", True)
+    monkeypatch.setattr(page_ocr, "read_native_pages", lambda path: list(bundle["pages"]))
+    monkeypatch.setattr(page_ocr, "ocr_page", fake_ocr)
+    cache = PageOCRCache(str(tmp_path))
+
+    def run():
+        ocr_calls.clear()
+        return extract_pages(b"%PDF", cache=cache, executor=ThreadPoolExecutor(2))
+
+    first = run()
+    assert sorted(ocr_calls) == [1, 2, 3]
+    assert (first.native_pages, first.ocr_pages, first.cached_pages) == (1, 3, 0)
+    assert first.text.split("\n\n")[1:] == ["ocr fp-1", "ocr fp-2", "ocr fp-3"]
+
+    # Re-upload with page 3 replaced: only that page is OCR'd again
+    bundle["pages"][3] = ("", "fp-3b")
+    second = run()
+    assert ocr_calls == [3] and (second.ocr_pages, second.cached_pages) == (1, 2)
+    assert second.pages[3] == "ocr fp-3b" and second.pages[1] == "ocr fp-1"
+
+    bundle["pages"].append(("", "fp-bad"))
+    third = run()
+    assert third.failed_pages == [4] and third.pages[4] == "" and ocr_calls == [4]
+
+    monkeypatch.setattr(page_ocr, "OCR_AVAILABLE", False)
+    assert run().ocr_applied is False and ocr_calls == []
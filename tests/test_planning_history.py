@@ -0,0 +1,50 @@
+import random
+import time
+
+from la.parsers import parse_con29
+from la.planning_history import extract_planning_decisions
+
+
+def _rows(text):
+    return [(d.ref, d.description, d.decision, d.date) for d in extract_planning_decisions(text)]
+
+
+def test_labelled_records_and_table_rows():
+    text = (
+        "1.1 Planning and building decisions\n"
+        "Reference: 21/01234/FUL\nProposal: Single storey rear extension\n"
+        "Decision: Conditionally approved\nDate of decision: 12 March 2021\n"
+        "Ref: 19/0099/LBC Description: Replacement windows Decision: Refused Date: 01/02/2019\n"
+        "SP/03/12 | Loft conversion | Granted | 1st May 2003   12/3746N Change of use refused\n"
+        "3.7 Outstanding notices\nDecision: Granted\n"
+    )
+    assert _rows(text) == [
+        ("21/01234/FUL", "Single storey rear extension", "approved", "12 March 2021"),
+        ("19/0099/LBC", "Replacement windows", "refused", "01/02/2019"),
+        ("SP/03/12", "Loft conversion", "granted", "1st May 2003"),
+        ("12/3746N", "Change of use", "refused", None),
+        ("N/A", None, "granted", None),
+    ]
+    assert len(parse_con29(text).planning_decisions) == 5
+
+
+def test_prose_and_empty_labels_produce_no_rows():
+    assert _rows("The decision of the council dated 12/03/2021 is final. Reference: none. Status: unknown") == []
+    assert _rows("decision: date: ref: description: " * 500) == []
+
+
+def test_fuzzed_inputs_stay_linear():
+    rng = random.Random(16)
+    tokens = ["decision", ":", "date", "ref", "Reference No.", "21/0001/FUL", "12/03/2021", "granted",
+              "Proposal:", "|", "/", "1", "12", " ", "\n", "3.7 Heading", "aaaa", "refused"]
+    for _ in range(200):
+        text = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 200)))
+        for d in extract_planning_decisions(text):
+            assert d.ref != "N/A" or d.decision
+
+    # ~1 MB of adversarial input, once as lines and once as a single line
+    soup = "".join(rng.choice(tokens) for _ in range(250_000))
+    for text in (soup, soup.replace("\n", " ")):
+        started = time.perf_counter()
+        extract_planning_decisions(text)
+        assert time.perf_counter() - started < 10
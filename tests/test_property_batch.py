@@ -0,0 +1,47 @@
+import asyncio
+
+from property_api.aggregator import PropertyDataAggregator
+
+
+def test_stream_summaries_shares_postcode_lookups(monkeypatch):
+    calls = {"land_registry": [], "flood_risk": [], "planning": [], "epc": []}
+
+    async def land_registry(self, identifier, search_type):
+        calls["land_registry"].append(identifier)
+        await asyncio.sleep(0.01)
+        return {"price_paid_data": [{"price": 250000}]}
+
+    async def flood_risk(self, identifier, search_type):
+        calls["flood_risk"].append(identifier)
+        await asyncio.sleep(0.01)
+        return {"overall_risk": "Low"}
+
+    async def planning(self, identifier, search_type, radius_m):
+        calls["planning"].append(identifier)
+        return {"applications": []}
+
+    async def epc(self, identifier, search_type):
+        calls["epc"].append(identifier)
+        return {"current_energy_rating": "C"}
+
+    monkeypatch.setattr(PropertyDataAggregator, "_get_land_registry_data", land_registry)
+    monkeypatch.setattr(PropertyDataAggregator, "_get_flood_risk_data", flood_risk)
+    monkeypatch.setattr(PropertyDataAggregator, "_get_planning_history_data", planning)
+    monkeypatch.setattr(PropertyDataAggregator, "_get_epc_data", epc)
+
+    identifiers = (
+        [f"{n} High Street, Oxford OX1 2AB" for n in range(12)]
+        + [f"{n} Mill Road, Cambridge CB1 2AB" for n in range(6)]
+        + ["4 Mill Road, Cambridge CB12AB", "0 High Street, Oxford OX1 2AB"]
+    )
+
+    async def run():
+        aggregator = PropertyDataAggregator()
+        return [row async for row in aggregator.stream_property_summaries(identifiers, max_concurrency=4)]
+
+    rows = asyncio.run(run())
+    assert sorted(row["index"] for row in rows) == list(range(len(identifiers)))
+    assert all(row["success"] and row["data"]["estimated_value"] == 250000 for row in rows)
+    assert sorted(calls["land_registry"]) == sorted(calls["flood_risk"]) == ["CB1 2AB", "OX1 2AB"]
+    assert len(calls["planning"]) == 2
+    assert len(calls["epc"]) == len(set(identifiers))
@@ -0,0 +1,232 @@
+import asyncio
+
+import pytest
+
+from property_api.cache import PropertyDataCache
+
+
+def test_file_cache_lru_eviction_uses_index(tmp_path):
+    async def run():
+        cache = PropertyDataCache("lru", backend="file", max_size_mb=1, cache_dir=str(tmp_path))
+        blob = "x" * 50_000
+        for i in range(40):
+            assert await cache.set(f"k{i}", blob)
+            if i >= 1:
+                assert await cache.get("k0") == blob  # keep k0 hot
+        stats = await cache.get_stats()
+        return cache, stats
+
+    cache, stats = asyncio.run(run())
+    assert stats["evictions"] > 0
+    assert stats["directory_scans"] == 1
+    assert stats["cache_size_mb"] <= 1
+    assert (tmp_path / "lru:k0.json").exists()
+    assert not (tmp_path / "lru:k1.json").exists()
+    assert not list(tmp_path.glob("*.tmp"))
+
+    # A fresh instance rebuilds the index from one scan and sees the same entries
+    reopened = PropertyDataCache("lru", backend="file", max_size_mb=1, cache_dir=str(tmp_path))
+    assert asyncio.run(reopened.get("k39")) is not None
+    assert reopened.stats["directory_scans"] == 1
+    assert len(reopened._file_index) == stats["indexed_files"]
+
+
+def test_adapters_share_one_file_cache_per_process(tmp_path, monkeypatch):
+    from property_api import cache as cache_module
+    from property_api.epc_data import EPCDataAdapter
+    from property_api.land_registry import LandRegistryAdapter
+
+    monkeypatch.delenv("PROPERTY_CACHE_BACKEND", raising=False)
+    monkeypatch.setattr(cache_module, "DEFAULT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache_module, "cache_manager", cache_module.CacheManager())
+
+    async def run():
+        first, second = LandRegistryAdapter(), LandRegistryAdapter()
+        await first.cache.set("title_A", {"n": 1})
+        return first, second, await second.cache.get("title_A")
+
+    first, second, value = asyncio.run(run())
+    assert first.cache is second.cache and value == {"n": 1}
+    assert first.cache.stats["directory_scans"] == 1
+    assert EPCDataAdapter().cache is cache_module.get_cache("epc_data")
+
+
+def test_file_cache_expired_entries_are_dropped(tmp_path):
+    async def run():
+        cache = PropertyDataCache("ttl", backend="file", cache_dir=str(tmp_path))
+        await cache.set("gone", {"a": 1}, ttl_hours=-1)
+        await cache.set("kept", {"a": 2})
+        return await cache.get("gone"), await cache.get("kept")
+
+    assert asyncio.run(run()) == (None, {"a": 2})
+    assert not (tmp_path / "ttl:gone.json").exists()
+
+
+def test_redis_backend_shares_entries_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def run():
+        server = fakeredis.FakeServer()
+        worker_a, worker_b = (
+            PropertyDataCache("epc_data", backend="redis",
+                              redis_client=fakeredis.aioredis.FakeRedis(server=server), l1_max_entries=2)
+            for _ in range(2)
+        )
+        big = {"rows": ["x" * 100] * 50}
+        await worker_a.set_many({"a": {"n": 1}, "b": big, "c": [3]})
+
+        # worker B misses its memory tier and fetches all three in one MGET round trip
+        first = await worker_b.get_many(["a", "b", "c", "missing"])
+        second = await worker_b.get("c")
+        stats = dict(worker_b.stats)
+
+        await worker_a.delete("a")
+        await worker_a.clear()
+        cleared = await worker_b.get_many(["a", "b"])
+        return first, second, stats, worker_b, cleared
+
+    first, second, stats, worker_b, cleared = asyncio.run(run())
+    assert first == {"a": {"n": 1}, "b": {"rows": ["x" * 100] * 50}, "c": [3]}
+    assert second == [3]
+    assert stats["l2_hits"] == 3 and stats["l1_hits"] == 1
+    assert stats["redis_round_trips"] == 1
+    assert len(worker_b._l1) == 2
+    # "a" was evicted from B's bounded memory tier, so the delete is visible;
+    # "b" is still served from B's memory tier until its L1 TTL lapses
+    assert cleared == {"b": {"rows": ["x" * 100] * 50}}
+
+
+def test_adapters_share_entries_between_workers_through_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from property_api import cache as cache_module
+    from property_api.land_registry import LandRegistryAdapter
+
+    server = fakeredis.FakeServer()
+    lookups = []
+    mock_lookup = LandRegistryAdapter._mock_title_lookup
+
+    async def counted_lookup(self, title_number):
+        lookups.append(title_number)
+        return await mock_lookup(self, title_number)
+
+    monkeypatch.setenv("PROPERTY_CACHE_BACKEND", "redis")
+    monkeypatch.setattr(LandRegistryAdapter, "_mock_title_lookup", counted_lookup)
+
+    def worker():
+        # Each worker process has its own cache manager and Redis client
+        monkeypatch.setattr(cache_module, "cache_manager", cache_module.CacheManager())
+        cache = cache_module.get_cache("land_registry")
+        cache._redis = fakeredis.aioredis.FakeRedis(server=server)
+        return cache
+
+    async def run():
+        cache_a = worker()
+        async with LandRegistryAdapter() as adapter:
+            title_a = await adapter.get_title_data("EX123456")
+        cache_b = worker()
+        async with LandRegistryAdapter() as first, LandRegistryAdapter() as second:
+            title_b = await first.get_title_data("EX123456")
+            assert second.cache is first.cache is cache_b
+        return cache_a, cache_b, title_a, title_b
+
+    cache_a, cache_b, title_a, title_b = asyncio.run(run())
+    assert cache_a is not cache_b and cache_b.backend == "redis"
+    assert title_a == title_b and title_b.title_number == "EX123456"
+    assert lookups == ["EX123456"]
+    assert cache_b.stats["l2_hits"] == 1
+
+
+def test_single_flight_and_stale_while_revalidate():
+    async def run():
+        cache = PropertyDataCache("sf", backend="memory")
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"version": len(calls)}
+
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute, stale_ttl_hours=1) for _ in range(20)))
+        assert len(calls) == 1 and all(r == {"version": 1} for r in results)
+
+        # Expire the fresh window: callers get the stale value, one refresh runs
+        entry = await cache.get("k")
+        entry["__swr_fresh_until__"] = 0
+        stale = await asyncio.gather(*(cache.get_or_compute("k", compute, stale_ttl_hours=1) for _ in range(5)))
+        assert all(r == {"version": 1} for r in stale)
+        await asyncio.gather(*cache._background)
+        return calls, await cache.get_or_compute("k", compute, stale_ttl_hours=1), cache.stats
+
+    calls, refreshed, stats = asyncio.run(run())
+    assert len(calls) == 2 and refreshed == {"version": 2}
+    assert stats["coalesced"] == 19 and stats["stale_served"] == 5 and stats["refreshes"] == 1
+
+
+def test_adapters_share_pooled_session_and_limiter():
+    from property_api import LandRegistryAdapter, FloodRiskAdapter, upstream_pool
+    from property_api.upstream import TokenBucket
+
+    async def run():
+        async with LandRegistryAdapter() as a, LandRegistryAdapter() as b, FloodRiskAdapter() as flood:
+            shared = a.session is b.session and a.limiter is b.limiter and flood.session is not a.session
+
+        bucket = TokenBucket(rate=50, capacity=5)
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(bucket.acquire() for _ in range(10)))
+        elapsed = asyncio.get_running_loop().time() - start
+
+        await upstream_pool.close_all()
+        return shared, elapsed, bucket.stats
+
+    shared, elapsed, stats = asyncio.run(run())
+    assert shared
+    # 5 burst tokens, then 5 more at 50/s
+    assert 0.08 <= elapsed < 0.5
+    assert stats["acquired"] == 10 and stats["waited"] == 5
+    assert upstream_pool.get_stats()["open_sessions"] == 0
+
+
+def test_report_flight_outlives_its_starting_caller_and_empty_reports_are_not_cached(monkeypatch):
+    from property_api import aggregator as agg, upstream_pool
+
+    lookups = []
+
+    async def land_registry(self, identifier, search_type):
+        lookups.append(identifier)
+        await asyncio.sleep(0.05)
+        if identifier == "nowhere" or self.land_registry_adapter.session is None:
+            return None
+        return {"price_paid_data": [{"price": 500000}]}
+
+    async def nothing(self, *args):
+        return None
+
+    monkeypatch.setattr(agg.PropertyDataAggregator, "_get_land_registry_data", land_registry)
+    for name in ("_get_epc_data", "_get_flood_risk_data", "_get_planning_history_data"):
+        monkeypatch.setattr(agg.PropertyDataAggregator, name, nothing)
+    cache = PropertyDataCache("reports", backend="memory")
+    monkeypatch.setattr(agg, "get_cache", lambda name: cache)
+
+    async def run():
+        async def starter():
+            async with agg.PropertyDataAggregator() as aggregator:
+                await aggregator.get_comprehensive_property_report("SW1A 1AA", "postcode")
+
+        # The caller that started the shared flight leaves before it finishes
+        started = asyncio.ensure_future(starter())
+        await asyncio.sleep(0.01)
+        async with agg.PropertyDataAggregator() as aggregator:
+            waiter = asyncio.ensure_future(aggregator.get_comprehensive_property_report("SW1A 1AA", "postcode"))
+            await asyncio.sleep(0.01)
+            started.cancel()
+            report = await waiter
+            empty = [await aggregator.get_comprehensive_property_report("nowhere", "postcode") for _ in range(2)]
+
+        await upstream_pool.close_all()
+        return report, empty
+
+    report, empty = asyncio.run(run())
+    assert report["report_metadata"]["data_sources"]["land_registry"]
+    assert lookups.count("SW1A 1AA") == 1
+    assert not any(empty[0]["report_metadata"]["data_sources"].values())
+    assert lookups.count("nowhere") == 2
@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+
+from lib.security import rate_limiter as rl
+from lib.security.rate_limiter import RateLimiter, WindowCounter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limit_requests
+    (client_id, endpoint, ip_address, user_agent, user_id, request_timestamp, request_info);
+CREATE TABLE IF NOT EXISTS rate_limit_violations
+    (client_id, endpoint, ip_address, user_agent, user_id, violation_timestamp, request_info);
+"""
+
+
+def _db(path=":memory:"):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _clock(monkeypatch, start=1_000_000.0):
+    now = [start]
+    monkeypatch.setattr(rl.time, "time", lambda: now[0])
+    return now
+
+
+def test_window_counter_weights_previous_window():
+    counter = WindowCounter()
+    counter.roll(60, 600.0)
+    counter.current = 30
+    counter.roll(60, 675.0)  # next window, a quarter elapsed
+    assert counter.previous == 30 and counter.current == 0
+    assert counter.estimate(60, 675.0) == pytest.approx(22.5)
+    assert counter.seconds_until_below(20, 60, 675.0) == pytest.approx(5.0)
+    counter.roll(60, 800.0)  # skipped a window entirely
+    assert counter.previous == 0
+
+
+def test_burst_then_window_limit(monkeypatch):
+    now = _clock(monkeypatch)
+    limiter = RateLimiter(_db(), log_batch_size=1000)
+    client = {"ip_address": "10.0.0.1", "user_agent": "ua"}
+
+    # 5/min with a burst of 10 per 10 seconds: the 11th request inside the burst window is refused
+    results = [limiter.check_rate_limit("/api/auth/login", client) for _ in range(11)]
+    assert all(r["allowed"] for r in results[:10])
+    assert not results[10]["allowed"] and results[10]["retry_after"] >= 1
+    assert limiter.check_rate_limit("/api/auth/login", {"ip_address": "10.0.0.2"})["allowed"]
+
+    now[0] += 11  # burst window has passed
+    assert limiter.check_rate_limit("/api/auth/login", client)["allowed"]
+
+    limiter.log_writer.flush()
+    counts = limiter.get_rate_limit_stats()
+    assert counts["total_requests"] == 12 and counts["total_violations"] == 1
+    assert limiter.log_writer.stats["flushes"] == 1
+
+
+def test_log_writer_batches_in_background(tmp_path, monkeypatch):
+    path = str(tmp_path / "rl.db")
+    limiter = RateLimiter(_db(path), log_batch_size=50, log_flush_interval_ms=10_000)
+    for i in range(120):
+        assert limiter.check_rate_limit("/api/unlisted", {"user_id": i})["allowed"]
+
+    limiter.log_writer.flush()
+    assert limiter.log_writer.stats["written"] == 120
+    assert limiter.log_writer.stats["flushes"] == 3
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM rate_limit_requests").fetchone()[0] == 120
+    limiter.log_writer.close()
+
+
+def test_redis_counters_shared_across_workers(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    _clock(monkeypatch)
+    server = fakeredis.FakeServer()
+    workers = [RateLimiter(_db(), redis_client=fakeredis.FakeRedis(server=server)) for _ in range(2)]
+    client = {"ip_address": "10.0.0.9"}
+
+    allowed = [workers[i % 2].check_rate_limit("/api/billing/upgrade", client)["allowed"] for i in range(5)]
+    assert allowed == [True, True, True, False, False]
+    assert workers[0].get_client_status(client)["/api/billing/upgrade"]["current_requests"] == 3
+    assert workers[0].backend == "redis" and not workers[0].counters
+
+    down = fakeredis.FakeServer()
+    down.connected = False
+    workers[1].redis = fakeredis.FakeRedis(server=down)
+    assert workers[1].check_rate_limit("/api/billing/upgrade", client)["allowed"]
+    assert workers[1].stats["redis_errors"] == 1
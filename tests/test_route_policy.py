@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from lib.route_policy import RoutePolicyTable, build_route_policy_table, get_route_policy_table
+from lib.security.rate_limiter import DEFAULT_RATE_LIMITS, RateLimiter
+from middleware.credit_enforcement import CREDIT_ENFORCEMENT_MAP
+
+
+def _legacy_rate_limit(endpoint):
+    if endpoint in DEFAULT_RATE_LIMITS:
+        return DEFAULT_RATE_LIMITS[endpoint]
+    for pattern, config in DEFAULT_RATE_LIMITS.items():
+        if pattern.endswith('*') and endpoint.startswith(pattern[:-1]):
+            return config
+    return DEFAULT_RATE_LIMITS['default']
+
+
+def test_default_table_matches_previous_lookups():
+    table = get_route_policy_table()
+    paths = [p for p in DEFAULT_RATE_LIMITS if p != 'default'] + [
+        '/api/admin/', '/api/admin/users/7', '/api/admin', '/api/auth/login/', '/', '', '/api/unknown'
+    ]
+    for path in paths:
+        assert table.match(None, path).rate_limit is _legacy_rate_limit(path), path
+    for route_key, rule in CREDIT_ENFORCEMENT_MAP.items():
+        method, path = route_key.split(' ')
+        assert table.match(method, path).credit is rule
+        assert table.match('GET', path).credit is None
+
+    match = table.match('post', '/api/planning/analyse')
+    assert match.credit['credit_cost'] == 1
+    assert match.rate_limit is DEFAULT_RATE_LIMITS['default']
+
+    limiter = RateLimiter(db_connection=__import__('sqlite3').connect(':memory:'))
+    assert limiter.policy_table is table
+    assert limiter._get_rate_limit_config('/api/admin/x') is DEFAULT_RATE_LIMITS['/api/admin/*']
+
+
+def test_precedence_and_path_params():
+    table = RoutePolicyTable(default_rate_limit={'requests': 1})
+    table.add('/api/projects/*', rate_limit='projects')
+    table.add('/api/projects/{project_id}', 'GET', credit='read')
+    table.add('/api/projects/{project_id}', 'DELETE', credit='delete')
+    table.add('/api/projects/{project_id}/docs/*', 'POST', credit='docs', rate_limit='docs')
+    table.add('/api/projects/export', credit='export')
+    table.add('/api/projects/export/*', rate_limit='export')
+
+    match = table.match('GET', '/api/projects/p-1')
+    assert match == ('/api/projects/{project_id}', {'project_id': 'p-1'}, 'projects', 'read')
+    assert table.match('DELETE', '/api/projects/p-1').credit == 'delete'
+    assert table.match('PUT', '/api/projects/p-1').credit is None
+
+    # Static segment beats the parameter; fields fall through to wildcards
+    assert table.match('GET', '/api/projects/export')[2:] == ('projects', 'export')
+    # Deeper wildcard beats a shallower one, found through the parameter branch too
+    assert table.match('GET', '/api/projects/export/csv').rate_limit == 'export'
+    deep = table.match('POST', '/api/projects/p-9/docs/a/b')
+    assert (deep.credit, deep.rate_limit, deep.params) == ('docs', 'docs', {'project_id': 'p-9'})
+    assert table.match('GET', '/api/projects/p-9/docs/a').credit is None
+
+    assert table.match('GET', '/api/projects').rate_limit == {'requests': 1}
+    assert table.match('GET', '/api/projects/').rate_limit == 'projects'
+    with pytest.raises(ValueError):
+        table.add('/api/pro*')
+    with pytest.raises(ValueError):
+        table.add('/api/x', quota=1)
+    with pytest.raises(ValueError):
+        table.add('/api/x', permission='sites:read')
+
+
+def test_matches_linear_scan_on_generated_patterns():
+    rng = random.Random(5)
+    words = [f"w{i}" for i in range(12)]
+    patterns = set()
+    while len(patterns) < 300:
+        segments = [rng.choice(words + ['{id}']) for _ in range(rng.randint(1, 4))]
+        if rng.random() < 0.2:
+            segments.append('*')
+        patterns.add('/' + '/'.join(segments))
+    table = build_route_policy_table({p: p for p in patterns}, {})
+
+    def linear(path):
+        parts = path.split('/')[1:]
+        exact = [p for p in patterns if not p.endswith('*') and _fits(p.split('/')[1:], parts)]
+        if exact:
+            return _most_static(exact)
+        wild = [p for p in patterns if p.endswith('*') and len(parts) >= len(p.split('/')) - 1
+                and _fits(p.split('/')[1:-1], parts[:len(p.split('/')) - 2])]
+        return _most_static(wild) if wild else None
+
+    for _ in range(2000):
+        path = '/' + '/'.join(rng.choice(words + ['x']) for _ in range(rng.randint(1, 5)))
+        assert table.match('GET', path).rate_limit == linear(path), path
+
+
+def _fits(pattern_parts, parts):
+    return len(pattern_parts) == len(parts) and all(
+        p == s or (p == '{id}' and s) for p, s in zip(pattern_parts, parts))
+
+
+def _most_static(candidates):
+    # Longest first, then static segments before parameters, left to right
+    return max(candidates, key=lambda p: (len(p.split('/')), [s != '{id}' for s in p.split('/')]))
@@ -0,0 +1,42 @@
+import dataclasses
+
+from modules.development_calculator import MIN_VIABLE_MARGIN_PERCENT
+from modules.scheme_optimiser import create_sample_optimisation, pareto_front, scheme_optimiser
+
+
+def _objectives(variant):
+    return (variant.viability_results.net_profit, variant.planning_score, variant.affordable_percent)
+
+
+def _dominates(a, b):
+    return all(x >= y for x, y in zip(a, b)) and any(x > y for x, y in zip(a, b))
+
+
+def test_search_prunes_and_returns_non_dominated_front():
+    site, base, parameters = create_sample_optimisation()
+    result = scheme_optimiser.search_schemes(site, base, parameters)
+
+    assert result.pareto_front and result.evaluated < result.candidates
+    assert result.pruned["density"] > 0 and result.pruned["viability"] > 0
+    for variant in result.pareto_front:
+        assert variant.is_feasible
+        assert variant.affordable_percent >= site.affordable_housing_percent
+        assert variant.viability_results.profit_margin_percent >= MIN_VIABLE_MARGIN_PERCENT
+        assert not any(_dominates(_objectives(other), _objectives(variant)) for other in result.pareto_front)
+
+    variants = scheme_optimiser.optimise_scheme(site, base, parameters)
+    assert [v.combined_score for v in variants] == sorted((v.combined_score for v in variants), reverse=True)
+
+
+def test_pool_and_in_process_searches_agree(monkeypatch):
+    import modules.scheme_optimiser as so
+
+    site, base, parameters = create_sample_optimisation()
+    monkeypatch.setattr(so, "POOL_MIN_CANDIDATES", 1)
+    monkeypatch.setattr(so, "POOL_CHUNK_SIZE", 4)
+    pooled = scheme_optimiser.search_schemes(site, base, dataclasses.replace(parameters, workers=2))
+    inline = scheme_optimiser.search_schemes(site, base, dataclasses.replace(parameters, workers=0))
+
+    assert [(v.variant_id, _objectives(v)) for v in pooled.pareto_front] == \
+        [(v.variant_id, _objectives(v)) for v in inline.pareto_front]
+    assert pareto_front([]) == []
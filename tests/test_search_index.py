@@ -0,0 +1,86 @@
+import json
+import math
+
+import pytest
+
+from lib.ai_explainability.citation_engine import CitationEngine
+from modules.planning_copilot import PlanningKnowledgeBase
+from search_index import BM25Index, tokenize
+
+
+def _bm25(docs, query, k1=1.2, b=0.75):
+    """Textbook BM25 over tokenised documents"""
+    tokens = {doc_id: tokenize(text) for doc_id, text in docs.items()}
+    average = sum(map(len, tokens.values())) / len(tokens)
+    scores = {}
+    for doc_id, terms in tokens.items():
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in t for t in tokens.values())
+            tf = terms.count(term)
+            if tf:
+                idf = math.log(1 + (len(tokens) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(terms) / average))
+        if score:
+            scores[doc_id] = score
+    return scores
+
+
+def test_scores_match_bm25_through_updates():
+    docs = {
+        "a": "Residential scheme of 25 dwellings allowed on appeal",
+        "b": "Housing refused: harm to the conservation area and heritage assets",
+        "c": "Planning permission for houses near the station, high density",
+        "d": "Appeal dismissed, design harmful to character",
+    }
+    index = BM25Index()
+    for doc_id, text in docs.items():
+        index.add(doc_id, text, payload=doc_id.upper())
+
+    index.add("b", "Housing allowed after heritage objections were resolved")
+    docs["b"] = "Housing allowed after heritage objections were resolved"
+    assert index.remove("d") and not index.remove("d")
+    del docs["d"]
+    index.add("e", "Appeal allowed for a dwelling in a conservation area")
+    docs["e"] = "Appeal allowed for a dwelling in a conservation area"
+
+    query = "appeal allowed for new dwellings"
+    expected = _bm25(docs, query)
+    hits = index.search(query, k=10)
+    assert {doc_id: score for doc_id, score, _ in hits} == pytest.approx(expected)
+    assert [score for _, score, _ in hits] == sorted(expected.values(), reverse=True)
+    assert dict((doc_id, payload) for doc_id, _, payload in hits)["a"] == "A"
+    assert [doc_id for doc_id, _, _ in index.search(query, k=1, where=lambda doc_id, _: doc_id != hits[0][0])] \
+        == [hits[1][0]]
+    assert index.search("the of and", k=5) == []
+
+
+def test_copilot_and_citation_search(tmp_path):
+    kb = PlanningKnowledgeBase()
+    kb.add_precedent({"reference": "APP/1", "development": "Office conversion to flats",
+                      "key_issues": ["Parking"], "relevance_keywords": ["prior approval"]})
+    assert kb.search_precedents("parking for flats")[0]["content"]["reference"] == "APP/1"
+    # Precedents without a reference keep distinct ids after removals and replacements
+    kb.add_precedent({"development": "Barn conversion", "key_issues": ["Heritage"]})
+    kb.precedent_index.remove("APP/1")
+    kb.knowledge.precedents = [p for p in kb.knowledge.precedents if p.get("reference") != "APP/1"]
+    kb.add_precedent({"development": "Rear extension", "key_issues": ["Overlooking"]})
+    kb.add_precedent({"development": "Rear extension", "key_issues": ["Overlooking"]})
+    kb.add_precedent({"reference": "APP/1", "development": "Office conversion to flats"})
+    assert len(kb.precedent_index) == len(kb.knowledge.precedents)
+    assert kb.search_precedents("barn heritage")[0]["content"]["development"] == "Barn conversion"
+    assert kb.search_legislation("Town and Country Planning Act")[0]["key"] == "town_country_planning_act"
+    assert kb.search_policies("How much affordable housing is needed?")[0]["topic"] == "affordable_housing"
+
+    entries = {
+        "nppf-124": {"type": "planning_guidance", "quality": "secondary", "title": "NPPF efficient use of land",
+                     "authority": "DLUHC", "date": "2023-12-19", "content_excerpt": "Density and land use"},
+        "local-h1": {"type": "local_plan_policy", "quality": "tertiary", "title": "Policy H1 housing density",
+                     "authority": "Council", "date": "2019-03-15", "lpa_code": "E0001",
+                     "content_excerpt": "Minimum density of 40 dwellings per hectare"},
+    }
+    (tmp_path / "citation_index.json").write_text(json.dumps(entries))
+    engine = CitationEngine(str(tmp_path))
+    assert [c.id for c in engine.find_citations("housing density", "E0001")] == ["local-h1", "nppf-124"]
+    assert [c.id for c in engine.find_citations("housing density", "E0002")] == ["nppf-124"]
+    assert engine.find_citations("housing density", "E0001")[0].relevance_score == 1.0
@@ -0,0 +1,73 @@
+import asyncio
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import Base
+from la.models import LAMatter
+from sla import BusinessCalendar, england_wales_bank_holidays, sla_manager
+
+
+def test_bank_holidays_include_substitute_days():
+    assert england_wales_bank_holidays(2024) == [
+        date(2024, 1, 1), date(2024, 3, 29), date(2024, 4, 1), date(2024, 5, 6),
+        date(2024, 5, 27), date(2024, 8, 26), date(2024, 12, 25), date(2024, 12, 26),
+    ]
+    assert england_wales_bank_holidays(2021)[-2:] == [date(2021, 12, 27), date(2021, 12, 28)]
+    assert england_wales_bank_holidays(2022)[-2:] == [date(2022, 12, 26), date(2022, 12, 27)]
+    assert date(2022, 9, 19) in england_wales_bank_holidays(2022)
+
+
+def test_add_business_days_matches_day_by_day_stepping():
+    holidays = {d for year in range(2020, 2031) for d in england_wales_bank_holidays(year)}
+    calendar = BusinessCalendar(holidays, first_year=2020, last_year=2030)
+
+    def stepped(start, n):
+        current, added = start, 0
+        while added < n:
+            current += timedelta(days=1)
+            if current.weekday() < 5 and current.date() not in holidays:
+                added += 1
+        return current
+
+    rng = random.Random(20)
+    for _ in range(500):
+        start = datetime(2020, 1, 1, 9, 30) + timedelta(days=rng.randint(0, 3600))
+        n = rng.randint(-2, 40)
+        assert calendar.add_business_days(start, n) == (stepped(start, n) if n > 0 else start)
+
+    assert calendar.add_business_days(datetime(2024, 12, 24, 15), 1) == datetime(2024, 12, 27, 15)
+    # Past the precomputed range only weekends are skipped
+    assert calendar.add_business_days(date(2031, 1, 3), 6) == date(2031, 1, 13)
+    assert calendar.add_business_days(date(2031, 1, 4), 5) == date(2031, 1, 10)
+
+
+def test_recompute_matches_per_matter_status(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sla.db'}")
+    Base.metadata.create_all(engine, tables=[LAMatter.__table__])
+    db = sessionmaker(bind=engine)()
+    now = datetime.now()
+    offsets = [10, 3.5, 2.5, 1.5, 0.5, -0.5, -1.5, -5]
+    for i, days in enumerate(offsets):
+        db.add(LAMatter(id=f"m{i}", ref=f"R{i}", status="assigned", sla_due_date=now + timedelta(days=days)))
+    db.add(LAMatter(id="closed", ref="C", status="issued", sla_due_date=now - timedelta(days=9)))
+    db.add(LAMatter(id="none", ref="N", status="created"))
+    db.commit()
+
+    assert sla_manager.recompute_sla_statuses(db, now=now) == 6
+    statuses = {m.id: m.sla_status for m in db.query(LAMatter)}
+    for i in range(len(offsets)):
+        assert statuses[f"m{i}"] == asyncio.run(sla_manager.check_sla_status(f"m{i}", db))["status"]
+    assert [statuses[f"m{i}"] for i in range(len(offsets))] == [
+        "on_time", "on_time", "at_risk", "at_risk", "overdue", "overdue", "urgent_overdue", "urgent_overdue"
+    ]
+    assert statuses["closed"] == statuses["none"] == "on_time"
+    assert sla_manager.recompute_sla_statuses(db, now=now) == 0
+
+    counts = asyncio.run(sla_manager.get_sla_counts(db))
+    overdue = asyncio.run(sla_manager.get_overdue_matters(db, limit=2))
+    assert counts == {"overdue": 3, "at_risk": 2}
+    assert [m["id"] for m in overdue] == ["m7", "m6"]
+    db.close()
@@ -0,0 +1,86 @@
+import random
+import re
+
+import pytest
+
+import text_scanner
+from text_scanner import MultiPatternScanner, ScanRule
+from la.parsers import parse_con29, parse_llc1
+import risk_engine
+
+WORDS = [
+    "abutting", "highway", "adopted", "Enforcement notice", "enforcement notices", "contaminated land",
+    "Section 106", "s106", "CIL", "council", "Flood Zone 2", "flood zone 3", "floodzone1", "radon",
+    "not affected", "affected", "Building Regulations", "completion certificate", "provided", "missing",
+    "yes", "no", "true", "false", "none", "outstanding", "payable", "conservation area", "listed building",
+    "tree preservation", "TPO", "listed", "the", "of", "notice", ":", ".", "\n", "x",
+]
+
+
+def _legacy_con29_fields(text):
+    def grab(pattern, group=1):
+        m = re.search(pattern, text, re.I | re.S)
+        return m.group(group) if m else None
+
+    return (
+        grab(r"(?:abutting.*?adopted|highway.*adopted).*?(yes|no|true|false)"),
+        grab(r"\benforcement\s+notice(?:s)?\b.*?(yes|no|true|false)"),
+        grab(r"\bcontaminated\s+land\b.*?(yes|no|true|false)"),
+        grab(r"\b(section\s*106|s106)\b.*?(yes|no|true|false|outstanding|payable|none)", 2),
+        grab(r"\bCIL\b.*?(yes|no|true|false|outstanding|none|payable)"),
+        grab(r"\bflood\s*zone\s*(1|2|3)\b"),
+        grab(r"\bradon\b.*?(affected|not\s*affected|yes|no|true|false)"),
+        grab(r"\b(building\s*reg(ulation)?s?|completion\s*certificate)\b.*?(provided|missing|yes|no|true|false)", 3),
+    )
+
+
+def _con29_fields(text):
+    from la.parsers import _adopted_answer, _answer, _re_br_answer, _re_cil_answer, _re_radon_answer, \
+        _re_s106_answer, _re_yes_no, scan_document
+
+    scan = scan_document(text)
+    fz = scan.first("flood_zone")
+    return (
+        _adopted_answer(scan),
+        _answer(scan, "enforcement", _re_yes_no),
+        _answer(scan, "contaminated", _re_yes_no),
+        _answer(scan, "s106", _re_s106_answer),
+        _answer(scan, "cil", _re_cil_answer),
+        fz.group(1) if fz else None,
+        _answer(scan, "radon", _re_radon_answer),
+        _answer(scan, "building_regs", _re_br_answer),
+    )
+
+
+@pytest.mark.parametrize("automaton", [True, False])
+def test_overlapping_and_nested_triggers(monkeypatch, automaton):
+    monkeypatch.setattr(text_scanner, "AHOCORASICK_AVAILABLE", automaton and text_scanner.AHOCORASICK_AVAILABLE)
+    scanner = MultiPatternScanner([
+        ScanRule("he", ("he",)),
+        ScanRule("she", ("she",)),
+        ScanRule("hers", ("hers",)),
+        ScanRule("word", ("s",), r"\bs\w+"),
+    ])
+    result = scanner.scan("USHERS shed")
+    assert [(h.start, h.end) for h in result.all("she")] == [(1, 4), (7, 10)]
+    assert [(h.start, h.end) for h in result.all("he")] == [(2, 4), (8, 10)]
+    assert [h.start for h in result.all("hers")] == [2]
+    assert [h.group() for h in result.all("word")] == ["shed"]
+    assert "missing" not in result and result.first("missing") is None
+
+
+def test_parsers_match_legacy_regexes():
+    rng = random.Random(15)
+    for _ in range(400):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 40)))
+        assert _con29_fields(text) == _legacy_con29_fields(text), text
+
+        llc1 = {c.charge_type: c.present for c in parse_llc1(text).charges}
+        assert llc1["TPO"] == bool(re.search(r"\b(tree\s+preservation|TPO)\b", text, re.I))
+        assert llc1["S106"] == bool(re.search(r"\b(section\s*106|s106)\b", text, re.I))
+
+        codes = {r["code"] for r in risk_engine.run(text)["risks"]}
+        lowered = text.lower()
+        assert codes == {r["code"] for r in risk_engine.RULES if any(n in lowered for n in r["needles"])}
+
+    assert parse_con29("Highway adopted: maybe. Abutting land adopted: yes").roads_footways.abutting_highway_adopted
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+import time
+
+import text_store as ts
+from text_store import DocumentTextStore, StoredText
+
+
+def _counting_extractor(pages, ocr_checked=False):
+    calls = []
+
+    def extract(path, ocr):
+        calls.append((path, ocr))
+        with open(path, "rb") as f:
+            f.read()
+        return list(pages), False, ocr_checked
+
+    return extract, calls
+
+
+def test_bytes_and_paths_share_entries(tmp_path):
+    extract, calls = _counting_extractor(["page one text", "page two text"])
+    store = DocumentTextStore(str(tmp_path / "store"), extractor=extract)
+    data = b"%PDF-1.4 fake"
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(data)
+
+    first = store.get_or_extract(data)
+    again = store.get_or_extract(str(pdf))
+    assert first.sha256 == again.sha256 == hashlib.sha256(data).hexdigest()
+    assert again.cached and not first.cached
+    assert again.pages == ["page one text", "page two text"] and again.text == "page one text\n\npage two text"
+    assert len(calls) == 1
+
+    # Entries are compressed on disk and survive a new store instance
+    assert list((tmp_path / "store").rglob("*.json.gz"))
+    assert DocumentTextStore(str(tmp_path / "store"), extractor=extract).get(first.sha256).pages == first.pages
+
+    stats = store.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate_percent"] == 50.0
+
+
+def test_outdated_entries_are_re_extracted(tmp_path, monkeypatch):
+    extract, calls = _counting_extractor(["", "native text on page two"])
+    store = DocumentTextStore(str(tmp_path), extractor=extract)
+    sha = store.get_or_extract(b"scan", ocr=False).sha256
+
+    # A text-less page extracted without OCR is redone once OCR is wanted and available
+    monkeypatch.setattr(ts, "OCR_AVAILABLE", True)
+    assert store.get(sha, ocr=False) is not None
+    assert store.get(sha, ocr=True) is None
+    store.get_or_extract(b"scan", ocr=True)
+    assert len(calls) == 2 and calls[-1][1] is True
+
+    store.put(StoredText(sha256=sha, pages=["old"], version=ts.EXTRACTION_VERSION - 1))
+    assert store.get(sha) is None and store.stats["stale"] == 3
+
+
+def test_concurrent_requests_extract_once(tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_extract(path, ocr):
+        calls.append(path)
+        started.set()
+        release.wait(5)
+        return ["text"], False, True
+
+    store = DocumentTextStore(str(tmp_path), extractor=slow_extract)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get_or_extract(b"same"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1 and len(results) == 4 and {r.text for r in results} == {"text"}
+
+
+def test_late_arrival_waits_for_the_extraction_in_progress(tmp_path):
+    first_fails, second_started, release = threading.Event(), threading.Event(), threading.Event()
+    active, peak, calls = [0], [0], []
+
+    def extract(path, ocr):
+        calls.append(path)
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        try:
+            if len(calls) == 1:
+                first_fails.wait(5)
+                raise ValueError("unreadable")
+            second_started.set()
+            release.wait(5)
+            return ["text"], False, True
+        finally:
+            active[0] -= 1
+
+    store = DocumentTextStore(str(tmp_path), extractor=extract)
+    results = []
+
+    def request():
+        try:
+            results.append(store.get_or_extract(b"same").text)
+        except ValueError:
+            results.append(None)
+
+    # A's extraction fails while B waits on the lock; C arrives while B extracts
+    a, b, c = (threading.Thread(target=request) for _ in range(3))
+    a.start()
+    while not calls:
+        time.sleep(0.01)
+    b.start()
+    time.sleep(0.05)
+    first_fails.set()
+    second_started.wait(5)
+    c.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in (a, b, c):
+        thread.join(5)
+
+    assert peak[0] == 1 and len(calls) == 2
+    assert sorted(results, key=str) == [None, "text", "text"]
+    assert store._locks == {}
+
+
+def test_plain_text_documents_are_decoded(tmp_path):
+    store = DocumentTextStore(str(tmp_path))
+    stored = store.get_or_extract(b"CON29 SAMPLE\nAbutting Highway Adopted: NO\n")
+    assert stored.pages == ["CON29 SAMPLE\nAbutting Highway Adopted: NO\n"]
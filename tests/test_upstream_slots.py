@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fakeredis
+
+from lib.background_jobs.upstream_slots import UpstreamSlots, jittered_backoff, upstream_for, upstream_limit
+
+
+def test_cap_is_never_exceeded_and_release_frees_a_slot():
+    slots = UpstreamSlots(fakeredis.FakeRedis(), lease_seconds=60)
+    tokens = [slots.acquire("idox", 2) for _ in range(4)]
+    assert sum(token is not None for token in tokens) == 2
+    assert slots.held("idox") == 2
+    assert slots.acquire("other", 2) is not None
+
+    slots.release("idox", tokens[0])
+    assert slots.acquire("idox", 2) is not None
+    assert slots.acquire("idox", 2) is None
+
+
+def test_concurrent_acquires_respect_the_limit():
+    slots = UpstreamSlots(fakeredis.FakeRedis(), lease_seconds=60)
+    with ThreadPoolExecutor(8) as pool:
+        tokens = list(pool.map(lambda _: slots.acquire("idox", 3), range(32)))
+    assert sum(token is not None for token in tokens) == 3
+
+
+def test_acquire_interleaved_with_another_acquire_respects_the_limit():
+    class PausingRedis(fakeredis.FakeRedis):
+        """Runs `before_acquire` just before the next acquire reaches Redis"""
+        before_acquire = None
+
+        def evalsha(self, *args):
+            hook, PausingRedis.before_acquire = PausingRedis.before_acquire, None
+            if hook:
+                hook()
+            return super().evalsha(*args)
+
+    client = PausingRedis()
+    slots = UpstreamSlots(client, lease_seconds=60)
+    other = []
+    PausingRedis.before_acquire = lambda: other.append(slots.acquire("idox", 1))
+
+    assert slots.acquire("idox", 1) is None
+    assert other[0] is not None
+    assert client.zcard(slots._keys("idox")[0]) == 1
+
+
+def test_expired_lease_is_reclaimed():
+    slots = UpstreamSlots(fakeredis.FakeRedis(), lease_seconds=0.05)
+    assert slots.acquire("idox", 1) is not None
+    assert slots.acquire("idox", 1) is None
+    time.sleep(0.1)
+    assert slots.acquire("idox", 1) is not None
+
+
+def test_renewed_lease_outlives_lease_seconds():
+    slots = UpstreamSlots(fakeredis.FakeRedis(), lease_seconds=0.15)
+    token = slots.acquire("idox", 1)
+    with slots.renewing("idox", token):
+        time.sleep(0.4)
+        assert slots.acquire("idox", 1) is None
+    assert slots.renew("idox", token)
+    slots.release("idox", token)
+    assert not slots.renew("idox", token)
+    assert slots.acquire("idox", 1) is not None
+
+
+def test_upstream_keys_share_a_cluster_hash_tag():
+    keys = UpstreamSlots(fakeredis.FakeRedis())._keys("lpa:E60000001")
+    assert len(set(keys)) == 3
+    assert {key[key.index("{"):key.index("}") + 1] for key in keys} == {"{lpa:E60000001}"}
+
+
+def test_defaults_and_backoff():
+    assert upstream_for("E60000001") == "lpa:E60000001"
+    assert upstream_limit("lpa:E60000001") >= 1
+    for attempt in range(8):
+        assert 0 <= jittered_backoff(attempt, base=30, cap=900) <= min(900, 30 * 2 ** attempt)
@@ -0,0 +1,205 @@
+"""
+Single-pass multi-pattern text scanning.
+
+Rules are compiled once into an Aho–Corasick automaton over their literal
+trigger words. A scan lowercases the text and walks it once with that
+automaton, collecting the offset of every trigger occurrence (overlapping and
+nested ones included). Each rule's full regex is then only tried, anchored,
+at the offsets of its own triggers, and only when a consumer asks for that
+rule, so a parser that needs the first hit stops at the first one that
+verifies. Parsers and risk rules consume the hits instead of running their
+own regex over the whole document.
+
+Without pyahocorasick the trigger offsets are collected with one str.find
+sweep per trigger, which is still C-speed for the rule sets used here.
+"""
+import heapq
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+@dataclass(frozen=True)
+class ScanRule:
+    """
+    A named pattern and the literal words that can start a match.
+
+    Every match of `pattern` must begin with one of `triggers` (compared
+    case-insensitively). Without a pattern the trigger itself is the match,
+    i.e. a plain case-insensitive substring. Several rules may share a name;
+    their hits are merged.
+    """
+    name: str
+    triggers: Tuple[str, ...]
+    pattern: Optional[str] = None
+    flags: int = re.I | re.S
+
+
+class Hit(NamedTuple):
+    """One rule match"""
+    name: str
+    start: int
+    end: int
+    match: Optional["re.Match"]
+
+    def group(self, index: int = 0) -> Optional[str]:
+        return self.match.group(index) if self.match else None
+
+
+class ScanResult:
+    """
+    Hits of one scan, per rule name in text order
+
+    Candidates are verified on first access; all() verifies every candidate
+    of a rule, first() only up to the first that matches.
+    """
+
+    def __init__(self, scanner: "MultiPatternScanner", text: str, starts: List[List[int]]):
+        self.text = text
+        self._scanner = scanner
+        self._starts = starts
+        self._hits: Dict[str, List[Hit]] = {}
+        self._pending: Dict[str, Iterator[Hit]] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return self.first(name) is not None
+
+    def all(self, name: str) -> List[Hit]:
+        hits = self._hits.setdefault(name, [])
+        hits.extend(self._iter_pending(name))
+        return hits
+
+    def first(self, name: str) -> Optional[Hit]:
+        hits = self._hits.setdefault(name, [])
+        if not hits:
+            hit = next(self._iter_pending(name), None)
+            if hit is not None:
+                hits.append(hit)
+        return hits[0] if hits else None
+
+    def first_of(self, *names: str) -> Optional[Hit]:
+        """Earliest hit among several rules"""
+        candidates = [hit for hit in (self.first(name) for name in names) if hit is not None]
+        return min(candidates, key=lambda hit: hit.start) if candidates else None
+
+    def search_after(self, name: str, pattern: Pattern) -> Optional["re.Match"]:
+        """
+        `pattern` searched from the end of the rule's first hit.
+
+        Equivalent to re.search(rule + ".*?" + pattern, text, re.S): if no
+        match follows the first hit, none follows any later hit either.
+        """
+        hit = self.first(name)
+        return pattern.search(self.text, hit.end) if hit else None
+
+    def _iter_pending(self, name: str) -> Iterator[Hit]:
+        pending = self._pending.get(name)
+        if pending is None:
+            indexes = self._scanner._by_name.get(name, ())
+            streams = [self._scanner._verify(index, self.text, self._starts) for index in indexes]
+            pending = self._pending[name] = (
+                streams[0] if len(streams) == 1 else heapq.merge(*streams, key=lambda hit: hit.start)
+            )
+        return pending
+
+
+class MultiPatternScanner:
+    """Compiled rule set; scan() walks the text once"""
+
+    def __init__(self, rules: Iterable[ScanRule]):
+        self.rules: List[ScanRule] = list(rules)
+        self._patterns: List[Optional[Pattern]] = [
+            re.compile(rule.pattern, rule.flags) if rule.pattern else None for rule in self.rules
+        ]
+
+        self._by_name: Dict[str, List[int]] = {}
+        self._triggers: List[str] = []
+        trigger_ids: Dict[str, int] = {}
+        # Trigger ids per rule
+        self._rule_triggers: List[Tuple[int, ...]] = []
+        for rule in self.rules:
+            if not rule.triggers:
+                raise ValueError(f"Scan rule {rule.name} has no triggers")
+            self._by_name.setdefault(rule.name, []).append(len(self._rule_triggers))
+            ids = []
+            for trigger in rule.triggers:
+                if not trigger:
+                    raise ValueError(f"Scan rule {rule.name} has an empty trigger")
+                trigger = trigger.lower()
+                if trigger not in trigger_ids:
+                    trigger_ids[trigger] = len(self._triggers)
+                    self._triggers.append(trigger)
+                ids.append(trigger_ids[trigger])
+            self._rule_triggers.append(tuple(dict.fromkeys(ids)))
+
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for trigger_id, trigger in enumerate(self._triggers):
+                self._automaton.add_word(trigger, (trigger_id, len(trigger) - 1))
+            self._automaton.make_automaton()
+
+    def scan(self, text: str) -> ScanResult:
+        text = text or ""
+        lowered = _lower(text)
+
+        # Start offsets per trigger, ascending
+        if self._automaton is not None:
+            starts: List[List[int]] = [[] for _ in self._triggers]
+            for end, (trigger_id, offset) in self._automaton.iter(lowered):
+                starts[trigger_id].append(end - offset)
+        else:
+            starts = [_find_all(lowered, trigger) for trigger in self._triggers]
+
+        return ScanResult(self, text, starts)
+
+    def _candidates(self, index: int, starts: List[List[int]]) -> Iterator[Tuple[int, int]]:
+        """(start, trigger length) of a rule's triggers in text order"""
+        streams = [
+            ((start, len(self._triggers[trigger_id])) for start in starts[trigger_id])
+            for trigger_id in self._rule_triggers[index]
+        ]
+        return streams[0] if len(streams) == 1 else heapq.merge(*streams)
+
+    def _verify(self, index: int, text: str, starts: List[List[int]]) -> Iterator[Hit]:
+        """Rule matches at its trigger offsets; a rule's hits don't overlap, as with re.finditer"""
+        name = self.rules[index].name
+        pattern = self._patterns[index]
+        last_end = 0
+        for start, length in self._candidates(index, starts):
+            if start < last_end:
+                continue
+            if pattern is None:
+                last_end = start + length
+                yield Hit(name, start, last_end, None)
+                continue
+            match = pattern.match(text, start)
+            if match is not None and match.end() > start:
+                last_end = match.end()
+                yield Hit(name, start, last_end, match)
+
+
+def _find_all(text: str, word: str) -> List[int]:
+    """Start of every (possibly overlapping) occurrence"""
+    starts = []
+    find = text.find
+    position = find(word)
+    while position != -1:
+        starts.append(position)
+        position = find(word, position + 1)
+    return starts
+
+
+def _lower(text: str) -> str:
+    """Lowercase without changing offsets"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters (e.g. 'İ') lowercase to two; leave those unchanged
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
@@ -0,0 +1,254 @@
+"""
+Content-addressed store of extracted document text.
+
+Extracted text is kept per page, keyed by the SHA-256 of the file bytes, as
+gzip-compressed JSON on disk shared by every process using the directory.
+The LA ingest pipeline, la.services, jobs_tasks, bulk processing and
+convey_extract all read text from here, so a document is parsed (and OCR'd)
+once however many times and through however many routes it is uploaded.
+
+Entries record the extraction version and whether OCR was attempted; an
+entry from an older extractor, or one with text-less pages that was made
+without OCR when OCR is now wanted, is re-extracted.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from page_ocr import MIN_PAGE_TEXT_CHARS, OCR_AVAILABLE, extract_pages
+
+logger = logging.getLogger(__name__)
+
+TEXT_STORE_DIR = os.getenv("TEXT_STORE_DIR", "data/text_store")
+
+# Bump when extraction changes so existing entries are re-extracted
+EXTRACTION_VERSION = 1
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# (path, ocr) -> (page texts, OCR applied, OCR attempted for text-less pages)
+Extractor = Callable[[str, bool], Tuple[List[str], bool, bool]]
+
+
+@dataclass
+class StoredText:
+    """Extracted text of one document"""
+    sha256: str
+    pages: List[str]
+    ocr_applied: bool = False
+    ocr_checked: bool = False
+    version: int = EXTRACTION_VERSION
+    extracted_at: float = field(default_factory=time.time)
+    # Served from the store rather than extracted for this call (not persisted)
+    cached: bool = False
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(self.pages).strip()
+
+    @property
+    def sparse_pages(self) -> List[int]:
+        """Pages with (almost) no text"""
+        return [i for i, page in enumerate(self.pages) if len(page.strip()) < MIN_PAGE_TEXT_CHARS]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sha256": self.sha256,
+            "pages": self.pages,
+            "ocr_applied": self.ocr_applied,
+            "ocr_checked": self.ocr_checked,
+            "version": self.version,
+            "extracted_at": self.extracted_at,
+        }
+
+
+def content_sha256(source: Union[str, bytes]) -> str:
+    """SHA-256 of file bytes, or of a file read in chunks"""
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    h = hashlib.sha256()
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def extract_document(path: str, ocr: bool = True) -> Tuple[List[str], bool, bool]:
+    """
+    Page texts of a file.
+
+    PDFs go through page_ocr (native text per page, OCR for pages without a
+    text layer), falling back to pdfminer when PyPDF2 can't read the file.
+    Anything else is decoded as UTF-8 text.
+    """
+    with open(path, "rb") as f:
+        head = f.read(5)
+        if head != b"%PDF-":
+            return [(head + f.read()).decode("utf-8", "replace")], False, True
+
+    try:
+        result = extract_pages(path, ocr=ocr)
+        return result.pages, result.ocr_applied, ocr and OCR_AVAILABLE
+    except Exception as e:
+        logger.info("Page extraction failed for %s (%s), trying pdfminer", path, e)
+        from parsers.pdf_text import extract_pdf_text
+        return extract_pdf_text(path).split("\f"), False, False
+
+
+class DocumentTextStore:
+    """Extracted text per document, keyed by content hash"""
+
+    def __init__(self, directory: str = TEXT_STORE_DIR, extractor: Extractor = extract_document):
+        self.directory = directory
+        self.extractor = extractor
+        # sha256 -> [lock, threads holding or waiting on it]
+        self._locks: Dict[str, List[Any]] = {}
+        self._locks_guard = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'extractions': 0,
+            'extraction_errors': 0,
+            'write_errors': 0
+        }
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.directory, sha256[:2], f"{sha256}.json.gz")
+
+    def get(self, sha256: str, ocr: bool = False) -> Optional[StoredText]:
+        """
+        Stored text for a hash, or None if absent or out of date
+
+        Args:
+            sha256: Content hash of the file
+            ocr: Whether the caller wants text-less pages OCR'd; entries made
+                without OCR that have such pages are then out of date
+        """
+
+        stored, reason = self._load(sha256, ocr)
+        self.stats[reason] += 1
+        return stored
+
+    def _load(self, sha256: str, ocr: bool) -> Tuple[Optional[StoredText], str]:
+        try:
+            with gzip.open(self._path(sha256), "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None, 'misses'
+
+        stored = StoredText(
+            sha256=sha256,
+            pages=data.get("pages", []),
+            ocr_applied=data.get("ocr_applied", False),
+            ocr_checked=data.get("ocr_checked", False),
+            version=data.get("version", 0),
+            extracted_at=data.get("extracted_at", 0.0),
+            cached=True
+        )
+        if stored.version != EXTRACTION_VERSION or (
+            ocr and OCR_AVAILABLE and not stored.ocr_checked and stored.sparse_pages
+        ):
+            return None, 'stale'
+        return stored, 'hits'
+
+    def put(self, stored: StoredText) -> None:
+        """Write an entry (atomically; concurrent writers of one hash write the same text)"""
+
+        path = self._path(stored.sha256)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(stored.to_dict()).encode("utf-8"))
+            os.replace(tmp, path)
+        except OSError as e:
+            self.stats['write_errors'] += 1
+            logger.warning("Text store write failed for %s: %s", stored.sha256, e)
+
+    def get_or_extract(
+        self,
+        source: Union[str, bytes],
+        ocr: bool = True,
+        sha256: Optional[str] = None
+    ) -> StoredText:
+        """
+        Text of a document, extracting and storing it on a miss
+
+        Args:
+            source: File path or bytes
+            ocr: OCR pages without a text layer (when OCR is available)
+            sha256: Content hash, if the caller already has it
+
+        Raises:
+            Whatever the extractor raises for an unreadable file
+        """
+
+        sha256 = sha256 or content_sha256(source)
+        stored = self.get(sha256, ocr)
+        if stored is not None:
+            return stored
+
+        # One extraction per document at a time in this process
+        with self._extraction_lock(sha256):
+            # Another thread may have extracted it while this one waited
+            stored, _ = self._load(sha256, ocr)
+            if stored is None:
+                stored = self._extract(source, sha256, ocr)
+                self.put(stored)
+        return stored
+
+    def _extract(self, source: Union[str, bytes], sha256: str, ocr: bool) -> StoredText:
+        self.stats['extractions'] += 1
+        path = source
+        if isinstance(source, bytes):
+            fd, path = tempfile.mkstemp(suffix=".bin")
+            with os.fdopen(fd, "wb") as f:
+                f.write(source)
+        try:
+            pages, ocr_applied, ocr_checked = self.extractor(path, ocr)
+        except Exception:
+            self.stats['extraction_errors'] += 1
+            raise
+        finally:
+            if path is not source:
+                os.unlink(path)
+        return StoredText(sha256=sha256, pages=pages, ocr_applied=ocr_applied, ocr_checked=ocr_checked)
+
+    @contextmanager
+    def _extraction_lock(self, sha256: str) -> Iterator[None]:
+        """Hold a document's lock; it is dropped once no thread holds or waits on it"""
+        with self._locks_guard:
+            entry = self._locks.setdefault(sha256, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[sha256]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Lookup counts and hit rate for this process"""
+
+        lookups = self.stats['hits'] + self.stats['misses'] + self.stats['stale']
+        return {
+            **self.stats,
+            'hit_rate_percent': round(self.stats['hits'] / lookups * 100, 2) if lookups else 0.0,
+            'directory': self.directory,
+            'extraction_version': EXTRACTION_VERSION
+        }
+
+
+# Process-wide store
+text_store = DocumentTextStore()